@@ -19,6 +19,7 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Any, Optional, Union, Callable
 from datetime import datetime, timedelta
+import time
 import requests
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 import xgboost as xgb
@@ -41,7 +42,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import helpers from other modules
-from model_utils import evaluate_model, save_model, load_model_with_metadata
+from model_utils import evaluate_model, save_model, load_model_with_metadata, calculate_class_weights, create_sample_weights
+from data_loader import get_training_state, load_rows_after_cutoff
 from xgboost_optimization import XGBoostOptimizer
 
 class AdaptiveParameterTuner:
@@ -55,7 +57,12 @@ class AdaptiveParameterTuner:
                  performance_threshold: float = 0.05,
                  min_data_points: int = 5,
                  adaptation_interval: int = 24,  # hours
-                 api_base_url: str = 'http://localhost:3000/api/ml/optimization'):
+                 api_base_url: str = 'http://localhost:3000/api/ml/optimization',
+                 full_retrain_every: int = 10,
+                 full_retrain_max_age_hours: float = 168,
+                 drift_threshold: float = 0.5,
+                 min_new_rows: int = 20,
+                 incremental_holdout: float = 0.2):
         """
         Initialize the adaptive tuner
         
@@ -65,12 +72,23 @@ class AdaptiveParameterTuner:
             min_data_points: Minimum number of performance data points needed before adaptation
             adaptation_interval: Minimum hours between adaptations
             api_base_url: Base URL for the ML optimization API
+            full_retrain_every: Incremental updates allowed before a full retrain is forced
+            full_retrain_max_age_hours: Maximum hours since the last full retrain before one is forced
+            drift_threshold: Average shift of the new rows' feature means, in training standard
+                deviations, above which the model is fully retrained instead of updated
+            min_new_rows: Minimum number of new candles needed for an incremental update
+            incremental_holdout: Fraction of the newest candles held out to evaluate an incremental update
         """
         self.optimizer = base_optimizer
         self.performance_threshold = performance_threshold
         self.min_data_points = min_data_points
         self.adaptation_interval = adaptation_interval
         self.api_base_url = api_base_url
+        self.full_retrain_every = full_retrain_every
+        self.full_retrain_max_age_hours = full_retrain_max_age_hours
+        self.drift_threshold = drift_threshold
+        self.min_new_rows = min_new_rows
+        self.incremental_holdout = incremental_holdout
         self.symbol = base_optimizer.symbol
         self.timeframe = base_optimizer.timeframe
         self.logger = logging.getLogger(f"{__name__}.{self.symbol}_{self.timeframe}")
@@ -343,12 +361,85 @@ class AdaptiveParameterTuner:
         
         return new_params
     
-    def apply_adaptation_to_model(self, model_type: str = 'best') -> Dict[str, Any]:
+    def measure_feature_drift(self, X_new: np.ndarray) -> float:
+        """
+        Measure how far new rows have drifted from the training data
+        
+        The rows are scaled with the training scaler, so without drift each feature
+        has a mean near 0; the drift is the average absolute feature mean (missing
+        values are ignored).
+        
+        Args:
+            X_new: New rows scaled with the training scaler
+            
+        Returns:
+            Average absolute shift of the feature means, in training standard deviations
+        """
+        if len(X_new) == 0:
+            return 0.0
+        return float(np.nanmean(np.abs(np.nanmean(X_new, axis=0))))
+    
+    def plan_training_update(self, training_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Decide between an incremental update and a full retrain of a model
+        
+        A full retrain is chosen when the model has no recorded training cutoff, when the
+        schedule is due (too many incremental updates or too long since the last full
+        retrain), or when the new rows have drifted from the training data.
+        
+        Args:
+            training_state: 'training_state' from the model metadata (or None)
+            
+        Returns:
+            Dictionary with 'mode' ('incremental', 'full' or 'none'), 'reason' and, for
+            incremental updates, the new rows ('X_new', 'y_new', 'cutoffs') and 'drift'
+        """
+        if not training_state or 'cutoff' not in training_state or 'scaler' not in training_state:
+            return {'mode': 'full', 'reason': 'no training cutoff recorded'}
+        
+        updates = training_state.get('incremental_updates', 0)
+        if updates >= self.full_retrain_every:
+            return {'mode': 'full', 'reason': f'scheduled after {updates} incremental updates'}
+        
+        last_full = training_state.get('last_full_retrain')
+        if last_full:
+            age_hours = (datetime.now() - datetime.fromisoformat(last_full)).total_seconds() / 3600
+            if age_hours >= self.full_retrain_max_age_hours:
+                return {'mode': 'full', 'reason': f'scheduled, last full retrain {age_hours:.0f} hours ago'}
+        
+        try:
+            X_new, y_new, cutoffs = load_rows_after_cutoff(
+                self.optimizer.data_dir, self.symbol, self.timeframe, training_state)
+        except Exception as e:
+            return {'mode': 'full', 'reason': f'new rows unavailable ({str(e)})'}
+        
+        if len(X_new) < self.min_new_rows:
+            return {'mode': 'none', 'reason': f'only {len(X_new)} new candles since the training cutoff'}
+        
+        drift = self.measure_feature_drift(X_new)
+        if drift > self.drift_threshold:
+            return {'mode': 'full', 'reason': f'feature drift {drift:.2f} above {self.drift_threshold}', 'drift': drift}
+        
+        return {
+            'mode': 'incremental',
+            'reason': f'{len(X_new)} new candles, drift {drift:.2f}',
+            'X_new': X_new,
+            'y_new': y_new,
+            'cutoffs': cutoffs,
+            'drift': drift
+        }
+    
+    def apply_adaptation_to_model(self, model_type: str = 'best', incremental: bool = True) -> Dict[str, Any]:
         """
         Load the current best model, adapt its parameters, and save a new version
         
+        With incremental=True the loaded model keeps boosting on only the candles added
+        since its training cutoff, so the cost scales with the new data. It falls back
+        to a full retrain as decided by plan_training_update.
+        
         Args:
             model_type: Type of model to adapt ('bayesian', 'random_search', 'grid_search', or 'best')
+            incremental: Whether to update the model incrementally when possible
             
         Returns:
             Dictionary with new model info and performance metrics
@@ -408,30 +499,92 @@ class AdaptiveParameterTuner:
             # Adapt parameters
             new_params = self.adapt_parameters(current_params)
             
-            # Train a new model with adapted parameters
-            self.optimizer.load_data()  # Ensure data is loaded
-            
             # Combine with base parameters
             full_params = {**self.optimizer.base_params, **new_params}
             
-            # Train the new model
-            new_model = xgb.XGBClassifier(**full_params)
-            new_model.fit(
-                self.optimizer.X_train, 
-                self.optimizer.y_train,
-                sample_weight=self.optimizer.sample_weights,
-                eval_set=[(self.optimizer.X_test, self.optimizer.y_test)],
-                verbose=False
-            )
+            # Decide how to train the new version
+            previous_state = model_info['metadata'].get('training_state')
+            if incremental:
+                plan = self.plan_training_update(previous_state)
+            else:
+                plan = {'mode': 'full', 'reason': 'incremental update disabled'}
+            
+            if plan['mode'] == 'none':
+                self.logger.info(f"Skipping adaptation: {plan['reason']}")
+                return {'success': False, 'error': f"Nothing to train on: {plan['reason']}"}
+            
+            self.logger.info(f"Training mode: {plan['mode']} ({plan['reason']})")
+            start_time = time.time()
+            
+            if plan['mode'] == 'incremental':
+                # Continue boosting on the new candles, holding out the newest ones for evaluation
+                X_new, y_new, cutoffs = plan['X_new'], plan['y_new'], plan['cutoffs']
+                n_holdout = max(1, int(len(X_new) * self.incremental_holdout))
+                n_train = len(X_new) - n_holdout
+                X_fit, y_fit = X_new[:n_train], y_new[:n_train]
+                X_eval, y_eval = X_new[n_train:], y_new[n_train:]
+                
+                # Add trees in proportion to the new data
+                total_estimators = int(full_params.get('n_estimators') or 100)
+                trained_rows = max(previous_state.get('rows', n_train), 1)
+                added_rounds = min(total_estimators, max(10, int(total_estimators * n_train / trained_rows)))
+                
+                booster_params = {k: v for k, v in full_params.items()
+                                  if k not in ('n_estimators', 'use_label_encoder', 'n_jobs', 'early_stopping_rounds')}
+                dtrain = xgb.DMatrix(
+                    X_fit,
+                    label=y_fit,
+                    weight=create_sample_weights(y_fit, calculate_class_weights(y_fit))
+                )
+                # xgb.train rather than XGBClassifier.fit, which rejects batches missing a class
+                booster = xgb.train(booster_params, dtrain, num_boost_round=added_rounds,
+                                    xgb_model=model.get_booster())
+                new_model = xgb.XGBClassifier()
+                new_model.load_model(bytearray(booster.save_raw(raw_format='json')))
+                
+                training_state = {
+                    **previous_state,
+                    'cutoff': cutoffs[n_train - 1],
+                    'rows': previous_state.get('rows', 0) + n_train,
+                    'incremental_updates': previous_state.get('incremental_updates', 0) + 1
+                }
+                new_rows = n_train
+            else:
+                # Train a new model with adapted parameters on all data
+                self.optimizer.load_data()  # Ensure data is loaded
+                
+                new_model = xgb.XGBClassifier(**full_params)
+                new_model.fit(
+                    self.optimizer.X_train, 
+                    self.optimizer.y_train,
+                    sample_weight=self.optimizer.sample_weights,
+                    eval_set=[(self.optimizer.X_test, self.optimizer.y_test)],
+                    verbose=False
+                )
+                X_eval, y_eval = self.optimizer.X_test, self.optimizer.y_test
+                
+                training_state = {
+                    **get_training_state(self.optimizer.data_dir, self.symbol, self.timeframe),
+                    'last_full_retrain': datetime.now().isoformat(),
+                    'incremental_updates': 0
+                }
+                new_rows = training_state['rows']
+                added_rounds = None
+            
+            training_seconds = time.time() - start_time
+            training_state['mode'] = plan['mode']
+            training_state['reason'] = plan['reason']
+            training_state['training_seconds'] = training_seconds
             
             # Evaluate new model
-            y_pred = new_model.predict(self.optimizer.X_test)
-            accuracy = accuracy_score(self.optimizer.y_test, y_pred)
-            precision = precision_score(self.optimizer.y_test, y_pred, average='weighted')
-            recall = recall_score(self.optimizer.y_test, y_pred, average='weighted')
-            f1 = f1_score(self.optimizer.y_test, y_pred, average='weighted')
+            y_pred = new_model.predict(X_eval)
+            accuracy = accuracy_score(y_eval, y_pred)
+            precision = precision_score(y_eval, y_pred, average='weighted', zero_division=0)
+            recall = recall_score(y_eval, y_pred, average='weighted', zero_division=0)
+            f1 = f1_score(y_eval, y_pred, average='weighted', zero_division=0)
             
-            self.logger.info(f"Adapted model - Accuracy: {accuracy:.4f}, F1: {f1:.4f}")
+            self.logger.info(f"Adapted model ({plan['mode']}, {new_rows} rows, {training_seconds:.2f}s) - "
+                             f"Accuracy: {accuracy:.4f}, F1: {f1:.4f}")
             
             # Save the adapted model
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -446,7 +599,7 @@ class AdaptiveParameterTuner:
             model_id = f"{self.symbol}_{self.timeframe}_{model_type}_adapted_{timestamp}"
             
             # Save metadata
-            features = [f"feature_{i}" for i in range(self.optimizer.X_train.shape[1])]
+            features = [f"feature_{i}" for i in range(X_eval.shape[1])]
             metadata = {
                 'modelId': model_id,
                 'symbol': self.symbol,
@@ -454,7 +607,7 @@ class AdaptiveParameterTuner:
                 'params': new_params,
                 'previousParams': current_params,
                 'features': features,
-                'class_mapping': self.optimizer.class_mapping,
+                'class_mapping': getattr(self.optimizer, 'class_mapping', None) or model_info['metadata'].get('class_mapping'),
                 'performance': {
                     'accuracy': accuracy,
                     'precision': precision,
@@ -464,8 +617,10 @@ class AdaptiveParameterTuner:
                 'adaptiveInfo': {
                     'adaptationCount': self.adaptation_count,
                     'adaptationTime': datetime.now().isoformat(),
-                    'previousModelId': best_model_info.get('modelId')
+                    'previousModelId': best_model_info.get('modelId'),
+                    'addedRounds': added_rounds
                 },
+                'training_state': training_state,
                 'training_date': datetime.now().isoformat()
             }
             
@@ -487,7 +642,7 @@ class AdaptiveParameterTuner:
                     'f1Score': f1,
                     'params': new_params,
                     'trainingDate': datetime.now().isoformat(),
-                    'notes': f"Adapted from {model_type} model. Adaptation #{self.adaptation_count}"
+                    'notes': f"Adapted from {model_type} model ({plan['mode']} training). Adaptation #{self.adaptation_count}"
                 }
                 
                 response = requests.post(
@@ -513,7 +668,11 @@ class AdaptiveParameterTuner:
                 },
                 'params': new_params,
                 'previous_params': current_params,
-                'adaptation_count': self.adaptation_count
+                'adaptation_count': self.adaptation_count,
+                'training_mode': plan['mode'],
+                'training_reason': plan['reason'],
+                'new_rows': new_rows,
+                'training_seconds': training_seconds
             }
             
         except Exception as e:
@@ -566,7 +725,9 @@ def perform_adaptive_tuning(symbol: str, timeframe: str) -> Dict[str, Any]:
                 'performance': result['performance'],
                 'previous_params': result['previous_params'],
                 'new_params': result['params'],
-                'adaptation_count': result['adaptation_count']
+                'adaptation_count': result['adaptation_count'],
+                'training_mode': result['training_mode'],
+                'training_seconds': result['training_seconds']
             }
         else:
             logger.error(f"Failed to adapt model: {result.get('error', 'Unknown error')}")
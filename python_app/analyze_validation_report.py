@@ -3,7 +3,9 @@
 Analyze Validation Report
 
 This script analyzes and visualizes the results from historical prediction validation,
-generating charts and statistics to evaluate model performance.
+generating charts and statistics to evaluate model performance. Statistics and
+charts come from the report's rollup (see validation_analytics) instead of the
+full CSV.
 
 Usage:
     python analyze_validation_report.py --report=path/to/report.csv
@@ -16,341 +18,79 @@ Arguments:
 import os
 import sys
 import argparse
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Optional
 
 # Add parent directory to the path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-def load_report(report_path: str) -> pd.DataFrame:
+from validation_analytics import ValidationRollup, load_rollup, render_validation_charts
+
+def load_report(report_path: str) -> Optional[ValidationRollup]:
     """
-    Load the validation report from a CSV file.
+    Load the rollup of a validation report (built from the CSV file if needed).
     
     Args:
         report_path: Path to the CSV report file
         
     Returns:
-        DataFrame containing the report data
+        The report's rollup, or None if the report cannot be read
     """
-    if not os.path.exists(report_path):
-        print(f"Error: Report file '{report_path}' not found")
-        return pd.DataFrame()
+    rollup = load_rollup(report_path)
+    if rollup is None:
+        print(f"Error: Could not load report '{report_path}'")
+        return None
     
-    try:
-        df = pd.read_csv(report_path)
-        # Convert timestamp to datetime
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        print(f"Loaded report with {len(df)} records")
-        return df
-    except Exception as e:
-        print(f"Error loading report: {e}")
-        return pd.DataFrame()
+    print(f"Loaded report with {rollup.total} records")
+    return rollup
 
-def create_basic_stats(df: pd.DataFrame) -> Dict:
+def create_basic_stats(rollup: ValidationRollup) -> Dict:
     """
-    Create basic statistics from the validation report.
+    Create basic statistics from the rollup of a validation report.
     
     Args:
-        df: DataFrame containing validation data
+        rollup: Rollup of the validation report
         
     Returns:
         Dictionary with basic statistics
     """
-    if df.empty:
-        return {}
-    
-    stats = {}
-    
-    # Overall accuracy
-    stats['total_predictions'] = len(df)
-    stats['correct_predictions'] = df['was_correct'].sum()
-    stats['accuracy'] = (stats['correct_predictions'] / stats['total_predictions']) * 100 if stats['total_predictions'] > 0 else 0
-    
-    # Predictions by type
-    for pred_type in ['BUY', 'HOLD', 'SELL']:
-        type_df = df[df['prediction'] == pred_type]
-        stats[f'{pred_type.lower()}_predictions'] = len(type_df)
-        stats[f'{pred_type.lower()}_correct'] = type_df['was_correct'].sum() if not type_df.empty else 0
-        stats[f'{pred_type.lower()}_accuracy'] = (stats[f'{pred_type.lower()}_correct'] / stats[f'{pred_type.lower()}_predictions']) * 100 if stats[f'{pred_type.lower()}_predictions'] > 0 else 0
-    
-    # Average confidence
-    stats['avg_confidence'] = df['confidence'].mean()
-    
-    # High confidence stats (>0.8)
-    high_conf_df = df[df['confidence'] > 0.8]
-    stats['high_conf_predictions'] = len(high_conf_df)
-    stats['high_conf_correct'] = high_conf_df['was_correct'].sum() if not high_conf_df.empty else 0
-    stats['high_conf_accuracy'] = (stats['high_conf_correct'] / stats['high_conf_predictions']) * 100 if stats['high_conf_predictions'] > 0 else 0
-    
-    # Time range
-    if 'timestamp' in df.columns:
-        stats['start_time'] = df['timestamp'].min()
-        stats['end_time'] = df['timestamp'].max()
-    
-    return stats
-
-def plot_prediction_accuracy(df: pd.DataFrame, output_dir: str) -> None:
-    """
-    Plot prediction accuracy by prediction type.
-    
-    Args:
-        df: DataFrame containing validation data
-        output_dir: Directory to save the plot
-    """
-    if df.empty:
-        return
-    
-    # Create data for the plot
-    pred_types = ['BUY', 'HOLD', 'SELL']
-    counts = []
-    correct_counts = []
-    
-    for pred_type in pred_types:
-        type_df = df[df['prediction'] == pred_type]
-        counts.append(len(type_df))
-        correct_counts.append(type_df['was_correct'].sum() if not type_df.empty else 0)
-    
-    # Create the figure
-    plt.figure(figsize=(10, 6))
-    
-    # Set position of bars on X axis
-    r1 = np.arange(len(pred_types))
-    r2 = [x + 0.25 for x in r1]
-    
-    # Create bars
-    plt.bar(r1, counts, color='skyblue', width=0.25, label='Total Predictions')
-    plt.bar(r2, correct_counts, color='lightgreen', width=0.25, label='Correct Predictions')
-    
-    # Add accuracy percentages
-    for i, (count, correct) in enumerate(zip(counts, correct_counts)):
-        if count > 0:
-            accuracy = (correct / count) * 100
-            plt.text(r1[i], count + 0.5, f'{count}', ha='center')
-            plt.text(r2[i], correct + 0.5, f'{correct}\n({accuracy:.1f}%)', ha='center')
-        else:
-            plt.text(r1[i], 0.5, '0', ha='center')
-            plt.text(r2[i], 0.5, '0\n(0%)', ha='center')
-    
-    # Add labels and title
-    plt.xlabel('Prediction Type')
-    plt.ylabel('Count')
-    plt.title('Prediction Accuracy by Type')
-    plt.xticks([r + 0.125 for r in range(len(pred_types))], pred_types)
-    plt.legend()
-    
-    # Add grid lines
-    plt.grid(True, linestyle='--', alpha=0.7)
-    
-    # Save the plot
-    plt.tight_layout()
-    output_path = os.path.join(output_dir, 'prediction_accuracy.png')
-    plt.savefig(output_path)
-    plt.close()
-    print(f"Saved prediction accuracy chart to: {output_path}")
-
-def plot_cumulative_accuracy(df: pd.DataFrame, output_dir: str) -> None:
-    """
-    Plot cumulative prediction accuracy over time.
-    
-    Args:
-        df: DataFrame containing validation data
-        output_dir: Directory to save the plot
-    """
-    if df.empty or 'cumulative_accuracy' not in df.columns or 'timestamp' not in df.columns:
-        return
-    
-    plt.figure(figsize=(12, 6))
-    
-    # Plot cumulative accuracy
-    plt.plot(df['timestamp'], df['cumulative_accuracy'], color='blue', marker='', linestyle='-', linewidth=2)
-    
-    # Add a horizontal line at 50% accuracy
-    plt.axhline(y=50, color='red', linestyle='--', alpha=0.7, label='50% Accuracy')
-    
-    # Add labels and title
-    plt.xlabel('Time')
-    plt.ylabel('Cumulative Accuracy (%)')
-    plt.title('Cumulative Prediction Accuracy Over Time')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend()
-    
-    # Format x-axis to show dates nicely
-    plt.gcf().autofmt_xdate()
-    
-    # Save the plot
-    plt.tight_layout()
-    output_path = os.path.join(output_dir, 'cumulative_accuracy.png')
-    plt.savefig(output_path)
-    plt.close()
-    print(f"Saved cumulative accuracy chart to: {output_path}")
-
-def plot_confidence_vs_accuracy(df: pd.DataFrame, output_dir: str) -> None:
-    """
-    Plot relationship between prediction confidence and accuracy.
-    
-    Args:
-        df: DataFrame containing validation data
-        output_dir: Directory to save the plot
-    """
-    if df.empty:
-        return
-    
-    # Create confidence bins
-    bins = [0, 0.6, 0.7, 0.8, 0.9, 0.95, 0.98, 1.0]
-    bin_labels = ['0-0.6', '0.6-0.7', '0.7-0.8', '0.8-0.9', '0.9-0.95', '0.95-0.98', '0.98-1.0']
-    
-    df['confidence_bin'] = pd.cut(df['confidence'], bins=bins, labels=bin_labels, right=True)
-    
-    # Calculate accuracy by confidence bin
-    accuracy_by_bin = df.groupby('confidence_bin').agg(
-        total=('was_correct', 'count'),
-        correct=('was_correct', 'sum'),
-        accuracy=('was_correct', lambda x: x.mean() * 100)
-    ).reset_index()
-    
-    # Create the plot
-    plt.figure(figsize=(12, 6))
-    
-    # Create bars with different colors based on accuracy
-    bar_colors = []
-    for acc in accuracy_by_bin['accuracy']:
-        if acc < 50:
-            bar_colors.append('lightcoral')
-        elif acc < 70:
-            bar_colors.append('gold')
-        else:
-            bar_colors.append('lightgreen')
-    
-    # Plot bars
-    bars = plt.bar(accuracy_by_bin['confidence_bin'], accuracy_by_bin['accuracy'], color=bar_colors)
-    
-    # Add count labels
-    for i, bar in enumerate(bars):
-        total = accuracy_by_bin.iloc[i]['total']
-        correct = accuracy_by_bin.iloc[i]['correct']
-        plt.text(bar.get_x() + bar.get_width()/2, 5, 
-                 f'n={total}\n{correct} correct', 
-                 ha='center', va='bottom', rotation=0, fontsize=9)
-    
-    # Add labels and title
-    plt.xlabel('Confidence Range')
-    plt.ylabel('Accuracy (%)')
-    plt.title('Prediction Accuracy by Confidence Level')
-    plt.grid(True, axis='y', linestyle='--', alpha=0.7)
-    
-    # Add a horizontal line at 50% accuracy
-    plt.axhline(y=50, color='red', linestyle='--', alpha=0.5, label='50% Accuracy')
-    
-    # Rotate x labels for better readability
-    plt.xticks(rotation=45)
-    
-    # Save the plot
-    plt.tight_layout()
-    output_path = os.path.join(output_dir, 'confidence_vs_accuracy.png')
-    plt.savefig(output_path)
-    plt.close()
-    print(f"Saved confidence vs accuracy chart to: {output_path}")
+    return rollup.stats()
 
-def plot_indicators_vs_predictions(df: pd.DataFrame, output_dir: str) -> None:
+def generate_charts(rollup: ValidationRollup, report_path: str, output_dir: str) -> None:
     """
-    Plot key technical indicators and predictions.
+    Render the report charts in parallel, reusing cached charts.
     
     Args:
-        df: DataFrame containing validation data
-        output_dir: Directory to save the plot
+        rollup: Rollup of the validation report
+        report_path: Path to the CSV report file
+        output_dir: Directory to save the charts
     """
-    if df.empty or 'rsi_14' not in df.columns or 'timestamp' not in df.columns:
+    if rollup.total == 0:
         return
     
-    # Create figure with two subplots (price and indicators)
-    fig, axs = plt.subplots(3, 1, figsize=(14, 12), sharex=True, gridspec_kw={'height_ratios': [3, 1, 1]})
-    
-    # Plot price data with predictions
-    axs[0].plot(df['timestamp'], df['current_price'], color='blue', label='Price')
-    
-    # Add markers for predictions
-    buy_points = df[df['prediction'] == 'BUY']
-    sell_points = df[df['prediction'] == 'SELL']
-    
-    # Mark correct and incorrect predictions
-    correct_buys = buy_points[buy_points['was_correct']]
-    incorrect_buys = buy_points[~buy_points['was_correct']]
-    correct_sells = sell_points[sell_points['was_correct']]
-    incorrect_sells = sell_points[~sell_points['was_correct']]
-    
-    # Plot markers for different prediction outcomes
-    if not correct_buys.empty:
-        axs[0].scatter(correct_buys['timestamp'], correct_buys['current_price'], color='green', marker='^', s=100, label='Correct BUY')
-    if not incorrect_buys.empty:
-        axs[0].scatter(incorrect_buys['timestamp'], incorrect_buys['current_price'], color='lightgreen', marker='^', s=60, alpha=0.6, label='Incorrect BUY')
-    if not correct_sells.empty:
-        axs[0].scatter(correct_sells['timestamp'], correct_sells['current_price'], color='red', marker='v', s=100, label='Correct SELL')
-    if not incorrect_sells.empty:
-        axs[0].scatter(incorrect_sells['timestamp'], incorrect_sells['current_price'], color='lightcoral', marker='v', s=60, alpha=0.6, label='Incorrect SELL')
-    
-    # Add Bollinger Bands if available
-    if 'bb_upper' in df.columns and 'bb_lower' in df.columns:
-        axs[0].plot(df['timestamp'], df['bb_upper'], color='purple', linestyle='--', alpha=0.7, label='BB Upper')
-        axs[0].plot(df['timestamp'], df['bb_lower'], color='purple', linestyle='--', alpha=0.7, label='BB Lower')
-        # Fill between Bollinger Bands
-        axs[0].fill_between(df['timestamp'], df['bb_lower'], df['bb_upper'], color='purple', alpha=0.1)
-    
-    # Add EMA if available
-    if 'ema_20' in df.columns:
-        axs[0].plot(df['timestamp'], df['ema_20'], color='orange', linestyle='-', label='EMA 20')
-    
-    axs[0].set_ylabel('Price')
-    axs[0].set_title('Price Chart with Predictions')
-    axs[0].grid(True, linestyle='--', alpha=0.7)
-    axs[0].legend(loc='upper left')
-    
-    # Plot RSI
-    if 'rsi_14' in df.columns:
-        axs[1].plot(df['timestamp'], df['rsi_14'], color='green', label='RSI (14)')
-        axs[1].axhline(y=70, color='red', linestyle='--', alpha=0.7)
-        axs[1].axhline(y=30, color='green', linestyle='--', alpha=0.7)
-        axs[1].set_ylabel('RSI')
-        axs[1].set_ylim(0, 100)
-        axs[1].grid(True, linestyle='--', alpha=0.7)
-        axs[1].legend(loc='upper left')
-    
-    # Plot MACD
-    if 'macd' in df.columns:
-        axs[2].plot(df['timestamp'], df['macd'], color='blue', label='MACD')
-        axs[2].axhline(y=0, color='red', linestyle='-', alpha=0.3)
-        axs[2].set_ylabel('MACD')
-        axs[2].grid(True, linestyle='--', alpha=0.7)
-        axs[2].legend(loc='upper left')
-    
-    # Format x-axis to show dates nicely
-    fig.autofmt_xdate()
-    
-    # Save the plot
-    plt.tight_layout()
-    output_path = os.path.join(output_dir, 'indicators_and_predictions.png')
-    plt.savefig(output_path)
-    plt.close()
-    print(f"Saved indicators chart to: {output_path}")
+    charts = render_validation_charts(rollup, report_path, output_dir)
+    for chart, result in charts.items():
+        source = 'cached' if result['cached'] else 'rendered'
+        print(f"Saved {chart.replace('_', ' ')} chart to: {result['path']} ({source})")
 
-def create_html_report(df: pd.DataFrame, stats: Dict, output_dir: str) -> None:
+def create_html_report(rollup: ValidationRollup, stats: Dict, output_dir: str) -> None:
     """
     Create a comprehensive HTML report with all analysis.
     
     Args:
-        df: DataFrame containing validation data
+        rollup: Rollup of the validation report
         stats: Dictionary with statistics
         output_dir: Directory to save the HTML report
     """
-    if df.empty:
+    if rollup.total == 0:
         return
     
+    symbol = rollup.metadata['symbol']
+    interval = rollup.metadata['interval']
+    model_type = rollup.metadata['model_type']
+    
     # Create an HTML template
     html_content = f"""
     <!DOCTYPE html>
@@ -387,9 +127,9 @@ def create_html_report(df: pd.DataFrame, stats: Dict, output_dir: str) -> None:
             <div class="stats">
                 <div class="stat-card">
                     <h3>General</h3>
-                    <p><span class="metric-name">Symbol:</span> {df['symbol'].iloc[0]}</p>
-                    <p><span class="metric-name">Interval:</span> {df['interval'].iloc[0]}</p>
-                    <p><span class="metric-name">Model Type:</span> {df['model_type'].iloc[0]}</p>
+                    <p><span class="metric-name">Symbol:</span> {symbol}</p>
+                    <p><span class="metric-name">Interval:</span> {interval}</p>
+                    <p><span class="metric-name">Model Type:</span> {model_type}</p>
                     <p><span class="metric-name">Date Range:</span> {stats.get('start_time', 'N/A')} to {stats.get('end_time', 'N/A')}</p>
                 </div>
                 
@@ -486,8 +226,8 @@ def create_html_report(df: pd.DataFrame, stats: Dict, output_dir: str) -> None:
             
             <h2>Conclusion and Recommendations</h2>
             <p>
-                Based on the analysis of {stats.get('total_predictions', 0)} predictions for {df['symbol'].iloc[0]} on the {df['interval'].iloc[0]} timeframe,
-                the {df['model_type'].iloc[0]} model achieved an overall accuracy of {stats.get('accuracy', 0):.2f}%.
+                Based on the analysis of {stats.get('total_predictions', 0)} predictions for {symbol} on the {interval} timeframe,
+                the {model_type} model achieved an overall accuracy of {stats.get('accuracy', 0):.2f}%.
             </p>
             <p>
                 {
@@ -503,21 +243,21 @@ def create_html_report(df: pd.DataFrame, stats: Dict, output_dir: str) -> None:
             </p>
             <script>
                 // Fill in the confidence analysis using JavaScript
-                document.addEventListener('DOMContentLoaded', function() {
+                document.addEventListener('DOMContentLoaded', function() {{
                     const avgConfidence = {stats.get('avg_confidence', 0)};
                     const highConfAccuracy = {stats.get('high_conf_accuracy', 0)};
                     
                     let confidenceText = "";
                     if (avgConfidence > 0.8 && highConfAccuracy > 70) {{
-                        confidenceText = `The model has high confidence in its predictions (average ${avgConfidence.toFixed(4)}), and these high confidence predictions have good accuracy (${highConfAccuracy.toFixed(2)}%).`;
+                        confidenceText = `The model has high confidence in its predictions (average ${{avgConfidence.toFixed(4)}}), and these high confidence predictions have good accuracy (${{highConfAccuracy.toFixed(2)}}%).`;
                     }} else if (avgConfidence > 0.8) {{
-                        confidenceText = `While the model expresses high confidence (${avgConfidence.toFixed(4)}), the accuracy of high-confidence predictions (${highConfAccuracy.toFixed(2)}%) suggests potential overconfidence.`;
+                        confidenceText = `While the model expresses high confidence (${{avgConfidence.toFixed(4)}}), the accuracy of high-confidence predictions (${{highConfAccuracy.toFixed(2)}}%) suggests potential overconfidence.`;
                     }} else {{
-                        confidenceText = `The model shows moderate confidence in its predictions (${avgConfidence.toFixed(4)}), which aligns with its accuracy levels.`;
+                        confidenceText = `The model shows moderate confidence in its predictions (${{avgConfidence.toFixed(4)}}), which aligns with its accuracy levels.`;
                     }}
                     
                     document.getElementById('confidence-analysis').textContent = confidenceText;
-                });
+                }});
             </script>
             
             <p>
@@ -537,7 +277,7 @@ def create_html_report(df: pd.DataFrame, stats: Dict, output_dir: str) -> None:
                     }
                     <li id="best-signal-type"></li>
                     <script>
-                        document.addEventListener('DOMContentLoaded', function() {
+                        document.addEventListener('DOMContentLoaded', function() {{
                             const buyAccuracy = {stats.get('buy_accuracy', 0)};
                             const sellAccuracy = {stats.get('sell_accuracy', 0)};
                             const holdAccuracy = {stats.get('hold_accuracy', 0)};
@@ -552,8 +292,8 @@ def create_html_report(df: pd.DataFrame, stats: Dict, output_dir: str) -> None:
                             }}
                             
                             document.getElementById('best-signal-type').textContent = 
-                                `The model performs particularly well on ${bestSignal} signals, which could be leveraged in the trading strategy.`;
-                        });
+                                `The model performs particularly well on ${{bestSignal}} signals, which could be leveraged in the trading strategy.`;
+                        }});
                     </script>
                     <li>Regular revalidation should be performed as market conditions change to ensure continued model effectiveness.</li>
                 </ul>
@@ -585,8 +325,8 @@ def main():
     args = parser.parse_args()
     
     # Load the report
-    df = load_report(args.report)
-    if df.empty:
+    rollup = load_report(args.report)
+    if rollup is None or rollup.total == 0:
         return 1
     
     # Set output directory
@@ -599,21 +339,18 @@ def main():
     print(f"Output directory: {output_dir}")
     
     # Create statistics
-    stats = create_basic_stats(df)
+    stats = create_basic_stats(rollup)
     
     # Create visualizations
     print("\nGenerating charts...")
-    plot_prediction_accuracy(df, output_dir)
-    plot_cumulative_accuracy(df, output_dir)
-    plot_confidence_vs_accuracy(df, output_dir)
-    plot_indicators_vs_predictions(df, output_dir)
+    generate_charts(rollup, args.report, output_dir)
     
     # Create HTML report
     print("\nGenerating HTML report...")
-    create_html_report(df, stats, output_dir)
+    create_html_report(rollup, stats, output_dir)
     
     print("\nAnalysis complete!")
-    print(f"Summary statistics:")
+    print("Summary statistics:")
     print(f"- Total predictions: {stats.get('total_predictions', 0)}")
     print(f"- Overall accuracy: {stats.get('accuracy', 0):.2f}%")
     print(f"- BUY signals: {stats.get('buy_predictions', 0)} predictions, {stats.get('buy_accuracy', 0):.2f}% accuracy")
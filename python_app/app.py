@@ -47,6 +47,14 @@ except ImportError:
         "Could not import Strategy Simulation blueprint. Strategy simulation will not be available."
     )
     strategy_simulation_bp = None
+# Import the chart routes (images of the background chart renderer)
+try:
+    from python_app.routes.chart_routes import chart_bp
+except ImportError:
+    logging.warning(
+        "Could not import Chart blueprint. Chart images will not be served."
+    )
+    chart_bp = None
 # Import the trade logs blueprint
 try:
     from python_app.routes.trade_logs_routes import trade_logs_bp
@@ -128,6 +136,11 @@ def create_app(config=None):
         app.register_blueprint(strategy_simulation_bp)
         logging.info("Strategy Simulation blueprint registered successfully")
 
+    # Register chart blueprint if available
+    if chart_bp:
+        app.register_blueprint(chart_bp)
+        logging.info("Chart blueprint registered successfully")
+
     # Register trade logs blueprint if available
     if trade_logs_bp:
         app.register_blueprint(trade_logs_bp)
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Vectorized Backtest Core
+
+This module is the array-based simulation core behind StrategySimulator. It keeps
+the semantics of the original row-by-row loop:
+
+1. Each candle, the equity (balance plus unrealized PnL) is recorded before
+   anything else happens
+2. An open position is closed at the candle's close when it reaches its stop loss
+   or take profit (stop loss checked first)
+3. When flat (including just after an exit), a position is opened at the close if
+   the prediction's signal strength (prediction - 0.5) * 2 reaches the confidence
+   threshold: long for a bullish signal, short for a bearish one
+4. A position still open at the end is closed at the last close
+
+Instead of visiting every candle in Python, the core jumps from trade to trade:
+the next entry is found with a binary search over the precomputed signal indices
+and the exit with a vectorized scan of the prices after the entry. Balance and
+equity curves and the metrics are then computed with array operations, so the
+Python work is per trade rather than per candle.
+"""
+
+import bisect
+import logging
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_TYPES = ['conservative', 'balanced', 'aggressive']
+
+# Exit reasons, indexed by the codes in the trade arrays
+EXIT_REASONS = ['stop_loss', 'take_profit', 'simulation_end']
+EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_SIMULATION_END = 0, 1, 2
+
+# Number of candles first scanned for an exit; the window grows for long trades
+EXIT_SCAN_WINDOW = 64
+
+
+def adjust_strategy_parameters(strategy_type: str,
+                               trade_size_percent: float,
+                               stop_loss_percent: float,
+                               take_profit_percent: float,
+                               leverage: float,
+                               confidence_threshold: float) -> Dict[str, float]:
+    """
+    Apply the adjustments of a strategy type to the base parameters
+
+    Args:
+        strategy_type: Type of strategy (conservative, balanced, aggressive)
+        trade_size_percent: Percentage of balance to use per trade
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+        leverage: Leverage multiplier
+        confidence_threshold: Minimum prediction confidence to enter a trade
+
+    Returns:
+        Dictionary with the adjusted parameters
+    """
+    if strategy_type == 'conservative':
+        # More conservative approach
+        trade_size_percent *= 0.7
+        stop_loss_percent *= 0.8
+        take_profit_percent *= 1.2
+        confidence_threshold = max(0.65, confidence_threshold)
+
+    elif strategy_type == 'aggressive':
+        # More aggressive approach
+        trade_size_percent *= 1.3
+        stop_loss_percent *= 1.2
+        take_profit_percent *= 0.8
+        confidence_threshold = min(0.55, confidence_threshold)
+        leverage = min(3.0, leverage * 1.5)
+
+    return {
+        'trade_size_percent': trade_size_percent,
+        'stop_loss_percent': stop_loss_percent,
+        'take_profit_percent': take_profit_percent,
+        'leverage': leverage,
+        'confidence_threshold': confidence_threshold
+    }
+
+
+def entry_signals(predictions: np.ndarray, confidence_threshold: float) -> np.ndarray:
+    """
+    Turn predictions into entry signals
+
+    Args:
+        predictions: Bullish probability per candle (0.5 is neutral)
+        confidence_threshold: Minimum signal strength to enter a trade
+
+    Returns:
+        Array with 1 (enter long), -1 (enter short) or 0 (no entry) per candle
+    """
+    signal = (np.asarray(predictions, dtype=np.float64) - 0.5) * 2
+    return np.where(np.abs(signal) >= confidence_threshold, np.sign(signal), 0).astype(np.int8)
+
+
+def first_exit(prices: np.ndarray, start: int, lower: float, upper: float) -> Optional[int]:
+    """
+    Find the first candle from start whose price is at or beyond one of two levels
+
+    Args:
+        prices: Close prices
+        start: First candle to check
+        lower: Exit when the price falls to this level or below
+        upper: Exit when the price rises to this level or above
+
+    Returns:
+        Index of the exit candle, or None if the levels are never reached
+    """
+    n = len(prices)
+    window = EXIT_SCAN_WINDOW
+    while start < n:
+        end = min(n, start + window)
+        segment = prices[start:end]
+        hits = (segment <= lower) | (segment >= upper)
+        first = int(hits.argmax())
+        if hits[first]:
+            return start + first
+        start = end
+        window *= 4
+    return None
+
+
+def trade_path(prices: np.ndarray,
+               signals: np.ndarray,
+               stop_loss_percent: float,
+               take_profit_percent: float) -> Dict[str, np.ndarray]:
+    """
+    Find the entry and exit candles of every trade
+
+    Entries and exits only depend on the signals and the price levels, not on the
+    balance, trade size or leverage, so one path serves every sizing of a strategy.
+
+    Args:
+        prices: Close price per candle
+        signals: Entry signal per candle (see entry_signals)
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+
+    Returns:
+        Dictionary of per-close arrays 'entry_index', 'exit_index', 'direction' and
+        'exit_reason' (a trade whose levels are both crossed on its exit candle is
+        closed twice, as in the original loop)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    signal_index = np.flatnonzero(signals).tolist()
+    price_list = prices.tolist()
+
+    # One (entry index, exit index, direction, reason) per close
+    rows = []
+
+    search_from = 0
+    while True:
+        # Next entry: the first signal at or after the last exit
+        position = bisect.bisect_left(signal_index, search_from)
+        if position == len(signal_index):
+            break
+        entry_index = signal_index[position]
+        direction = int(signals[entry_index])
+        entry_price = price_list[entry_index]
+
+        if direction > 0:
+            stop_price = entry_price * (1 - stop_loss_percent / 100)
+            take_profit_price = entry_price * (1 + take_profit_percent / 100)
+            exit_index = first_exit(prices, entry_index + 1, stop_price, take_profit_price)
+        else:
+            stop_price = entry_price * (1 + stop_loss_percent / 100)
+            take_profit_price = entry_price * (1 - take_profit_percent / 100)
+            exit_index = first_exit(prices, entry_index + 1, take_profit_price, stop_price)
+
+        if exit_index is None:
+            # Closed at the end of the simulation
+            rows.append((entry_index, n - 1, direction, EXIT_SIMULATION_END))
+            break
+
+        exit_price = price_list[exit_index]
+        if direction > 0:
+            stop_hit, take_profit_hit = exit_price <= stop_price, exit_price >= take_profit_price
+        else:
+            stop_hit, take_profit_hit = exit_price >= stop_price, exit_price <= take_profit_price
+
+        # Both checks run on the exit candle, so crossed levels close the trade twice
+        for reason, hit in ((EXIT_STOP_LOSS, stop_hit), (EXIT_TAKE_PROFIT, take_profit_hit)):
+            if hit:
+                rows.append((entry_index, exit_index, direction, reason))
+        search_from = exit_index
+
+    columns = list(zip(*rows)) if rows else [()] * 4
+    return {
+        'entry_index': np.asarray(columns[0], dtype=np.int64),
+        'exit_index': np.asarray(columns[1], dtype=np.int64),
+        'direction': np.asarray(columns[2], dtype=np.int8),
+        'exit_reason': np.asarray(columns[3], dtype=np.int8)
+    }
+
+
+def first_closes(path: Dict[str, np.ndarray]) -> np.ndarray:
+    """Mask of the first close of every trade (a trade closed twice is one position)"""
+    first = np.ones(len(path['entry_index']), dtype=bool)
+    first[1:] = path['entry_index'][1:] != path['entry_index'][:-1]
+    return first
+
+
+def open_rows(entry_index: np.ndarray, exit_index: np.ndarray):
+    """
+    Get the candles at which positions are open
+
+    A position adds unrealized PnL from the candle after its entry up to and
+    including its exit candle.
+
+    Args:
+        entry_index: Entry candle per position
+        exit_index: Exit candle per position
+
+    Returns:
+        Tuple of (candle indices, position of each candle)
+    """
+    starts = entry_index + 1
+    lengths = np.maximum(exit_index + 1 - starts, 0)
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return starts[owner] + offsets, owner
+
+
+def simulate(prices: np.ndarray,
+             signals: np.ndarray,
+             initial_investment: float,
+             trade_size_percent: float,
+             stop_loss_percent: float,
+             take_profit_percent: float,
+             leverage: float) -> Dict[str, Any]:
+    """
+    Simulate the strategy over a price series
+
+    Args:
+        prices: Close price per candle
+        signals: Entry signal per candle (see entry_signals)
+        initial_investment: Initial investment amount
+        trade_size_percent: Percentage of balance to use per trade
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+        leverage: Leverage multiplier
+
+    Returns:
+        Dictionary with 'final_balance', per-candle 'balance' and 'equity' arrays and
+        'trades', a dictionary of per-trade arrays ('entry_index', 'exit_index',
+        'direction', 'entry_price', 'exit_price', 'position_size', 'pnl',
+        'pnl_percent', 'exit_reason')
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    path = trade_path(prices, signals, stop_loss_percent, take_profit_percent)
+    first = first_closes(path)
+    entry_price = prices[path['entry_index']]
+    exit_price = prices[path['exit_index']]
+
+    # The balance is sequential: each position is sized from the balance at its entry
+    position_size = np.empty(len(first))
+    pnl = np.empty(len(first))
+    balance = float(initial_investment)
+    for index, (is_first, direction, entry, exit_) in enumerate(zip(
+            first.tolist(), path['direction'].tolist(), entry_price.tolist(), exit_price.tolist())):
+        if is_first:
+            size = balance * (trade_size_percent / 100) / entry
+        position_size[index] = size
+        pnl[index] = (size * (exit_ - entry) * leverage if direction > 0
+                      else size * (entry - exit_) * leverage)
+        balance += pnl[index]
+
+    trades = {
+        **path,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'position_size': position_size,
+        'pnl': pnl,
+        'pnl_percent': pnl / (position_size * entry_price) * 100
+    }
+
+    balance_curve, equity_curve = _balance_and_equity(prices, trades, initial_investment, leverage)
+
+    return {
+        'final_balance': balance,
+        'balance': balance_curve,
+        'equity': equity_curve,
+        'trades': trades
+    }
+
+
+def _balance_and_equity(prices: np.ndarray, trades: Dict[str, np.ndarray],
+                        initial_investment: float, leverage: float):
+    """
+    Compute the balance and equity recorded at each candle
+
+    The balance at a candle includes the trades closed at earlier candles (the
+    final close at the end of the simulation is not part of the curves).
+
+    Args:
+        prices: Close prices
+        trades: Per-trade arrays from simulate
+        initial_investment: Initial investment amount
+        leverage: Leverage multiplier
+
+    Returns:
+        Tuple of (balance array, equity array)
+    """
+    n = len(prices)
+    closes = trades['exit_reason'] != EXIT_SIMULATION_END
+    changes = np.zeros(n + 1)
+    changes[0] = initial_investment
+    np.add.at(changes, trades['exit_index'][closes] + 1, trades['pnl'][closes])
+    balance = np.cumsum(changes)[:n]
+
+    first = first_closes(trades)
+    rows, owner = open_rows(trades['entry_index'][first], trades['exit_index'][first])
+
+    equity = balance.copy()
+    if len(rows):
+        entry_price = trades['entry_price'][first][owner]
+        difference = np.where(trades['direction'][first][owner] > 0,
+                              prices[rows] - entry_price, entry_price - prices[rows])
+        equity[rows] = balance[rows] + trades['position_size'][first][owner] * difference * leverage
+
+    return balance, equity
+
+
+def compute_metrics(initial_investment: float, final_balance: float,
+                    equity: np.ndarray, trade_pnl: np.ndarray) -> Dict[str, float]:
+    """
+    Compute the performance metrics of a simulation
+
+    Args:
+        initial_investment: Initial investment amount
+        final_balance: Balance after the last trade
+        equity: Equity per candle
+        trade_pnl: PnL per trade
+
+    Returns:
+        Dictionary with PnL, win rate, drawdown, Sharpe ratio, volatility and trade statistics
+    """
+    pnl = final_balance - initial_investment
+
+    wins = trade_pnl[trade_pnl > 0]
+    losses = trade_pnl[trade_pnl <= 0]
+    trade_count = len(trade_pnl)
+
+    # Drawdown from the running peak (starting at the initial investment)
+    peak = np.maximum.accumulate(np.concatenate(([initial_investment], equity)))[1:]
+    valid = peak > 0
+    drawdowns = (peak[valid] - equity[valid]) / peak[valid] * 100
+
+    # Candle-to-candle returns for the Sharpe ratio
+    previous, current = equity[:-1], equity[1:]
+    valid = previous > 0
+    returns = (current[valid] - previous[valid]) / previous[valid]
+    if len(returns):
+        std_dev = np.std(returns) if len(returns) > 1 else 0
+        sharpe_ratio = (returns.mean() / std_dev) * np.sqrt(252) if std_dev > 0 else 0
+        volatility = std_dev * np.sqrt(252) * 100  # Annualized and in percentage
+    else:
+        sharpe_ratio = 0
+        volatility = 0
+
+    return {
+        'final_balance': float(final_balance),
+        'pnl': float(pnl),
+        'pnl_percent': float(pnl / initial_investment * 100),
+        'win_rate': len(wins) / trade_count if trade_count > 0 else 0,
+        'average_drawdown': float(drawdowns.mean()) if len(drawdowns) else 0,
+        'max_drawdown': float(drawdowns.max()) if len(drawdowns) else 0,
+        'sharpe_ratio': float(sharpe_ratio),
+        'volatility': float(volatility),
+        'trade_count': trade_count,
+        'win_count': len(wins),
+        'loss_count': len(losses),
+        'average_win': float(wins.mean()) if len(wins) else 0,
+        'average_loss': float(losses.mean()) if len(losses) else 0,
+        'largest_win': float(wins.max()) if len(wins) else 0,
+        'largest_loss': float(losses.min()) if len(losses) else 0
+    }
+
+
+def simulate_sizings(prices: np.ndarray,
+                     path: Dict[str, np.ndarray],
+                     initial_investment: float,
+                     exposures: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Simulate one trade path under several position sizings at once
+
+    With the path fixed, a sizing only changes how much each trade's price move
+    grows the balance: a trade sized at trade_size_percent of the balance with a
+    leverage multiplies it by 1 + exposure * move, where exposure is
+    trade_size_percent / 100 * leverage. All sizings are evaluated together as
+    matrices with one row per sizing.
+
+    Args:
+        prices: Close price per candle
+        path: Trade path from trade_path
+        initial_investment: Initial investment amount
+        exposures: Exposure per sizing (trade_size_percent / 100 * leverage)
+
+    Returns:
+        Dictionary with 'final_balance' (per sizing), 'equity' (sizing x candle)
+        and 'pnl' (sizing x close)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    exposure = np.asarray(exposures, dtype=np.float64)[:, np.newaxis]
+    n_sizings, n = exposure.shape[0], len(prices)
+
+    first = first_closes(path)
+    trade_of_close = np.cumsum(first) - 1
+    entry_price = prices[path['entry_index']]
+    move = np.where(path['direction'] > 0, prices[path['exit_index']] - entry_price,
+                    entry_price - prices[path['exit_index']]) / entry_price
+    n_trades = int(first.sum())
+
+    # Balance after each trade, and before it (each trade is sized from the latter)
+    growth = 1 + exposure * np.bincount(trade_of_close, weights=move, minlength=n_trades)
+    balances = initial_investment * np.cumprod(
+        np.concatenate((np.ones((n_sizings, 1)), growth), axis=1), axis=1)
+    before = balances[:, :-1]
+    pnl = before[:, trade_of_close] * exposure * move
+
+    # Candles see the trades closed before them (not the final close at the end)
+    completed = first & (path['exit_reason'] != EXIT_SIMULATION_END)
+    closed_before = np.searchsorted(path['exit_index'][completed], np.arange(n), side='left')
+    equity = balances[:, closed_before]
+
+    rows, owner = open_rows(path['entry_index'][first], path['exit_index'][first])
+    if len(rows):
+        open_entry = entry_price[first][owner]
+        relative = np.where(path['direction'][first][owner] > 0,
+                            prices[rows] - open_entry, open_entry - prices[rows]) / open_entry
+        equity[:, rows] = before[:, owner] + before[:, owner] * exposure * relative
+
+    return {
+        'final_balance': balances[:, -1],
+        'equity': equity,
+        'pnl': pnl
+    }
+
+
+def compute_metrics_batch(initial_investment: float, final_balance: np.ndarray,
+                          equity: np.ndarray, trade_pnl: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute the metrics of compute_metrics for many simulations at once
+
+    Args:
+        initial_investment: Initial investment amount
+        final_balance: Final balance per simulation
+        equity: Equity per simulation and candle
+        trade_pnl: PnL per simulation and trade (same trades in every simulation)
+
+    Returns:
+        Dictionary mapping each metric name to an array with one value per simulation
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        wins = trade_pnl > 0
+        win_count = wins.sum(axis=1)
+        loss_count = trade_pnl.shape[1] - win_count
+        win_total = np.where(wins, trade_pnl, 0).sum(axis=1)
+        loss_total = np.where(wins, 0, trade_pnl).sum(axis=1)
+        trade_count = trade_pnl.shape[1]
+
+        peak = np.maximum.accumulate(np.concatenate(
+            (np.full((equity.shape[0], 1), float(initial_investment)), equity), axis=1), axis=1)[:, 1:]
+        drawdowns = np.where(peak > 0, (peak - equity) / peak * 100, np.nan)
+        has_drawdowns = ~np.isnan(drawdowns).all(axis=1)
+
+        previous, current = equity[:, :-1], equity[:, 1:]
+        returns = np.where(previous > 0, (current - previous) / previous, np.nan)
+        return_count = (~np.isnan(returns)).sum(axis=1)
+        mean_return = np.where(return_count > 0, np.nansum(returns, axis=1) / np.maximum(return_count, 1), 0)
+        std_dev = np.where(return_count > 1, np.sqrt(np.nansum(
+            (returns - mean_return[:, np.newaxis]) ** 2, axis=1) / np.maximum(return_count, 1)), 0)
+
+        def largest(values, mask, reducer, empty):
+            if trade_count == 0:
+                return np.zeros(len(values))
+            reduced = reducer(np.where(mask, values, empty), axis=1)
+            return np.where(np.isinf(reduced), 0, reduced)
+
+        return {
+            'final_balance': final_balance,
+            'pnl': final_balance - initial_investment,
+            'pnl_percent': (final_balance - initial_investment) / initial_investment * 100,
+            'win_rate': win_count / trade_count if trade_count > 0 else np.zeros(len(final_balance)),
+            'average_drawdown': np.where(has_drawdowns, np.nanmean(np.where(has_drawdowns[:, np.newaxis],
+                                                                            drawdowns, 0), axis=1), 0),
+            'max_drawdown': np.where(has_drawdowns, np.nanmax(np.where(has_drawdowns[:, np.newaxis],
+                                                                       drawdowns, 0), axis=1), 0),
+            'sharpe_ratio': np.where(std_dev > 0, mean_return / std_dev * np.sqrt(252), 0),
+            'volatility': std_dev * np.sqrt(252) * 100,
+            'trade_count': np.full(len(final_balance), trade_count),
+            'win_count': win_count,
+            'loss_count': loss_count,
+            'average_win': np.where(win_count > 0, win_total / np.maximum(win_count, 1), 0),
+            'average_loss': np.where(loss_count > 0, loss_total / np.maximum(loss_count, 1), 0),
+            'largest_win': largest(trade_pnl, wins, np.max, -np.inf),
+            'largest_loss': largest(trade_pnl, ~wins, np.min, np.inf)
+        }
+
+
+def run_backtest(prices: np.ndarray,
+                 predictions: np.ndarray,
+                 strategy_type: str,
+                 initial_investment: float,
+                 trade_size_percent: float,
+                 stop_loss_percent: float,
+                 take_profit_percent: float,
+                 leverage: float,
+                 confidence_threshold: float) -> Dict[str, Any]:
+    """
+    Run a strategy over prices and predictions
+
+    Args:
+        prices: Close price per candle
+        predictions: Bullish probability per candle
+        strategy_type: Type of strategy (conservative, balanced, aggressive)
+        initial_investment: Initial investment amount
+        trade_size_percent: Percentage of balance to use per trade
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+        leverage: Leverage multiplier
+        confidence_threshold: Minimum prediction confidence to enter a trade
+
+    Returns:
+        The metrics of compute_metrics plus 'balance', 'equity' and 'trades' from simulate
+    """
+    params = adjust_strategy_parameters(strategy_type, trade_size_percent, stop_loss_percent,
+                                        take_profit_percent, leverage, confidence_threshold)
+    signals = entry_signals(predictions, params['confidence_threshold'])
+    result = simulate(prices, signals, initial_investment, params['trade_size_percent'],
+                      params['stop_loss_percent'], params['take_profit_percent'], params['leverage'])
+    metrics = compute_metrics(initial_investment, result['final_balance'], result['equity'],
+                              result['trades']['pnl'])
+    return {**metrics, 'balance': result['balance'], 'equity': result['equity'], 'trades': result['trades']}
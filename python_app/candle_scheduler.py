@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Candle-Close Prediction Scheduler
+
+This module runs live predictions on candle boundaries instead of fixed sleeps, so
+signals are aligned with the candles the models were trained on. It handles:
+
+1. Waking up right after each candle close of the configured interval
+2. Computing predictions for every tracked symbol and model type in one batch
+3. Staggering the per-symbol candle requests to stay within Binance rate limits
+4. Publishing each batch to a cache of latest results and to subscribers
+
+Each symbol is fetched once per candle and all of its models run on the same feature
+pass (see live_prediction.make_live_predictions).
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+logger = logging.getLogger('candle_scheduler')
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+# Candle intervals supported by the scheduler, in seconds
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '3m': 180,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '2h': 7200,
+    '4h': 14400,
+    '1d': 86400
+}
+
+
+def interval_to_seconds(interval: str) -> int:
+    """
+    Convert a candle interval such as '5m' or '1h' to seconds
+
+    Args:
+        interval: Candle interval
+
+    Returns:
+        Interval length in seconds
+    """
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported candle interval: {interval}")
+    return INTERVAL_SECONDS[interval]
+
+
+def seconds_to_interval(seconds: int) -> str:
+    """
+    Get the candle interval for a number of seconds (e.g. 300 -> '5m')
+
+    Args:
+        seconds: Interval length in seconds
+
+    Returns:
+        Candle interval
+    """
+    for interval, interval_seconds in INTERVAL_SECONDS.items():
+        if interval_seconds == seconds:
+            return interval
+    raise ValueError(f"No candle interval of {seconds} seconds")
+
+
+def next_candle_close(interval_seconds: int, now: Optional[float] = None) -> float:
+    """
+    Get the next candle close time
+
+    Binance candles are aligned to the Unix epoch, so a candle closes whenever the
+    timestamp is a multiple of the interval.
+
+    Args:
+        interval_seconds: Candle interval in seconds
+        now: Current Unix timestamp (default: time.time())
+
+    Returns:
+        Unix timestamp of the next candle close
+    """
+    now = time.time() if now is None else now
+    return (int(now // interval_seconds) + 1) * interval_seconds
+
+
+class RequestRateLimiter:
+    """
+    Spaces out API requests so a batch does not burst past the exchange rate limit
+    """
+
+    def __init__(self, max_requests_per_second: float):
+        """
+        Initialize the rate limiter
+
+        Args:
+            max_requests_per_second: Maximum request rate
+        """
+        self.min_spacing = 1.0 / max_requests_per_second if max_requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the next request slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_spacing
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _default_prediction_func(symbol: str, model_types: List[str], interval: str) -> Dict[str, Dict[str, Any]]:
+    """Predict on the candle that just closed with the live prediction module"""
+    from live_prediction import make_live_predictions
+    return make_live_predictions(symbol, model_types, interval=interval, closed_only=True)
+
+
+class CandleCloseScheduler:
+    """
+    Runs predictions for all tracked symbols and model types at every candle close
+    """
+
+    def __init__(self,
+                 symbols: Optional[Iterable[str]] = None,
+                 model_types: Optional[Iterable[str]] = None,
+                 interval: str = '5m',
+                 close_delay: float = 0.25,
+                 max_requests_per_second: float = 10.0,
+                 max_workers: int = 4,
+                 prediction_func: Optional[Callable[[str, List[str], str], Dict[str, Dict[str, Any]]]] = None):
+        """
+        Initialize the scheduler
+
+        Args:
+            symbols: Symbols to predict (e.g. ['BTCUSDT', 'ETHUSDT'])
+            model_types: Model types to run for every symbol (default: ['balanced'])
+            interval: Candle interval to align to
+            close_delay: Seconds to wait after the close so the exchange has finalised the candle
+            max_requests_per_second: Rate limit for the candle requests of a batch
+            max_workers: Number of symbols processed concurrently
+            prediction_func: Function (symbol, model_types, interval) returning results per
+                model type (default: live_prediction.make_live_predictions)
+        """
+        self.interval = interval
+        self.interval_seconds = interval_to_seconds(interval)
+        self.close_delay = close_delay
+        self.max_workers = max_workers
+        self.prediction_func = prediction_func or _default_prediction_func
+        self.rate_limiter = RequestRateLimiter(max_requests_per_second)
+
+        self.symbols: List[str] = []
+        self.model_types: List[str] = []
+        self.add_symbols(symbols or [], model_types or ['balanced'])
+
+        # Latest results per symbol and model type, and the last published batch
+        self._latest: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._last_batch: Optional[Dict[str, Any]] = None
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            'batches': 0,
+            'predictions': 0,
+            'errors': 0,
+            'last_ready_after_close_ms': None
+        }
+
+    def add_symbols(self, symbols: Iterable[str], model_types: Optional[Iterable[str]] = None) -> None:
+        """
+        Track more symbols and/or model types
+
+        Args:
+            symbols: Symbols to add
+            model_types: Model types to add
+        """
+        for symbol in symbols:
+            symbol = symbol.replace('-', '').replace('/', '').upper()
+            if symbol not in self.symbols:
+                self.symbols.append(symbol)
+        for model_type in model_types or []:
+            if model_type not in self.model_types:
+                self.model_types.append(model_type)
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Register a callback that receives every published batch
+
+        Args:
+            callback: Function called with the batch dictionary
+        """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Remove a registered callback"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def get_latest(self, symbol: str, model_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the most recent scheduled prediction for a symbol
+
+        Args:
+            symbol: Trading pair symbol
+            model_type: Model type (default: all model types for the symbol)
+
+        Returns:
+            The prediction result (or results per model type), or None if not available
+        """
+        symbol = symbol.replace('-', '').replace('/', '').upper()
+        with self._lock:
+            results = self._latest.get(symbol)
+            if results is None:
+                return None
+            return results.get(model_type) if model_type else dict(results)
+
+    def get_last_batch(self) -> Optional[Dict[str, Any]]:
+        """Get the most recently published batch"""
+        with self._lock:
+            return self._last_batch
+
+    def _predict_symbol(self, symbol: str) -> Dict[str, Dict[str, Any]]:
+        """Run all model types for one symbol after waiting for a request slot"""
+        self.rate_limiter.acquire()
+        try:
+            return self.prediction_func(symbol, list(self.model_types), self.interval)
+        except Exception as e:
+            logger.error(f"Scheduled prediction failed for {symbol}: {e}")
+            return {
+                model_type: {
+                    'success': False,
+                    'error': str(e),
+                    'symbol': symbol,
+                    'timestamp': datetime.now().isoformat()
+                }
+                for model_type in self.model_types
+            }
+
+    def run_batch(self, candle_close: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Predict all tracked symbols once and publish the results
+
+        Args:
+            candle_close: Unix timestamp of the candle close this batch is for
+                (default: the most recent close)
+
+        Returns:
+            Batch dictionary with the predictions per symbol and model type
+        """
+        if candle_close is None:
+            candle_close = next_candle_close(self.interval_seconds) - self.interval_seconds
+
+        start_time = time.time()
+        symbols = list(self.symbols)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(symbols) or 1))) as executor:
+            predictions = dict(zip(symbols, executor.map(self._predict_symbol, symbols)))
+
+        finished = time.time()
+        errors = sum(1 for results in predictions.values()
+                     for result in results.values() if not result.get('success', False))
+        batch = {
+            'success': errors == 0,
+            'interval': self.interval,
+            'candle_close': datetime.fromtimestamp(candle_close).isoformat(),
+            'batch_seconds': finished - start_time,
+            'ready_after_close_ms': (finished - candle_close) * 1000,
+            'errors': errors,
+            'predictions': predictions,
+            'timestamp': datetime.now().isoformat()
+        }
+
+        with self._lock:
+            for symbol, results in predictions.items():
+                self._latest.setdefault(symbol, {}).update(results)
+            self._last_batch = batch
+            subscribers = list(self._subscribers)
+
+            self.stats['batches'] += 1
+            self.stats['predictions'] += sum(len(results) for results in predictions.values())
+            self.stats['errors'] += errors
+            self.stats['last_ready_after_close_ms'] = batch['ready_after_close_ms']
+
+        logger.info(f"Candle {batch['candle_close']} ({self.interval}): {len(symbols)} symbols predicted "
+                    f"in {batch['batch_seconds']:.2f}s, ready {batch['ready_after_close_ms']:.0f} ms "
+                    f"after close, {errors} errors")
+
+        for callback in subscribers:
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error(f"Error in scheduler subscriber {callback}: {e}")
+
+        return batch
+
+    def run_forever(self) -> None:
+        """Run a batch after every candle close until stop() is called"""
+        logger.info(f"Candle scheduler running for {len(self.symbols)} symbols, "
+                    f"models {self.model_types}, interval {self.interval}")
+
+        while not self._stop_event.is_set():
+            candle_close = next_candle_close(self.interval_seconds)
+
+            # Wait on the event rather than sleeping, so stop() takes effect immediately
+            if self._stop_event.wait(max(0.0, candle_close + self.close_delay - time.time())):
+                break
+
+            try:
+                self.run_batch(candle_close)
+            except Exception as e:
+                logger.error(f"Error in scheduled prediction batch: {e}")
+
+        logger.info("Candle scheduler stopped")
+
+    def start(self) -> None:
+        """Start the scheduler in a background thread"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, name=f'candle-scheduler-{self.interval}',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the scheduler
+
+        Args:
+            timeout: Seconds to wait for a running batch to finish
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def is_running(self) -> bool:
+        """Check if the background thread is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get the scheduler status
+
+        Returns:
+            Dictionary with configuration, next close time and statistics
+        """
+        return {
+            'running': self.is_running(),
+            'interval': self.interval,
+            'symbols': list(self.symbols),
+            'model_types': list(self.model_types),
+            'next_candle_close': datetime.fromtimestamp(next_candle_close(self.interval_seconds)).isoformat(),
+            'stats': dict(self.stats)
+        }
+
+
+# Create singleton instances (one scheduler per candle interval)
+_candle_schedulers: Dict[str, CandleCloseScheduler] = {}
+_candle_schedulers_lock = threading.Lock()
+
+
+def get_candle_scheduler(interval: str = '5m') -> CandleCloseScheduler:
+    """
+    Get the shared scheduler for a candle interval
+
+    Callers register their symbols and model types with add_symbols(), so every
+    consumer of the same interval is served by one batch per candle.
+
+    Args:
+        interval: Candle interval
+
+    Returns:
+        The CandleCloseScheduler instance
+    """
+    with _candle_schedulers_lock:
+        if interval not in _candle_schedulers:
+            _candle_schedulers[interval] = CandleCloseScheduler(interval=interval)
+        return _candle_schedulers[interval]
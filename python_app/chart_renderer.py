@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+Chart Renderer
+
+Charts are rendered in background worker processes instead of in the process
+that asks for them, so a request never waits for matplotlib (and the web
+process never imports it). A chart is described by its name and a small
+JSON-serializable payload; the hash of both is the chart's key:
+
+- submit_chart returns the key at once and queues the chart if it has not been
+  rendered yet; chart_url(key) is where the API serves it (/api/charts/<key>)
+- a chart with the same inputs is rendered only once, later submissions reuse
+  the cached image
+- render_chart waits for the image and optionally copies it to a path, for
+  scripts that write their charts next to their other outputs
+
+Each chart is stored in the chart directory as <key>.png with a <key>.json spec
+(name and payload), so another process serving the API can render a chart it
+did not submit. Once there are more than CHART_CACHE_MAX_ENTRIES charts the
+least recently used ones are removed.
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, List, Any, Optional, Callable
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CHART_DIR = os.path.join(os.path.dirname(current_dir), 'data', 'charts')
+CHART_URL_PREFIX = '/api/charts'
+
+# Bump when a chart's drawing changes, so old images are not served for it
+CHART_VERSION = 1
+
+# Equity curves are sampled down to this many points before drawing
+MAX_CURVE_POINTS = 2000
+
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{24}$')
+
+
+def _pyplot():
+    """Import pyplot with a non-interactive backend (only in the worker processes)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _plot_strategy_performance(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot the equity and balance of a simulation with its trades"""
+    plt = _pyplot()
+    plt.figure(figsize=(12, 8))
+
+    timestamps = pd.to_datetime(payload['timestamps'])
+    plt.plot(timestamps, payload['equity'], label='Equity', color='blue')
+    plt.plot(timestamps, payload['balance'], label='Balance', color='green', linestyle='--')
+
+    # Mark trades on the equity curve
+    for entry_time, entry_equity, exit_time, exit_equity, won in payload['trades']:
+        plt.plot([pd.Timestamp(entry_time), pd.Timestamp(exit_time)], [entry_equity, exit_equity],
+                 color='green' if won else 'red', alpha=0.5, linewidth=1)
+
+    plt.title(payload['title'])
+    plt.xlabel("Date")
+    plt.ylabel("Value")
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_performance_comparison(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot the accuracy and F1 score of several optimization methods"""
+    plt = _pyplot()
+    plt.figure(figsize=(10, 6))
+
+    x = np.arange(len(payload['methods']))
+    width = 0.35
+    plt.bar(x - width/2, payload['accuracy'], width, label='Accuracy')
+    plt.bar(x + width/2, payload['f1_score'], width, label='F1 Score')
+
+    plt.ylabel('Score')
+    plt.title(payload['title'])
+    plt.xticks(x, [method.replace('_', ' ').title() for method in payload['methods']])
+    plt.legend()
+    plt.ylim(0, 1.0)
+
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_feature_importance(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot the importance of the top features"""
+    plt = _pyplot()
+    count = len(payload['features'])
+    plt.figure(figsize=(12, 8))
+    plt.title(payload['title'])
+    plt.bar(range(count), payload['importance'], align="center")
+    plt.xticks(range(count), payload['features'], rotation=90)
+    plt.tight_layout()
+
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_confusion_matrix(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot a confusion matrix"""
+    plt = _pyplot()
+    cm = np.asarray(payload['matrix'])
+    class_names = payload['classes']
+
+    plt.figure(figsize=(10, 8))
+    plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
+    plt.title(payload['title'])
+    plt.colorbar()
+
+    tick_marks = np.arange(len(class_names))
+    plt.xticks(tick_marks, class_names, rotation=45)
+    plt.yticks(tick_marks, class_names)
+
+    # Format the text in each cell
+    thresh = cm.max() / 2.
+    for i in range(cm.shape[0]):
+        for j in range(cm.shape[1]):
+            plt.text(j, i, format(cm[i, j], 'd'),
+                     horizontalalignment="center",
+                     color="white" if cm[i, j] > thresh else "black")
+
+    plt.tight_layout()
+    plt.ylabel('True label')
+    plt.xlabel('Predicted label')
+
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_prediction_accuracy(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot prediction accuracy by prediction type"""
+    plt = _pyplot()
+    pred_types = payload['classes']
+    counts = payload['count']
+    correct_counts = payload['correct']
+
+    plt.figure(figsize=(10, 6))
+
+    # Set position of bars on X axis
+    r1 = np.arange(len(pred_types))
+    r2 = [x + 0.25 for x in r1]
+
+    plt.bar(r1, counts, color='skyblue', width=0.25, label='Total Predictions')
+    plt.bar(r2, correct_counts, color='lightgreen', width=0.25, label='Correct Predictions')
+
+    # Add accuracy percentages
+    for i, (count, correct) in enumerate(zip(counts, correct_counts)):
+        if count > 0:
+            accuracy = (correct / count) * 100
+            plt.text(r1[i], count + 0.5, f'{count}', ha='center')
+            plt.text(r2[i], correct + 0.5, f'{correct}\n({accuracy:.1f}%)', ha='center')
+        else:
+            plt.text(r1[i], 0.5, '0', ha='center')
+            plt.text(r2[i], 0.5, '0\n(0%)', ha='center')
+
+    plt.xlabel('Prediction Type')
+    plt.ylabel('Count')
+    plt.title('Prediction Accuracy by Type')
+    plt.xticks([r + 0.125 for r in range(len(pred_types))], pred_types)
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.7)
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_cumulative_accuracy(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot cumulative prediction accuracy at the end of each day"""
+    plt = _pyplot()
+    days = pd.to_datetime(payload['days'])
+    cumulative_accuracy = np.cumsum(payload['correct']) / np.cumsum(payload['count']) * 100
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(days, cumulative_accuracy, color='blue', marker='o' if len(days) < 60 else '',
+             linestyle='-', linewidth=2)
+
+    # Add a horizontal line at 50% accuracy
+    plt.axhline(y=50, color='red', linestyle='--', alpha=0.7, label='50% Accuracy')
+
+    plt.xlabel('Time')
+    plt.ylabel('Cumulative Accuracy (%)')
+    plt.title('Cumulative Prediction Accuracy Over Time')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend()
+
+    # Format x-axis to show dates nicely
+    plt.gcf().autofmt_xdate()
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_confidence_vs_accuracy(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot prediction accuracy per confidence bucket"""
+    plt = _pyplot()
+    labels, totals, corrects = payload['labels'], payload['count'], payload['correct']
+    accuracies = [correct / total * 100 for total, correct in zip(totals, corrects)]
+
+    plt.figure(figsize=(12, 6))
+
+    # Color the bars by accuracy
+    bar_colors = ['lightcoral' if acc < 50 else 'gold' if acc < 70 else 'lightgreen' for acc in accuracies]
+    bars = plt.bar(labels, accuracies, color=bar_colors)
+
+    # Add count labels
+    for bar, total, correct in zip(bars, totals, corrects):
+        plt.text(bar.get_x() + bar.get_width()/2, 5,
+                 f'n={total}\n{correct} correct',
+                 ha='center', va='bottom', rotation=0, fontsize=9)
+
+    plt.xlabel('Confidence Range')
+    plt.ylabel('Accuracy (%)')
+    plt.title('Prediction Accuracy by Confidence Level')
+    plt.grid(True, axis='y', linestyle='--', alpha=0.7)
+
+    # Add a horizontal line at 50% accuracy
+    plt.axhline(y=50, color='red', linestyle='--', alpha=0.5, label='50% Accuracy')
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_indicators_and_predictions(payload: Dict[str, Any], output_path: str) -> None:
+    """Plot price, indicators and prediction outcomes (reads the report's columns)"""
+    plt = _pyplot()
+    header = pd.read_csv(payload['report'], nrows=0).columns
+    df = pd.read_csv(payload['report'], usecols=[column for column in payload['columns'] if column in header])
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['was_correct'] = df['was_correct'].astype(bool)
+
+    fig, axs = plt.subplots(3, 1, figsize=(14, 12), sharex=True, gridspec_kw={'height_ratios': [3, 1, 1]})
+
+    # Plot price data with predictions
+    axs[0].plot(df['timestamp'], df['current_price'], color='blue', label='Price')
+
+    buy_points = df[df['prediction'] == 'BUY']
+    sell_points = df[df['prediction'] == 'SELL']
+    outcomes = [
+        (buy_points[buy_points['was_correct']], dict(color='green', marker='^', s=100, label='Correct BUY')),
+        (buy_points[~buy_points['was_correct']], dict(color='lightgreen', marker='^', s=60, alpha=0.6, label='Incorrect BUY')),
+        (sell_points[sell_points['was_correct']], dict(color='red', marker='v', s=100, label='Correct SELL')),
+        (sell_points[~sell_points['was_correct']], dict(color='lightcoral', marker='v', s=60, alpha=0.6, label='Incorrect SELL'))
+    ]
+    for points, style in outcomes:
+        if len(points) > 0:
+            axs[0].scatter(points['timestamp'], points['current_price'], **style)
+
+    # Add Bollinger Bands if available
+    if 'bb_upper' in df.columns and 'bb_lower' in df.columns:
+        axs[0].plot(df['timestamp'], df['bb_upper'], color='purple', linestyle='--', alpha=0.7, label='BB Upper')
+        axs[0].plot(df['timestamp'], df['bb_lower'], color='purple', linestyle='--', alpha=0.7, label='BB Lower')
+        axs[0].fill_between(df['timestamp'], df['bb_lower'], df['bb_upper'], color='purple', alpha=0.1)
+
+    if 'ema_20' in df.columns:
+        axs[0].plot(df['timestamp'], df['ema_20'], color='orange', linestyle='-', label='EMA 20')
+
+    axs[0].set_ylabel('Price')
+    axs[0].set_title('Price Chart with Predictions')
+    axs[0].grid(True, linestyle='--', alpha=0.7)
+    axs[0].legend(loc='upper left')
+
+    if 'rsi_14' in df.columns:
+        axs[1].plot(df['timestamp'], df['rsi_14'], color='green', label='RSI (14)')
+        axs[1].axhline(y=70, color='red', linestyle='--', alpha=0.7)
+        axs[1].axhline(y=30, color='green', linestyle='--', alpha=0.7)
+        axs[1].set_ylabel('RSI')
+        axs[1].set_ylim(0, 100)
+        axs[1].grid(True, linestyle='--', alpha=0.7)
+        axs[1].legend(loc='upper left')
+
+    if 'macd' in df.columns:
+        axs[2].plot(df['timestamp'], df['macd'], color='blue', label='MACD')
+        axs[2].axhline(y=0, color='red', linestyle='-', alpha=0.3)
+        axs[2].set_ylabel('MACD')
+        axs[2].grid(True, linestyle='--', alpha=0.7)
+        axs[2].legend(loc='upper left')
+
+    fig.autofmt_xdate()
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+# Chart renderers by chart name
+CHART_RENDERERS: Dict[str, Callable[[Dict[str, Any], str], None]] = {
+    'strategy_performance': _plot_strategy_performance,
+    'performance_comparison': _plot_performance_comparison,
+    'feature_importance': _plot_feature_importance,
+    'confusion_matrix': _plot_confusion_matrix,
+    'prediction_accuracy': _plot_prediction_accuracy,
+    'cumulative_accuracy': _plot_cumulative_accuracy,
+    'confidence_vs_accuracy': _plot_confidence_vs_accuracy,
+    'indicators_and_predictions': _plot_indicators_and_predictions
+}
+
+
+def strategy_performance_payload(title: str,
+                                 balance_history: pd.Series,
+                                 equity_history: pd.Series,
+                                 trades: List[Dict[str, Any]],
+                                 max_points: int = MAX_CURVE_POINTS) -> Dict[str, Any]:
+    """
+    Build the payload of a strategy performance chart (raises KeyError for a
+    trade whose time is not in the equity history).
+
+    Args:
+        title: Chart title
+        balance_history: Balance indexed by timestamp
+        equity_history: Equity indexed by timestamp
+        trades: Trade dictionaries with 'entry_time', 'exit_time' and 'pnl'
+        max_points: Number of curve points to draw at most (the trades are
+            drawn at their exact equity values)
+
+    Returns:
+        The chart payload
+    """
+    timestamps = equity_history.index
+    equity = equity_history.to_numpy(dtype=np.float64)
+    balance = balance_history.to_numpy(dtype=np.float64)
+
+    sample = np.arange(len(equity))
+    if len(sample) > max_points:
+        sample = np.unique(np.linspace(0, len(equity) - 1, max_points).round().astype(int))
+
+    # Trade times are candle timestamps
+    entries = timestamps.get_indexer(pd.to_datetime([trade['entry_time'] for trade in trades]))
+    exits = timestamps.get_indexer(pd.to_datetime([trade['exit_time'] for trade in trades]))
+    missing = [trade for trade, entry, exit in zip(trades, entries, exits) if entry < 0 or exit < 0]
+    if missing:
+        raise KeyError(f"{len(missing)} trades are not on the equity history, e.g. "
+                       f"{missing[0]['entry_time']} - {missing[0]['exit_time']}")
+
+    return {
+        'title': title,
+        'timestamps': [timestamp.isoformat() for timestamp in timestamps[sample]],
+        'equity': equity[sample].tolist(),
+        'balance': balance[sample].tolist(),
+        'trades': [[timestamps[entry].isoformat(), float(equity[entry]),
+                    timestamps[exit].isoformat(), float(equity[exit]), bool(trade['pnl'] > 0)]
+                   for trade, entry, exit in zip(trades, entries, exits)]
+    }
+
+
+def chart_key(chart: str, payload: Dict[str, Any]) -> str:
+    """Hash of a chart's name, drawing version and payload"""
+    data = {'chart': chart, 'version': CHART_VERSION, 'payload': payload}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+def chart_url(key: str) -> str:
+    """URL the API serves a chart at"""
+    return f"{CHART_URL_PREFIX}/{key}"
+
+
+def _render_chart(chart: str, payload: Dict[str, Any], output_path: str) -> str:
+    """Render one chart to a file (runs in a worker process)"""
+    tmp_path = f"{output_path}.{os.getpid()}.tmp.png"
+    CHART_RENDERERS[chart](payload, tmp_path)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class ChartRenderer:
+    """
+    Renders charts in background worker processes and caches the images by input hash
+    """
+
+    def __init__(self, chart_dir: str = DEFAULT_CHART_DIR, n_workers: int = 1, max_entries: int = 500):
+        """
+        Initialize the chart renderer.
+
+        Args:
+            chart_dir: Directory of the rendered charts and their specs
+            n_workers: Number of worker processes (started with the first chart)
+            max_entries: Maximum number of charts kept
+        """
+        self.chart_dir = chart_dir
+        self.n_workers = max(1, n_workers)
+        self.max_entries = max_entries
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._failed: Dict[str, str] = {}
+        # Reentrant: a rendering that is already done calls _finish from _queue
+        self._lock = threading.RLock()
+        os.makedirs(chart_dir, exist_ok=True)
+
+    def _paths(self, key: str) -> Dict[str, str]:
+        """Image and spec paths of a chart"""
+        return {'image': os.path.join(self.chart_dir, f'{key}.png'),
+                'spec': os.path.join(self.chart_dir, f'{key}.json')}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use"""
+        if self._executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=context)
+        return self._executor
+
+    def _queue(self, key: str, chart: str, payload: Dict[str, Any]) -> None:
+        """Queue the rendering of a chart (called with the lock held)"""
+        future = self._get_executor().submit(_render_chart, chart, payload, self._paths(key)['image'])
+        self._pending[key] = future
+        self._failed.pop(key, None)
+        future.add_done_callback(lambda done: self._finish(key, done))
+
+    def _finish(self, key: str, future: Future) -> None:
+        """Record the outcome of a rendering"""
+        error = future.exception()
+        with self._lock:
+            self._pending.pop(key, None)
+            if error is not None:
+                self._failed[key] = str(error)
+        if error is not None:
+            logger.error(f"Rendering chart {key} failed: {error}")
+        else:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Remove the least recently used charts beyond max_entries"""
+        entries = []
+        for filename in os.listdir(self.chart_dir):
+            if filename.endswith('.png') and '.tmp' not in filename:
+                path = os.path.join(self.chart_dir, filename)
+                try:
+                    entries.append((os.path.getmtime(path), filename[:-4]))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+        for _, key in entries[self.max_entries:]:
+            for path in self._paths(key).values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def submit(self, chart: str, payload: Dict[str, Any]) -> str:
+        """
+        Queue a chart unless an image with the same inputs exists.
+
+        Args:
+            chart: Chart name (see CHART_RENDERERS)
+            payload: JSON-serializable chart inputs
+
+        Returns:
+            The chart key
+        """
+        if chart not in CHART_RENDERERS:
+            raise ValueError(f"Unknown chart {chart}. Must be in: {', '.join(CHART_RENDERERS)}")
+
+        key = chart_key(chart, payload)
+        paths = self._paths(key)
+        with self._lock:
+            if os.path.exists(paths['image']):
+                # Mark the chart as recently used
+                os.utime(paths['image'])
+                return key
+            if key in self._pending:
+                return key
+
+            if not os.path.exists(paths['spec']):
+                tmp_path = f"{paths['spec']}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'chart': chart, 'payload': payload}, f)
+                os.replace(tmp_path, paths['spec'])
+            self._queue(key, chart, payload)
+        return key
+
+    def status(self, key: str) -> str:
+        """
+        Get the status of a chart.
+
+        A chart that is neither rendered nor queued here but has a spec (it was
+        submitted by another process, or before a restart) is queued.
+
+        Args:
+            key: Chart key
+
+        Returns:
+            'ready', 'pending', 'failed' or 'unknown'
+        """
+        if not _KEY_PATTERN.match(key):
+            return 'unknown'
+
+        paths = self._paths(key)
+        with self._lock:
+            if os.path.exists(paths['image']):
+                return 'ready'
+            if key in self._pending:
+                return 'pending'
+            if key in self._failed:
+                return 'failed'
+            try:
+                with open(paths['spec'], 'r') as f:
+                    spec = json.load(f)
+            except (OSError, ValueError):
+                return 'unknown'
+            self._queue(key, spec['chart'], spec['payload'])
+        return 'pending'
+
+    def get_error(self, key: str) -> Optional[str]:
+        """Error of a chart that failed to render"""
+        with self._lock:
+            return self._failed.get(key)
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Path of a rendered chart (None if it is not rendered)"""
+        if not _KEY_PATTERN.match(key):
+            return None
+        path = self._paths(key)['image']
+        return path if os.path.exists(path) else None
+
+    def wait(self, key: str, timeout: Optional[float] = None) -> str:
+        """
+        Wait until a chart is rendered.
+
+        Args:
+            key: Chart key
+            timeout: Seconds to wait at most (None waits as long as it takes)
+
+        Returns:
+            Path of the rendered chart
+        """
+        if self.status(key) == 'pending':
+            with self._lock:
+                future = self._pending.get(key)
+            if future is not None:
+                future.result(timeout=timeout)
+
+        path = self.get_path(key)
+        if path is None:
+            raise RuntimeError(f"Chart {key} was not rendered: {self.get_error(key) or 'unknown chart'}")
+        return path
+
+    def render(self, chart: str, payload: Dict[str, Any], save_path: Optional[str] = None,
+               timeout: Optional[float] = None) -> str:
+        """
+        Render a chart (or reuse its cached image) and wait for it.
+
+        Args:
+            chart: Chart name (see CHART_RENDERERS)
+            payload: JSON-serializable chart inputs
+            save_path: Optional path to copy the image to
+            timeout: Seconds to wait at most
+
+        Returns:
+            save_path, or the path of the cached image
+        """
+        path = self.wait(self.submit(chart, payload), timeout)
+        if save_path:
+            shutil.copyfile(path, save_path)
+            return save_path
+        return path
+
+    def shutdown(self) -> None:
+        """Stop the worker processes after the queued charts"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# Create a singleton instance
+_chart_renderer = None
+_chart_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer() -> ChartRenderer:
+    """
+    Get the shared chart renderer
+
+    The worker count and number of cached charts come from CHART_RENDER_WORKERS
+    and CHART_CACHE_MAX_ENTRIES, the directory from CHART_DIR.
+
+    Returns:
+        The ChartRenderer instance
+    """
+    global _chart_renderer
+
+    with _chart_renderer_lock:
+        if _chart_renderer is None:
+            try:
+                from config import active_config
+                n_workers = int(getattr(active_config, 'CHART_RENDER_WORKERS', 1))
+                max_entries = int(getattr(active_config, 'CHART_CACHE_MAX_ENTRIES', 500))
+                chart_dir = getattr(active_config, 'CHART_DIR', '') or DEFAULT_CHART_DIR
+            except (ImportError, ValueError):
+                n_workers, max_entries, chart_dir = 1, 500, DEFAULT_CHART_DIR
+            _chart_renderer = ChartRenderer(chart_dir, n_workers=n_workers, max_entries=max_entries)
+        return _chart_renderer
+
+
+def submit_chart(chart: str, payload: Dict[str, Any]) -> str:
+    """
+    Queue a chart on the shared renderer without waiting for it.
+
+    Args:
+        chart: Chart name (see CHART_RENDERERS)
+        payload: JSON-serializable chart inputs
+
+    Returns:
+        The chart key (see chart_url)
+    """
+    return get_chart_renderer().submit(chart, payload)
+
+
+def render_chart(chart: str, payload: Dict[str, Any], save_path: Optional[str] = None,
+                 timeout: Optional[float] = None) -> str:
+    """
+    Render a chart on the shared renderer and wait for it.
+
+    Args:
+        chart: Chart name (see CHART_RENDERERS)
+        payload: JSON-serializable chart inputs
+        save_path: Optional path to copy the image to
+        timeout: Seconds to wait at most
+
+    Returns:
+        save_path, or the path of the cached image
+    """
+    return get_chart_renderer().render(chart, payload, save_path, timeout)
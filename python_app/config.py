@@ -41,6 +41,32 @@ class Config:
     DEFAULT_MODEL_TYPE = 'xgboost'
     CONFIDENCE_THRESHOLD = 0.75
     
+    # Prediction worker pool settings (0 workers = run inference in the request thread)
+    PREDICTION_POOL_WORKERS = int(os.environ.get('PREDICTION_POOL_WORKERS', '0'))
+    PREDICTION_POOL_MAX_TASKS = int(os.environ.get('PREDICTION_POOL_MAX_TASKS', '500'))
+    
+    # Serve the fastest compact model variant whose accuracy is within this tolerance
+    # of the full model (unset = always serve the full model)
+    MODEL_VARIANT_TOLERANCE = (float(os.environ['MODEL_VARIANT_TOLERANCE'])
+                               if os.environ.get('MODEL_VARIANT_TOLERANCE') else None)
+    
+    # Cached model outputs over historical candles (0 = disable the prediction cache)
+    PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', '200'))
+    
+    # Concurrent validation runs: parallel history downloads and scoring processes
+    # (0 scoring workers = one per CPU core)
+    VALIDATION_FETCH_WORKERS = int(os.environ.get('VALIDATION_FETCH_WORKERS', '8'))
+    VALIDATION_WORKERS = int(os.environ.get('VALIDATION_WORKERS', '0'))
+    
+    # Background chart rendering: worker processes, cached images and their
+    # directory (empty = data/charts)
+    CHART_RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', '1'))
+    CHART_CACHE_MAX_ENTRIES = int(os.environ.get('CHART_CACHE_MAX_ENTRIES', '500'))
+    CHART_DIR = os.environ.get('CHART_DIR', '')
+    
+    # CPU cores shared by training/tuning/retraining jobs (0 = all cores)
+    JOB_SCHEDULER_CPU_SLOTS = int(os.environ.get('JOB_SCHEDULER_CPU_SLOTS', '0'))
+    
     # Paper trading settings
     DEFAULT_PAPER_BALANCE = 10000.0  # USD
     
@@ -17,6 +17,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Candles add_target_labels looks ahead to label a row
+DEFAULT_FORWARD_RETURNS_PERIODS = 24
+
+# Columns add_target_labels derives from future prices (never model features)
+FUTURE_COLUMNS = ['forward_return']
+
 def load_market_data(data_dir: str, symbol: str, timeframe: str) -> pd.DataFrame:
     """
     Load market data from CSV or other sources
@@ -87,7 +93,8 @@ def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
         
     return processed_df
 
-def add_target_labels(df: pd.DataFrame, forward_returns_periods: int = 24, threshold: float = 0.005) -> pd.DataFrame:
+def add_target_labels(df: pd.DataFrame, forward_returns_periods: int = DEFAULT_FORWARD_RETURNS_PERIODS,
+                      threshold: float = 0.005) -> pd.DataFrame:
     """
     Add target labels for classification
     
@@ -127,6 +134,153 @@ def add_target_labels(df: pd.DataFrame, forward_returns_periods: int = 24, thres
     
     return labeled_df
 
+def load_feature_frame(data_dir: str, symbol: str, timeframe: str) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Load and preprocess market data in time order, with target labels
+    
+    Args:
+        data_dir: Directory containing data files
+        symbol: Trading pair symbol (e.g., 'btcusdt')
+        timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
+        
+    Returns:
+        Tuple of (DataFrame, list of numeric feature columns, without FUTURE_COLUMNS)
+    """
+    # Load data
+    df = load_market_data(data_dir, symbol, timeframe)
+    
+    # Preprocess data
+    df = preprocess_data(df)
+    
+    # Check if target is already in the data
+    if 'target' not in df.columns:
+        # Add target labels if not present
+        df = add_target_labels(df)
+    
+    # Identify feature columns (exclude target, the columns it is built from and any non-numeric columns)
+    feature_cols = [col for col in df.columns if col != 'target' and col not in FUTURE_COLUMNS
+                    and pd.api.types.is_numeric_dtype(df[col])]
+    
+    if not feature_cols:
+        raise ValueError("No numeric feature columns found in data")
+        
+    logger.info(f"Using {len(feature_cols)} features: {feature_cols}")
+    
+    return df, feature_cols
+
+def prepare_data_for_training(df: pd.DataFrame, symbol: str, timeframe: str) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+    """
+    Prepare market data the way load_train_test_data prepares training data
+    
+    Args:
+        df: DataFrame with market data
+        symbol: Trading pair symbol (e.g., 'btcusdt')
+        timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
+        
+    Returns:
+        Tuple of (scaled features indexed like the preprocessed data, target labels,
+        list of feature columns)
+    """
+    logger.info(f"Preparing {len(df)} rows of {symbol} {timeframe} data")
+    
+    df = preprocess_data(df)
+    if 'target' not in df.columns:
+        df = add_target_labels(df)
+    
+    feature_cols = [col for col in df.columns if col != 'target' and col not in FUTURE_COLUMNS
+                    and pd.api.types.is_numeric_dtype(df[col])]
+    if not feature_cols:
+        raise ValueError("No numeric feature columns found in data")
+    
+    X = pd.DataFrame(StandardScaler().fit_transform(df[feature_cols].values),
+                     index=df.index, columns=feature_cols)
+    return X, df['target'], feature_cols
+
+def _row_cutoff(df: pd.DataFrame, position: int) -> Union[str, int]:
+    """Get the cutoff marker for the first `position` rows (last timestamp, or the row count)"""
+    if isinstance(df.index, pd.DatetimeIndex) and position > 0:
+        return df.index[position - 1].isoformat()
+    return position
+
+def _labeled_rows(df: pd.DataFrame) -> int:
+    """Number of leading rows whose label is known (the newest rows' forward return is not yet)"""
+    if 'forward_return' not in df.columns:
+        return len(df)
+    known = np.flatnonzero(df['forward_return'].notna().to_numpy())
+    return int(known[-1]) + 1 if len(known) else 0
+
+def get_training_state(data_dir: str, symbol: str, timeframe: str) -> Dict[str, Any]:
+    """
+    Describe the data a full training run sees, so later runs can train on newer rows only
+    
+    The scaler is fitted on all rows, exactly as load_train_test_data does, and is
+    kept so new rows can be scaled the same way the model's training data was. The
+    cutoff stops before the newest rows whose labels are not known yet, so later
+    updates learn them once their future prices are in.
+    
+    Args:
+        data_dir: Directory containing data files
+        symbol: Trading pair symbol (e.g., 'btcusdt')
+        timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
+        
+    Returns:
+        Dictionary with the training cutoff, row count, feature columns and scaler parameters
+    """
+    df, feature_cols = load_feature_frame(data_dir, symbol, timeframe)
+    scaler = StandardScaler().fit(df[feature_cols].values)
+    labeled = _labeled_rows(df)
+    
+    return {
+        'cutoff': _row_cutoff(df, labeled),
+        'rows': labeled,
+        'feature_cols': feature_cols,
+        'scaler': {
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist()
+        }
+    }
+
+def load_rows_after_cutoff(data_dir: str, symbol: str, timeframe: str,
+                           training_state: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, List[Union[str, int]]]:
+    """
+    Load the rows added after a training cutoff, scaled with the training scaler
+    
+    Only rows with known labels are returned: the newest rows still carry the
+    placeholder HOLD label of add_target_labels and are left for a later update.
+    
+    Args:
+        data_dir: Directory containing data files
+        symbol: Trading pair symbol (e.g., 'btcusdt')
+        timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
+        training_state: State from get_training_state (or a later incremental update)
+        
+    Returns:
+        Tuple of (X_new, y_new, cutoffs), where cutoffs[i] is the cutoff marker after
+        training on the first i + 1 new rows
+    """
+    df, _ = load_feature_frame(data_dir, symbol, timeframe)
+    feature_cols = training_state['feature_cols']
+    missing = [col for col in feature_cols if col not in df.columns]
+    if missing:
+        raise ValueError(f"Data no longer has the training features: {missing}")
+    
+    cutoff = training_state['cutoff']
+    if isinstance(cutoff, str) and isinstance(df.index, pd.DatetimeIndex):
+        start = int(df.index.searchsorted(pd.Timestamp(cutoff), side='right'))
+    else:
+        start = int(cutoff)
+    
+    new_rows = df.iloc[start:_labeled_rows(df)]
+    mean = np.asarray(training_state['scaler']['mean'])
+    scale = np.asarray(training_state['scaler']['scale'])
+    X_new = (new_rows[feature_cols].values - mean) / scale
+    y_new = new_rows['target'].values
+    cutoffs = [_row_cutoff(df, start + i + 1) for i in range(len(new_rows))]
+    
+    logger.info(f"Loaded {len(new_rows)} rows after cutoff {cutoff}")
+    
+    return X_new, y_new, cutoffs
+
 def load_train_test_data(data_dir: str, symbol: str, timeframe: str = '1h', 
                         test_size: float = 0.2, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
@@ -143,24 +297,7 @@ def load_train_test_data(data_dir: str, symbol: str, timeframe: str = '1h',
         Tuple of (X_train, X_test, y_train, y_test)
     """
     try:
-        # Load data
-        df = load_market_data(data_dir, symbol, timeframe)
-        
-        # Preprocess data
-        df = preprocess_data(df)
-        
-        # Check if target is already in the data
-        if 'target' not in df.columns:
-            # Add target labels if not present
-            df = add_target_labels(df)
-        
-        # Identify feature columns (exclude target and any non-numeric columns)
-        feature_cols = [col for col in df.columns if col != 'target' and pd.api.types.is_numeric_dtype(df[col])]
-        
-        if not feature_cols:
-            raise ValueError("No numeric feature columns found in data")
-            
-        logger.info(f"Using {len(feature_cols)} features: {feature_cols}")
+        df, feature_cols = load_feature_frame(data_dir, symbol, timeframe)
         
         # Extract features and target
         X = df[feature_cols].values
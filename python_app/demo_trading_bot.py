@@ -12,9 +12,7 @@ Note: This is for demonstration purposes only and does not execute real trades.
 import os
 import sys
 import json
-import time
 import logging
-from datetime import datetime
 import argparse
 
 # Add parent directory to path
@@ -39,13 +37,19 @@ except ImportError as e:
     logger.error(f"Error importing ML Trading Bridge: {e}")
     sys.exit(1)
 
+# Import the clock so replays can run the bot on simulated time
+try:
+    from python_app.utils.clock import get_clock
+except ImportError:
+    from utils.clock import get_clock
+
 class DemoTradingBot:
     """
     Demo trading bot that uses ML predictions to simulate trading decisions
     """
     
     def __init__(self, symbol="BTCUSDT", interval="1h", model_type="balanced", 
-                 confidence_threshold=0.75, initial_balance=10000.0):
+                 confidence_threshold=0.75, initial_balance=10000.0, ml_bridge=None):
         """
         Initialize the demo trading bot
         
@@ -55,6 +59,8 @@ class DemoTradingBot:
             model_type: Model type to use ('standard' or 'balanced')
             confidence_threshold: Minimum confidence level for trades (0.0-1.0)
             initial_balance: Initial USDT balance for the simulation
+            ml_bridge: Optional source of predictions with a get_prediction(symbol, interval)
+                method, e.g. a replay feed (default: MLTradingBridge)
         """
         self.symbol = symbol
         self.interval = interval
@@ -62,7 +68,7 @@ class DemoTradingBot:
         self.confidence_threshold = confidence_threshold
         
         # Initialize the ML trading bridge
-        self.ml_bridge = MLTradingBridge(model_type=model_type)
+        self.ml_bridge = ml_bridge if ml_bridge is not None else MLTradingBridge(model_type=model_type)
         
         # Initialize account state
         self.initial_balance = initial_balance
@@ -130,7 +136,7 @@ class DemoTradingBot:
         Returns:
             True if the trade was executed, False otherwise
         """
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = get_clock().now().strftime('%Y-%m-%d %H:%M:%S')
         
         if action == "BUY" and self.usdt_balance > 0:
             # Calculate amount to buy
@@ -281,7 +287,7 @@ class DemoTradingBot:
         profit = final_value - self.initial_balance
         profit_percent = (profit / self.initial_balance) * 100
         
-        print(f"\nTrading period: {self.trades[0]['timestamp'] if self.trades else 'N/A'} to {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"\nTrading period: {self.trades[0]['timestamp'] if self.trades else 'N/A'} to {get_clock().now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"\nStarting balance: ${self.initial_balance:.2f}")
         print(f"Final balance: ${final_value:.2f}")
         print(f"Profit/Loss: ${profit:.2f} ({profit_percent:.2f}%)")
@@ -322,7 +328,7 @@ class DemoTradingBot:
         }
         
         # Save to file
-        report_file = f"demo_trading_{self.symbol.lower()}_{self.interval}_{int(time.time())}.json"
+        report_file = f"demo_trading_{self.symbol.lower()}_{self.interval}_{int(get_clock().time())}.json"
         report_path = os.path.join(current_dir, report_file)
         
         with open(report_path, 'w') as f:
@@ -331,42 +337,61 @@ class DemoTradingBot:
         logger.info(f"Saved trading report to: {report_path}")
         return report_path
     
-    def run_simulation(self, periods=10, interval_minutes=None):
+    def run_period(self, period, periods, interval_minutes=None):
+        """
+        Run one trading period: fetch the price and act on the prediction
+        
+        Args:
+            period: Index of the period (0-based)
+            periods: Total number of periods
+            interval_minutes: Minutes between each check (for display only)
+            
+        Returns:
+            The action taken
+        """
+        # Get latest price
+        price = self.fetch_latest_price()
+        if price:
+            self.current_price = price
+        
+        logger.info(f"\n--- PERIOD {period+1}/{periods} ---")
+        if interval_minutes:
+            logger.info(f"Time: {get_clock().now().strftime('%Y-%m-%d %H:%M:%S')} (simulating {interval_minutes}min intervals)")
+        
+        # Get prediction
+        prediction = self.get_prediction()
+        
+        # Process prediction
+        return self.process_prediction(prediction)
+    
+    def run_simulation(self, periods=10, interval_minutes=None, period_seconds=1.0, save_report=True):
         """
         Run a trading simulation for a specific number of periods
         
         Args:
             periods: Number of trading periods to simulate
             interval_minutes: Minutes between each check (for display only)
+            period_seconds: Seconds to wait on the clock between periods (on a
+                simulation clock this advances time instead of waiting)
+            save_report: Whether to save the trading report to file
             
         Returns:
             Final portfolio value
         """
         logger.info(f"Starting trading simulation for {periods} periods")
+        clock = get_clock()
         
         for i in range(periods):
-            # Get latest price
-            price = self.fetch_latest_price()
-            if price:
-                self.current_price = price
-            
-            logger.info(f"\n--- PERIOD {i+1}/{periods} ---")
-            if interval_minutes:
-                logger.info(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (simulating {interval_minutes}min intervals)")
-            
-            # Get prediction
-            prediction = self.get_prediction()
-            
-            # Process prediction
-            action = self.process_prediction(prediction)
+            self.run_period(i, periods, interval_minutes)
             
             # Simulate time passing
             if i < periods - 1:
-                time.sleep(1)  # Short delay between periods
+                clock.sleep(period_seconds)  # Short delay between periods
         
         # Print and save summary
         self.print_summary()
-        self.save_report()
+        if save_report:
+            self.save_report()
         
         # Return final portfolio value
         return self.usdt_balance + (self.coin_balance * self.current_price)
@@ -11,7 +11,6 @@ Usage:
 import os
 import sys
 import logging
-import pickle
 import argparse
 import json
 from datetime import datetime
@@ -15,7 +15,6 @@ Parameters:
 import os
 import sys
 import logging
-import pickle
 import argparse
 from datetime import datetime
 from typing import Dict, Any, List, Optional
@@ -58,6 +57,7 @@ except ImportError:
 # Import functions from train_model.py and predict.py
 from train_model import fetch_historical_data, add_technical_indicators, add_target_labels
 from predict import load_model
+from prediction_cache import get_prediction_cache
 
 def evaluate_model(symbol: str, interval: str = '4h', threshold: float = 2.0, window: int = 5) -> Dict[str, Any]:
     """
@@ -85,6 +85,7 @@ def evaluate_model(symbol: str, interval: str = '4h', threshold: float = 2.0, wi
         model = model_data['model']
         scaler = model_data['scaler']
         features = model_data['features']
+        artifact = model_data['artifact']
         
         # Fetch historical data (last 100 periods for a smaller test set to avoid timeouts)
         logging.info(f"Fetching historical data for {symbol} evaluation...")
@@ -115,8 +116,12 @@ def evaluate_model(symbol: str, interval: str = '4h', threshold: float = 2.0, wi
         # Scale features
         X_scaled = scaler.transform(X)
         
-        # Make predictions
-        y_pred_mapped = model.predict(X_scaled)
+        # Make predictions (from the prediction cache when these candles were scored before)
+        X_scaled_df = pd.DataFrame(X_scaled, index=X.index, columns=features)
+        probabilities = get_prediction_cache().get_or_compute(
+            artifact.version, X_scaled_df, lambda: model.predict_proba(X_scaled),
+            label=artifact.stem)
+        y_pred_mapped = probabilities.argmax(axis=1)
         
         # Map predictions back to original labels for reporting
         y_pred = np.select([y_pred_mapped == 0, y_pred_mapped == 1, y_pred_mapped == 2], [-1, 0, 1])
@@ -148,9 +153,8 @@ def evaluate_model(symbol: str, interval: str = '4h', threshold: float = 2.0, wi
         
         # Get sample prediction with confidence
         sample_index = np.random.randint(0, len(X_scaled))
-        sample_X = X_scaled[sample_index:sample_index+1]
-        sample_prediction = model.predict(sample_X)[0]
-        sample_proba = model.predict_proba(sample_X)[0]
+        sample_proba = probabilities[sample_index]
+        sample_prediction = int(sample_proba.argmax())
         
         sample_signal_map = {0: 'SELL', 1: 'HOLD', 2: 'BUY'}
         sample_signal = sample_signal_map[sample_prediction]
@@ -10,13 +10,16 @@ Usage:
 
 import os
 import sys
-import pickle
 import argparse
 import logging
 from datetime import datetime
 import json
 import requests
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_artifacts import load_symbol_model
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,21 +32,20 @@ logging.basicConfig(
 def load_model_info(symbol):
     """
     Load the trained model metadata from disk.
+    
+    Only the artifact metadata is read; the booster itself is not loaded.
     """
-    # Determine file path
-    symbol_lower = symbol.lower()
     model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
-    model_path = os.path.join(model_dir, f'model_{symbol_lower}.pkl')
-    
-    if not os.path.exists(model_path):
-        logging.error(f"Model file not found: {model_path}")
-        return None
     
     try:
-        with open(model_path, 'rb') as f:
-            model_data = pickle.load(f)
+        artifact = load_symbol_model(symbol, model_dir)
+        if artifact is None:
+            logging.error(f"Model file not found for {symbol} in {model_dir}")
+            return None
+        
+        model_data = dict(artifact.metadata)
         
-        logging.info(f"Successfully loaded model metadata for {symbol} (trained at {model_data['trained_at']})")
+        logging.info(f"Successfully loaded model metadata for {symbol} (trained at {model_data.get('trained_at')})")
         return model_data
     
     except Exception as e:
@@ -5,12 +5,14 @@ Historical Prediction Validator
 This script validates ML model predictions on historical market data by:
 1. Loading historical OHLCV data for a given symbol and timeframe
 2. Recalculating technical indicators as used in the training phase
-3. Running predictions on each candle using a sliding window approach
+3. Running predictions on every candle in one batched pass (or, with --replay,
+   one candle at a time using a sliding window approach)
 4. Comparing predictions to actual outcomes
 5. Generating a comprehensive CSV report of the results
 
 Usage:
     python historical_prediction_validator.py --symbol=BTCUSDT --interval=1h --days=7
+    python historical_prediction_validator.py --symbols BTCUSDT ETHUSDT --intervals 1h 4h --days=7
 
 Arguments:
     --symbol: Trading pair to analyze (e.g., BTCUSDT)
@@ -19,6 +21,10 @@ Arguments:
     --model: Model type to use (standard or balanced)
     --threshold: Minimum confidence threshold for predictions (0.0-1.0)
     --output: Custom output filename (optional)
+    --replay: Predict one candle at a time instead of in one batched pass
+    --symbols/--intervals: Validate every symbol x interval combination concurrently
+        and merge the results into one summary (see validation_runner.py)
+    --workers/--fetch-workers: Scoring processes and concurrent downloads of such a run
 """
 
 import os
@@ -69,13 +75,51 @@ except ImportError as e:
         print("Please make sure you're running this script from the python_app directory.")
         sys.exit(1)
 
+from validation_analytics import ValidationRollup, save_rollup
+
+def fetch_validation_history(symbol: str, interval: str, days: int) -> pd.DataFrame:
+    """
+    Fetch the historical OHLCV data a validation of a symbol and timeframe needs.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., 'BTCUSDT')
+        interval: Timeframe interval (e.g., '5m', '1h', '1d')
+        days: Number of days of historical data to analyze
+    
+    Returns:
+        DataFrame containing historical market data with technical indicators
+        (empty if the data could not be retrieved)
+    """
+    logging.info(f"Fetching {days} days of historical {interval} data for {symbol}")
+    
+    # Determine the lookback period needed for calculating indicators
+    # For a proper indicator calculation, we need extra data before our analysis period
+    indicator_lookback = '14d'  # Extra data to ensure accurate indicator calculations
+    
+    # Use the dataset loader to fetch data with indicators
+    df = load_symbol_data(
+        symbol=symbol,
+        interval=interval,
+        lookback=f"{days}d",
+        additional_lookback=indicator_lookback
+    )
+    
+    if df is None or df.empty:
+        logging.error(f"Failed to retrieve historical data for {symbol}")
+        return pd.DataFrame()
+    
+    logging.info(f"Retrieved {len(df)} historical candles with {len(df.columns)} columns")
+    return df
+
 class HistoricalPredictionValidator:
     """
     Validates ML model predictions against historical market data
     """
     
     def __init__(self, symbol: str, interval: str = '1h', model_type: str = 'balanced',
-                 days: int = 7, confidence_threshold: float = 0.5):
+                 days: int = 7, confidence_threshold: float = 0.5,
+                 predictor: Optional[XGBoostPredictor] = None,
+                 market_service: Optional[BinanceMarketService] = None):
         """
         Initialize the historical prediction validator.
         
@@ -85,6 +129,9 @@ class HistoricalPredictionValidator:
             model_type: Model type to use ('standard' or 'balanced')
             days: Number of days of historical data to analyze
             confidence_threshold: Minimum confidence threshold for predictions
+            predictor: Predictor to share with other validators (default: a new one);
+                a model it has already loaded is not loaded again
+            market_service: Market service to share with other validators (default: a new one)
         """
         self.symbol = symbol.upper()
         self.interval = interval
@@ -93,15 +140,16 @@ class HistoricalPredictionValidator:
         self.confidence_threshold = confidence_threshold
         
         # Initialize market service for data fetching
-        self.market_service = BinanceMarketService()
+        self.market_service = market_service or BinanceMarketService()
         
         # Initialize ML predictor
-        self.predictor = XGBoostPredictor()
+        self.predictor = predictor or XGBoostPredictor()
         self.load_model()
         
         # Results storage
         self.predictions = []
         self.report_df = None
+        self.rollup = None
         
         logging.info(f"Initialized validator for {symbol} on {interval} timeframe using {model_type} model")
         logging.info(f"Analyzing {days} days of historical data with confidence threshold {confidence_threshold}")
@@ -113,6 +161,9 @@ class HistoricalPredictionValidator:
         Returns:
             Boolean indicating if model was loaded successfully
         """
+        if self.predictor.get_model_key(self.symbol.lower(), self.model_type) in self.predictor.models:
+            return True
+        
         success = self.predictor.load_model(self.symbol, self.model_type)
         if success:
             logging.info(f"Successfully loaded {self.model_type} model for {self.symbol}")
@@ -127,26 +178,7 @@ class HistoricalPredictionValidator:
         Returns:
             DataFrame containing historical market data with technical indicators
         """
-        logging.info(f"Fetching {self.days} days of historical {self.interval} data for {self.symbol}")
-        
-        # Determine the lookback period needed for calculating indicators
-        # For a proper indicator calculation, we need extra data before our analysis period
-        indicator_lookback = '14d'  # Extra data to ensure accurate indicator calculations
-        
-        # Use the dataset loader to fetch data with indicators
-        df = load_symbol_data(
-            symbol=self.symbol,
-            interval=self.interval,
-            lookback=f"{self.days}d",
-            additional_lookback=indicator_lookback
-        )
-        
-        if df is None or df.empty:
-            logging.error(f"Failed to retrieve historical data for {self.symbol}")
-            return pd.DataFrame()
-        
-        logging.info(f"Retrieved {len(df)} historical candles with {len(df.columns)} columns")
-        return df
+        return fetch_validation_history(self.symbol, self.interval, self.days)
     
     def determine_actual_outcome(self, df: pd.DataFrame, current_idx: int) -> Dict[str, Any]:
         """
@@ -215,10 +247,15 @@ class HistoricalPredictionValidator:
         
         return False
     
-    def run_validation(self) -> List[Dict[str, Any]]:
+    def run_validation(self, one_pass: bool = True) -> List[Dict[str, Any]]:
         """
         Run the validation process on historical data.
         
+        Args:
+            one_pass: Score all candles with one batched inference call and derive
+                outcomes with vectorized forward shifts (False replays the history
+                one candle at a time; both give the same records)
+        
         Returns:
             List of prediction results with validation information
         """
@@ -227,6 +264,19 @@ class HistoricalPredictionValidator:
         if historical_data.empty:
             return []
         
+        return self.validate_history(historical_data, one_pass)
+    
+    def validate_history(self, historical_data: pd.DataFrame, one_pass: bool = True) -> List[Dict[str, Any]]:
+        """
+        Run the validation on already fetched historical data.
+        
+        Args:
+            historical_data: Output of fetch_historical_data (including the indicator lookback)
+            one_pass: See run_validation
+        
+        Returns:
+            List of prediction results with validation information
+        """
         # Use only the data for the days we want to analyze (remove the additional lookback)
         # We still want to keep enough history for technical indicators to be accurate
         min_lookback = 100  # Minimum number of candles needed for accurate indicators
@@ -235,6 +285,82 @@ class HistoricalPredictionValidator:
         
         logging.info(f"Running prediction validation on {len(analyze_data)} candles")
         
+        if one_pass:
+            predictions = self.validate_one_pass(analyze_data)
+        else:
+            predictions = self.validate_replay(analyze_data)
+        
+        self.predictions = predictions
+        logging.info(f"Completed validation with {len(predictions)} predictions")
+        
+        return predictions
+    
+    def validate_one_pass(self, analyze_data: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Validate every candle with one batched prediction.
+        
+        Args:
+            analyze_data: DataFrame of candles with indicators to validate
+        
+        Returns:
+            List of prediction records (see validate_replay)
+        """
+        # The last candle has no next candle to validate against
+        count = len(analyze_data) - 1
+        if count <= 0:
+            return []
+        if 'close' not in analyze_data.columns:
+            logging.error("Historical data has no 'close' column")
+            return []
+        
+        candles = analyze_data.iloc[:count]
+        scored = self.predictor.predict_frame(candles, self.symbol, self.model_type)
+        if scored is None:
+            labels = [None] * count
+            confidences = [None] * count
+        else:
+            labels = scored['predicted_label'].tolist()
+            confidences = scored['confidence'].tolist()
+        
+        # Outcomes from the next candle (same thresholds as determine_actual_outcome)
+        close = analyze_data['close'].to_numpy(dtype=np.float64)
+        current_price, next_price = close[:-1], close[1:]
+        price_change_pct = ((next_price - current_price) / current_price) * 100.0
+        actual = np.where(price_change_pct > 0.1, 'BUY', np.where(price_change_pct < -0.1, 'SELL', 'HOLD'))
+        was_correct = np.asarray(labels, dtype=object) == actual.astype(object)
+        
+        columns = {
+            'timestamp': candles.index.tolist(),
+            'symbol': [self.symbol] * count,
+            'interval': [self.interval] * count,
+            'current_price': current_price.tolist(),
+            'prediction': labels,
+            'confidence': confidences,
+            'actual_direction': actual.tolist(),
+            'price_change_pct': price_change_pct.tolist(),
+            'future_price': next_price.tolist(),
+            'was_correct': was_correct.tolist()
+        }
+        
+        # Add key indicators to the records for reference
+        for indicator in ['rsi_14', 'macd', 'bb_upper', 'bb_lower', 'ema_20']:
+            if indicator in candles.columns:
+                columns[indicator] = candles[indicator].tolist()
+        
+        logging.info(f"Processed {count}/{count} candles (100.0%)")
+        
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    def validate_replay(self, analyze_data: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Validate the candles one at a time with a sliding window.
+        
+        Args:
+            analyze_data: DataFrame of candles with indicators to validate
+        
+        Returns:
+            List of prediction records
+        """
         predictions = []
         
         # Iterate through each candle and make predictions
@@ -286,9 +412,6 @@ class HistoricalPredictionValidator:
             except Exception as e:
                 logging.error(f"Error processing candle at {current_time}: {str(e)}")
         
-        self.predictions = predictions
-        logging.info(f"Completed validation with {len(predictions)} predictions")
-        
         return predictions
     
     def create_report(self) -> pd.DataFrame:
@@ -332,6 +455,8 @@ class HistoricalPredictionValidator:
                     logging.info(f"{pred_type} predictions: {len(type_df)} with {type_accuracy:.2f}% accuracy")
         
         self.report_df = df
+        self.rollup = ValidationRollup.from_frame(df, symbol=self.symbol, interval=self.interval,
+                                                  model_type=self.model_type)
         return df
     
     def save_report(self, output_path: Optional[str] = None, format_type: str = 'both') -> Dict[str, str]:
@@ -386,6 +511,11 @@ class HistoricalPredictionValidator:
             # Create standard CSV filename that will be overwritten with each run
             standard_csv_path = os.path.join(output_dir, f"{standard_base_filename}.csv")
             self.report_df.to_csv(standard_csv_path, index=False)
+            
+            # Save the rollups the report analyzers read instead of the CSV
+            rollup = self._get_rollup()
+            for path in dict.fromkeys([csv_path, standard_csv_path]):
+                save_rollup(rollup, path)
         
         if format_type in ['json', 'both']:
             # Create JSON report with summary data
@@ -420,6 +550,13 @@ class HistoricalPredictionValidator:
         logging.info(f"Reports generated in format: {format_type}")
         return paths
     
+    def _get_rollup(self) -> ValidationRollup:
+        """Get the rollup of the report, building it if the report was set directly"""
+        if self.rollup is None or self.rollup.total != len(self.report_df):
+            self.rollup = ValidationRollup.from_frame(self.report_df, symbol=self.symbol,
+                                                      interval=self.interval, model_type=self.model_type)
+        return self.rollup
+    
     def generate_summary_data(self) -> Dict[str, Any]:
         """
         Generate a structured summary of the validation results for reporting.
@@ -431,129 +568,7 @@ class HistoricalPredictionValidator:
             logging.error("No validation data available for summary generation")
             return {}
         
-        # Basic stats
-        total = len(self.report_df)
-        correct = self.report_df['was_correct'].sum()
-        accuracy = (correct / total) * 100 if total > 0 else 0
-        avg_confidence = float(self.report_df['confidence'].mean())
-        
-        # Breakdown by prediction type
-        class_metrics = {}
-        for pred_type in ['BUY', 'HOLD', 'SELL']:
-            type_df = self.report_df[self.report_df['prediction'] == pred_type]
-            count = len(type_df)
-            
-            # Calculate accuracy for this class
-            if count > 0:
-                type_correct = type_df['was_correct'].sum()
-                type_accuracy = (type_correct / count) * 100
-            else:
-                type_correct = 0
-                type_accuracy = 0
-                
-            # Store class metrics
-            class_metrics[pred_type] = {
-                "count": int(count),
-                "correct": int(type_correct),
-                "accuracy": float(type_accuracy)
-            }
-        
-        # Calculate precision, recall, and F1 scores for BUY and SELL predictions
-        # First, prepare classification metrics data
-        buy_predictions = self.report_df[self.report_df['prediction'] == 'BUY']
-        sell_predictions = self.report_df[self.report_df['prediction'] == 'SELL']
-        
-        # Precision: True Positives / (True Positives + False Positives)
-        buy_precision = (buy_predictions['was_correct'].sum() / len(buy_predictions)) if len(buy_predictions) > 0 else 0
-        sell_precision = (sell_predictions['was_correct'].sum() / len(sell_predictions)) if len(sell_predictions) > 0 else 0
-        
-        # Recall calculations require identifying actual positives (when actual_direction matches prediction type)
-        actual_buys = self.report_df[self.report_df['actual_direction'] == 'BUY']
-        actual_sells = self.report_df[self.report_df['actual_direction'] == 'SELL']
-        
-        # True Positives
-        buy_true_positives = self.report_df[(self.report_df['prediction'] == 'BUY') & 
-                                          (self.report_df['was_correct'] == True)].shape[0]
-        sell_true_positives = self.report_df[(self.report_df['prediction'] == 'SELL') & 
-                                           (self.report_df['was_correct'] == True)].shape[0]
-        
-        # Recall: True Positives / (True Positives + False Negatives)
-        buy_recall = buy_true_positives / len(actual_buys) if len(actual_buys) > 0 else 0
-        sell_recall = sell_true_positives / len(actual_sells) if len(actual_sells) > 0 else 0
-        
-        # F1 Score: 2 * (precision * recall) / (precision + recall)
-        buy_f1 = 2 * (buy_precision * buy_recall) / (buy_precision + buy_recall) if (buy_precision + buy_recall) > 0 else 0
-        sell_f1 = 2 * (sell_precision * sell_recall) / (sell_precision + sell_recall) if (sell_precision + sell_recall) > 0 else 0
-        
-        # Profitability analysis (simulated)
-        # For profitable trades, we consider correct BUY and SELL predictions
-        buy_df = self.report_df[(self.report_df['prediction'] == 'BUY') & (self.report_df['was_correct'])]
-        sell_df = self.report_df[(self.report_df['prediction'] == 'SELL') & (self.report_df['was_correct'])]
-        
-        # Average profit percentages
-        avg_buy_profit = float(buy_df['price_change_pct'].mean()) if not buy_df.empty else 0
-        avg_sell_profit = float(-sell_df['price_change_pct'].mean()) if not sell_df.empty else 0
-        
-        # Calculate win ratios
-        buy_win_ratio = (len(buy_df) / len(buy_predictions)) * 100 if len(buy_predictions) > 0 else 0
-        sell_win_ratio = (len(sell_df) / len(sell_predictions)) * 100 if len(sell_predictions) > 0 else 0
-        
-        # Calculate cumulative return (simplified model)
-        profitable_trades = len(buy_df) + len(sell_df)
-        avg_profit_per_trade = ((avg_buy_profit * len(buy_df)) + (avg_sell_profit * len(sell_df))) / profitable_trades if profitable_trades > 0 else 0
-        
-        # Rough estimate of cumulative return if we traded with equal capital on each signal
-        # This is a simplified model and doesn't account for compounding, transaction fees, etc.
-        cumulative_return = 0
-        
-        # For BUY signals, we add the price change
-        if not buy_df.empty:
-            cumulative_return += buy_df['price_change_pct'].sum()
-        
-        # For SELL signals, we add the negative price change (price drop = profit for short)
-        if not sell_df.empty:
-            cumulative_return += -sell_df['price_change_pct'].sum()
-            
-        # Get time range
-        start_time = self.report_df['timestamp'].min() if not self.report_df.empty else None
-        end_time = self.report_df['timestamp'].max() if not self.report_df.empty else None
-            
-        # Compile all metrics into a single dictionary
-        summary = {
-            "total_predictions": int(total),
-            "correct_predictions": int(correct),
-            "overall_accuracy": float(accuracy),
-            "average_confidence": float(avg_confidence),
-            "time_range": {
-                "start": str(start_time),
-                "end": str(end_time)
-            },
-            "class_breakdown": class_metrics,
-            "classification_metrics": {
-                "BUY": {
-                    "precision": float(buy_precision),
-                    "recall": float(buy_recall),
-                    "f1_score": float(buy_f1),
-                    "win_ratio": float(buy_win_ratio)
-                },
-                "SELL": {
-                    "precision": float(sell_precision),
-                    "recall": float(sell_recall),
-                    "f1_score": float(sell_f1),
-                    "win_ratio": float(sell_win_ratio)
-                }
-            },
-            "profitability": {
-                "profitable_trades": int(profitable_trades),
-                "profitable_trades_percentage": float((profitable_trades / total) * 100) if total > 0 else 0,
-                "avg_buy_profit_pct": float(avg_buy_profit),
-                "avg_sell_profit_pct": float(avg_sell_profit),
-                "avg_profit_per_trade": float(avg_profit_per_trade),
-                "cumulative_return_pct": float(cumulative_return)
-            }
-        }
-        
-        return summary
+        return self._get_rollup().summary()
     
     def print_summary(self) -> None:
         """
@@ -639,9 +654,35 @@ def main():
                         help='Custom output filename')
     parser.add_argument('--format', type=str, choices=['json', 'csv', 'both'], default='both',
                         help='Output format for the report (json, csv, or both)')
+    parser.add_argument('--replay', action='store_true',
+                        help='Predict one candle at a time instead of in one batched pass')
+    parser.add_argument('--symbols', nargs='+', default=None,
+                        help='Validate several symbols concurrently (with --intervals: every combination)')
+    parser.add_argument('--intervals', nargs='+', default=None,
+                        help='Validate several intervals concurrently (with --symbols: every combination)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Scoring processes of a multi-symbol/interval run (default: one per CPU core)')
+    parser.add_argument('--fetch-workers', type=int, default=None,
+                        help='Concurrent downloads of a multi-symbol/interval run')
     
     args = parser.parse_args()
     
+    if args.symbols or args.intervals:
+        from validation_runner import run_validation_matrix, format_summary_table
+        
+        summary = run_validation_matrix(
+            symbols=args.symbols or [args.symbol],
+            intervals=args.intervals or [args.interval],
+            model_type=args.model,
+            days=args.days,
+            confidence_threshold=args.threshold,
+            fetch_workers=args.fetch_workers,
+            n_workers=args.workers
+        )
+        print(format_summary_table(summary))
+        print(f"Summary saved to: {summary['summary_path']}")
+        return 1 if summary['failed'] else 0
+    
     print(f"\n=== Historical Prediction Validator ===")
     print(f"Symbol: {args.symbol}")
     print(f"Interval: {args.interval}")
@@ -663,7 +704,7 @@ def main():
     )
     
     # Run validation
-    validator.run_validation()
+    validator.run_validation(one_pass=not args.replay)
     
     # Create report
     validator.create_report()
@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler
+
+This module runs the heavy training workloads (hyperparameter optimization, adaptive
+tuning and market-triggered retraining) through one shared scheduler instead of a
+thread per request. It handles:
+
+1. A priority queue of jobs, deduplicated by (symbol, timeframe, method)
+2. A global cap on the CPU cores used by running jobs (each job reserves CPU slots)
+3. Running every job in its own worker process, limited to its reserved cores
+4. Progress reporting from the worker process back to the scheduler
+5. Cancelling queued jobs and running jobs (cooperatively first, then by terminating
+   the worker process)
+
+Job targets are module-level functions (so they can be started in a new process)
+that take a JobContext as their first argument.
+"""
+
+import os
+import sys
+import time
+import heapq
+import queue
+import logging
+import threading
+import itertools
+import multiprocessing
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger('job_scheduler')
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+# Job priorities (lower runs first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+
+class JobContext:
+    """
+    Handle passed to a job target inside its worker process
+    """
+
+    def __init__(self, job_id: str, cpu_slots: int, message_queue: Any, cancel_event: Any):
+        """
+        Initialize the context
+
+        Args:
+            job_id: ID of the job
+            cpu_slots: Number of CPU cores reserved for the job
+            message_queue: Queue for messages to the scheduler
+            cancel_event: Event set when the job is cancelled
+        """
+        self.job_id = job_id
+        self.cpu_slots = cpu_slots
+        self.cancel_event = cancel_event
+        self._message_queue = message_queue
+
+    def report_progress(self, **progress: Any) -> None:
+        """Send progress fields (e.g. stage, trials_completed) to the scheduler"""
+        self._message_queue.put(('progress', self.job_id, progress))
+
+    def is_cancelled(self) -> bool:
+        """Check if the job has been cancelled"""
+        return self.cancel_event.is_set()
+
+
+def _job_process_main(target: Callable, args: Tuple, kwargs: Dict[str, Any], job_id: str,
+                      cpu_slots: int, message_queue: Any, cancel_event: Any) -> None:
+    """
+    Entry point of a job's worker process
+
+    The thread budget is applied before the target imports xgboost, so the job stays
+    within its reserved CPU slots.
+    """
+    os.environ['OMP_NUM_THREADS'] = str(cpu_slots)
+    os.environ['JOB_CPU_SLOTS'] = str(cpu_slots)
+
+    context = JobContext(job_id, cpu_slots, message_queue, cancel_event)
+    try:
+        result = target(context, *args, **kwargs)
+        message_queue.put(('result', job_id, {'success': True, 'result': result}))
+    except Exception as e:
+        cancelled = type(e).__name__ == 'OptimizationCancelled' or cancel_event.is_set()
+        message_queue.put(('result', job_id, {'success': False, 'error': str(e), 'cancelled': cancelled}))
+
+
+class Job:
+    """
+    A unit of work submitted to the scheduler
+    """
+
+    def __init__(self, job_id: str, kind: str, symbol: str, timeframe: str, method: str,
+                 target: Callable, args: Tuple, kwargs: Dict[str, Any], priority: int, cpu_slots: int,
+                 on_complete: Optional[Callable[['Job'], None]] = None):
+        self.job_id = job_id
+        self.kind = kind
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.method = method
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.cpu_slots = cpu_slots
+        self.on_complete = on_complete
+
+        self.status = JOB_QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.duplicate_submissions = 0
+
+        # Worker process state
+        self.process = None
+        self.cancel_event = None
+        self.cancel_requested_at: Optional[float] = None
+
+    @property
+    def dedup_key(self) -> Tuple[str, str, str]:
+        """Key under which identical jobs are merged"""
+        return (self.symbol, self.timeframe, self.method)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a JSON-serializable view of the job"""
+        return {
+            'jobId': self.job_id,
+            'kind': self.kind,
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'method': self.method,
+            'priority': self.priority,
+            'cpuSlots': self.cpu_slots,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'result': self.result,
+            'error': self.error,
+            'submittedAt': self.submitted_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'duplicateSubmissions': self.duplicate_submissions
+        }
+
+
+class JobScheduler:
+    """
+    Schedules training, tuning and retraining jobs on a shared CPU budget
+    """
+
+    def __init__(self, max_cpu_slots: Optional[int] = None, cancel_grace_seconds: float = 30.0,
+                 max_finished_jobs: int = 200):
+        """
+        Initialize the scheduler
+
+        Args:
+            max_cpu_slots: CPU cores shared by all running jobs (default: number of CPU cores)
+            cancel_grace_seconds: Seconds a cancelled job may take to stop before its process is terminated
+            max_finished_jobs: Number of finished jobs kept for status queries
+        """
+        self.max_cpu_slots = max(1, max_cpu_slots or os.cpu_count() or 1)
+        self.cancel_grace_seconds = cancel_grace_seconds
+        self.max_finished_jobs = max_finished_jobs
+
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._message_queue = None
+
+        self._jobs: Dict[str, Job] = {}
+        self._queue: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._completed: List[Job] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    # Submission and cancellation
+
+    def submit(self, kind: str, symbol: str, timeframe: str, method: str, target: Callable,
+               args: Tuple = (), kwargs: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_NORMAL,
+               cpu_slots: int = 1, on_complete: Optional[Callable[[Job], None]] = None) -> Tuple[Job, bool]:
+        """
+        Submit a job, or return the queued/running job with the same (symbol, timeframe, method)
+
+        A duplicate submission with a higher priority raises the priority of the queued job.
+
+        Args:
+            kind: Kind of workload ('optimization', 'adaptive_tuning', 'retraining')
+            symbol: Trading pair symbol
+            timeframe: Timeframe
+            method: Method of the workload (e.g. 'bayesian', 'adaptive')
+            target: Module-level function called as target(context, *args, **kwargs) in the worker
+            args: Positional arguments for the target
+            kwargs: Keyword arguments for the target
+            priority: Job priority (lower runs first)
+            cpu_slots: CPU cores the job reserves while running
+            on_complete: Called with the job in the scheduler process when it finishes
+
+        Returns:
+            Tuple of (job, whether a new job was created)
+        """
+        self.start()
+        cpu_slots = max(1, min(cpu_slots, self.max_cpu_slots))
+
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in ACTIVE_STATES and job.dedup_key == (symbol, timeframe, method):
+                    job.duplicate_submissions += 1
+                    if job.status == JOB_QUEUED and priority < job.priority:
+                        job.priority = priority
+                        heapq.heappush(self._queue, (priority, next(self._sequence), job.job_id))
+                    logger.info(f"Job {job.job_id} for {symbol} {timeframe} ({method}) is already {job.status}")
+                    return job, False
+
+            job_id = f"{kind}_{symbol}_{timeframe}_{method}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+            job = Job(job_id, kind, symbol, timeframe, method, target, tuple(args), kwargs or {},
+                      priority, cpu_slots, on_complete)
+            self._jobs[job_id] = job
+            heapq.heappush(self._queue, (priority, next(self._sequence), job_id))
+
+        logger.info(f"Queued job {job_id} (priority {priority}, {cpu_slots} CPU slots)")
+        return job, True
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job
+
+        Running jobs get their cancel event set so they can stop cleanly; the worker
+        process is terminated if it has not stopped after the grace period.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            True if the job was queued or running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return False
+
+            if job.status == JOB_QUEUED:
+                self._finish(job, JOB_CANCELLED)
+            else:
+                job.cancel_requested_at = time.time()
+                job.cancel_event.set()
+
+        logger.info(f"Cancellation requested for job {job_id}")
+        return True
+
+    # Queries
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find_active_job(self, symbol: str, timeframe: str, method: str) -> Optional[Job]:
+        """Get the queued or running job for (symbol, timeframe, method), if any"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in ACTIVE_STATES and job.dedup_key == (symbol, timeframe, method):
+                    return job
+        return None
+
+    def list_jobs(self, kind: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List jobs, newest first
+
+        Args:
+            kind: Only jobs of this kind
+            status: Only jobs in this state
+
+        Returns:
+            List of job dictionaries
+        """
+        with self._lock:
+            jobs = [job.to_dict() for job in self._jobs.values()
+                    if (kind is None or job.kind == kind) and (status is None or job.status == status)]
+        jobs.sort(key=lambda job: job['submittedAt'], reverse=True)
+        return jobs
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get the scheduler status
+
+        Returns:
+            Dictionary with CPU slot usage and job counts per state
+        """
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'running': self.is_running(),
+                'maxCpuSlots': self.max_cpu_slots,
+                'usedCpuSlots': self._used_slots(),
+                'jobCounts': counts
+            }
+
+    # Scheduling loop
+
+    def start(self) -> None:
+        """Start the scheduling thread"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._message_queue = self._context.Queue()
+            self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+            self._thread.start()
+        logger.info(f"Job scheduler started with {self.max_cpu_slots} CPU slots")
+
+    def stop(self, cancel_running: bool = True, timeout: float = 30.0) -> None:
+        """
+        Stop the scheduler
+
+        Args:
+            cancel_running: Whether to cancel the running jobs (otherwise they are left to finish)
+            timeout: Seconds to wait for the scheduling thread
+        """
+        with self._lock:
+            if not self._running:
+                return
+            if cancel_running:
+                for job in self._jobs.values():
+                    if job.status == JOB_RUNNING and job.cancel_event is not None:
+                        job.cancel_requested_at = time.time()
+                        job.cancel_event.set()
+            self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+        logger.info("Job scheduler stopped")
+
+    def is_running(self) -> bool:
+        """Check if the scheduling thread is running"""
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def _used_slots(self) -> int:
+        """CPU slots reserved by running jobs (caller holds the lock)"""
+        return sum(job.cpu_slots for job in self._jobs.values() if job.status == JOB_RUNNING)
+
+    def _run(self) -> None:
+        """Dispatch queued jobs and collect messages from the worker processes"""
+        while True:
+            with self._lock:
+                if not self._running and not any(job.status == JOB_RUNNING for job in self._jobs.values()):
+                    break
+                if self._running:
+                    self._dispatch()
+
+            self._collect_messages(timeout=0.5)
+            self._check_processes()
+            self._run_completion_callbacks()
+
+        self._run_completion_callbacks()
+
+    def _dispatch(self) -> None:
+        """
+        Start queued jobs in priority order while CPU slots are free (caller holds the lock)
+
+        A job that does not fit yet blocks the jobs behind it, so the slots freed by
+        finishing jobs add up for it instead of going to a stream of smaller jobs.
+        """
+        free_slots = self.max_cpu_slots - self._used_slots()
+
+        while self._queue and free_slots > 0:
+            priority, sequence, job_id = heapq.heappop(self._queue)
+            job = self._jobs.get(job_id)
+            # Skip stale entries (cancelled jobs, or entries superseded by a priority raise)
+            if job is None or job.status != JOB_QUEUED or priority != job.priority:
+                continue
+            if job.cpu_slots > free_slots:
+                # Keep it at the head until enough slots are free
+                heapq.heappush(self._queue, (priority, sequence, job_id))
+                break
+            self._start_job(job)
+            free_slots -= job.cpu_slots
+
+    def _start_job(self, job: Job) -> None:
+        """Start a job's worker process (caller holds the lock)"""
+        job.cancel_event = self._context.Event()
+        job.process = self._context.Process(
+            target=_job_process_main,
+            args=(job.target, job.args, job.kwargs, job.job_id, job.cpu_slots,
+                  self._message_queue, job.cancel_event),
+            name=f'job-{job.job_id}'
+        )
+        job.status = JOB_RUNNING
+        job.started_at = datetime.now().isoformat()
+        try:
+            job.process.start()
+            logger.info(f"Started job {job.job_id} (pid {job.process.pid})")
+        except Exception as e:
+            logger.error(f"Could not start job {job.job_id}: {e}")
+            job.error = str(e)
+            self._finish(job, JOB_FAILED)
+
+    def _collect_messages(self, timeout: float) -> None:
+        """Apply progress and result messages from the worker processes (timeout 0 only drains)"""
+        try:
+            message = self._message_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+
+        while message is not None:
+            kind, job_id, payload = message
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job.status == JOB_RUNNING:
+                    if kind == 'progress':
+                        job.progress.update(payload)
+                    elif kind == 'result':
+                        if payload['success']:
+                            job.result = payload['result']
+                            self._finish(job, JOB_COMPLETED)
+                        else:
+                            job.error = payload['error']
+                            self._finish(job, JOB_CANCELLED if payload.get('cancelled') else JOB_FAILED)
+            try:
+                message = self._message_queue.get_nowait()
+            except queue.Empty:
+                message = None
+
+    def _check_processes(self) -> None:
+        """Handle worker processes that exited without a result, and enforce cancel grace periods"""
+        exited = []
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if job.status != JOB_RUNNING or job.process is None:
+                    continue
+                if not job.process.is_alive():
+                    exited.append(job)
+                elif (job.cancel_requested_at is not None
+                      and time.time() - job.cancel_requested_at > self.cancel_grace_seconds):
+                    logger.warning(f"Terminating job {job.job_id} after the cancel grace period")
+                    job.process.terminate()
+
+        if not exited:
+            return
+
+        # A worker puts its result on the queue before it exits, so apply the queued
+        # messages first: a job that finished despite a cancel request keeps its result
+        self._collect_messages(timeout=0)
+
+        with self._lock:
+            for job in exited:
+                # The result message may still be in flight; give it one more poll
+                job.process.join(0)
+                if job.status == JOB_RUNNING and job.process.exitcode is not None:
+                    if job.cancel_requested_at is not None:
+                        self._finish(job, JOB_CANCELLED)
+                    elif job.process.exitcode != 0:
+                        job.error = f"Worker process exited with code {job.process.exitcode}"
+                        self._finish(job, JOB_FAILED)
+
+    def _finish(self, job: Job, status: str) -> None:
+        """Mark a job as finished and queue its completion callback (caller holds the lock)"""
+        job.status = status
+        job.finished_at = datetime.now().isoformat()
+        logger.info(f"Job {job.job_id} {status}" + (f": {job.error}" if job.error else ""))
+
+        if job.on_complete is not None:
+            self._completed.append(job)
+
+        # Forget the oldest finished jobs
+        finished = [j for j in self._jobs.values() if j.status not in ACTIVE_STATES]
+        for old_job in sorted(finished, key=lambda j: j.finished_at)[:-self.max_finished_jobs]:
+            del self._jobs[old_job.job_id]
+
+    def _run_completion_callbacks(self) -> None:
+        """Run the callbacks of finished jobs outside the lock (they may do network I/O)"""
+        with self._lock:
+            completed, self._completed = self._completed, []
+        for job in completed:
+            try:
+                job.on_complete(job)
+            except Exception as e:
+                logger.error(f"Error in completion callback of job {job.job_id}: {e}")
+
+
+# Job targets (run inside the worker processes)
+
+def optimization_job(context: JobContext, symbol: str, timeframe: str, optimization_type: str,
+                     resume: bool = False) -> None:
+    """
+    Run an XGBoost hyperparameter optimization as a job
+
+    Args:
+        context: Job context
+        symbol: Trading pair symbol
+        timeframe: Timeframe
+        optimization_type: Optimization method or 'all'
+        resume: Whether to continue from the run's checkpoints
+    """
+    from xgboost_optimization import run_xgboost_optimization
+
+    context.report_progress(stage='optimization', trials_completed=0)
+    run_xgboost_optimization(
+        symbol=symbol,
+        timeframe=timeframe,
+        optimization_type=optimization_type,
+        n_workers=context.cpu_slots,
+        resume=resume,
+        cancel_event=context.cancel_event,
+        progress_callback=lambda progress: context.report_progress(**progress)
+    )
+
+
+def adaptive_tuning_job(context: JobContext, symbol: str, timeframe: str) -> Dict[str, Any]:
+    """
+    Run adaptive tuning as a job
+
+    Args:
+        context: Job context
+        symbol: Trading pair symbol
+        timeframe: Timeframe
+
+    Returns:
+        Result of perform_adaptive_tuning
+    """
+    from adaptive_tuning import perform_adaptive_tuning
+
+    context.report_progress(stage='adaptive_tuning')
+    result = perform_adaptive_tuning(symbol, timeframe)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Unknown error'))
+    return result
+
+
+# Create singleton instance
+_job_scheduler = None
+_job_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler() -> JobScheduler:
+    """
+    Get the shared job scheduler
+
+    The CPU budget comes from JOB_SCHEDULER_CPU_SLOTS (default: number of CPU cores).
+
+    Returns:
+        The JobScheduler instance
+    """
+    global _job_scheduler
+
+    with _job_scheduler_lock:
+        if _job_scheduler is None:
+            try:
+                from config import active_config
+                max_cpu_slots = int(getattr(active_config, 'JOB_SCHEDULER_CPU_SLOTS', 0))
+            except (ImportError, ValueError):
+                max_cpu_slots = 0
+            _job_scheduler = JobScheduler(max_cpu_slots=max_cpu_slots or None)
+        return _job_scheduler
@@ -13,7 +13,8 @@ Functions:
 - fetch_latest_candle: Gets the most recent complete 5-minute candle
 - prepare_features: Calculates technical indicators needed for prediction
 - make_live_prediction: Makes a prediction using the balanced model
-- start_live_prediction_service: Runs continuous predictions (for background tasks)
+- make_live_predictions: Runs several models on one candle fetch and feature pass
+- start_live_prediction_service: Runs predictions at every candle close (for background tasks)
 """
 
 import os
@@ -21,7 +22,7 @@ import sys
 import logging
 import json
 import time
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
@@ -303,43 +304,63 @@ def prepare_features(candle_data: pd.DataFrame) -> Dict[str, Any]:
     
     return features
 
-def make_live_prediction(symbol: str, model_type: str = 'balanced') -> Dict[str, Any]:
+def _live_error(symbol: str, error: str) -> Dict[str, Any]:
+    """Build the error result returned by the live prediction functions"""
+    return {
+        'success': False,
+        'error': error,
+        'symbol': symbol,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def make_live_predictions(symbol: str, model_types: Optional[List[str]] = None,
+                          interval: str = '5m', closed_only: bool = False) -> Dict[str, Dict[str, Any]]:
     """
-    Make a real-time prediction using the latest candle data.
+    Make real-time predictions with several models from one candle fetch and one feature pass.
     
     Args:
         symbol: Trading pair symbol (e.g., BTCUSDT)
-        model_type: Type of model to use ('balanced' or 'standard')
+        model_types: Model types to use (default: ['standard', 'balanced'])
+        interval: Candle timeframe (default: 5m)
+        closed_only: Drop the candle that is still forming, so the features describe
+            the candle that just closed (used when predicting right at candle close)
         
     Returns:
-        Dictionary with prediction results
+        Dictionary mapping each model type to its prediction result
     """
-    logging.info(f"Making live prediction for {symbol} using {model_type} model")
+    if model_types is None:
+        model_types = ['standard', 'balanced']
+    
+    logging.info(f"Making live predictions for {symbol} using models: {', '.join(model_types)}")
     
     # Format symbol (ensure uppercase without hyphens)
     symbol = symbol.replace('-', '').upper()
-    
-    # Make sure the model is loaded
     symbol_lower = symbol.lower()
-    if not predictor.load_model(symbol_lower, model_type):
-        logging.error(f"Failed to load {model_type} model for {symbol_lower}")
-        return {
-            'success': False,
-            'error': f"Model not available for {symbol}",
-            'symbol': symbol,
-            'timestamp': datetime.now().isoformat()
-        }
     
-    # Fetch historical candles for technical indicators
-    df = fetch_historical_candles(symbol, interval='5m', limit=100)
+    # Make sure the models are loaded, keeping only the ones that are available
+    results = {}
+    available_types = []
+    for model_type in model_types:
+        if predictor.get_model_key(symbol_lower, model_type) in predictor.models or \
+                predictor.load_model(symbol_lower, model_type):
+            available_types.append(model_type)
+        else:
+            logging.error(f"Failed to load {model_type} model for {symbol_lower}")
+            results[model_type] = _live_error(symbol, f"Model not available for {symbol}")
+    
+    if not available_types:
+        return results
+    
+    # Fetch historical candles for technical indicators (once for all models)
+    df = fetch_historical_candles(symbol, interval=interval, limit=100)
+    if df is not None and closed_only:
+        now_ms = time.time() * 1000
+        df = df[df['close_time'].astype('int64') <= now_ms]
     if df is None or len(df) < 20:  # Need at least 20 candles for indicators
         logging.error(f"Insufficient historical data for {symbol}")
-        return {
-            'success': False,
-            'error': "Insufficient historical data",
-            'symbol': symbol,
-            'timestamp': datetime.now().isoformat()
-        }
+        for model_type in available_types:
+            results[model_type] = _live_error(symbol, "Insufficient historical data")
+        return results
     
     # Calculate features
     features = prepare_features(df)
@@ -354,18 +375,34 @@ def make_live_prediction(symbol: str, model_type: str = 'balanced') -> Dict[str,
         features['price_change_pct'] = 0.0  # Use 0 as placeholder for no price change
         logging.info(f"Added missing feature 'price_change_pct' with default value 0.0")
     
-    # Make prediction using the model
+    # Include key indicators for reference
+    indicators = {
+        'rsi_14': features['rsi_14'],
+        'ema_20': features['ema_20'],
+        'macd': features['macd'],
+        'macd_signal': features['macd_signal'],
+        'macd_hist': features['macd_hist'],
+        'bb_upper': features['bb_upper'],
+        'bb_lower': features['bb_lower'],
+        'stoch_k': features['stoch_k']
+    }
+    
+    # Make predictions using all models on the same feature matrix
     try:
-        prediction_result = predictor.predict(features, symbol_lower, model_type)
+        predictions = predictor.predict_multi(features, symbol_lower, available_types)
+    except Exception as e:
+        logging.error(f"Error making prediction: {e}")
+        for model_type in available_types:
+            results[model_type] = _live_error(symbol, str(e))
+        return results
+    
+    for model_type in available_types:
+        prediction_result = predictions.get(model_type)
         
         # If prediction result is None or prediction failed
         if not prediction_result or prediction_result.get('predicted_class') is None:
-            return {
-                'success': False,
-                'error': "Prediction failed",
-                'symbol': symbol,
-                'timestamp': datetime.now().isoformat()
-            }
+            results[model_type] = _live_error(symbol, "Prediction failed")
+            continue
         
         # Add extra information
         prediction_result['symbol'] = symbol
@@ -374,107 +411,108 @@ def make_live_prediction(symbol: str, model_type: str = 'balanced') -> Dict[str,
         prediction_result['success'] = prediction_result['predicted_class'] is not None
         prediction_result['current_price'] = features['close']
         prediction_result['is_live_data'] = True
+        prediction_result['indicators'] = dict(indicators)
         
-        # Include key indicators for reference
-        prediction_result['indicators'] = {
-            'rsi_14': features['rsi_14'],
-            'ema_20': features['ema_20'],
-            'macd': features['macd'],
-            'macd_signal': features['macd_signal'],
-            'macd_hist': features['macd_hist'],
-            'bb_upper': features['bb_upper'],
-            'bb_lower': features['bb_lower'],
-            'stoch_k': features['stoch_k']
-        }
-        
-        logging.info(f"Live prediction for {symbol}: {prediction_result['predicted_label']} with {prediction_result['confidence']:.4f} confidence")
+        logging.info(f"Live prediction for {symbol} ({model_type}): {prediction_result['predicted_label']} with {prediction_result['confidence']:.4f} confidence")
         
-        return prediction_result
+        results[model_type] = prediction_result
+    
+    return results
+
+def make_live_prediction(symbol: str, model_type: str = 'balanced') -> Dict[str, Any]:
+    """
+    Make a real-time prediction using the latest candle data.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., BTCUSDT)
+        model_type: Type of model to use ('balanced' or 'standard')
         
-    except Exception as e:
-        logging.error(f"Error making prediction: {e}")
-        return {
-            'success': False,
-            'error': str(e),
-            'symbol': symbol,
-            'timestamp': datetime.now().isoformat()
-        }
+    Returns:
+        Dictionary with prediction results
+    """
+    return make_live_predictions(symbol, [model_type])[model_type]
 
-def compare_live_predictions(symbol: str) -> Dict[str, Any]:
+def compare_live_predictions(symbol: str, model_types: Optional[List[str]] = None) -> Dict[str, Any]:
     """
-    Make predictions using both standard and balanced models for comparison.
+    Make predictions using several models (standard and balanced by default) for comparison.
+    
+    Candles are fetched and features are computed once for all models.
     
     Args:
         symbol: Trading pair symbol (e.g., BTCUSDT)
+        model_types: Model types to compare (default: ['standard', 'balanced'])
         
     Returns:
-        Dictionary with prediction results from both models
+        Dictionary with prediction results from all models
     """
-    logging.info(f"Comparing live predictions for {symbol} using both models")
+    logging.info(f"Comparing live predictions for {symbol}")
     
-    # Get predictions from both models
-    standard_result = make_live_prediction(symbol, 'standard')
-    balanced_result = make_live_prediction(symbol, 'balanced')
+    predictions = make_live_predictions(symbol, model_types)
     
     # Combine results
     return {
-        'success': standard_result['success'] and balanced_result['success'],
+        'success': all(result.get('success', False) for result in predictions.values()),
         'symbol': symbol,
         'compare': True,
         'timestamp': datetime.now().isoformat(),
-        'predictions': {
-            'standard': standard_result,
-            'balanced': balanced_result
-        }
+        'predictions': predictions
     }
 
-def start_live_prediction_service(symbol: str, interval_seconds: int = 300) -> None:
+def start_live_prediction_service(symbol: Union[str, List[str]], interval_seconds: int = 300) -> None:
     """
-    Start continuous live prediction service for a symbol.
+    Start continuous live prediction service for one or more symbols.
+    
+    Predictions run right after each candle close (see candle_scheduler), with
+    both models computed on one candle fetch per symbol.
     
     Args:
-        symbol: Trading pair symbol (e.g., BTCUSDT)
-        interval_seconds: Seconds between predictions (default: 5 minutes)
+        symbol: Trading pair symbol (e.g., BTCUSDT) or list of symbols
+        interval_seconds: Candle interval in seconds (default: 5 minutes)
     """
-    logging.info(f"Starting live prediction service for {symbol} at {interval_seconds}s intervals")
+    from candle_scheduler import get_candle_scheduler, seconds_to_interval
+    
+    symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+    interval = seconds_to_interval(interval_seconds)
+    logging.info(f"Starting live prediction service for {', '.join(symbols)} on {interval} candle closes")
+    
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'live_predictions')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    def save_batch(batch: Dict[str, Any]) -> None:
+        """Log each symbol's predictions and save them to a JSON file"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for batch_symbol, predictions in batch['predictions'].items():
+            result = {
+                'success': all(r.get('success', False) for r in predictions.values()),
+                'symbol': batch_symbol,
+                'compare': True,
+                'candle_close': batch['candle_close'],
+                'timestamp': batch['timestamp'],
+                'predictions': predictions
+            }
+            
+            if result['success']:
+                summary = ', '.join(f"{model_type}: {r['predicted_label']} ({r['confidence']:.2f})"
+                                    for model_type, r in predictions.items())
+                logging.info(f"[{batch_symbol}] {summary}")
+            else:
+                errors = {model_type: r.get('error', 'Unknown error') for model_type, r in predictions.items()
+                          if not r.get('success', False)}
+                logging.warning(f"[{batch_symbol}] Prediction failed: {errors}")
+            
+            output_file = os.path.join(output_dir, f"{batch_symbol.lower()}_{timestamp}.json")
+            with open(output_file, 'w') as f:
+                json.dump(result, f, indent=2)
     
     try:
-        # Initialize predictor and load models
-        symbol_lower = symbol.lower()
-        predictor.load_all_models(symbol_lower)
-        
-        while True:
-            try:
-                # Make prediction with both models
-                result = compare_live_predictions(symbol)
-                
-                # Log the result
-                if result['success']:
-                    standard_signal = result['predictions']['standard']['predicted_label']
-                    balanced_signal = result['predictions']['balanced']['predicted_label']
-                    standard_conf = result['predictions']['standard']['confidence']
-                    balanced_conf = result['predictions']['balanced']['confidence']
-                    
-                    logging.info(f"[{symbol}] Standard: {standard_signal} ({standard_conf:.2f}), Balanced: {balanced_signal} ({balanced_conf:.2f})")
-                else:
-                    logging.warning(f"[{symbol}] Prediction failed: {result.get('error', 'Unknown error')}")
-                
-                # Save results to a JSON file with timestamp
-                output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'live_predictions')
-                os.makedirs(output_dir, exist_ok=True)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = os.path.join(output_dir, f"{symbol.lower()}_{timestamp}.json")
-                
-                with open(output_file, 'w') as f:
-                    json.dump(result, f, indent=2)
-                
-            except Exception as e:
-                logging.error(f"Error in prediction loop: {e}")
-            
-            # Wait for the next interval
-            logging.info(f"Waiting {interval_seconds} seconds until next prediction")
-            time.sleep(interval_seconds)
+        # Load the models up front so the first batch is not slowed down by loading
+        for service_symbol in symbols:
+            predictor.load_all_models(service_symbol.lower())
+        
+        scheduler = get_candle_scheduler(interval)
+        scheduler.add_symbols(symbols, ['standard', 'balanced'])
+        scheduler.subscribe(save_batch)
+        scheduler.run_forever()
             
     except KeyboardInterrupt:
         logging.info("Live prediction service stopped by user")
@@ -486,17 +524,18 @@ if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Live Prediction Service for BTCUSDT')
-    parser.add_argument('--symbol', type=str, default='BTCUSDT', help='Symbol to predict (default: BTCUSDT)')
+    parser.add_argument('--symbol', type=str, default='BTCUSDT',
+                        help='Symbol to predict, or comma-separated symbols in continuous mode (default: BTCUSDT)')
     parser.add_argument('--model', type=str, default='balanced', choices=['standard', 'balanced', 'compare'], 
                         help='Model type to use (default: balanced)')
-    parser.add_argument('--interval', type=int, default=300, help='Seconds between predictions (default: 300)')
+    parser.add_argument('--interval', type=int, default=300, help='Candle interval in seconds (default: 300)')
     parser.add_argument('--continuous', action='store_true', help='Run in continuous mode')
     
     args = parser.parse_args()
     
     if args.continuous:
         logging.info(f"Starting continuous prediction service for {args.symbol}")
-        start_live_prediction_service(args.symbol, args.interval)
+        start_live_prediction_service(args.symbol.split(','), args.interval)
     else:
         if args.model == 'compare':
             result = compare_live_predictions(args.symbol)
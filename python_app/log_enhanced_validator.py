@@ -10,6 +10,7 @@ import os
 import sys
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -252,15 +253,20 @@ class LogEnhancedValidator:
     
     def generate_validation_summary(self, symbols: List[str], intervals: List[str], 
                                    start_date: Optional[str] = None, 
-                                   end_date: Optional[str] = None):
+                                   end_date: Optional[str] = None,
+                                   max_workers: Optional[int] = None):
         """
         Generate a summary of validation results across multiple symbols and intervals
         
+        The symbol/interval combinations are validated concurrently.
+        
         Args:
             symbols: List of trading symbols
             intervals: List of timeframe intervals
             start_date: Optional start date for validation
             end_date: Optional end date for validation
+            max_workers: Number of combinations validated at once
+                (default: VALIDATION_FETCH_WORKERS)
         """
         log_with_data(logger, logging.INFO, "Generating validation summary", {
             'symbols': symbols,
@@ -270,26 +276,33 @@ class LogEnhancedValidator:
             'model': self.model_name
         })
         
-        results = {}
+        combinations = [(symbol, interval) for symbol in symbols for interval in intervals]
+        if max_workers is None:
+            from validation_runner import get_validation_worker_counts
+            max_workers = get_validation_worker_counts()['fetch']
+        max_workers = max(1, min(max_workers, len(combinations) or 1))
+        
+        def validate(symbol: str, interval: str) -> Dict[str, Any]:
+            # Log start of validation for this symbol and interval
+            log_with_data(logger, logging.INFO, f"Validating {symbol} on {interval} timeframe", {
+                'symbol': symbol,
+                'interval': interval
+            })
+            
+            # Run validation for this symbol and interval
+            return self.validate_historical_predictions(
+                symbol=symbol,
+                interval=interval,
+                start_date=start_date,
+                end_date=end_date
+            )
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='validation') as executor:
+            futures = {combination: executor.submit(validate, *combination) for combination in combinations}
         
-        for symbol in symbols:
-            results[symbol] = {}
-            for interval in intervals:
-                # Log start of validation for this symbol and interval
-                log_with_data(logger, logging.INFO, f"Validating {symbol} on {interval} timeframe", {
-                    'symbol': symbol,
-                    'interval': interval
-                })
-                
-                # Run validation for this symbol and interval
-                validation_result = self.validate_historical_predictions(
-                    symbol=symbol,
-                    interval=interval,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-                
-                results[symbol][interval] = validation_result
+        results = {symbol: {} for symbol in symbols}
+        for (symbol, interval), future in futures.items():
+            results[symbol][interval] = future.result()
         
         # Log summary results
         all_accuracies = []
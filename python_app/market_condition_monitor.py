@@ -11,7 +11,9 @@ changes in market dynamics are detected. It analyzes various market indicators i
 - Regime shifts
 
 It integrates with the XGBoost optimization system to automatically adapt models to 
-changing market conditions.
+changing market conditions. Retraining runs as low-priority jobs of the shared job
+scheduler (see job_scheduler.py), so it never competes with user-started runs for
+more than the scheduler's CPU budget.
 """
 
 import os
@@ -25,7 +27,6 @@ from datetime import datetime, timedelta
 import requests
 import time
 from threading import Thread, Lock
-from queue import Queue
 
 # Configure logging
 log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
@@ -48,8 +49,8 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 # Import necessary local modules
-from adaptive_tuning import perform_adaptive_tuning
-from xgboost_optimization import run_xgboost_optimization
+from job_scheduler import (get_job_scheduler, optimization_job, adaptive_tuning_job,
+                           Job, PRIORITY_LOW, JOB_QUEUED, JOB_COMPLETED)
 
 
 class MarketConditionMonitor:
@@ -99,11 +100,9 @@ class MarketConditionMonitor:
         # Minimum time between retrainings (24 hours by default)
         self.min_retrain_interval = 24 * 3600  # seconds
         
-        # Retraining queue and workers
-        self.retrain_queue = Queue()
+        # Retraining jobs submitted to the job scheduler
         self.retrain_lock = Lock()
-        self.workers = []
-        self.num_workers = 2  # Number of parallel retraining jobs
+        self.retraining_jobs = []
         self.running = False
         
         # Load configuration if provided
@@ -128,7 +127,6 @@ class MarketConditionMonitor:
             self.correlation_threshold = config.get('correlation_threshold', self.correlation_threshold)
             self.trend_window = config.get('trend_window', self.trend_window)
             self.min_retrain_interval = config.get('min_retrain_interval', self.min_retrain_interval)
-            self.num_workers = config.get('num_workers', self.num_workers)
             
             # Set monitored assets
             if 'monitored_assets' in config:
@@ -154,7 +152,6 @@ class MarketConditionMonitor:
                 'correlation_threshold': self.correlation_threshold,
                 'trend_window': self.trend_window,
                 'min_retrain_interval': self.min_retrain_interval,
-                'num_workers': self.num_workers,
                 'monitored_assets': self.monitored_assets
             }
             
@@ -439,7 +436,10 @@ class MarketConditionMonitor:
     
     def queue_retraining_task(self, symbol: str, timeframe: str, method: str = 'adaptive') -> None:
         """
-        Queue a retraining task
+        Queue a retraining task as a low-priority job of the job scheduler
+        
+        A retraining task for an asset that is already queued or running (including a
+        user-started run with the same method) is not queued twice.
         
         Args:
             symbol: Trading pair symbol
@@ -449,66 +449,61 @@ class MarketConditionMonitor:
         normalized_symbol = symbol.replace('/', '').lower()
         asset_key = f"{normalized_symbol}_{timeframe}"
         
-        # Add to queue
-        self.retrain_queue.put({
-            'symbol': normalized_symbol,
-            'timeframe': timeframe,
-            'method': method,
-            'queued_at': datetime.now().isoformat()
-        })
+        if method == 'full':
+            # Run full optimization (all methods)
+            target, job_method, args = optimization_job, 'all', (normalized_symbol, timeframe, 'all')
+        else:
+            target, job_method, args = adaptive_tuning_job, 'adaptive', (normalized_symbol, timeframe)
+        
+        job, created = get_job_scheduler().submit(
+            'retraining', normalized_symbol, timeframe, job_method, target,
+            args=args,
+            priority=PRIORITY_LOW,
+            on_complete=lambda finished_job: self._on_retraining_complete(finished_job, method)
+        )
         
         # Update last retrain time
         with self.retrain_lock:
             self.last_retrain_time[asset_key] = time.time()
+            if created:
+                self.retraining_jobs.append(job.job_id)
             
-        logger.info(f"Queued {method} retraining task for {symbol} {timeframe}")
+        logger.info(f"Queued {method} retraining task for {symbol} {timeframe} (job {job.job_id})")
     
-    def retraining_worker(self) -> None:
+    def _on_retraining_complete(self, job: Job, method: str) -> None:
         """
-        Worker thread to process retraining tasks from the queue
+        Handle a finished retraining job
+        
+        Args:
+            job: The finished job
+            method: Retraining method ('adaptive' or 'full')
         """
-        while self.running:
-            try:
-                # Get a task from the queue with a timeout
-                try:
-                    task = self.retrain_queue.get(timeout=5)
-                except Queue.Empty:
-                    continue
-                
-                # Log task start
-                symbol = task['symbol']
-                timeframe = task['timeframe']
-                method = task['method']
-                logger.info(f"Starting {method} retraining for {symbol} {timeframe}")
-                
-                # Execute retraining based on method
-                if method == 'adaptive':
-                    result = perform_adaptive_tuning(symbol, timeframe)
-                    
-                    if result.get('success'):
-                        logger.info(f"Adaptive tuning completed for {symbol} {timeframe}")
-                        
-                        # Record market condition at retraining time
-                        self.record_retraining_event(symbol, timeframe, method, result)
-                    else:
-                        logger.error(f"Adaptive tuning failed for {symbol} {timeframe}: {result.get('error', 'Unknown error')}")
-                        
-                elif method == 'full':
-                    # Run full optimization (grid search)
-                    try:
-                        run_xgboost_optimization(symbol, timeframe, 'all')
-                        logger.info(f"Full optimization completed for {symbol} {timeframe}")
-                        
-                        # Record market condition at retraining time
-                        self.record_retraining_event(symbol, timeframe, method, {'success': True})
-                    except Exception as e:
-                        logger.error(f"Full optimization failed for {symbol} {timeframe}: {str(e)}")
-                
-                # Mark task as done
-                self.retrain_queue.task_done()
-                
-            except Exception as e:
-                logger.error(f"Error in retraining worker: {str(e)}")
+        with self.retrain_lock:
+            if job.job_id in self.retraining_jobs:
+                self.retraining_jobs.remove(job.job_id)
+        
+        if job.status != JOB_COMPLETED:
+            logger.error(f"{method.capitalize()} retraining {job.status} for {job.symbol} {job.timeframe}: "
+                         f"{job.error or 'no error message'}")
+            return
+        
+        logger.info(f"{method.capitalize()} retraining completed for {job.symbol} {job.timeframe}")
+        
+        # Record market condition at retraining time
+        self.record_retraining_event(job.symbol, job.timeframe, method, job.result or {'success': True})
+    
+    def get_queue_size(self) -> int:
+        """
+        Get the number of retraining jobs waiting in the job scheduler
+        
+        Returns:
+            Number of queued retraining jobs
+        """
+        scheduler = get_job_scheduler()
+        with self.retrain_lock:
+            job_ids = list(self.retraining_jobs)
+        return sum(1 for job_id in job_ids
+                   if (job := scheduler.get_job(job_id)) is not None and job.status == JOB_QUEUED)
     
     def record_retraining_event(self, symbol: str, timeframe: str, method: str, result: Dict[str, Any]) -> None:
         """
@@ -593,17 +588,14 @@ class MarketConditionMonitor:
         logger.info("Starting market condition monitoring")
         self.running = True
         
-        # Start worker threads
-        for i in range(self.num_workers):
-            worker = Thread(target=self.retraining_worker, daemon=True)
-            worker.start()
-            self.workers.append(worker)
+        # Retraining jobs run on the shared job scheduler
+        get_job_scheduler().start()
         
         # Start monitoring loop in a separate thread
         self.monitor_thread = Thread(target=self._monitoring_loop, daemon=True)
         self.monitor_thread.start()
         
-        logger.info(f"Market condition monitoring started with {self.num_workers} worker threads")
+        logger.info("Market condition monitoring started")
     
     def _monitoring_loop(self) -> None:
         """
@@ -642,13 +634,14 @@ class MarketConditionMonitor:
         logger.info("Stopping market condition monitoring")
         self.running = False
         
-        # Wait for worker threads to finish current tasks
-        logger.info("Waiting for worker threads to finish current tasks")
-        for worker in self.workers:
-            worker.join(timeout=10)
-            
-        # Clear workers list
-        self.workers = []
+        # Drop retraining jobs that have not started yet; running ones finish normally
+        scheduler = get_job_scheduler()
+        with self.retrain_lock:
+            job_ids = list(self.retraining_jobs)
+        for job_id in job_ids:
+            job = scheduler.get_job(job_id)
+            if job is not None and job.status == JOB_QUEUED:
+                scheduler.cancel(job_id)
         
         logger.info("Market condition monitoring stopped")
 
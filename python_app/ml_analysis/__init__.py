@@ -4,6 +4,7 @@ ML Analysis Package
 This package contains modules for analyzing and evaluating machine learning models.
 Currently includes:
 - Feature importance analysis for XGBoost models
+- Cached per-prediction feature contribution analysis
 """
 
 from .feature_importance_analyzer import (
@@ -12,7 +13,11 @@ from .feature_importance_analyzer import (
     rank_features,
     print_feature_importance,
     export_feature_importance,
-    analyze_model
+    get_importance_table,
+    importance_frame,
+    analyze_model,
+    load_contribution_samples,
+    compute_contributions
 )
 
 __all__ = [
@@ -21,5 +26,9 @@ __all__ = [
     'rank_features',
     'print_feature_importance',
     'export_feature_importance',
-    'analyze_model'
+    'get_importance_table',
+    'importance_frame',
+    'analyze_model',
+    'load_contribution_samples',
+    'compute_contributions'
 ]
\ No newline at end of file
@@ -5,8 +5,15 @@ Feature Importance Analyzer for XGBoost Models
 This module analyzes the feature importance of trained XGBoost models
 and provides utilities to extract, visualize, and save the results.
 
+Importance is read from the table precomputed when the model was saved
+(<stem>_importance.json, see model_artifacts) and only recomputed for models
+saved without one. Per-prediction contributions (SHAP values from XGBoost's
+pred_contribs) are computed on demand in parallel batches and cached on disk per
+model version and sample set.
+
 Usage:
     python feature_importance_analyzer.py --symbol=BTCUSDT --model=balanced
+    python feature_importance_analyzer.py --symbol=BTCUSDT --model=balanced --contributions
 
 Functions:
     - load_xgboost_model: Load an XGBoost model from a model file
@@ -14,18 +21,27 @@ Functions:
     - rank_features: Rank features by importance score
     - print_feature_importance: Print feature importance in a readable format
     - export_feature_importance: Export feature importance to a CSV file
+    - get_importance_table: Get the precomputed importance table of a model
+    - importance_frame: Convert an importance table to a feature importance DataFrame
     - analyze_model: Analyze a model and generate all outputs
+    - load_contribution_samples: Load the stored test features of a symbol
+    - compute_contributions: Compute (or load cached) feature contributions
     - main: Parse arguments and run the analyzer
 """
 
 import os
 import sys
 import json
+import time
+import hashlib
 import logging
 import argparse
+import threading
 import numpy as np
 import pandas as pd
 import xgboost as xgb
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, List, Tuple, Any, Optional, Union
 
 # Add the parent directory to the path to import from python_app
@@ -51,6 +67,23 @@ logging.basicConfig(
     ]
 )
 
+from model_artifacts import load_artifact, load_importance_table, write_importance_table
+
+MODEL_DIR = os.path.join(parent_dir, 'models')
+TRAINING_DATA_DIR = os.path.join(parent_dir, 'data', 'training')
+
+# Rows per pred_contribs batch
+CONTRIBUTION_CHUNK_ROWS = 20000
+
+# Contribution summaries already read or computed in this process, keyed by cache path
+_contribution_cache: Dict[str, Dict[str, Any]] = {}
+_contribution_lock = threading.Lock()
+
+def _model_stem(symbol: str, model_type: str) -> str:
+    """Name stem of a symbol's XGBoost model ('standard' or 'balanced')"""
+    model_suffix = "_balanced" if model_type == "balanced" else ""
+    return f'xgboost_{symbol.lower()}{model_suffix}'
+
 def load_xgboost_model(symbol: str, model_type: str = "balanced") -> Tuple[Optional[xgb.XGBClassifier], Optional[Dict[str, Any]]]:
     """
     Load an XGBoost model from the model directory.
@@ -230,6 +263,60 @@ def export_feature_importance(ranked_df: pd.DataFrame, symbol: str,
     
     return output_path
 
+def get_importance_table(symbol: str, model_type: str = "balanced",
+                         model_dir: str = MODEL_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Get the feature importance table of a model.
+    
+    The table is written when the model is saved; it is only computed here (and
+    saved for the next call) for models saved before tables existed, or when the
+    model changed since.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., 'BTCUSDT')
+        model_type: Type of model ('standard' or 'balanced')
+        model_dir: Directory containing the model files
+        
+    Returns:
+        Importance table (see model_artifacts.build_importance_table), or None if
+        the model does not exist
+    """
+    stem = _model_stem(symbol, model_type)
+    artifact = load_artifact(stem, model_dir)
+    if artifact is None:
+        logging.error(f"Model file not found: {os.path.join(model_dir, stem + '.model')}")
+        return None
+    
+    table = load_importance_table(stem, model_dir, artifact.version)
+    if table is None:
+        logging.info(f"No up-to-date importance table for {stem}, computing it")
+        write_importance_table(artifact.model, stem, artifact.features, model_dir)
+        table = load_importance_table(stem, model_dir, artifact.version)
+    return table
+
+def importance_frame(table: Dict[str, Any], importance_type: str = 'gain') -> pd.DataFrame:
+    """
+    Convert an importance table to the DataFrame returned by get_feature_importance.
+    
+    Args:
+        table: Importance table
+        importance_type: Type of importance ('gain', 'weight', 'cover', 
+                       'total_gain', or 'total_cover')
+        
+    Returns:
+        DataFrame with feature names and importance scores
+    """
+    if importance_type not in table['importance']:
+        raise ValueError(f"Importance type {importance_type} not in the importance table")
+    
+    entry = table['importance'][importance_type]
+    return pd.DataFrame({
+        'feature': [f'f{i}' for i in range(len(table['features']))],
+        f'importance_{importance_type}': entry['scores'],
+        'feature_name': table['features'],
+        'importance_pct': entry['pct']
+    })
+
 def analyze_model(symbol: str, model_type: str = "balanced", 
                  importance_types: List[str] = ['gain', 'weight'],
                  top_n: int = 20) -> Dict[str, Any]:
@@ -254,26 +341,25 @@ def analyze_model(symbol: str, model_type: str = "balanced",
         'analysis': {}
     }
     
-    # Load the model
-    model, metadata = load_xgboost_model(symbol, model_type)
-    if model is None or metadata is None:
+    # Get the importance precomputed at training time
+    table = get_importance_table(symbol, model_type)
+    if table is None:
         results['message'] = f"Failed to load {model_type} model for {symbol}"
         return results
     
-    # Get features from metadata
-    if 'features' not in metadata:
+    if not table['features']:
         results['message'] = f"Features list not found in metadata for {symbol} {model_type} model"
         return results
     
-    features = metadata['features']
-    results['analysis']['feature_count'] = len(features)
+    results['analysis']['feature_count'] = len(table['features'])
+    results['analysis']['model_version'] = table.get('model_version')
     results['analysis']['importance_types'] = {}
     
     # Generate importance analysis for each importance type
     for importance_type in importance_types:
         try:
             # Get feature importance
-            importance_df = get_feature_importance(model, features, importance_type)
+            importance_df = importance_frame(table, importance_type)
             
             # Rank features
             ranked_df = rank_features(importance_df, f'importance_{importance_type}')
@@ -305,6 +391,154 @@ def analyze_model(symbol: str, model_type: str = "balanced",
     
     return results
 
+def load_contribution_samples(symbol: str, data_dir: str = TRAINING_DATA_DIR,
+                              max_rows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load the stored test features of a symbol as a contribution sample set.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., 'BTCUSDT')
+        data_dir: Directory containing X_test_<symbol>.csv
+        max_rows: Keep only the most recent rows (default: all)
+        
+    Returns:
+        DataFrame of features
+    """
+    X = pd.read_csv(os.path.join(data_dir, f'X_test_{symbol.lower()}.csv'))
+    if max_rows:
+        X = X.tail(max_rows).reset_index(drop=True)
+    return X
+
+def _sample_hash(X: np.ndarray, features: List[str]) -> str:
+    """Hash of a sample set, used with the model version as the cache key"""
+    digest = hashlib.sha256(','.join(features).encode())
+    digest.update(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:16]
+
+def _contribution_chunk(booster: xgb.Booster, X: np.ndarray, threads: int) -> np.ndarray:
+    """Compute the pred_contribs of one batch of rows"""
+    dmatrix = xgb.DMatrix(X, feature_names=booster.feature_names, nthread=threads)
+    return booster.predict(dmatrix, pred_contribs=True)
+
+def compute_contributions(symbol: str, model_type: str, X: pd.DataFrame,
+                          model_dir: str = MODEL_DIR,
+                          n_workers: Optional[int] = None,
+                          chunk_rows: int = CONTRIBUTION_CHUNK_ROWS,
+                          use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Compute per-prediction feature contributions over a sample set.
+    
+    The rows are split into batches scored concurrently (XGBoost releases the GIL
+    while predicting). The full contribution array is saved to
+    <model_dir>/contributions/<stem>_<model version>_<sample hash>.npz with a JSON
+    summary next to it, so the same model and samples are only ever computed once;
+    files of older model versions are removed.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., 'BTCUSDT')
+        model_type: Type of model ('standard' or 'balanced')
+        X: Feature rows (must contain the model's features)
+        model_dir: Directory containing the model files
+        n_workers: Number of concurrent batches (default: one per CPU core)
+        chunk_rows: Rows per batch
+        use_cache: Return the cached summary when there is one
+        
+    Returns:
+        Summary with the mean absolute and mean contribution of every feature per
+        class, the bias per class, an overall ranking and the path of the full array
+    """
+    stem = _model_stem(symbol, model_type)
+    artifact = load_artifact(stem, model_dir)
+    if artifact is None:
+        raise FileNotFoundError(f"Model file not found: {os.path.join(model_dir, stem + '.model')}")
+    
+    features = artifact.features
+    missing = [feature for feature in features if feature not in X.columns]
+    if missing:
+        raise ValueError(f"Sample set is missing model features: {missing}")
+    
+    rows = np.asarray(artifact.transform(X[features]), dtype=np.float32)
+    version = artifact.version
+    cache_dir = os.path.join(model_dir, 'contributions')
+    cache_stem = os.path.join(cache_dir, f'{stem}_{version}_{_sample_hash(rows, features)}')
+    summary_path = f'{cache_stem}.json'
+    
+    if use_cache:
+        with _contribution_lock:
+            cached = _contribution_cache.get(summary_path)
+        if cached is None and os.path.exists(summary_path):
+            with open(summary_path, 'r') as f:
+                cached = json.load(f)
+            with _contribution_lock:
+                _contribution_cache[summary_path] = cached
+        if cached is not None:
+            return {**cached, 'cached': True}
+    
+    # Score the batches concurrently, splitting the cores between them
+    cpu_count = os.cpu_count() or 1
+    chunks = [rows[start:start + chunk_rows] for start in range(0, len(rows), chunk_rows)]
+    n_workers = max(1, min(n_workers or cpu_count, len(chunks)))
+    threads = max(1, cpu_count // n_workers)
+    booster = artifact.model.get_booster()
+    
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        parts = list(executor.map(lambda chunk: _contribution_chunk(booster, chunk, threads), chunks))
+    contributions = np.concatenate(parts).astype(np.float32)
+    if contributions.ndim == 2:
+        # Binary models give one set of contributions
+        contributions = contributions[:, np.newaxis, :]
+    compute_seconds = time.time() - start_time
+    
+    class_mapping = artifact.class_mapping
+    classes = [class_mapping.get(index, str(index)) for index in range(contributions.shape[1])]
+    mean_abs = np.abs(contributions[:, :, :-1]).mean(axis=0)
+    overall = mean_abs.sum(axis=0)
+    order = np.argsort(-overall)
+    
+    summary = {
+        'symbol': symbol.upper(),
+        'model_type': model_type,
+        'stem': stem,
+        'model_version': version,
+        'n_samples': int(len(rows)),
+        'features': features,
+        'classes': classes,
+        'mean_abs_contribution': {label: mean_abs[index].tolist() for index, label in enumerate(classes)},
+        'mean_contribution': {label: contributions[:, index, :-1].mean(axis=0).tolist()
+                              for index, label in enumerate(classes)},
+        'bias': {label: float(contributions[:, index, -1].mean()) for index, label in enumerate(classes)},
+        'ranking': [{'rank': rank + 1, 'feature_name': features[index],
+                     'mean_abs_contribution': float(overall[index])}
+                    for rank, index in enumerate(order)],
+        'contributions_path': f'{cache_stem}.npz',
+        'compute_seconds': compute_seconds,
+        'batches': len(chunks),
+        'computed_at': datetime.now().isoformat()
+    }
+    
+    # Replace the files of older model versions, then write the array and the summary
+    # (<stem>_<version>_<hash>: the hex parts have no underscores, which keeps the
+    # files of e.g. xgboost_btcusdt_balanced apart from those of xgboost_btcusdt)
+    os.makedirs(cache_dir, exist_ok=True)
+    for filename in os.listdir(cache_dir):
+        if filename.startswith(f'{stem}_') and filename[len(stem) + 1:].count('_') == 1 \
+                and not filename.startswith(f'{stem}_{version}_'):
+            os.remove(os.path.join(cache_dir, filename))
+    tmp_path = f'{cache_stem}.{os.getpid()}.tmp.npz'
+    np.savez(tmp_path, contributions=contributions)
+    os.replace(tmp_path, f'{cache_stem}.npz')
+    tmp_path = f'{summary_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, summary_path)
+    
+    with _contribution_lock:
+        _contribution_cache[summary_path] = summary
+    logging.info(f"Computed contributions of {len(rows)} rows for {stem} in {compute_seconds:.2f}s "
+                 f"({len(chunks)} batches, {n_workers} workers)")
+    return {**summary, 'cached': False}
+
 def main():
     """Main function to run the feature importance analyzer."""
     parser = argparse.ArgumentParser(description='Analyze feature importance of XGBoost models')
@@ -318,6 +552,12 @@ def main():
                         help='Types of importance to analyze')
     parser.add_argument('--top', type=int, default=20,
                         help='Number of top features to display (0 for all)')
+    parser.add_argument('--contributions', action='store_true',
+                        help='Also compute feature contributions over the stored test set')
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help='Number of most recent test rows to compute contributions for')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of concurrent contribution batches')
     
     args = parser.parse_args()
     
@@ -341,6 +581,15 @@ def main():
             print(f"  - {imp_type}: {path}")
     else:
         print(f"\nAnalysis failed: {results['message']}")
+    
+    if args.contributions:
+        samples = load_contribution_samples(args.symbol, max_rows=args.max_rows)
+        summary = compute_contributions(args.symbol, args.model, samples, n_workers=args.workers)
+        status = 'cached' if summary['cached'] else f"computed in {summary['compute_seconds']:.2f}s"
+        print(f"\nContributions over {summary['n_samples']} rows ({status}):")
+        for entry in summary['ranking'][:args.top or None]:
+            print(f"{entry['rank']:3d}. {entry['feature_name']:<30} {entry['mean_abs_contribution']:.4f}")
+        print(f"Full contributions: {summary['contributions_path']}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,15 +9,19 @@ It provides a bridge that:
 3. Executes simulated trades in Paper Trading
 4. Records all activities with detailed logs
 5. Tracks performance metrics
+
+Trades normally go through the paper trading REST API of the local server. When a
+BinanceTradeQueueService is passed in, they go through the trade execution queue
+to a paper mode BinanceTradingService in this process instead, which is how the
+replay driver (see trading_replay.py) runs the whole path on stored candles.
 """
 
 import os
 import sys
 import json
-import time
+import queue
 import logging
 import requests
-from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union, Tuple
 
 # Configure logging
@@ -39,6 +43,13 @@ if current_dir not in sys.path:
 # Import the trading ML components
 from ml_trading_bridge import get_ml_trading_bridge
 from trading_ml import get_trading_ml
+from candle_scheduler import get_candle_scheduler, seconds_to_interval
+
+# Import the clock so replays can run the integration on simulated time
+try:
+    from python_app.utils.clock import get_clock
+except ImportError:
+    from utils.clock import get_clock
 
 # Import Binance market service for real-time data
 try:
@@ -71,14 +82,24 @@ class MLPaperTradingIntegration:
     Integrates ML predictions with Paper Trading for simulation and backtesting
     """
     
-    def __init__(self, user_id: int = 1):
+    def __init__(self, user_id: int = 1, trade_queue_service=None, initial_balance: float = 10000.0):
         """
         Initialize the ML Paper Trading Integration
         
         Args:
             user_id: The user ID to use for paper trading (default: 1 for system)
+            trade_queue_service: Optional BinanceTradeQueueService with a paper mode trading
+                service to trade through instead of the paper trading API
+            initial_balance: Starting balance of the in-process paper account (only used
+                with trade_queue_service)
         """
         self.user_id = user_id
+        self.trade_queue_service = trade_queue_service
+        self.paper_account = {
+            "id": f"local-{user_id}",
+            "initialBalance": initial_balance,
+            "currentBalance": initial_balance
+        }
         self.ml_bridge = get_ml_trading_bridge()
         self.trading_ml = get_trading_ml()
         self.market_service = binance_market_service
@@ -142,6 +163,9 @@ class MLPaperTradingIntegration:
         Returns:
             Account details including balance
         """
+        if self.trade_queue_service is not None:
+            return dict(self.paper_account)
+        
         try:
             response = requests.get(f"{self.api_base_url}/api/ai/paper-trading/account", 
                                   headers={"X-Test-User-Id": "admin"})
@@ -166,6 +190,9 @@ class MLPaperTradingIntegration:
         Returns:
             List of open positions
         """
+        if self.trade_queue_service is not None:
+            return self._queued_positions(status="OPEN")
+        
         try:
             response = requests.get(f"{self.api_base_url}/api/ai/paper-trading/positions", 
                                   headers={"X-Test-User-Id": "admin"})
@@ -190,6 +217,9 @@ class MLPaperTradingIntegration:
         Returns:
             List of trades
         """
+        if self.trade_queue_service is not None:
+            return self._queued_positions()
+        
         try:
             response = requests.get(f"{self.api_base_url}/api/ai/paper-trading/trades", 
                                   headers={"X-Test-User-Id": "admin"})
@@ -235,11 +265,14 @@ class MLPaperTradingIntegration:
                 "action": action,
                 "confidence": confidence,
                 "price": current_price,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": get_clock().now().isoformat()
             }
             
             log_with_data(self.logger, logging.INFO, "Executing trade", decision)
             
+            if self.trade_queue_service is not None:
+                return self._queue_trade(decision)
+            
             # Execute trade using the API
             response = requests.post(f"{self.api_base_url}/api/ai/paper-trading/execute", 
                                    json=decision,
@@ -270,10 +303,60 @@ class MLPaperTradingIntegration:
                 "message": error_msg
             }
     
+    def _queue_trade(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a trade with the trade queue service
+        
+        The position is sized at max_position_risk_pct of the paper account balance.
+        
+        Args:
+            decision: Trading decision built by execute_trade
+            
+        Returns:
+            Queue response with the queued trade ID
+        """
+        position_value = self.paper_account["currentBalance"] * self.max_position_risk_pct / 100
+        result = self.trade_queue_service.place_order(
+            symbol=decision["symbol"],
+            side=decision["action"],
+            quantity=position_value / decision["price"],
+            strategy_id="ml_paper_trading",
+            ml_signal={"signal": decision["action"], "confidence": decision["confidence"]}
+        )
+        log_with_data(self.logger, logging.INFO, "Trade queued", result)
+        return result
+    
+    def _queued_positions(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the positions of the in-process paper trading service in the API format
+        
+        Args:
+            status: Only return positions with this status (default: all)
+            
+        Returns:
+            List of positions
+        """
+        positions = []
+        for position in self.trade_queue_service.trading_service.positions:
+            if status and position["status"] != status:
+                continue
+            positions.append({
+                "id": position["id"],
+                "symbol": position["symbol"],
+                "direction": "LONG" if position["side"] == "BUY" else "SHORT",
+                "entryPrice": position["entry_price"],
+                "quantity": position["quantity"],
+                "status": position["status"],
+                "openedAt": position["timestamp"],
+                "profitLoss": position.get("pnl")
+            })
+        return positions
+    
     def monitor_for_trading_signals(self) -> None:
         """
         Start monitoring symbols for trading signals
-        This continuously checks for ML signals and executes trades accordingly
+        This acts on the ML predictions published by the candle-close scheduler
+        right after every candle closes, and executes trades accordingly
         """
         if self.active:
             logger.warning("Monitoring is already active")
@@ -286,23 +369,21 @@ class MLPaperTradingIntegration:
             "min_confidence": self.min_confidence_threshold
         })
         
+        # Register our symbols with the shared scheduler and receive its batches
+        scheduler = get_candle_scheduler(seconds_to_interval(self.monitoring_interval))
+        scheduler.add_symbols(self.symbols_to_monitor, [self.model_type])
+        batches = queue.Queue()
+        scheduler.subscribe(batches.put)
+        scheduler.start()
+        
         try:
             while self.active:
-                log_with_data(self.logger, logging.INFO, "Checking for trading signals", {
-                    "time": datetime.now().isoformat()
-                })
-                
-                # Get signals for all symbols
-                self._check_and_execute_signals()
-                
-                # Update positions with current prices
-                self._update_positions_with_current_prices()
-                
-                # Check for take profit or stop loss conditions
-                self._check_exit_conditions()
+                try:
+                    batch = batches.get(timeout=1.0)
+                except queue.Empty:
+                    continue
                 
-                # Sleep until next check
-                time.sleep(self.monitoring_interval)
+                self.process_batch(batch)
                 
         except KeyboardInterrupt:
             logger.info("Monitoring stopped by user")
@@ -310,6 +391,29 @@ class MLPaperTradingIntegration:
         except Exception as e:
             logger.error(f"Error in monitoring loop: {e}")
             self.active = False
+        finally:
+            scheduler.unsubscribe(batches.put)
+    
+    def process_batch(self, batch: Dict[str, Any]) -> None:
+        """
+        Act on one batch of predictions published by the candle-close scheduler
+        
+        Args:
+            batch: Batch with the 'candle_close' time and 'predictions' per symbol
+        """
+        log_with_data(self.logger, logging.INFO, "Checking for trading signals", {
+            "time": get_clock().now().isoformat(),
+            "candle_close": batch.get('candle_close')
+        })
+        
+        # Act on the signals for all symbols
+        self._check_and_execute_signals(self._signals_from_batch(batch))
+        
+        # Update positions with current prices
+        self._update_positions_with_current_prices()
+        
+        # Check for take profit or stop loss conditions
+        self._check_exit_conditions()
     
     def stop_monitoring(self) -> None:
         """
@@ -318,6 +422,30 @@ class MLPaperTradingIntegration:
         self.active = False
         logger.info("Monitoring stopped")
     
+    def _signals_from_batch(self, batch: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Convert a scheduler batch into trading signals for the monitored symbols
+        
+        Args:
+            batch: Batch published by the candle-close scheduler
+            
+        Returns:
+            Dictionary mapping symbol to signal data (success, signal, confidence)
+        """
+        signals = {}
+        for symbol in self.symbols_to_monitor:
+            prediction = batch.get('predictions', {}).get(symbol, {}).get(self.model_type)
+            if not prediction:
+                continue
+            signals[symbol] = {
+                'success': prediction.get('success', False),
+                'signal': prediction.get('predicted_label'),
+                'confidence': prediction.get('confidence', 0),
+                'price': prediction.get('current_price'),
+                'timestamp': prediction.get('timestamp')
+            }
+        return signals
+    
     def _get_symbol_price(self, symbol: str) -> Optional[float]:
         """
         Get current price for a symbol using Binance market service
@@ -355,17 +483,21 @@ class MLPaperTradingIntegration:
             logger.error(f"Error getting price for {symbol}: {e}")
             return None
     
-    def _check_and_execute_signals(self) -> None:
+    def _check_and_execute_signals(self, signals: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
         """
         Check for ML signals and execute trades if confident enough
+        
+        Args:
+            signals: Signals per symbol (default: fetched from the ML bridge)
         """
         try:
             # Get batch signals for all symbols
-            signals = self.ml_bridge.get_batch_signals(
-                self.symbols_to_monitor, 
-                model_type=self.model_type, 
-                min_confidence=self.min_confidence_threshold
-            )
+            if signals is None:
+                signals = self.ml_bridge.get_batch_signals(
+                    self.symbols_to_monitor, 
+                    model_type=self.model_type, 
+                    min_confidence=self.min_confidence_threshold
+                )
             
             log_with_data(self.logger, logging.INFO, "Received batch signals from ML system", {
                 "symbol_count": len(signals),
@@ -437,6 +569,10 @@ class MLPaperTradingIntegration:
         Returns:
             Success or failure
         """
+        # The in-process paper trading service reads prices itself
+        if self.trade_queue_service is not None:
+            return True
+        
         try:
             # Call the price simulation API
             response = requests.post(
@@ -520,6 +656,9 @@ class MLPaperTradingIntegration:
         Returns:
             Success or failure
         """
+        if self.trade_queue_service is not None:
+            return self._close_queued_position(position_id, reason)
+        
         try:
             # Call the close position API
             response = requests.post(
@@ -548,6 +687,34 @@ class MLPaperTradingIntegration:
             logger.error(f"Error closing position: {e}")
             return False
     
+    def _close_queued_position(self, position_id: int, reason: str) -> bool:
+        """
+        Close a position of the in-process paper trading service
+        
+        Args:
+            position_id: ID of the position to close
+            reason: Reason for closing the position
+            
+        Returns:
+            Success or failure
+        """
+        trading_service = self.trade_queue_service.trading_service
+        position = next((p for p in trading_service.positions if p["id"] == position_id), None)
+        if position is None:
+            logger.error(f"Failed to close position: position {position_id} not found")
+            return False
+        
+        result = trading_service.close_position(position["symbol"], position_id, reason=reason)
+        if result.get("success", False):
+            self.paper_account["currentBalance"] += result["pnl"]
+        
+        log_with_data(self.logger, logging.INFO,
+                    f"Position {position_id} closed",
+                    {"success": result.get("success", False),
+                     "exit_price": result.get("exit_price"),
+                     "reason": reason})
+        return result.get("success", False)
+    
     def generate_performance_report(self) -> Dict[str, Any]:
         """
         Generate a performance report for the ML Paper Trading system
@@ -584,7 +751,7 @@ class MLPaperTradingIntegration:
                 "account_id": account['id'],
                 "time_period": {
                     "start": min(t['openedAt'] for t in trades) if trades else "N/A",
-                    "end": datetime.now().isoformat()
+                    "end": get_clock().now().isoformat()
                 },
                 "initial_balance": initial_balance,
                 "current_balance": current_balance,
@@ -64,6 +64,13 @@ except ImportError:
             'is_fallback': True
         }
 
+# Try to import the prediction worker pool for batch signals
+try:
+    from prediction_worker_pool import get_prediction_pool, run_trading_signal
+except ImportError:
+    logger.warning("Could not import prediction worker pool - batch signals run in-process")
+    get_prediction_pool = lambda: None
+
 # Try to import market service for getting prices
 try:
     from services.binance.market_service import binance_market_service
@@ -190,6 +197,37 @@ class MLTradingBridge:
             'signals': {}
         }
         
+        # Compute uncached signals in the prediction worker pool when it is enabled
+        pool = get_prediction_pool()
+        if pool is not None:
+            model_type = model_type or 'xgboost'
+            pending = []
+            for symbol in formatted_symbols:
+                cached_signal = self.signal_cache.get(f"{symbol}_{model_type}_{timeframe}")
+                if (not force_refresh and cached_signal and
+                        time.time() - cached_signal.get('cache_time', 0) < self.cache_ttl):
+                    results['signals'][symbol] = cached_signal
+                else:
+                    pending.append(symbol)
+            
+            pooled_signals = pool.map_calls(run_trading_signal,
+                                            [(symbol, model_type, timeframe) for symbol in pending])
+            for symbol, signal in zip(pending, pooled_signals):
+                if signal is None:
+                    signal = {
+                        'success': False,
+                        'symbol': symbol,
+                        'error': 'Prediction worker failed',
+                        'timestamp': datetime.now().isoformat()
+                    }
+                elif 'cache_time' in signal:
+                    self.signal_cache[f"{symbol}_{model_type}_{timeframe}"] = signal
+                results['signals'][symbol] = signal
+            
+            # Keep the order of the requested symbols
+            results['signals'] = {symbol: results['signals'][symbol] for symbol in formatted_symbols}
+            return results
+        
         # Process each symbol
         for symbol in formatted_symbols:
             try:
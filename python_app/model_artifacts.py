@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+Model Artifact Loader
+
+This module provides one artifact format and one loader for every trained model,
+covering both the legacy pickled bundles (model_<symbol>.pkl with booster,
+StandardScaler and feature list) and the XGBoost models (xgboost_<name>.model with
+a metadata JSON file).
+
+An artifact with name stem <stem> consists of:
+- <stem>.model: the booster in XGBoost's native binary (UBJSON) format
+- <stem>_metadata.json: features, class mapping and training metadata
+- <stem>_scaler.npz: optional scaler parameters stored as arrays
+- <stem>_variants.json: optional latency/accuracy table of compact variants
+- <stem>_importance.json: feature importance precomputed when the model was saved
+
+Artifacts are loaded lazily (metadata first, the booster and scaler on first use)
+and cached across calls until the files change on disk. Legacy pickles are
+converted to the native format the first time they are loaded, so later calls
+never unpickle again.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Class mapping used by the legacy pickled models (see train_model.py)
+LEGACY_CLASS_MAPPING = {0: 'SELL', 1: 'HOLD', 2: 'BUY'}
+
+ARTIFACT_FORMAT_VERSION = 1
+
+# Importance types stored in the precomputed importance tables
+IMPORTANCE_TYPES = ['gain', 'weight', 'cover', 'total_gain', 'total_cover']
+
+# Content hashes of model files, keyed by path and invalidated by (mtime, size)
+_version_cache: Dict[str, Tuple[Tuple[float, int], str]] = {}
+_version_cache_lock = threading.Lock()
+
+
+def model_version(model_path: str) -> str:
+    """
+    Get the version of a saved model: a hash of the booster file's content.
+
+    Two saves of the same booster give the same version, and any retraining gives a
+    new one, so it can key caches of anything derived from the model.
+
+    Args:
+        model_path: Path of the booster file
+
+    Returns:
+        16 character hex digest
+    """
+    stat = os.stat(model_path)
+    key = (stat.st_mtime, stat.st_size)
+    with _version_cache_lock:
+        cached = _version_cache.get(model_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    version = digest.hexdigest()[:16]
+
+    with _version_cache_lock:
+        _version_cache[model_path] = (key, version)
+    return version
+
+
+def booster_version(model) -> str:
+    """
+    Get the version of a loaded model that has no known file: a hash of its booster.
+
+    Args:
+        model: xgboost Booster or sklearn-style XGBoost model
+
+    Returns:
+        16 character hex digest
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    return hashlib.sha256(bytes(booster.save_raw(raw_format='ubj'))).hexdigest()[:16]
+
+
+class ArrayScaler:
+    """
+    Standard scaler restored from stored arrays
+
+    Applies the same transform as a fitted sklearn StandardScaler without having
+    to unpickle it.
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        """
+        Initialize the scaler
+
+        Args:
+            mean: Per-feature mean subtracted before scaling
+            scale: Per-feature scale the centred values are divided by
+        """
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    @classmethod
+    def from_sklearn(cls, scaler) -> 'ArrayScaler':
+        """Create an ArrayScaler from a fitted sklearn StandardScaler"""
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+        return cls(mean, scale)
+
+    @classmethod
+    def load(cls, path: str) -> 'ArrayScaler':
+        """Load scaler parameters from an .npz file"""
+        with np.load(path) as arrays:
+            return cls(arrays['mean'], arrays['scale'])
+
+    def save(self, path: str) -> None:
+        """Save scaler parameters to an .npz file"""
+        np.savez(path, mean=self.mean_, scale=self.scale_)
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Scale features
+
+        Args:
+            X: Feature matrix (array or DataFrame)
+
+        Returns:
+            Scaled feature array
+        """
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ModelArtifact:
+    """
+    A trained model stored in the native artifact format
+
+    The metadata is read on first access; the booster and scaler are only loaded
+    when they are used.
+    """
+
+    def __init__(self, stem: str, model_dir: str = DEFAULT_MODEL_DIR):
+        """
+        Initialize the artifact
+
+        Args:
+            stem: Artifact name stem (e.g. 'xgboost_btcusdt_balanced' or 'model_btcusdt')
+            model_dir: Directory containing the artifact files
+        """
+        self.stem = stem
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, f'{stem}.model')
+        self.metadata_path = os.path.join(model_dir, f'{stem}_metadata.json')
+        self.scaler_path = os.path.join(model_dir, f'{stem}_scaler.npz')
+
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._model = None
+        self._scaler: Optional[ArrayScaler] = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Check if the booster and metadata files exist"""
+        return os.path.exists(self.model_path) and os.path.exists(self.metadata_path)
+
+    def signature(self) -> Tuple[float, ...]:
+        """Modification times of the artifact files, used to invalidate the cache"""
+        return tuple(os.path.getmtime(path) if os.path.exists(path) else 0.0
+                     for path in (self.model_path, self.metadata_path, self.scaler_path))
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Model metadata (loaded on first access)"""
+        if self._metadata is None:
+            with open(self.metadata_path, 'r') as f:
+                self._metadata = json.load(f)
+        return self._metadata
+
+    @property
+    def version(self) -> str:
+        """Content hash of the booster file (see model_version)"""
+        return model_version(self.model_path)
+
+    @property
+    def features(self) -> List[str]:
+        """Feature names in the order the model expects them"""
+        return self.metadata.get('features', [])
+
+    @property
+    def class_mapping(self) -> Dict[int, str]:
+        """Mapping from class index to label with integer keys"""
+        mapping = self.metadata.get('class_mapping', {})
+        return {int(k): v for k, v in mapping.items()}
+
+    @property
+    def model(self):
+        """The XGBoost classifier (loaded on first access)"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import xgboost as xgb
+
+                    model = xgb.XGBClassifier()
+                    model.load_model(self.model_path)
+                    self._model = model
+                    logger.info(f"Loaded booster from {self.model_path}")
+        return self._model
+
+    @property
+    def scaler(self) -> Optional[ArrayScaler]:
+        """The feature scaler, or None if the model was trained on raw features"""
+        if self._scaler is None and os.path.exists(self.scaler_path):
+            self._scaler = ArrayScaler.load(self.scaler_path)
+        return self._scaler
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the booster has been loaded"""
+        return self._model is not None
+
+    def transform(self, X) -> np.ndarray:
+        """Apply the stored scaler (if any) to a feature matrix"""
+        scaler = self.scaler
+        return scaler.transform(X) if scaler is not None else X
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Scale features if needed and return class probabilities"""
+        return self.model.predict_proba(self.transform(X))
+
+    def as_legacy_dict(self) -> Dict[str, Any]:
+        """
+        Return the artifact in the layout of the legacy pickled bundles.
+
+        Returns:
+            Dictionary with model, scaler, features, trained_at and symbol
+        """
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'features': self.features,
+            'trained_at': self.metadata.get('trained_at'),
+            'symbol': self.metadata.get('symbol'),
+            'artifact': self
+        }
+
+
+# Cache of loaded artifacts, keyed by absolute stem path
+_artifact_cache: Dict[str, Tuple[Tuple[float, ...], ModelArtifact]] = {}
+_artifact_cache_lock = threading.Lock()
+
+
+def save_artifact(model, stem: str, metadata: Dict[str, Any],
+                  scaler=None, model_dir: str = DEFAULT_MODEL_DIR) -> ModelArtifact:
+    """
+    Save a model in the native artifact format.
+
+    Files are written to temporary names and renamed into place, so readers never
+    see a partially written artifact.
+
+    Args:
+        model: Trained XGBoost classifier
+        stem: Artifact name stem
+        metadata: Model metadata (must include 'features')
+        scaler: Optional fitted StandardScaler or ArrayScaler
+        model_dir: Directory to save the artifact in
+
+    Returns:
+        The saved ModelArtifact
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    artifact = ModelArtifact(stem, model_dir)
+
+    metadata = dict(metadata)
+    metadata['artifact_format'] = ARTIFACT_FORMAT_VERSION
+    metadata['has_scaler'] = scaler is not None
+
+    # XGBoost picks the format from the file extension, so write UBJSON explicitly
+    tmp_model_path = f'{artifact.model_path}.{os.getpid()}.tmp.ubj'
+    model.save_model(tmp_model_path)
+
+    if scaler is not None:
+        if not isinstance(scaler, ArrayScaler):
+            scaler = ArrayScaler.from_sklearn(scaler)
+        tmp_scaler_path = f'{artifact.scaler_path}.{os.getpid()}.tmp.npz'
+        scaler.save(tmp_scaler_path)
+        os.replace(tmp_scaler_path, artifact.scaler_path)
+    elif os.path.exists(artifact.scaler_path):
+        os.remove(artifact.scaler_path)
+
+    tmp_metadata_path = f'{artifact.metadata_path}.{os.getpid()}.tmp'
+    with open(tmp_metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    os.replace(tmp_model_path, artifact.model_path)
+    os.replace(tmp_metadata_path, artifact.metadata_path)
+
+    logger.info(f"Model artifact saved to {artifact.model_path}")
+    invalidate_artifact(stem, model_dir)
+    write_importance_table(model, stem, metadata.get('features', []), model_dir)
+    return artifact
+
+
+def convert_legacy_pickle(pickle_path: str, model_dir: Optional[str] = None) -> Optional[ModelArtifact]:
+    """
+    Convert a legacy pickled bundle to the native artifact format.
+
+    Args:
+        pickle_path: Path to a model_<symbol>.pkl file
+        model_dir: Directory for the converted artifact (default: next to the pickle)
+
+    Returns:
+        The converted ModelArtifact, or None if the pickle could not be read
+    """
+    model_dir = model_dir or os.path.dirname(pickle_path)
+    stem = os.path.splitext(os.path.basename(pickle_path))[0]
+
+    try:
+        with open(pickle_path, 'rb') as f:
+            bundle = pickle.load(f)
+    except Exception as e:
+        logger.error(f"Error reading legacy model {pickle_path}: {e}")
+        return None
+
+    metadata = {
+        'symbol': bundle.get('symbol'),
+        'features': list(bundle.get('features', [])),
+        'trained_at': bundle.get('trained_at'),
+        'class_mapping': {str(k): v for k, v in LEGACY_CLASS_MAPPING.items()},
+        'converted_from': os.path.basename(pickle_path)
+    }
+
+    artifact = save_artifact(bundle['model'], stem, metadata, bundle.get('scaler'), model_dir)
+    logger.info(f"Converted legacy model {pickle_path} to native artifact {artifact.model_path}")
+    return artifact
+
+
+def load_artifact(stem: str, model_dir: str = DEFAULT_MODEL_DIR) -> Optional[ModelArtifact]:
+    """
+    Load a model artifact, using the cache when the files are unchanged.
+
+    If only a legacy pickle (<stem>.pkl) exists, or the pickle is newer than the
+    native files, it is converted first.
+
+    Args:
+        stem: Artifact name stem (e.g. 'model_btcusdt' or 'xgboost_btcusdt')
+        model_dir: Directory containing the model files
+
+    Returns:
+        The ModelArtifact, or None if no model files exist
+    """
+    cache_key = os.path.abspath(os.path.join(model_dir, stem))
+    artifact = ModelArtifact(stem, model_dir)
+    pickle_path = os.path.join(model_dir, f'{stem}.pkl')
+
+    with _artifact_cache_lock:
+        if os.path.exists(pickle_path) and (
+                not artifact.exists() or
+                os.path.getmtime(pickle_path) > os.path.getmtime(artifact.model_path)):
+            if convert_legacy_pickle(pickle_path, model_dir) is None:
+                return None
+
+        if not artifact.exists():
+            return None
+
+        signature = artifact.signature()
+        cached = _artifact_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        _artifact_cache[cache_key] = (signature, artifact)
+        return artifact
+
+
+def invalidate_artifact(stem: str, model_dir: str = DEFAULT_MODEL_DIR) -> None:
+    """Drop an artifact from the cache"""
+    cache_key = os.path.abspath(os.path.join(model_dir, stem))
+    _artifact_cache.pop(cache_key, None)
+
+
+def load_symbol_model(symbol: str, model_dir: str = DEFAULT_MODEL_DIR) -> Optional[ModelArtifact]:
+    """
+    Load the scaled model for a symbol (formerly model_<symbol>.pkl).
+
+    Args:
+        symbol: Symbol name (e.g., BTCUSDT)
+        model_dir: Directory containing the model files
+
+    Returns:
+        The ModelArtifact, or None if the model is not available
+    """
+    return load_artifact(f'model_{symbol.lower()}', model_dir)
+
+
+def list_symbol_models(model_dir: str = DEFAULT_MODEL_DIR) -> List[str]:
+    """
+    List the symbols that have a scaled model, in either the native or legacy format.
+
+    Args:
+        model_dir: Directory containing the model files
+
+    Returns:
+        Sorted list of upper-case symbols
+    """
+    symbols = set()
+    if os.path.exists(model_dir):
+        for filename in os.listdir(model_dir):
+            if filename.startswith('model_') and filename.endswith(('.pkl', '.model')):
+                symbols.add(os.path.splitext(filename)[0].replace('model_', '', 1).upper())
+    return sorted(symbols)
+
+
+def variant_table_path(stem: str, model_dir: str = DEFAULT_MODEL_DIR) -> str:
+    """Path of the latency/accuracy trade-off table for a model's compact variants"""
+    return os.path.join(model_dir, f'{stem}_variants.json')
+
+
+def save_variant_table(stem: str, table: Dict[str, Any], model_dir: str = DEFAULT_MODEL_DIR) -> str:
+    """
+    Write the trade-off table for a model's compact variants.
+
+    Args:
+        stem: Name stem of the full model
+        table: Table with a 'variants' section mapping variant name to its metrics
+        model_dir: Directory containing the model files
+
+    Returns:
+        Path of the written table
+    """
+    path = variant_table_path(stem, model_dir)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp_path, path)
+    logger.info(f"Variant table saved to {path}")
+    return path
+
+
+def load_variant_table(stem: str, model_dir: str = DEFAULT_MODEL_DIR) -> Optional[Dict[str, Any]]:
+    """Load the trade-off table for a model, or None if no variants were built"""
+    path = variant_table_path(stem, model_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading variant table {path}: {e}")
+        return None
+
+
+def select_model_variant(stem: str, accuracy_tolerance: float,
+                         model_dir: str = DEFAULT_MODEL_DIR,
+                         latency_key: str = 'single_row_ms') -> str:
+    """
+    Pick the fastest variant of a model whose accuracy is within a tolerance of the
+    full model's.
+
+    Args:
+        stem: Name stem of the full model (e.g. 'xgboost_btcusdt_balanced')
+        accuracy_tolerance: Largest accepted accuracy drop (e.g. 0.01 for one point)
+        model_dir: Directory containing the model files
+        latency_key: Latency metric to minimise ('single_row_ms' or 'batch_row_us')
+
+    Returns:
+        The stem of the selected variant, or the given stem if there are no variants
+    """
+    table = load_variant_table(stem, model_dir)
+    if not table or 'full' not in table.get('variants', {}):
+        return stem
+
+    variants = table['variants']
+    min_accuracy = variants['full']['accuracy'] - accuracy_tolerance
+    candidates = [
+        (entry.get(latency_key, float('inf')), name, entry.get('stem', stem))
+        for name, entry in variants.items()
+        if entry.get('accuracy', 0.0) >= min_accuracy
+    ]
+
+    for latency, name, variant_stem in sorted(candidates):
+        if ModelArtifact(variant_stem, model_dir).exists():
+            if variant_stem != stem:
+                logger.info(f"Using variant '{name}' of {stem} ({latency_key}={latency:.3f}, "
+                            f"accuracy {variants[name]['accuracy']:.4f} vs "
+                            f"{variants['full']['accuracy']:.4f})")
+            return variant_stem
+    return stem
+
+
+def importance_table_path(stem: str, model_dir: str = DEFAULT_MODEL_DIR) -> str:
+    """Path of the precomputed feature importance table of a model"""
+    return os.path.join(model_dir, f'{stem}_importance.json')
+
+
+def build_importance_table(model, features: List[str],
+                           importance_types: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compute a model's feature importance for every importance type.
+
+    Args:
+        model: XGBoost classifier or booster
+        features: Feature names in the order the model expects them (default: the
+            names stored in the booster)
+        importance_types: Importance types to compute (default: IMPORTANCE_TYPES)
+
+    Returns:
+        Table with the features and, per importance type, the raw scores and their
+        percentages of the total (features the trees never split on score 0)
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    features = list(features) or list(booster.feature_names or [])
+    table = {'features': features, 'importance': {}}
+
+    for importance_type in importance_types or IMPORTANCE_TYPES:
+        scores = booster.get_score(importance_type=importance_type)
+        # Boosters trained on arrays name their features f0, f1, ...
+        values = [float(scores.get(feature, scores.get(f'f{index}', 0.0)))
+                  for index, feature in enumerate(features)]
+        total = sum(values)
+        table['importance'][importance_type] = {
+            'scores': values,
+            'pct': [value / total * 100 if total > 0 else 0.0 for value in values]
+        }
+
+    return table
+
+
+def save_importance_table(stem: str, table: Dict[str, Any], model_dir: str = DEFAULT_MODEL_DIR) -> str:
+    """
+    Write the precomputed feature importance table of a model.
+
+    Args:
+        stem: Name stem of the model
+        table: Table from build_importance_table (with 'model_version')
+        model_dir: Directory containing the model files
+
+    Returns:
+        Path of the written table
+    """
+    path = importance_table_path(stem, model_dir)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp_path, path)
+    logger.info(f"Feature importance table saved to {path}")
+    return path
+
+
+def write_importance_table(model, stem: str, features: List[str],
+                           model_dir: str = DEFAULT_MODEL_DIR) -> Optional[str]:
+    """
+    Precompute and save the importance table of a just-saved model.
+
+    Failures are logged and never fail the save of the model itself.
+
+    Args:
+        model: The saved XGBoost classifier or booster
+        stem: Name stem of the model
+        features: Feature names in the order the model expects them
+        model_dir: Directory containing the model files
+
+    Returns:
+        Path of the table, or None if it could not be written
+    """
+    try:
+        table = build_importance_table(model, features)
+        table['stem'] = stem
+        table['model_version'] = model_version(os.path.join(model_dir, f'{stem}.model'))
+        return save_importance_table(stem, table, model_dir)
+    except Exception as e:
+        logger.warning(f"Could not precompute feature importance for {stem}: {e}")
+        return None
+
+
+def load_importance_table(stem: str, model_dir: str = DEFAULT_MODEL_DIR,
+                          version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load the precomputed importance table of a model.
+
+    Args:
+        stem: Name stem of the model
+        model_dir: Directory containing the model files
+        version: Expected model version; a table of another version is stale
+
+    Returns:
+        The table, or None if it is missing, unreadable or stale
+    """
+    path = importance_table_path(stem, model_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            table = json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading importance table {path}: {e}")
+        return None
+    if version is not None and table.get('model_version') != version:
+        return None
+    return table
@@ -8,17 +8,20 @@ This module provides helper functions for model training, evaluation, and saving
 import os
 import sys
 import json
+import time
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-import matplotlib.pyplot as plt
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 from sklearn.utils.class_weight import compute_class_weight
 from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split
 from typing import Dict, List, Tuple, Any, Optional, Union
 from datetime import datetime
 import logging
 
+from chart_renderer import submit_chart, render_chart
+
 logger = logging.getLogger(__name__)
 
 def calculate_class_weights(y: np.ndarray) -> Dict[int, float]:
@@ -52,7 +55,11 @@ def create_sample_weights(y: np.ndarray, class_weights: Dict[int, float]) -> np.
 def train_xgboost_model(X_train: np.ndarray, y_train: np.ndarray, 
                       sample_weights: Optional[np.ndarray] = None,
                       class_weights: Optional[Dict[int, float]] = None,
-                      params: Optional[Dict[str, Any]] = None) -> xgb.XGBClassifier:
+                      params: Optional[Dict[str, Any]] = None,
+                      compact_variants: bool = False,
+                      variant_stem: Optional[str] = None,
+                      metadata: Optional[Dict[str, Any]] = None,
+                      model_dir: str = 'models') -> xgb.XGBClassifier:
     """
     Train an XGBoost model
     
@@ -62,6 +69,11 @@ def train_xgboost_model(X_train: np.ndarray, y_train: np.ndarray,
         sample_weights: Sample weights for training
         class_weights: Class weights
         params: XGBoost parameters
+        compact_variants: Also build and save compact variants of the model (see
+            save_compact_variants), validated on a split of the training data
+        variant_stem: Name stem of the model, required with compact_variants
+        metadata: Metadata to save with the variants
+        model_dir: Directory to save the variants in
         
     Returns:
         Trained XGBoost model
@@ -95,6 +107,13 @@ def train_xgboost_model(X_train: np.ndarray, y_train: np.ndarray,
     )
     
     logger.info("XGBoost model training completed")
+    
+    if compact_variants:
+        if not variant_stem:
+            raise ValueError("variant_stem is required to save compact variants")
+        save_compact_variants(model, variant_stem, metadata or {}, X_train, y_train,
+                              sample_weights, model_dir=model_dir)
+    
     return model
 
 def evaluate_model(model: xgb.XGBClassifier, X_test: np.ndarray, y_test: np.ndarray, 
@@ -164,6 +183,9 @@ def save_model(model: xgb.XGBClassifier, model_path: str,
     """
     Save a trained model with metadata
     
+    Both files are written to temporary names and renamed into place, so readers
+    (and concurrent training jobs) never see a partially written model.
+    
     Args:
         model: Trained model
         model_path: Path to save the model
@@ -173,16 +195,28 @@ def save_model(model: xgb.XGBClassifier, model_path: str,
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(model_path), exist_ok=True)
     
-    # Save the model
-    model.save_model(model_path)
+    # Save the model (XGBoost picks the format from the extension, so name the
+    # temporary file explicitly; it is per process, as farm jobs may save the same model)
+    tmp_model_path = f'{model_path}.{os.getpid()}.tmp.ubj'
+    model.save_model(tmp_model_path)
     
     # Save metadata
     metadata_path = model_path.replace('.model', '_metadata.json')
-    with open(metadata_path, 'w') as f:
+    tmp_metadata_path = f'{metadata_path}.{os.getpid()}.tmp'
+    with open(tmp_metadata_path, 'w') as f:
         json.dump(metadata, f, indent=2)
     
+    os.replace(tmp_model_path, model_path)
+    os.replace(tmp_metadata_path, metadata_path)
+    
     logger.info(f"Model saved to {model_path}")
     logger.info(f"Metadata saved to {metadata_path}")
+    
+    # Precompute feature importance so dashboards never recompute it
+    from model_artifacts import write_importance_table
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    write_importance_table(model, stem, feature_names or metadata.get('features', []),
+                           os.path.dirname(model_path))
 
 def load_model(model_path: str) -> Tuple[xgb.XGBClassifier, Dict[str, Any]]:
     """
@@ -211,42 +245,30 @@ def load_model(model_path: str) -> Tuple[xgb.XGBClassifier, Dict[str, Any]]:
 
 def plot_confusion_matrix(cm: np.ndarray, class_names: List[str], 
                         title: str = "Confusion Matrix",
-                        save_path: Optional[str] = None) -> None:
+                        save_path: Optional[str] = None) -> str:
     """
     Plot a confusion matrix
     
+    The chart is drawn by the background chart renderer; without a save_path
+    this returns at once.
+    
     Args:
         cm: Confusion matrix array
         class_names: List of class names
         title: Plot title
-        save_path: Optional path to save the plot
+        save_path: Optional path to save the plot (waits for the rendering)
+        
+    Returns:
+        Chart key (see chart_renderer.chart_url)
     """
-    plt.figure(figsize=(10, 8))
-    plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-    plt.title(title)
-    plt.colorbar()
-    
-    tick_marks = np.arange(len(class_names))
-    plt.xticks(tick_marks, class_names, rotation=45)
-    plt.yticks(tick_marks, class_names)
-    
-    # Format the text in each cell
-    thresh = cm.max() / 2.
-    for i in range(cm.shape[0]):
-        for j in range(cm.shape[1]):
-            plt.text(j, i, format(cm[i, j], 'd'),
-                     horizontalalignment="center",
-                     color="white" if cm[i, j] > thresh else "black")
-    
-    plt.tight_layout()
-    plt.ylabel('True label')
-    plt.xlabel('Predicted label')
+    payload = {'title': title, 'classes': list(class_names), 'matrix': np.asarray(cm).astype(int).tolist()}
+    key = submit_chart('confusion_matrix', payload)
     
     if save_path:
-        plt.savefig(save_path)
+        render_chart('confusion_matrix', payload, save_path)
         logger.info(f"Confusion matrix saved to {save_path}")
     
-    plt.close()
+    return key
 
 def load_model_with_metadata(model_dir: str, model_name_prefix: str, with_model: bool = True) -> Dict[str, Any]:
     """
@@ -331,6 +353,7 @@ def find_best_model(model_dir: str, symbol: str, timeframe: str) -> Dict[str, An
         f'xgboost_{symbol}_{timeframe}_bayesian',
         f'xgboost_{symbol}_{timeframe}_random_search',
         f'xgboost_{symbol}_{timeframe}_grid_search',
+        f'xgboost_{symbol}_{timeframe}_hyperband',
         f'xgboost_{symbol}_{timeframe}_adapted',
         f'xgboost_{symbol}_{timeframe}_baseline'
     ]
@@ -357,37 +380,42 @@ def find_best_model(model_dir: str, symbol: str, timeframe: str) -> Dict[str, An
 
 def plot_feature_importance(model: xgb.XGBClassifier, feature_names: List[str], 
                           title: str = "Feature Importance",
-                          save_path: Optional[str] = None) -> None:
+                          save_path: Optional[str] = None) -> str:
     """
     Plot feature importance
     
+    The chart is drawn by the background chart renderer; without a save_path
+    this returns at once.
+    
     Args:
         model: Trained XGBoost model
         feature_names: Names of features
         title: Plot title
-        save_path: Optional path to save the plot
+        save_path: Optional path to save the plot (waits for the rendering)
+        
+    Returns:
+        Chart key (see chart_renderer.chart_url)
     """
     # Get feature importance
     importance = model.feature_importances_
     
     # Sort features by importance
     indices = np.argsort(importance)[::-1]
-    sorted_importance = importance[indices]
-    sorted_names = [feature_names[i] for i in indices]
     
     # Plot only the top 20 features
-    num_features = min(20, len(sorted_names))
-    plt.figure(figsize=(12, 8))
-    plt.title(title)
-    plt.bar(range(num_features), sorted_importance[:num_features], align="center")
-    plt.xticks(range(num_features), sorted_names[:num_features], rotation=90)
-    plt.tight_layout()
+    top = indices[:20]
+    payload = {
+        'title': title,
+        'features': [feature_names[i] for i in top],
+        'importance': importance[top].astype(float).tolist()
+    }
+    key = submit_chart('feature_importance', payload)
     
     if save_path:
-        plt.savefig(save_path)
+        render_chart('feature_importance', payload, save_path)
         logger.info(f"Feature importance plot saved to {save_path}")
     
-    plt.close()
+    return key
 
 def plot_learning_curve(model: xgb.XGBClassifier, X: np.ndarray, y: np.ndarray, 
                        title: str = "Learning Curve",
@@ -404,6 +432,7 @@ def plot_learning_curve(model: xgb.XGBClassifier, X: np.ndarray, y: np.ndarray,
         cv: Number of cross-validation folds
         save_path: Optional path to save the plot
     """
+    import matplotlib.pyplot as plt
     from sklearn.model_selection import learning_curve
     
     train_sizes, train_scores, test_scores = learning_curve(
@@ -503,4 +532,228 @@ def calculate_strategy_impact(predictions: np.ndarray, actual_returns: np.ndarra
         'largest_loss': largest_loss,
         'volatility': volatility,
         'sharpe_ratio': sharpe_ratio
-    }
\ No newline at end of file
+    }
+
+def measure_inference_latency(model: xgb.XGBClassifier, X: pd.DataFrame,
+                              single_row_samples: int = 200) -> Dict[str, float]:
+    """
+    Measure prediction latency for single rows and for a full batch
+    
+    Args:
+        model: Trained model
+        X: Feature data to predict on
+        single_row_samples: Number of single-row predictions to time
+        
+    Returns:
+        Dictionary with median/p95 single-row latency in milliseconds and
+        batch latency per row in microseconds
+    """
+    rows = [X.iloc[[i]] for i in range(min(single_row_samples, len(X)))]
+    
+    # Warm up so the first call's setup cost is not measured
+    model.predict_proba(rows[0])
+    
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch_seconds = time.perf_counter() - start
+    
+    return {
+        'single_row_ms': float(np.median(timings)),
+        'single_row_p95_ms': float(np.percentile(timings, 95)),
+        'batch_row_us': float(batch_seconds * 1e6 / len(X))
+    }
+
+def build_compact_variants(model: xgb.XGBClassifier, X_train: pd.DataFrame, y_train: np.ndarray,
+                           X_val: pd.DataFrame, y_val: np.ndarray,
+                           sample_weights: Optional[np.ndarray] = None,
+                           depth_caps: Tuple[int, ...] = (3, 4),
+                           feature_fractions: Tuple[float, ...] = (0.5,),
+                           early_stopping_rounds: int = 20) -> Dict[str, Tuple[xgb.XGBClassifier, List[str]]]:
+    """
+    Train smaller, faster variants of a trained model
+    
+    Variants are retrained with the full model's parameters and one change each:
+    - 'early_stopped': as many trees as early stopping on the validation set keeps
+    - 'depth<N>': trees capped at depth N (only caps below the model's depth)
+    - 'top<K>': trained on the K most important features of the full model
+    
+    Args:
+        model: Trained full model
+        X_train: Training features
+        y_train: Training labels
+        X_val: Validation features used for early stopping
+        y_val: Validation labels
+        sample_weights: Sample weights for training
+        depth_caps: Maximum tree depths to build variants for
+        feature_fractions: Fractions of the features to keep for pruned variants
+        early_stopping_rounds: Rounds without improvement before stopping
+        
+    Returns:
+        Dictionary mapping variant name to (model, feature names)
+    """
+    params = model.get_params()
+    features = list(X_train.columns)
+    n_estimators = params.get('n_estimators') or 100
+    full_depth = params.get('max_depth') or 6
+    variants = {}
+    
+    def fit_variant(name: str, overrides: Dict[str, Any], columns: List[str]) -> None:
+        variant_params = dict(params)
+        variant_params.update(overrides)
+        variant = xgb.XGBClassifier(**variant_params)
+        variant.fit(X_train[columns], y_train, sample_weight=sample_weights, verbose=False)
+        variants[name] = (variant, columns)
+        logger.info(f"Trained compact variant '{name}' with {overrides or 'no overrides'} "
+                    f"on {len(columns)} features")
+    
+    # Find the tree count early stopping settles on, then refit with exactly that many
+    # trees so the saved booster does not carry the unused ones
+    try:
+        probe_params = dict(params)
+        probe_params.update({'early_stopping_rounds': early_stopping_rounds,
+                             'eval_metric': params.get('eval_metric') or 'mlogloss'})
+        probe = xgb.XGBClassifier(**probe_params)
+        probe.fit(X_train, y_train, sample_weight=sample_weights,
+                  eval_set=[(X_val, y_val)], verbose=False)
+        best_trees = int(probe.best_iteration) + 1
+        if best_trees < n_estimators:
+            fit_variant('early_stopped', {'n_estimators': best_trees}, features)
+        else:
+            logger.info("Early stopping used all trees, skipping the early_stopped variant")
+    except Exception as e:
+        logger.warning(f"Could not build early_stopped variant: {str(e)}")
+    
+    for depth in depth_caps:
+        if depth < full_depth:
+            fit_variant(f'depth{depth}', {'max_depth': depth}, features)
+    
+    importance_order = np.argsort(model.feature_importances_)[::-1]
+    for fraction in feature_fractions:
+        top_k = max(1, int(round(len(features) * fraction)))
+        if top_k < len(features):
+            top_features = [features[i] for i in importance_order[:top_k]]
+            fit_variant(f'top{top_k}', {}, top_features)
+    
+    return variants
+
+def save_compact_variants(model: xgb.XGBClassifier, stem: str, metadata: Dict[str, Any],
+                          X_train: pd.DataFrame, y_train: np.ndarray,
+                          sample_weights: Optional[np.ndarray] = None,
+                          X_val: Optional[pd.DataFrame] = None, y_val: Optional[np.ndarray] = None,
+                          X_test: Optional[pd.DataFrame] = None, y_test: Optional[np.ndarray] = None,
+                          validation_fraction: float = 0.2,
+                          model_dir: str = 'models', **variant_options) -> Dict[str, Any]:
+    """
+    Build compact variants of a trained model, save them next to it and write the
+    latency/accuracy trade-off table (<stem>_variants.json)
+    
+    Each variant is saved as <stem>_<variant> with the full model's metadata and
+    its own feature list, so it can be loaded like any other model.
+    
+    Early stopping and the 'accuracy' of the table (which variant selection uses)
+    come from a validation split of the training data: the variants, and a
+    reference copy of the full model, are trained on the rest of it. The test set
+    only adds 'test_accuracy' and 'test_f1_score' to the table for reporting.
+    
+    Args:
+        model: Trained full model (already saved as <stem>)
+        stem: Name stem of the full model (e.g. 'xgboost_btcusdt_balanced')
+        metadata: Metadata of the full model
+        X_train: Training features
+        y_train: Training labels
+        sample_weights: Sample weights for training
+        X_val: Validation features, split off X_train when not given
+        y_val: Validation labels
+        X_test: Test features, only reported
+        y_test: Test labels
+        validation_fraction: Fraction of the training data to validate on
+        model_dir: Directory to save the variants in
+        **variant_options: Passed on to build_compact_variants
+        
+    Returns:
+        The trade-off table
+    """
+    from model_artifacts import save_artifact, save_variant_table
+    
+    if not isinstance(X_train, pd.DataFrame):
+        X_train = pd.DataFrame(X_train, columns=metadata.get('features'))
+    y_train = np.asarray(y_train)
+    
+    if X_val is None:
+        split = train_test_split(
+            X_train, y_train, *([sample_weights] if sample_weights is not None else []),
+            test_size=validation_fraction, random_state=42, stratify=y_train)
+        X_fit, X_val, y_fit, y_val = split[:4]
+        fit_weights = split[4] if sample_weights is not None else None
+    else:
+        X_fit, y_fit, fit_weights = X_train, y_train, sample_weights
+        if not isinstance(X_val, pd.DataFrame):
+            X_val = pd.DataFrame(X_val, columns=X_train.columns)
+    if X_test is not None and not isinstance(X_test, pd.DataFrame):
+        X_test = pd.DataFrame(X_test, columns=X_train.columns)
+    
+    def describe(variant_model: xgb.XGBClassifier, columns: List[str],
+                 test_model: Optional[xgb.XGBClassifier] = None) -> Dict[str, Any]:
+        X_eval = X_val[columns]
+        y_pred = variant_model.predict(X_eval)
+        variant_params = variant_model.get_params()
+        entry = {
+            'accuracy': float(accuracy_score(y_val, y_pred)),
+            'f1_score': float(f1_score(y_val, y_pred, average='weighted')),
+            'n_estimators': int(variant_params.get('n_estimators') or 0),
+            'max_depth': int(variant_params.get('max_depth') or 0),
+            'feature_count': len(columns)
+        }
+        if X_test is not None and y_test is not None:
+            y_test_pred = (test_model or variant_model).predict(X_test[columns])
+            entry['test_accuracy'] = float(accuracy_score(y_test, y_test_pred))
+            entry['test_f1_score'] = float(f1_score(y_test, y_test_pred, average='weighted'))
+        entry.update(measure_inference_latency(test_model or variant_model, X_eval))
+        return entry
+    
+    # The served model has seen the validation rows, so validate a copy trained
+    # without them; the test metrics and latency are those of the served model
+    reference = xgb.XGBClassifier(**model.get_params())
+    reference.fit(X_fit, y_fit, sample_weight=fit_weights, verbose=False)
+    features = list(X_train.columns)
+    variants = {'full': describe(reference, features, test_model=model)}
+    variants['full']['stem'] = stem
+    
+    for name, (variant_model, columns) in build_compact_variants(
+            reference, X_fit, y_fit, X_val, y_val, fit_weights, **variant_options).items():
+        variant_stem = f'{stem}_{name}'
+        entry = describe(variant_model, columns)
+        entry['stem'] = variant_stem
+        
+        variant_metadata = dict(metadata)
+        variant_metadata.update({
+            'features': columns,
+            'feature_count': len(columns),
+            'params': {k: v for k, v in variant_model.get_params().items()
+                       if isinstance(v, (int, float, str, bool, type(None)))},
+            'variant': name,
+            'variant_of': stem,
+            'variant_metrics': entry
+        })
+        save_artifact(variant_model, variant_stem, variant_metadata, model_dir=model_dir)
+        variants[name] = entry
+    
+    for name, entry in variants.items():
+        logger.info(f"Variant {name}: validation accuracy {entry['accuracy']:.4f}, "
+                    f"single row {entry['single_row_ms']:.3f} ms, batch {entry['batch_row_us']:.2f} us/row")
+    
+    table = {
+        'stem': stem,
+        'created_at': datetime.now().isoformat(),
+        'validation_samples': int(len(y_val)),
+        'test_samples': int(len(y_test)) if y_test is not None else 0,
+        'variants': variants
+    }
+    save_variant_table(stem, table, model_dir)
+    return table
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Optimization Checkpoints
+
+This module persists the progress of the XGBoost hyperparameter searches so a run
+that is cancelled or interrupted can continue where it stopped. It handles:
+
+1. Appending every finished trial (params, fold scores, timing) to a trial log
+2. Keeping a small run state (status, configuration fingerprint, tuning run ID)
+3. Storing the search state that is not a plain list of trials, such as the
+   hyperopt Trials object and its random generator
+4. Listing the checkpoints of a model directory for the API
+
+A checkpoint for <symbol>_<timeframe>_<method> consists of:
+- <name>_state.json: run state, written atomically
+- <name>_trials.jsonl: one JSON line per finished trial, appended as trials finish
+- <name>_search.pkl: optional pickled search state, written atomically
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger('optimization_checkpoint')
+
+
+class OptimizationCancelled(Exception):
+    """Raised inside a search when its run has been cancelled"""
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    """
+    Hash a search configuration so a checkpoint is only resumed by the same search
+
+    Args:
+        config: JSON-serializable description of the search (space, budget, data shape)
+
+    Returns:
+        Hex digest of the configuration
+    """
+    encoded = json.dumps(config, sort_keys=True, default=_json_default).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _json_default(value: Any) -> Any:
+    """Convert NumPy scalars and arrays (e.g. sampled parameters) to JSON types"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    """Write a JSON file through a temporary file so readers never see a partial write"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, default=_json_default)
+    os.replace(tmp_path, path)
+
+
+class OptimizationCheckpoint:
+    """
+    Checkpoint of one optimization method run for a symbol and timeframe
+    """
+
+    def __init__(self, checkpoint_dir: str, symbol: str, timeframe: str, method: str):
+        """
+        Initialize the checkpoint
+
+        Args:
+            checkpoint_dir: Directory holding the checkpoint files
+            symbol: Trading pair symbol (e.g., 'btcusdt')
+            timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
+            method: Optimization method ('grid_search', 'random_search', 'bayesian', 'hyperband')
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.method = method
+        self.name = f"{symbol}_{timeframe}_{method}"
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.state_path = os.path.join(checkpoint_dir, f"{self.name}_state.json")
+        self.trials_path = os.path.join(checkpoint_dir, f"{self.name}_trials.jsonl")
+        self.search_state_path = os.path.join(checkpoint_dir, f"{self.name}_search.pkl")
+
+        self.state: Dict[str, Any] = {}
+
+    def load_state(self) -> Optional[Dict[str, Any]]:
+        """Load the run state, or None if there is no checkpoint"""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading checkpoint state {self.state_path}: {e}")
+            return None
+
+    def load_trials(self) -> List[Dict[str, Any]]:
+        """
+        Load the finished trials
+
+        A line cut short by a crash is skipped, so the trial is simply run again.
+
+        Returns:
+            List of trial results in the order they finished
+        """
+        trials = []
+        if not os.path.exists(self.trials_path):
+            return trials
+        with open(self.trials_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    trials.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping incomplete trial record in {self.trials_path}")
+        return trials
+
+    def start(self, config: Dict[str, Any], resume: bool = False,
+              tuning_run_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Start a run, continuing from the existing checkpoint if requested
+
+        A checkpoint is only continued when it was written by a search with the same
+        configuration; otherwise it is discarded and the run starts from zero.
+
+        Args:
+            config: JSON-serializable description of the search
+            resume: Whether to continue from an existing checkpoint
+            tuning_run_id: Tuning run ID of the API record for this run
+
+        Returns:
+            Trials already finished by the checkpointed run (empty for a fresh start)
+        """
+        fingerprint = config_fingerprint(config)
+        previous = self.load_state() if resume else None
+
+        if previous and previous.get('fingerprint') == fingerprint:
+            trials = self.load_trials()
+            self.state = {
+                **previous,
+                'status': 'running',
+                'resumed_at': datetime.now().isoformat(),
+                'resume_count': previous.get('resume_count', 0) + 1,
+                'updated_at': datetime.now().isoformat()
+            }
+            _write_json_atomic(self.state_path, self.state)
+            logger.info(f"Resuming {self.name} from checkpoint with {len(trials)} finished trials")
+            return trials
+
+        if previous:
+            logger.warning(f"Checkpoint {self.name} was written by a different search configuration, starting over")
+
+        self.clear()
+        self.state = {
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'method': self.method,
+            'status': 'running',
+            'fingerprint': fingerprint,
+            'config': config,
+            'tuning_run_id': tuning_run_id,
+            'trials_completed': 0,
+            'resume_count': 0,
+            'started_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+        _write_json_atomic(self.state_path, self.state)
+        return []
+
+    def record_trial(self, result: Dict[str, Any]) -> None:
+        """
+        Persist a finished trial
+
+        Args:
+            result: Trial result (params, accuracy, fold scores, fit seconds, ...)
+        """
+        record = {**result, 'finished_at': datetime.now().isoformat()}
+        with open(self.trials_path, 'a') as f:
+            f.write(json.dumps(record, default=_json_default) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.state['trials_completed'] = self.state.get('trials_completed', 0) + 1
+        self.state['updated_at'] = record['finished_at']
+
+    def update(self, **fields: Any) -> None:
+        """Update fields of the run state"""
+        self.state.update(fields)
+        self.state['updated_at'] = datetime.now().isoformat()
+        _write_json_atomic(self.state_path, self.state)
+
+    def save_search_state(self, search_state: Any) -> None:
+        """
+        Persist search state that is not a list of trials (e.g. hyperopt Trials)
+
+        Args:
+            search_state: Picklable object
+        """
+        tmp_path = f'{self.search_state_path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(search_state, f)
+        os.replace(tmp_path, self.search_state_path)
+        self.update()
+
+    def load_search_state(self) -> Optional[Any]:
+        """Load the search state, or None if none was saved"""
+        if not os.path.exists(self.search_state_path):
+            return None
+        try:
+            with open(self.search_state_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error reading search state {self.search_state_path}: {e}")
+            return None
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """
+        Mark the run as finished
+
+        Args:
+            status: Final status ('completed', 'cancelled' or 'failed')
+            error: Error message for failed runs
+        """
+        fields = {'status': status, 'finished_at': datetime.now().isoformat()}
+        if error:
+            fields['error'] = error
+        self.update(**fields)
+
+    def clear(self) -> None:
+        """Remove the checkpoint files"""
+        for path in (self.state_path, self.trials_path, self.search_state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_checkpoints(checkpoint_dir: str) -> List[Dict[str, Any]]:
+    """
+    List the run states of all checkpoints in a directory
+
+    Args:
+        checkpoint_dir: Directory holding the checkpoint files
+
+    Returns:
+        List of run states, most recently updated first
+    """
+    states = []
+    if not os.path.exists(checkpoint_dir):
+        return states
+    for filename in os.listdir(checkpoint_dir):
+        if not filename.endswith('_state.json'):
+            continue
+        try:
+            with open(os.path.join(checkpoint_dir, filename), 'r') as f:
+                state = json.load(f)
+            state.pop('config', None)
+            states.append(state)
+        except Exception as e:
+            logger.error(f"Error reading checkpoint {filename}: {e}")
+    states.sort(key=lambda state: state.get('updated_at', ''), reverse=True)
+    return states
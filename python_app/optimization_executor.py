@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Parallel Cross-Validation Executor
+
+This module runs the (trial, fold) fits of the XGBoost hyperparameter searches in a
+pool of worker processes. It handles:
+
+1. Shipping the training data and fold indices to each worker once
+2. Building each fold's quantized (QuantileDMatrix) training matrix once per worker
+   and reusing it for every candidate
+3. Splitting the CPU cores between workers so fits do not oversubscribe them
+4. Running every fold of every candidate as an independent task
+5. Streaming each candidate's result back as soon as its last fold finishes
+
+With a single worker the fits run in the calling process, so small searches and
+machines with one core do not pay for starting a pool.
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple, Any, Optional, Callable, Hashable
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+
+logger = logging.getLogger('optimization_executor')
+
+# Per-process state of a worker (set by _init_worker)
+_worker_state: Dict[str, Any] = {}
+
+
+def _set_worker_state(X: np.ndarray, y: np.ndarray, sample_weights: Optional[np.ndarray],
+                      folds: List[Tuple[np.ndarray, np.ndarray]], threads_per_fit: int) -> None:
+    """Point the worker state at a training set and clear its matrix cache"""
+    _worker_state.clear()
+    _worker_state.update({
+        'X': X,
+        'y': y,
+        'sample_weights': sample_weights,
+        'folds': folds,
+        'threads_per_fit': threads_per_fit,
+        'matrices': {}
+    })
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, sample_weights: Optional[np.ndarray],
+                 folds: List[Tuple[np.ndarray, np.ndarray]], threads_per_fit: int) -> None:
+    """
+    Initialise a worker process with the training data and fold indices
+
+    Args:
+        X: Training features
+        y: Training labels
+        sample_weights: Sample weights (or None)
+        folds: List of (train_idx, val_idx) pairs
+        threads_per_fit: Number of threads each fit may use
+    """
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_fit)
+    _set_worker_state(X, y, sample_weights, folds, threads_per_fit)
+
+
+def _budget_subset(train_idx: np.ndarray, fold_idx: int, data_fraction: float) -> np.ndarray:
+    """
+    Get the training rows used for a reduced data budget
+
+    The subset only depends on the fold and the fraction, so all candidates
+    evaluated at the same budget see the same rows.
+
+    Args:
+        train_idx: Training rows of the fold
+        fold_idx: Index of the fold
+        data_fraction: Fraction of the training rows to keep
+
+    Returns:
+        Sorted array of training rows
+    """
+    if data_fraction >= 1.0:
+        return train_idx
+    size = max(1, int(len(train_idx) * data_fraction))
+    rng = np.random.default_rng(fold_idx)
+    return np.sort(rng.choice(train_idx, size=size, replace=False))
+
+
+def _get_fold_matrices(fold_idx: int, data_fraction: float, max_bin: int) -> Tuple[Any, Any, np.ndarray, float]:
+    """
+    Get the quantized training and validation matrices of a fold
+
+    The histogram cuts only depend on the data and max_bin, not on the candidate,
+    so they are built once per fold and budget and reused by every candidate.
+
+    Args:
+        fold_idx: Index of the fold
+        data_fraction: Fraction of the fold's training rows to train on
+        max_bin: Number of histogram bins
+
+    Returns:
+        Tuple of (training matrix, validation matrix, validation labels, build seconds
+        or 0.0 if the matrices came from the cache)
+    """
+    import xgboost as xgb
+
+    key = (fold_idx, round(data_fraction, 6), max_bin)
+    cached = _worker_state['matrices'].get(key)
+    if cached is not None:
+        return cached[0], cached[1], cached[2], 0.0
+
+    X, y = _worker_state['X'], _worker_state['y']
+    sample_weights = _worker_state['sample_weights']
+    train_idx, val_idx = _worker_state['folds'][fold_idx]
+    train_idx = _budget_subset(train_idx, fold_idx, data_fraction)
+
+    start_time = time.time()
+    dtrain = xgb.QuantileDMatrix(
+        X[train_idx], label=y[train_idx],
+        weight=sample_weights[train_idx] if sample_weights is not None else None,
+        max_bin=max_bin, nthread=_worker_state['threads_per_fit']
+    )
+    dval = xgb.QuantileDMatrix(X[val_idx], ref=dtrain, nthread=_worker_state['threads_per_fit'])
+    build_seconds = time.time() - start_time
+
+    _worker_state['matrices'][key] = (dtrain, dval, y[val_idx])
+    return dtrain, dval, y[val_idx], build_seconds
+
+
+def _booster_params(params: Dict[str, Any], threads: int) -> Tuple[Dict[str, Any], int]:
+    """
+    Convert XGBClassifier parameters to xgb.train parameters
+
+    Args:
+        params: XGBClassifier parameters
+        threads: Number of threads for the fit
+
+    Returns:
+        Tuple of (booster parameters, number of boosting rounds)
+    """
+    booster_params = {k: v for k, v in params.items()
+                      if k not in ('n_estimators', 'use_label_encoder', 'n_jobs', 'early_stopping_rounds')}
+    booster_params['nthread'] = threads
+    booster_params.setdefault('tree_method', 'hist')
+    return booster_params, int(params.get('n_estimators') or 100)
+
+
+def _fit_fold(trial_id: Hashable, fold_idx: int, params: Dict[str, Any],
+              data_fraction: float = 1.0) -> Tuple[Hashable, int, float, float, float]:
+    """
+    Train on one fold and score the held-out part
+
+    Args:
+        trial_id: Identifier of the candidate
+        fold_idx: Index of the fold
+        params: Full XGBoost parameters
+        data_fraction: Fraction of the fold's training rows to train on
+
+    Returns:
+        Tuple of (trial_id, fold_idx, accuracy, fit seconds, matrix build seconds)
+    """
+    import xgboost as xgb
+
+    dtrain, dval, y_val, build_seconds = _get_fold_matrices(
+        fold_idx, data_fraction, int(params.get('max_bin') or 256))
+    booster_params, num_rounds = _booster_params(params, _worker_state['threads_per_fit'])
+
+    start_time = time.time()
+    booster = xgb.train(booster_params, dtrain, num_boost_round=num_rounds)
+    predictions = booster.predict(dval)
+    if predictions.ndim > 1:
+        predictions = predictions.argmax(axis=1)
+    accuracy = accuracy_score(y_val, predictions.astype(int))
+
+    return trial_id, fold_idx, float(accuracy), time.time() - start_time, build_seconds
+
+
+class ParallelCVExecutor:
+    """
+    Evaluates hyperparameter candidates with cross-validation across worker processes
+    """
+
+    def __init__(self,
+                 X: np.ndarray,
+                 y: np.ndarray,
+                 sample_weights: Optional[np.ndarray],
+                 folds: List[Tuple[np.ndarray, np.ndarray]],
+                 n_workers: Optional[int] = None,
+                 threads_per_fit: Optional[int] = None):
+        """
+        Initialize the executor
+
+        Args:
+            X: Training features
+            y: Training labels
+            sample_weights: Sample weights (or None)
+            folds: List of (train_idx, val_idx) pairs
+            n_workers: Number of worker processes (default: one per CPU core)
+            threads_per_fit: Threads per fit (default: the cores divided between the workers)
+        """
+        # Inside a scheduled job only the job's reserved cores are used (see job_scheduler)
+        cpu_count = int(os.environ.get('JOB_CPU_SLOTS') or 0) or os.cpu_count() or 1
+        self.n_workers = max(1, n_workers or cpu_count)
+        self.threads_per_fit = max(1, threads_per_fit or cpu_count // self.n_workers)
+
+        self.X = X
+        self.y = y
+        self.sample_weights = sample_weights
+        self.folds = folds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_process_ready = False
+
+        # Quantized matrix cache statistics
+        self.stats = {
+            'matrix_builds': 0,
+            'matrix_reuses': 0,
+            'matrix_build_seconds': 0.0
+        }
+
+    def __enter__(self) -> 'ParallelCVExecutor':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def start(self) -> None:
+        """Start the worker processes (or prepare in-process execution for one worker)"""
+        if self.n_workers == 1:
+            if not self._in_process_ready:
+                _set_worker_state(self.X, self.y, self.sample_weights, self.folds, self.threads_per_fit)
+                self._in_process_ready = True
+            return
+        if self._executor is None:
+            init_args = (self.X, self.y, self.sample_weights, self.folds, self.threads_per_fit)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=context,
+                                                 initializer=_init_worker, initargs=init_args)
+            logger.info(f"Started {self.n_workers} CV workers with {self.threads_per_fit} threads per fit")
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._in_process_ready:
+            _worker_state.clear()
+            self._in_process_ready = False
+        if self.stats['matrix_builds']:
+            summary = self.get_matrix_cache_summary()
+            logger.info(f"Quantized matrices built {summary['matrix_builds']} times and reused "
+                        f"{summary['matrix_reuses']} times, saving about "
+                        f"{summary['estimated_setup_seconds_saved']:.1f}s of setup")
+
+    def get_matrix_cache_summary(self) -> Dict[str, Any]:
+        """
+        Get statistics of the quantized matrix cache
+
+        The saved time is estimated as the average build time times the number of
+        fits that reused a cached matrix instead of building their own.
+
+        Returns:
+            Dictionary with builds, reuses, build seconds and estimated seconds saved
+        """
+        builds = self.stats['matrix_builds']
+        average_build = self.stats['matrix_build_seconds'] / builds if builds else 0.0
+        return {
+            **self.stats,
+            'estimated_setup_seconds_saved': average_build * self.stats['matrix_reuses']
+        }
+
+    def evaluate(self,
+                 candidates: List[Tuple[Hashable, Dict[str, Any]]],
+                 callback: Optional[Callable[[Hashable, Dict[str, Any]], None]] = None,
+                 data_fraction: float = 1.0) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Cross-validate candidates, running all (candidate, fold) fits concurrently
+
+        Args:
+            candidates: List of (trial_id, full XGBoost parameters)
+            callback: Called with (trial_id, result) as soon as a candidate's folds are done
+            data_fraction: Fraction of each fold's training rows to train on
+
+        Returns:
+            Dictionary mapping trial_id to a result with 'accuracy', 'fold_scores' and 'fit_seconds'
+        """
+        n_folds = len(self.folds)
+        fold_scores: Dict[Hashable, List[Optional[float]]] = {trial_id: [None] * n_folds for trial_id, _ in candidates}
+        fit_seconds: Dict[Hashable, float] = {trial_id: 0.0 for trial_id, _ in candidates}
+        results: Dict[Hashable, Dict[str, Any]] = {}
+
+        def record(trial_id: Hashable, fold_idx: int, accuracy: float, seconds: float,
+                   build_seconds: float) -> None:
+            if build_seconds > 0:
+                self.stats['matrix_builds'] += 1
+                self.stats['matrix_build_seconds'] += build_seconds
+            else:
+                self.stats['matrix_reuses'] += 1
+            fold_scores[trial_id][fold_idx] = accuracy
+            fit_seconds[trial_id] += seconds
+            if all(score is not None for score in fold_scores[trial_id]):
+                results[trial_id] = {
+                    'accuracy': float(np.mean(fold_scores[trial_id])),
+                    'fold_scores': list(fold_scores[trial_id]),
+                    'fit_seconds': fit_seconds[trial_id]
+                }
+                if callback is not None:
+                    callback(trial_id, results[trial_id])
+
+        tasks = [(trial_id, fold_idx, params, data_fraction)
+                 for trial_id, params in candidates for fold_idx in range(n_folds)]
+
+        if self.n_workers == 1:
+            # Run in this process; the worker state just points at our own data
+            self.start()
+            for task in tasks:
+                record(*_fit_fold(*task))
+            return results
+
+        self.start()
+
+        futures = [self._executor.submit(_fit_fold, *task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                record(*future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return results
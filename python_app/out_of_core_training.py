@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Out-of-Core Training
+
+This module trains XGBoost models on feature data that does not fit in memory. It handles:
+
+1. Reading feature partitions (CSV files, or paired X/y CSV files) chunk by chunk
+2. Streaming the chunks through an xgboost DataIter into an external-memory
+   quantized matrix (ExtMemQuantileDMatrix), so only one chunk is held at a time
+3. Balancing the classes with sample weights computed from streamed label counts
+   instead of materialized oversampling (SMOTE copies the whole training set)
+4. Evaluating on test partitions chunk by chunk
+5. Estimating whether a data set fits in memory and reporting the peak RSS of training
+
+A partition is a (features_path, labels_path) pair. With labels_path None the
+features file itself holds the label column.
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+import resource
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Tuple, Any, Optional, Iterator
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import (accuracy_score, precision_score, recall_score, f1_score,
+                             confusion_matrix, classification_report)
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+logger = logging.getLogger('out_of_core_training')
+
+# Partition: (features CSV, labels CSV or None when the features CSV has the label column)
+Partition = Tuple[str, Optional[str]]
+
+# Rough in-memory size of a numeric CSV relative to its size on disk (parsed
+# DataFrame plus the float copy handed to xgboost)
+CSV_MEMORY_FACTOR = 2.0
+
+DEFAULT_PARAMS = {
+    'objective': 'multi:softmax',
+    'eval_metric': 'mlogloss',
+    'learning_rate': 0.05,
+    'max_depth': 6,
+    'min_child_weight': 2,
+    'gamma': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'n_estimators': 200,
+    'seed': 42
+}
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Get the peak resident set size of this process
+
+    Returns:
+        Peak RSS in megabytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def get_available_memory_mb() -> Optional[float]:
+    """
+    Get the memory available to new allocations
+
+    Returns:
+        Available memory in megabytes, or None if it cannot be determined
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimate_memory_mb(partitions: List[Partition], copies: float = 1.0) -> float:
+    """
+    Estimate the memory needed to load partitions fully
+
+    Args:
+        partitions: Feature partitions
+        copies: Number of in-memory copies of the data (e.g. 2 or more with oversampling)
+
+    Returns:
+        Estimated memory in megabytes
+    """
+    size = sum(os.path.getsize(path) for partition in partitions for path in partition if path)
+    return size * CSV_MEMORY_FACTOR * copies / (1024 * 1024)
+
+
+def memory_is_tight(partitions: List[Partition], copies: float = 1.0, headroom: float = 0.5) -> bool:
+    """
+    Check whether loading partitions fully would use too much of the available memory
+
+    Args:
+        partitions: Feature partitions
+        copies: Number of in-memory copies of the data
+        headroom: Fraction of the available memory training may use
+
+    Returns:
+        True if the data should be streamed instead of loaded
+    """
+    available = get_available_memory_mb()
+    if available is None:
+        return False
+    needed = estimate_memory_mb(partitions, copies)
+    logger.info(f"Estimated {needed:.0f} MB to load the data in memory, {available:.0f} MB available")
+    return needed > available * headroom
+
+
+def discover_partitions(partitions_dir: str, pattern: str = '*.csv') -> List[Partition]:
+    """
+    List the partition files of a directory in name order (i.e. time order for
+    date-stamped partitions)
+
+    Args:
+        partitions_dir: Directory of partition CSV files with a label column
+        pattern: Glob pattern of the partition files
+
+    Returns:
+        List of partitions
+    """
+    paths = sorted(glob.glob(os.path.join(partitions_dir, pattern)))
+    if not paths:
+        raise FileNotFoundError(f"No partitions matching {pattern} in {partitions_dir}")
+    return [(path, None) for path in paths]
+
+
+def iter_chunks(partitions: List[Partition], chunk_rows: int,
+                target_column: str = 'target') -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+    """
+    Read partitions chunk by chunk
+
+    Infinite values are turned into NaN, which XGBoost treats as missing.
+
+    Args:
+        partitions: Feature partitions
+        chunk_rows: Rows per chunk
+        target_column: Name of the label column
+
+    Yields:
+        Tuples of (feature DataFrame, label array)
+    """
+    for features_path, labels_path in partitions:
+        if labels_path:
+            feature_reader = pd.read_csv(features_path, chunksize=chunk_rows)
+            label_reader = pd.read_csv(labels_path, chunksize=chunk_rows)
+            for X, labels in zip(feature_reader, label_reader):
+                yield X.replace([np.inf, -np.inf], np.nan), labels[target_column].values.astype(int)
+        else:
+            for chunk in pd.read_csv(features_path, chunksize=chunk_rows):
+                y = chunk.pop(target_column).values.astype(int)
+                X = chunk.select_dtypes(include=[np.number])
+                yield X.replace([np.inf, -np.inf], np.nan), y
+
+
+def scan_partitions(partitions: List[Partition], chunk_rows: int,
+                    target_column: str = 'target') -> Dict[str, Any]:
+    """
+    Stream through partitions once to count rows and labels
+
+    Args:
+        partitions: Feature partitions
+        chunk_rows: Rows per chunk
+        target_column: Name of the label column
+
+    Returns:
+        Dictionary with 'rows', 'chunks', 'class_counts' and 'feature_names'
+    """
+    class_counts = np.zeros(0, dtype=np.int64)
+    rows, chunks, feature_names = 0, 0, None
+    for X, y in iter_chunks(partitions, chunk_rows, target_column):
+        if feature_names is None:
+            feature_names = X.columns.tolist()
+        counts = np.bincount(y)
+        if len(counts) > len(class_counts):
+            class_counts = np.pad(class_counts, (0, len(counts) - len(class_counts)))
+        class_counts[:len(counts)] += counts
+        rows += len(y)
+        chunks += 1
+    return {'rows': rows, 'chunks': chunks, 'class_counts': class_counts.tolist(), 'feature_names': feature_names}
+
+
+def class_weights_from_counts(class_counts: List[int]) -> Dict[int, float]:
+    """
+    Compute balanced class weights (total / (classes * count)) from label counts
+
+    Args:
+        class_counts: Number of rows of each class
+
+    Returns:
+        Dictionary mapping class labels to weights
+    """
+    total = sum(class_counts)
+    present = [count for count in class_counts if count > 0]
+    return {label: total / (len(present) * count) if count > 0 else 0.0
+            for label, count in enumerate(class_counts)}
+
+
+class FeatureChunkIterator(xgb.DataIter):
+    """
+    xgboost data iterator over feature partitions, one chunk per batch
+    """
+
+    def __init__(self, partitions: List[Partition], chunk_rows: int = 100000,
+                 class_weights: Optional[Dict[int, float]] = None, target_column: str = 'target',
+                 cache_prefix: Optional[str] = None):
+        """
+        Initialize the iterator
+
+        Args:
+            partitions: Feature partitions
+            chunk_rows: Rows per chunk
+            class_weights: Class weights turned into per-row sample weights (or None)
+            target_column: Name of the label column
+            cache_prefix: Path prefix of xgboost's external-memory cache files
+        """
+        self.partitions = partitions
+        self.chunk_rows = chunk_rows
+        self.class_weights = class_weights
+        self.target_column = target_column
+        # Weight of each class label, indexed by label to weight a chunk at once
+        self._label_weights = None
+        if class_weights:
+            self._label_weights = np.zeros(max(class_weights) + 1, dtype=np.float32)
+            for label, class_weight in class_weights.items():
+                self._label_weights[label] = class_weight
+        self._chunks: Optional[Iterator[Tuple[pd.DataFrame, np.ndarray]]] = None
+        super().__init__(cache_prefix=cache_prefix, release_data=True)
+
+    def next(self, input_data) -> bool:
+        """Pass the next chunk to xgboost; returns False when all chunks have been read"""
+        if self._chunks is None:
+            self._chunks = iter_chunks(self.partitions, self.chunk_rows, self.target_column)
+        try:
+            X, y = next(self._chunks)
+        except StopIteration:
+            return False
+        weight = None
+        if self._label_weights is not None:
+            weight = self._label_weights[y]
+        input_data(data=X.values.astype(np.float32), label=y, weight=weight,
+                   feature_names=X.columns.tolist())
+        return True
+
+    def reset(self) -> None:
+        """Start again from the first chunk"""
+        self._chunks = None
+
+
+def train_out_of_core(train_partitions: List[Partition],
+                      test_partitions: Optional[List[Partition]] = None,
+                      params: Optional[Dict[str, Any]] = None,
+                      chunk_rows: int = 100000,
+                      use_class_weights: bool = True,
+                      cache_dir: Optional[str] = None,
+                      target_column: str = 'target') -> Tuple[xgb.XGBClassifier, Dict[str, Any]]:
+    """
+    Train an XGBoost model by streaming feature partitions through external memory
+
+    Args:
+        train_partitions: Training partitions
+        test_partitions: Test partitions (evaluated chunk by chunk), or None
+        params: XGBClassifier-style parameters (default: the balanced training defaults)
+        chunk_rows: Rows per chunk
+        use_class_weights: Whether to balance the classes with sample weights
+        cache_dir: Directory of the external-memory cache (default: a temporary directory)
+        target_column: Name of the label column
+
+    Returns:
+        Tuple of (trained model, report with data statistics, class weights, timings,
+        test evaluation and peak RSS)
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    start_time = time.time()
+
+    scan = scan_partitions(train_partitions, chunk_rows, target_column)
+    if not scan['rows']:
+        raise ValueError("Training partitions contain no rows")
+    class_weights = class_weights_from_counts(scan['class_counts']) if use_class_weights else None
+    logger.info(f"Streaming {scan['rows']} training rows in {scan['chunks']} chunks, "
+                f"class counts {scan['class_counts']}")
+
+    booster_params = {k: v for k, v in params.items()
+                      if k not in ('n_estimators', 'use_label_encoder', 'n_jobs', 'early_stopping_rounds')}
+    booster_params['num_class'] = len(scan['class_counts'])
+    booster_params['tree_method'] = 'hist'
+    num_rounds = int(params.get('n_estimators') or 100)
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp_dir:
+        iterator = FeatureChunkIterator(train_partitions, chunk_rows, class_weights, target_column,
+                                        cache_prefix=os.path.join(tmp_dir, 'cache'))
+        dtrain = xgb.ExtMemQuantileDMatrix(iterator, max_bin=int(params.get('max_bin') or 256))
+        train_start = time.time()
+        booster = xgb.train(booster_params, dtrain, num_boost_round=num_rounds)
+        train_seconds = time.time() - train_start
+        del dtrain
+
+    # Same in-memory model as a regular fit, so the usual save/predict code applies
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(booster.save_raw(raw_format='json')))
+
+    report = {
+        'rows': scan['rows'],
+        'chunks': scan['chunks'],
+        'chunk_rows': chunk_rows,
+        'class_counts': scan['class_counts'],
+        'class_weights': class_weights,
+        'feature_names': scan['feature_names'],
+        'params': params,
+        'train_seconds': train_seconds,
+        'evaluation': evaluate_out_of_core(model, test_partitions, chunk_rows, target_column) if test_partitions else None,
+        'wall_clock_seconds': time.time() - start_time,
+        'peak_rss_mb': get_peak_rss_mb(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+    logger.info(f"Out-of-core training finished in {report['wall_clock_seconds']:.1f}s "
+                f"(peak RSS {report['peak_rss_mb']:.0f} MB)")
+    return model, report
+
+
+def evaluate_out_of_core(model: xgb.XGBClassifier, test_partitions: List[Partition], chunk_rows: int = 100000,
+                         target_column: str = 'target') -> Dict[str, Any]:
+    """
+    Evaluate a model on test partitions, predicting chunk by chunk
+
+    Args:
+        model: Trained model
+        test_partitions: Test partitions
+        chunk_rows: Rows per chunk
+        target_column: Name of the label column
+
+    Returns:
+        Dictionary with accuracy, weighted precision/recall/F1, confusion matrix and
+        classification report
+    """
+    booster = model.get_booster()
+    y_true, y_pred = [], []
+    for X, y in iter_chunks(test_partitions, chunk_rows, target_column):
+        predictions = booster.predict(xgb.DMatrix(X.astype(np.float32)))
+        if predictions.ndim > 1:
+            predictions = predictions.argmax(axis=1)
+        y_true.append(y)
+        y_pred.append(predictions.astype(int))
+
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    return {
+        'accuracy': float(accuracy_score(y_true, y_pred)),
+        'precision': float(precision_score(y_true, y_pred, average='weighted', zero_division=0)),
+        'recall': float(recall_score(y_true, y_pred, average='weighted', zero_division=0)),
+        'f1_score': float(f1_score(y_true, y_pred, average='weighted', zero_division=0)),
+        'confusion_matrix': confusion_matrix(y_true, y_pred).tolist(),
+        'classification_report': classification_report(y_true, y_pred, output_dict=True, zero_division=0),
+        'test_samples': int(len(y_true))
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model_utils import save_model
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Out-of-core XGBoost training over partitioned feature data")
+    parser.add_argument('--symbol', type=str, required=True, help="Trading pair symbol (e.g., 'btcusdt')")
+    parser.add_argument('--timeframe', type=str, required=True, help="Timeframe (e.g., '1m', '1h')")
+    parser.add_argument('--partitions-dir', type=str, required=True,
+                        help="Directory of time-ordered partition CSVs with a 'target' column")
+    parser.add_argument('--test-partitions', type=int, default=1,
+                        help="Number of newest partitions held out for evaluation")
+    parser.add_argument('--chunk-rows', type=int, default=100000, help="Rows per streamed chunk")
+    parser.add_argument('--model-dir', type=str, default='models', help="Directory to save the model")
+    parser.add_argument('--cache-dir', type=str, default=None, help="Directory of the external-memory cache")
+
+    args = parser.parse_args()
+
+    partitions = discover_partitions(args.partitions_dir)
+    if args.test_partitions >= len(partitions):
+        parser.error("Need more partitions than --test-partitions")
+    split = len(partitions) - args.test_partitions
+
+    model, report = train_out_of_core(partitions[:split], partitions[split:] or None,
+                                      chunk_rows=args.chunk_rows, cache_dir=args.cache_dir)
+
+    model_path = os.path.join(args.model_dir, f'xgboost_{args.symbol.lower()}_{args.timeframe}_out_of_core.model')
+    metadata = {
+        'symbol': args.symbol.lower(),
+        'timeframe': args.timeframe,
+        'training_date': report['timestamp'],
+        'training_mode': 'out_of_core',
+        'resampling': 'class_weights',
+        'training_samples': report['rows'],
+        'class_weights': report['class_weights'],
+        'features': report['feature_names'],
+        'params': report['params'],
+        'performance': report['evaluation'],
+        'train_seconds': report['train_seconds'],
+        'peak_rss_mb': report['peak_rss_mb']
+    }
+    save_model(model, model_path, metadata)
+
+    evaluation = report['evaluation'] or {}
+    print(f"Trained on {report['rows']} rows in {report['chunks']} chunks in {report['train_seconds']:.1f}s, "
+          f"test accuracy {evaluation.get('accuracy', float('nan')):.4f}, peak RSS {report['peak_rss_mb']:.0f} MB")
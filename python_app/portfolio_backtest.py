@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Portfolio Backtest
+
+This module simulates one strategy over several assets that share a single
+balance. It handles:
+
+1. Aligning the assets on a common clock (the union of their candles); an asset
+   does not trade before its first candle and its price is carried over gaps
+2. Sizing every position from the shared balance at its entry, with a cap on the
+   exposure of a single asset and on the total exposure of the open positions
+3. Resolving contention: when several assets signal on the same candle the
+   strongest signals are served first, and an entry that does not fit under the
+   caps is scaled down or skipped
+4. Portfolio balance, equity and exposure curves and the metrics of
+   backtest_core.compute_metrics, plus a breakdown per asset
+
+Each asset follows the rules of backtest_core: one position at a time, exits at
+the stop loss (checked first) or take profit, re-entry on the exit candle and a
+final close at the end. Exposure is the notional value of a position times its
+leverage, as a percentage of the balance at entry. Signals, exits and curves are
+array operations over the asset x candle matrices; the only Python loop walks
+the trade events in time order, so its work is per trade rather than per candle.
+"""
+
+import heapq
+import bisect
+import logging
+from typing import Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+from backtest_core import (adjust_strategy_parameters, entry_signals, first_exit, open_rows,
+                           compute_metrics, EXIT_REASONS, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT,
+                           EXIT_SIMULATION_END)
+
+logger = logging.getLogger(__name__)
+
+# Event kinds; exits sort before entries on the same candle so freed capital can be reused
+_EXIT, _ENTRY = 0, 1
+
+
+def align_assets(frames: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Put several assets on a common clock
+
+    Args:
+        frames: Per symbol, a frame indexed by candle time with 'close' and
+            'prediction' columns
+
+    Returns:
+        Dictionary with the common 'index', the 'symbols' and asset x candle
+        'prices', 'predictions' and 'active' (the asset has a candle) matrices
+    """
+    if not frames:
+        raise ValueError("No assets to align")
+
+    symbols = list(frames)
+    closes = pd.concat({symbol: frames[symbol]['close'] for symbol in symbols}, axis=1).sort_index()
+    predictions = pd.concat({symbol: frames[symbol]['prediction'] for symbol in symbols}, axis=1)
+    predictions = predictions.reindex(closes.index)
+
+    active = closes.notna().to_numpy().T
+    # Carry prices over gaps; candles before an asset's first one are never traded
+    prices = closes.ffill().bfill().to_numpy(dtype=np.float64).T
+    # A missing prediction is neutral, so it never opens a position
+    predictions = predictions.where(closes.notna(), 0.5).fillna(0.5).to_numpy(dtype=np.float64).T
+
+    return {
+        'index': closes.index,
+        'symbols': symbols,
+        'prices': np.ascontiguousarray(prices),
+        'predictions': np.ascontiguousarray(predictions),
+        'active': active
+    }
+
+
+def simulate_portfolio(prices: np.ndarray,
+                       predictions: np.ndarray,
+                       initial_investment: float,
+                       trade_size_percent: float,
+                       stop_loss_percent: float,
+                       take_profit_percent: float,
+                       leverage: float,
+                       confidence_threshold: float,
+                       max_asset_exposure_percent: float = 25.0,
+                       max_total_exposure_percent: float = 100.0,
+                       min_exposure_percent: float = 1.0) -> Dict[str, Any]:
+    """
+    Simulate the strategy over aligned assets sharing one balance
+
+    Args:
+        prices: Close price per asset and candle
+        predictions: Bullish probability per asset and candle
+        initial_investment: Initial investment amount
+        trade_size_percent: Percentage of balance to use per trade
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+        leverage: Leverage multiplier
+        confidence_threshold: Minimum prediction confidence to enter a trade
+        max_asset_exposure_percent: Largest exposure of one position (percent of balance)
+        max_total_exposure_percent: Largest exposure of all open positions (percent of balance)
+        min_exposure_percent: Entries that would be scaled below this exposure are skipped
+
+    Returns:
+        Dictionary with 'final_balance', per-candle 'balance', 'equity' and
+        'exposure' arrays, 'trades' (per-trade arrays as in backtest_core.simulate
+        plus 'asset' and 'exposure') and per-asset 'skipped' and 'scaled' entry counts
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n_assets, n = prices.shape
+    signals = np.stack([entry_signals(row, confidence_threshold) for row in predictions]) \
+        if n_assets else np.zeros((0, n), dtype=np.int8)
+    strength = np.abs(np.asarray(predictions, dtype=np.float64) - 0.5) * 2
+    signal_index = [np.flatnonzero(row).tolist() for row in signals]
+
+    desired_fraction = min(trade_size_percent * leverage, max_asset_exposure_percent) / 100
+    total_fraction = max_total_exposure_percent / 100
+    min_fraction = min_exposure_percent / 100
+
+    events: List[tuple] = []
+
+    def schedule_entry(asset: int, search_from: int) -> None:
+        position = bisect.bisect_left(signal_index[asset], search_from)
+        if position < len(signal_index[asset]):
+            candle = signal_index[asset][position]
+            heapq.heappush(events, (candle, _ENTRY, -strength[asset, candle], asset))
+
+    for asset in range(n_assets):
+        schedule_entry(asset, 0)
+
+    balance = float(initial_investment)
+    open_exposure = 0.0
+    positions: Dict[int, tuple] = {}
+    rows = []
+    skipped = np.zeros(n_assets, dtype=np.int64)
+    scaled = np.zeros(n_assets, dtype=np.int64)
+
+    while events:
+        candle, kind, _, asset = heapq.heappop(events)
+
+        if kind == _EXIT:
+            entry_index, direction, entry_price, size, exposure, exit_index, reason, _ = positions.pop(asset)
+            exit_price = prices[asset, exit_index]
+            pnl = size * (exit_price - entry_price) * leverage * direction
+            balance += pnl
+            open_exposure -= exposure
+            rows.append((asset, entry_index, exit_index, direction, entry_price, exit_price,
+                         size, exposure, pnl, reason))
+            if reason != EXIT_SIMULATION_END:
+                schedule_entry(asset, exit_index)
+            continue
+
+        # Size the entry from the shared balance within the caps
+        exposure = min(desired_fraction * balance, total_fraction * balance - open_exposure)
+        if balance <= 0 or exposure < min_fraction * balance or exposure <= 0:
+            # The balance and open exposure only change at the next exit, so every
+            # signal before it would be skipped as well
+            resume = min((position[-1] for position in positions.values()), default=n)
+            skipped[asset] += (bisect.bisect_left(signal_index[asset], resume) -
+                               bisect.bisect_left(signal_index[asset], candle))
+            schedule_entry(asset, resume)
+            continue
+        if exposure < desired_fraction * balance:
+            scaled[asset] += 1
+
+        direction = int(signals[asset, candle])
+        entry_price = prices[asset, candle]
+        size = exposure / leverage / entry_price
+        if direction > 0:
+            stop_price = entry_price * (1 - stop_loss_percent / 100)
+            take_profit_price = entry_price * (1 + take_profit_percent / 100)
+            exit_index = first_exit(prices[asset], candle + 1, stop_price, take_profit_price)
+        else:
+            stop_price = entry_price * (1 + stop_loss_percent / 100)
+            take_profit_price = entry_price * (1 - take_profit_percent / 100)
+            exit_index = first_exit(prices[asset], candle + 1, take_profit_price, stop_price)
+
+        if exit_index is None:
+            # Closed at the end of the simulation, after every other event
+            reason, exit_index, exit_event = EXIT_SIMULATION_END, n - 1, n
+        else:
+            exit_price = prices[asset, exit_index]
+            stop_hit = exit_price <= stop_price if direction > 0 else exit_price >= stop_price
+            reason, exit_event = (EXIT_STOP_LOSS if stop_hit else EXIT_TAKE_PROFIT), exit_index
+
+        positions[asset] = (candle, direction, entry_price, size, exposure, exit_index, reason, exit_event)
+        open_exposure += exposure
+        heapq.heappush(events, (exit_event, _EXIT, 0.0, asset))
+
+    rows.sort(key=lambda row: (row[1], row[0]))
+    columns = list(zip(*rows)) if rows else [()] * 10
+    trades = {
+        'asset': np.asarray(columns[0], dtype=np.int64),
+        'entry_index': np.asarray(columns[1], dtype=np.int64),
+        'exit_index': np.asarray(columns[2], dtype=np.int64),
+        'direction': np.asarray(columns[3], dtype=np.int8),
+        'entry_price': np.asarray(columns[4], dtype=np.float64),
+        'exit_price': np.asarray(columns[5], dtype=np.float64),
+        'position_size': np.asarray(columns[6], dtype=np.float64),
+        'exposure': np.asarray(columns[7], dtype=np.float64),
+        'pnl': np.asarray(columns[8], dtype=np.float64),
+        'exit_reason': np.asarray(columns[9], dtype=np.int8)
+    }
+    trades['pnl_percent'] = trades['pnl'] / (trades['position_size'] * trades['entry_price']) * 100 \
+        if rows else np.zeros(0)
+
+    # The balance at a candle includes the trades closed at earlier candles
+    closes = trades['exit_reason'] != EXIT_SIMULATION_END
+    changes = np.zeros(n + 1)
+    changes[0] = initial_investment
+    np.add.at(changes, trades['exit_index'][closes] + 1, trades['pnl'][closes])
+    balance_curve = np.cumsum(changes)[:n]
+
+    # Open positions add their unrealized PnL and exposure from the candle after entry
+    candles, owner = open_rows(trades['entry_index'], trades['exit_index'])
+    equity_curve = balance_curve.copy()
+    gross_exposure = np.zeros(n)
+    if len(candles):
+        unrealized = (trades['position_size'][owner] * leverage * trades['direction'][owner] *
+                      (prices[trades['asset'][owner], candles] - trades['entry_price'][owner]))
+        np.add.at(equity_curve, candles, unrealized)
+        np.add.at(gross_exposure, candles, trades['exposure'][owner])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exposure_curve = np.where(equity_curve > 0, gross_exposure / equity_curve * 100, 0.0)
+
+    return {
+        'final_balance': balance,
+        'balance': balance_curve,
+        'equity': equity_curve,
+        'exposure': exposure_curve,
+        'trades': trades,
+        'skipped': skipped,
+        'scaled': scaled
+    }
+
+
+def run_portfolio_backtest(frames: Dict[str, pd.DataFrame],
+                           strategy_type: str,
+                           initial_investment: float,
+                           trade_size_percent: float,
+                           stop_loss_percent: float,
+                           take_profit_percent: float,
+                           leverage: float,
+                           confidence_threshold: float,
+                           max_asset_exposure_percent: float = 25.0,
+                           max_total_exposure_percent: float = 100.0,
+                           min_exposure_percent: float = 1.0) -> Dict[str, Any]:
+    """
+    Run a strategy over several assets sharing one balance
+
+    Args:
+        frames: Per symbol, a frame indexed by candle time with 'close' and 'prediction'
+        strategy_type: Type of strategy (conservative, balanced, aggressive)
+        initial_investment: Initial investment amount
+        trade_size_percent: Percentage of balance to use per trade
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+        leverage: Leverage multiplier
+        confidence_threshold: Minimum prediction confidence to enter a trade
+        max_asset_exposure_percent: Largest exposure of one position (percent of balance)
+        max_total_exposure_percent: Largest exposure of all open positions (percent of balance)
+        min_exposure_percent: Entries that would be scaled below this exposure are skipped
+
+    Returns:
+        The portfolio metrics of compute_metrics plus exposure statistics, an
+        'assets' breakdown per symbol, the 'index' and the 'balance', 'equity',
+        'exposure' and 'trades' of simulate_portfolio
+    """
+    params = adjust_strategy_parameters(strategy_type, trade_size_percent, stop_loss_percent,
+                                        take_profit_percent, leverage, confidence_threshold)
+    aligned = align_assets(frames)
+    result = simulate_portfolio(aligned['prices'], aligned['predictions'], initial_investment,
+                                params['trade_size_percent'], params['stop_loss_percent'],
+                                params['take_profit_percent'], params['leverage'],
+                                params['confidence_threshold'],
+                                max_asset_exposure_percent=max_asset_exposure_percent,
+                                max_total_exposure_percent=max_total_exposure_percent,
+                                min_exposure_percent=min_exposure_percent)
+    trades = result['trades']
+    metrics = compute_metrics(initial_investment, result['final_balance'], result['equity'], trades['pnl'])
+
+    assets = {}
+    for index, symbol in enumerate(aligned['symbols']):
+        pnl = trades['pnl'][trades['asset'] == index]
+        assets[symbol] = {
+            'pnl': float(pnl.sum()),
+            'trade_count': int(len(pnl)),
+            'win_rate': float((pnl > 0).mean()) if len(pnl) else 0,
+            'skipped_entries': int(result['skipped'][index]),
+            'scaled_entries': int(result['scaled'][index]),
+            'candles': int(aligned['active'][index].sum())
+        }
+
+    logger.info(f"Portfolio of {len(assets)} assets over {len(aligned['index'])} candles: "
+                f"{metrics['trade_count']} trades, PnL {metrics['pnl_percent']:.2f}%")
+
+    return {
+        **metrics,
+        'strategy_type': strategy_type,
+        'parameters': params,
+        'max_exposure': float(result['exposure'].max()) if len(result['exposure']) else 0,
+        'average_exposure': float(result['exposure'].mean()) if len(result['exposure']) else 0,
+        'skipped_entries': int(result['skipped'].sum()),
+        'scaled_entries': int(result['scaled'].sum()),
+        'exit_reasons': {reason: int((trades['exit_reason'] == code).sum())
+                         for code, reason in enumerate(EXIT_REASONS)},
+        'assets': assets,
+        'symbols': aligned['symbols'],
+        'index': aligned['index'],
+        'balance': result['balance'],
+        'equity': result['equity'],
+        'exposure': result['exposure'],
+        'trades': trades
+    }
@@ -14,7 +14,6 @@ Parameters:
 import os
 import sys
 import logging
-import pickle
 import argparse
 from typing import Dict, Any, Tuple, List, Optional
 
@@ -37,6 +36,7 @@ try:
     from binance.spot import Spot
     from binance.error import ClientError, ServerError
     from config import active_config
+    from model_artifacts import load_symbol_model
     import requests
 except ImportError:
     logging.error("Binance connector SDK not found. Please install it using 'pip install binance-connector'")
@@ -57,24 +57,24 @@ def load_model(symbol: str) -> Optional[Dict[str, Any]]:
     """
     Load the trained model and associated metadata from disk.
     
+    Models are read through the shared artifact loader, which converts a legacy
+    model_<symbol>.pkl bundle once and caches the loaded model across calls.
+    
     Args:
         symbol: Symbol name (e.g., BTCUSDT)
         
     Returns:
         Dictionary containing model, scaler, features, and metadata or None if not found
     """
-    # Determine file path
-    symbol_lower = symbol.lower()
     model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
-    model_path = os.path.join(model_dir, f'model_{symbol_lower}.pkl')
-    
-    if not os.path.exists(model_path):
-        logging.error(f"Model file not found: {model_path}")
-        return None
     
     try:
-        with open(model_path, 'rb') as f:
-            model_data = pickle.load(f)
+        artifact = load_symbol_model(symbol, model_dir)
+        if artifact is None:
+            logging.error(f"Model file not found for {symbol} in {model_dir}")
+            return None
+        
+        model_data = artifact.as_legacy_dict()
         
         logging.info(f"Successfully loaded model for {symbol} (trained at {model_data['trained_at']})")
         return model_data
@@ -17,8 +17,10 @@ import json
 import logging
 import numpy as np
 import pandas as pd
-import xgboost as xgb
-from typing import Dict, List, Tuple, Any, Optional, Union
+from typing import Dict, List, Tuple, Any, Optional, Union, Callable
+
+from model_artifacts import load_artifact, select_model_variant
+from prediction_cache import get_prediction_cache
 
 # Configure logging
 log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
@@ -37,21 +39,53 @@ logging.basicConfig(
 class XGBoostPredictor:
     """Class for making predictions using trained XGBoost models"""
     
-    def __init__(self, model_dir: str = 'models'):
+    def __init__(self, model_dir: str = 'models', variant_tolerance: Optional[float] = None):
         """
         Initialize the XGBoost predictor.
         
         Args:
             model_dir: Directory containing trained models
+            variant_tolerance: If set, load the fastest compact variant of each model
+                whose accuracy is within this tolerance of the full model
+                (default: MODEL_VARIANT_TOLERANCE from the config)
         """
+        if variant_tolerance is None:
+            try:
+                from config import active_config
+                variant_tolerance = active_config.MODEL_VARIANT_TOLERANCE
+            except (ImportError, AttributeError):
+                variant_tolerance = None
+        
         self.model_dir = model_dir
+        self.variant_tolerance = variant_tolerance
         self.models = {}
         self.metadata = {}
         self.features = {}
         self.class_mappings = {}
+        self.versions = {}
         
         logging.info(f"Initializing XGBoost predictor with model directory: {model_dir}")
     
+    @staticmethod
+    def get_model_key(symbol: str, model_type: str = "standard") -> str:
+        """
+        Get the key (and file name stem) used for a symbol/model type pair.
+        
+        The standard model has no suffix, every other variant ('balanced',
+        'optimized', ...) is stored as xgboost_<symbol>_<model_type>.model.
+        
+        Args:
+            symbol: Symbol name (e.g., 'btcusdt')
+            model_type: Type of model - 'standard', 'balanced' or another variant name
+            
+        Returns:
+            Model key such as 'btcusdt' or 'btcusdt_balanced'
+        """
+        symbol = symbol.lower()
+        if model_type in (None, "", "standard"):
+            return symbol
+        return f"{symbol}_{model_type}"
+    
     def load_model(self, symbol: str, model_type: str = "standard") -> bool:
         """
         Load a trained model for a specific symbol.
@@ -64,11 +98,10 @@ class XGBoostPredictor:
             Boolean indicating if model was loaded successfully
         """
         symbol = symbol.lower()
-        model_suffix = "_balanced" if model_type == "balanced" else ""
-        model_key = f"{symbol}{model_suffix}"
+        model_key = self.get_model_key(symbol, model_type)
         
-        model_path = os.path.join(self.model_dir, f'xgboost_{symbol}{model_suffix}.model')
-        metadata_path = os.path.join(self.model_dir, f'xgboost_{symbol}{model_suffix}_metadata.json')
+        model_path = os.path.join(self.model_dir, f'xgboost_{model_key}.model')
+        metadata_path = os.path.join(self.model_dir, f'xgboost_{model_key}_metadata.json')
         
         if not os.path.exists(model_path):
             logging.error(f"Model file not found: {model_path}")
@@ -79,14 +112,21 @@ class XGBoostPredictor:
             return False
         
         try:
-            # Load the model
-            model = xgb.XGBClassifier()
-            model.load_model(model_path)
-            self.models[model_key] = model
+            # Load the model through the shared artifact cache, so predictors created
+            # per request reuse the already loaded booster
+            stem = f'xgboost_{model_key}'
+            if self.variant_tolerance is not None:
+                stem = select_model_variant(stem, self.variant_tolerance, self.model_dir)
+            artifact = load_artifact(stem, self.model_dir)
+            if artifact is None:
+                logging.error(f"Model artifact not found: {model_path}")
+                return False
+            
+            self.models[model_key] = artifact.model
+            self.versions[model_key] = artifact.version
             
             # Load the metadata
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            metadata = artifact.metadata
             
             self.metadata[model_key] = metadata
             self.features[model_key] = metadata['features']
@@ -128,41 +168,51 @@ class XGBoostPredictor:
         
         return results
     
-    def prepare_features(self, market_data: Dict[str, Any], symbol: str, model_type: str = "standard") -> Optional[pd.DataFrame]:
+    def build_feature_frame(self, market_data: Dict[str, Any]) -> pd.DataFrame:
         """
-        Prepare feature vector from market data for prediction.
+        Build the model-independent feature frame from market data.
+        
+        The frame holds every column in the market data plus the live placeholders
+        for 'future_price' and 'price_change_pct'. It is built once and then
+        narrowed to each model's feature list with select_features.
         
         Args:
             market_data: Dictionary containing market data with technical indicators
-            symbol: Symbol name (e.g., 'btcusdt')
-            model_type: Type of model to use - 'standard' or 'balanced'
             
         Returns:
-            DataFrame with features in the correct order, or None if preparation fails
+            Single-row DataFrame with all available feature columns
         """
-        symbol = symbol.lower()
-        model_suffix = "_balanced" if model_type == "balanced" else ""
-        model_key = f"{symbol}{model_suffix}"
+        # Make a copy of the market data to avoid modifying the original
+        market_data_copy = market_data.copy()
         
+        # Check if 'future_price' and 'price_change_pct' are missing and add them if needed
+        if 'future_price' not in market_data_copy:
+            # In live prediction, use current price as future price placeholder
+            market_data_copy['future_price'] = market_data_copy.get('close', 0.0)
+        
+        if 'price_change_pct' not in market_data_copy:
+            # In live prediction, assume no price change as placeholder
+            market_data_copy['price_change_pct'] = 0.0
+        
+        return pd.DataFrame([market_data_copy])
+    
+    def select_features(self, feature_frame: pd.DataFrame, model_key: str) -> Optional[pd.DataFrame]:
+        """
+        Select and order the columns of a feature frame for a loaded model.
+        
+        Args:
+            feature_frame: DataFrame returned by build_feature_frame
+            model_key: Key of a loaded model (see get_model_key)
+            
+        Returns:
+            DataFrame with features in the correct order, or None if selection fails
+        """
         if model_key not in self.features:
             logging.error(f"No feature list available for {model_key}. Load model first.")
             return None
         
         try:
-            # Make a copy of the market data to avoid modifying the original
-            market_data_copy = market_data.copy()
-            
-            # Check if 'future_price' and 'price_change_pct' are missing and add them if needed
-            if 'future_price' not in market_data_copy:
-                # In live prediction, use current price as future price placeholder
-                market_data_copy['future_price'] = market_data_copy.get('close', 0.0)
-            
-            if 'price_change_pct' not in market_data_copy:
-                # In live prediction, assume no price change as placeholder
-                market_data_copy['price_change_pct'] = 0.0
-            
-            # Create a DataFrame with all required features
-            features_df = pd.DataFrame([market_data_copy])
+            features_df = feature_frame
             
             # Check if all required features are present
             missing_features = [f for f in self.features[model_key] if f not in features_df.columns]
@@ -170,6 +220,7 @@ class XGBoostPredictor:
                 logging.error(f"Missing features for {model_key}: {missing_features}")
                 
                 # Add missing features with default values
+                features_df = features_df.copy()
                 for feature in missing_features:
                     features_df[feature] = 0.0
                     logging.warning(f"Added missing feature '{feature}' with default value 0.0")
@@ -189,9 +240,9 @@ class XGBoostPredictor:
             logging.error(f"Error preparing features for {model_key}: {str(e)}")
             return None
     
-    def predict(self, market_data: Dict[str, Any], symbol: str, model_type: str = "standard") -> Dict[str, Any]:
+    def prepare_features(self, market_data: Dict[str, Any], symbol: str, model_type: str = "standard") -> Optional[pd.DataFrame]:
         """
-        Make a prediction using the loaded model.
+        Prepare feature vector from market data for prediction.
         
         Args:
             market_data: Dictionary containing market data with technical indicators
@@ -199,19 +250,21 @@ class XGBoostPredictor:
             model_type: Type of model to use - 'standard' or 'balanced'
             
         Returns:
-            Dictionary containing prediction result with:
-                - predicted_class: Numerical class (0, 1, 2)
-                - predicted_label: String label (BUY, HOLD, SELL)
-                - probabilities: Probability for each class
-                - confidence: Confidence score for the prediction
-                - timestamp: Current timestamp
-                - model_type: Type of model used for the prediction
+            DataFrame with features in the correct order, or None if preparation fails
         """
-        symbol = symbol.lower()
-        model_suffix = "_balanced" if model_type == "balanced" else ""
-        model_key = f"{symbol}{model_suffix}"
+        model_key = self.get_model_key(symbol, model_type)
         
-        result = {
+        try:
+            feature_frame = self.build_feature_frame(market_data)
+        except Exception as e:
+            logging.error(f"Error preparing features for {model_key}: {str(e)}")
+            return None
+        
+        return self.select_features(feature_frame, model_key)
+    
+    def _empty_result(self, symbol: str, model_type: str) -> Dict[str, Any]:
+        """Create the prediction result skeleton returned when a prediction fails"""
+        return {
             'symbol': symbol,
             'predicted_class': None,
             'predicted_label': None,
@@ -220,6 +273,21 @@ class XGBoostPredictor:
             'model_type': model_type,
             'timestamp': pd.Timestamp.now().isoformat()
         }
+    
+    def _predict_from_frame(self, feature_frame: pd.DataFrame, symbol: str, model_type: str) -> Dict[str, Any]:
+        """
+        Run one model on an already built feature frame.
+        
+        Args:
+            feature_frame: DataFrame returned by build_feature_frame
+            symbol: Symbol name (e.g., 'btcusdt')
+            model_type: Type of model to use
+            
+        Returns:
+            Prediction result dictionary (see predict)
+        """
+        model_key = self.get_model_key(symbol, model_type)
+        result = self._empty_result(symbol, model_type)
         
         # Check if model is loaded
         if model_key not in self.models:
@@ -228,37 +296,104 @@ class XGBoostPredictor:
                 return result
         
         # Prepare features
-        features_df = self.prepare_features(market_data, symbol, model_type)
+        features_df = self.select_features(feature_frame, model_key)
         if features_df is None:
             logging.error(f"Failed to prepare features for {model_key}")
             return result
         
         try:
-            # Make prediction
-            predicted_class = self.models[model_key].predict(features_df)[0]
+            # A single predict_proba pass gives both the class and its confidence
             probabilities = self.models[model_key].predict_proba(features_df)[0]
+            return self.result_from_probabilities(symbol, model_type, probabilities)
+        
+        except Exception as e:
+            logging.error(f"Error making prediction for {model_key}: {str(e)}")
+            return result
+    
+    def result_from_probabilities(self, symbol: str, model_type: str, probabilities: np.ndarray) -> Dict[str, Any]:
+        """
+        Build a prediction result from one row of class probabilities.
+        
+        Args:
+            symbol: Symbol name (e.g., 'btcusdt')
+            model_type: Type of model that produced the probabilities
+            probabilities: Probability for each class
             
-            # Convert numpy types to Python native types
-            predicted_class = int(predicted_class)
-            probabilities = [float(p) for p in probabilities]
-            confidence = float(probabilities[predicted_class])
-            
-            # Get the label
-            predicted_label = self.class_mappings[model_key].get(predicted_class, "UNKNOWN")
-            
-            # Update result
-            result['predicted_class'] = predicted_class
-            result['predicted_label'] = predicted_label
-            result['probabilities'] = probabilities
-            result['confidence'] = confidence
+        Returns:
+            Prediction result dictionary (see predict)
+        """
+        model_key = self.get_model_key(symbol, model_type)
+        result = self._empty_result(symbol, model_type)
+        
+        # Convert numpy types to Python native types
+        predicted_class = int(np.argmax(probabilities))
+        probabilities = [float(p) for p in probabilities]
+        confidence = float(probabilities[predicted_class])
+        
+        # Get the label
+        predicted_label = self.class_mappings[model_key].get(predicted_class, "UNKNOWN")
+        
+        # Update result
+        result['predicted_class'] = predicted_class
+        result['predicted_label'] = predicted_label
+        result['probabilities'] = probabilities
+        result['confidence'] = confidence
+        
+        logging.info(f"Prediction for {symbol} using {model_type} model: {predicted_label} (Class {predicted_class}) with {confidence:.4f} confidence")
+        
+        return result
+    
+    def predict(self, market_data: Dict[str, Any], symbol: str, model_type: str = "standard") -> Dict[str, Any]:
+        """
+        Make a prediction using the loaded model.
+        
+        Args:
+            market_data: Dictionary containing market data with technical indicators
+            symbol: Symbol name (e.g., 'btcusdt')
+            model_type: Type of model to use - 'standard' or 'balanced'
             
-            logging.info(f"Prediction for {symbol} using {model_type} model: {predicted_label} (Class {predicted_class}) with {confidence:.4f} confidence")
+        Returns:
+            Dictionary containing prediction result with:
+                - predicted_class: Numerical class (0, 1, 2)
+                - predicted_label: String label (BUY, HOLD, SELL)
+                - probabilities: Probability for each class
+                - confidence: Confidence score for the prediction
+                - timestamp: Current timestamp
+                - model_type: Type of model used for the prediction
+        """
+        return self.predict_multi(market_data, symbol, [model_type])[model_type]
+    
+    def predict_multi(self, market_data: Dict[str, Any], symbol: str,
+                      model_types: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Make predictions with several models from a single feature pass.
+        
+        The feature frame is built once and every requested model (standard,
+        balanced, optimized variants, ...) scores the same matrix, so ensemble and
+        comparison callers pay for feature preparation only once.
+        
+        Args:
+            market_data: Dictionary containing market data with technical indicators
+            symbol: Symbol name (e.g., 'btcusdt')
+            model_types: Model types to run (default: ['standard', 'balanced'])
             
-            return result
+        Returns:
+            Dictionary mapping each model type to its prediction result
+        """
+        symbol = symbol.lower()
+        if model_types is None:
+            model_types = ["standard", "balanced"]
         
+        try:
+            feature_frame = self.build_feature_frame(market_data)
         except Exception as e:
-            logging.error(f"Error making prediction for {model_key}: {str(e)}")
-            return result
+            logging.error(f"Error preparing features for {symbol}: {str(e)}")
+            return {model_type: self._empty_result(symbol, model_type) for model_type in model_types}
+        
+        return {
+            model_type: self._predict_from_frame(feature_frame, symbol, model_type)
+            for model_type in model_types
+        }
             
     def predict_with_both_models(self, market_data: Dict[str, Any], symbol: str) -> Dict[str, Dict[str, Any]]:
         """
@@ -271,21 +406,139 @@ class XGBoostPredictor:
         Returns:
             Dictionary with results from both models
         """
-        results = {}
+        return self.predict_multi(market_data, symbol, ["standard", "balanced"])
+    
+
+    def predict_rows(self, rows: List[Tuple[Dict[str, Any], str, str]],
+                     scorer: Optional[Callable[[List[Tuple[str, str, pd.DataFrame, int]]], List[Optional[np.ndarray]]]] = None
+                     ) -> List[Dict[str, Any]]:
+        """
+        Make predictions for many (market data, symbol, model type) rows.
         
-        # Try to load both models if not already loaded
-        self.load_all_models(symbol)
+        Rows that use the same model are stacked into one feature matrix and scored
+        with a single predict_proba call. A scorer (for example the prediction
+        worker pool) can take over the scoring step; it receives a list of
+        (symbol, model_type, features_df, n_classes) jobs and returns one
+        probability matrix (or None on failure) per job.
         
-        # Try standard model
-        standard_result = self.predict(market_data, symbol, "standard")
-        results["standard"] = standard_result
+        Args:
+            rows: List of (market_data, symbol, model_type) tuples
+            scorer: Optional callable that scores the stacked feature matrices
+            
+        Returns:
+            List of prediction results in the same order as rows
+        """
+        results = []
+        groups: Dict[Tuple[str, str], Tuple[List[int], List[pd.DataFrame]]] = {}
+        
+        for index, (market_data, symbol, model_type) in enumerate(rows):
+            symbol = symbol.lower()
+            results.append(self._empty_result(symbol, model_type))
+            
+            model_key = self.get_model_key(symbol, model_type)
+            if model_key not in self.models and not self.load_model(symbol, model_type):
+                logging.error(f"Failed to load {model_type} model for {symbol}")
+                continue
+            
+            features_df = self.prepare_features(market_data, symbol, model_type)
+            if features_df is None:
+                logging.error(f"Failed to prepare features for {model_key}")
+                continue
+            
+            indices, frames = groups.setdefault((symbol, model_type), ([], []))
+            indices.append(index)
+            frames.append(features_df)
+        
+        if not groups:
+            return results
         
-        # Try balanced model
-        balanced_result = self.predict(market_data, symbol, "balanced")
-        results["balanced"] = balanced_result
+        jobs = []
+        for (symbol, model_type), (indices, frames) in groups.items():
+            model_key = self.get_model_key(symbol, model_type)
+            jobs.append((symbol, model_type, pd.concat(frames, ignore_index=True),
+                         len(self.class_mappings[model_key])))
+        
+        if scorer is not None:
+            probability_matrices = scorer(jobs)
+        else:
+            probability_matrices = []
+            for symbol, model_type, features_df, _ in jobs:
+                try:
+                    probability_matrices.append(
+                        self.models[self.get_model_key(symbol, model_type)].predict_proba(features_df))
+                except Exception as e:
+                    logging.error(f"Error making batch prediction for {symbol} ({model_type}): {str(e)}")
+                    probability_matrices.append(None)
+        
+        for ((symbol, model_type), (indices, _)), probabilities in zip(groups.items(), probability_matrices):
+            if probabilities is None:
+                continue
+            for row, index in enumerate(indices):
+                results[index] = self.result_from_probabilities(symbol, model_type, probabilities[row])
         
         return results
     
+    def predict_frame(self, frame: pd.DataFrame, symbol: str, model_type: str = "standard",
+                      use_cache: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Score every row of a market data frame with a single predict_proba call.
+        
+        Each row gets the same live placeholders as build_feature_frame, so it
+        scores exactly as predict would score it on its own. The probabilities are
+        kept in the prediction cache, so scoring the same candles with the same
+        model again skips inference.
+        
+        Args:
+            frame: DataFrame with one row of market data and indicators per candle
+            symbol: Symbol name (e.g., 'btcusdt')
+            model_type: Type of model to use - 'standard' or 'balanced'
+            use_cache: Reuse (and store) probabilities in the prediction cache
+            
+        Returns:
+            Dictionary with 'predicted_class', 'predicted_label', 'confidence' and
+            'probabilities' arrays (one entry per row), or None if scoring fails
+        """
+        symbol = symbol.lower()
+        model_key = self.get_model_key(symbol, model_type)
+        if model_key not in self.models and not self.load_model(symbol, model_type):
+            logging.error(f"Failed to load {model_type} model for {symbol}")
+            return None
+        
+        placeholders = {}
+        if 'future_price' not in frame.columns:
+            placeholders['future_price'] = frame['close'] if 'close' in frame.columns else 0.0
+        if 'price_change_pct' not in frame.columns:
+            placeholders['price_change_pct'] = 0.0
+        features_df = self.select_features(frame.assign(**placeholders) if placeholders else frame, model_key)
+        if features_df is None:
+            logging.error(f"Failed to prepare features for {model_key}")
+            return None
+        
+        try:
+            model = self.models[model_key]
+            if use_cache:
+                probabilities = get_prediction_cache().get_or_compute(
+                    self.versions[model_key], features_df, lambda: model.predict_proba(features_df),
+                    label=f'xgboost_{model_key}')
+            else:
+                probabilities = model.predict_proba(features_df)
+        except Exception as e:
+            logging.error(f"Error making frame prediction for {model_key}: {str(e)}")
+            return None
+        
+        predicted_class = probabilities.argmax(axis=1)
+        labels = np.array([self.class_mappings[model_key].get(c, "UNKNOWN") for c in range(probabilities.shape[1])],
+                          dtype=object)
+        
+        logging.info(f"Scored {len(frame)} rows for {symbol} using {model_type} model")
+        
+        return {
+            'predicted_class': predicted_class,
+            'predicted_label': labels[predicted_class],
+            'confidence': probabilities[np.arange(len(probabilities)), predicted_class],
+            'probabilities': probabilities
+        }
+    
     def predict_batch(self, market_data_batch: List[Dict[str, Any]], symbols: List[str]) -> List[Dict[str, Any]]:
         """
         Make predictions for multiple market data points and symbols.
@@ -301,12 +554,8 @@ class XGBoostPredictor:
             logging.error(f"Length mismatch: {len(market_data_batch)} data points vs {len(symbols)} symbols")
             return []
         
-        results = []
-        for market_data, symbol in zip(market_data_batch, symbols):
-            result = self.predict(market_data, symbol)
-            results.append(result)
-        
-        return results
+        return self.predict_rows([(market_data, symbol, "standard")
+                                  for market_data, symbol in zip(market_data_batch, symbols)])
         
     def predict_live(self, symbol: str, df: pd.DataFrame, model_type: str = "balanced") -> Dict[str, Any]:
         """
@@ -321,8 +570,7 @@ class XGBoostPredictor:
             Dictionary containing prediction result with all needed fields
         """
         symbol = symbol.lower()
-        model_suffix = "_balanced" if model_type == "balanced" else ""
-        model_key = f"{symbol}{model_suffix}"
+        model_key = self.get_model_key(symbol, model_type)
         
         result = {
             'symbol': symbol,
@@ -472,6 +720,17 @@ def get_available_models(model_dir: str = 'models', categorize: bool = False) ->
         model_files = [f for f in os.listdir(model_dir) if f.startswith('xgboost_') and f.endswith('.model')]
         model_names = [f.replace('xgboost_', '').replace('.model', '') for f in model_files]
         
+        # Compact variants are served in place of their full model, not listed separately
+        variant_names = set()
+        for filename in os.listdir(model_dir):
+            if filename.startswith('xgboost_') and filename.endswith('_variants.json'):
+                with open(os.path.join(model_dir, filename), 'r') as f:
+                    table = json.load(f)
+                variant_names.update(entry['stem'].replace('xgboost_', '', 1)
+                                     for name, entry in table.get('variants', {}).items()
+                                     if name != 'full' and 'stem' in entry)
+        model_names = [name for name in model_names if name not in variant_names]
+        
         if not categorize:
             return model_names
         
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Prediction Cache
+
+Backtests, validations and evaluations score the same historical candles with the
+same model every time they run. This module keeps the model outputs on disk so a
+rerun that only changes strategy parameters never reruns inference.
+
+An entry is keyed by:
+- the model version: the content hash of the model (see model_artifacts.model_version)
+- the feature-set version: FEATURE_SET_VERSION plus the ordered feature names
+- the candle range: first and last candle and the number of rows, together with a
+  digest of the feature values so revised candles never hit a stale entry
+
+Each entry is the array the model returned (float32 class probabilities for the
+XGBoost models) saved as <key>.npy, with a <key>.json sidecar describing it. Once
+there are more than PREDICTION_CACHE_MAX_ENTRIES entries the least recently used
+ones are removed.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+import numpy as np
+import pandas as pd
+
+from model_artifacts import DEFAULT_MODEL_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(DEFAULT_MODEL_DIR, 'prediction_cache')
+
+# Bump when indicator calculations change, so cached outputs of old features are not reused
+FEATURE_SET_VERSION = 1
+
+
+def feature_set_version(features: List[str]) -> str:
+    """
+    Get the version of a feature set: FEATURE_SET_VERSION and the ordered feature names.
+
+    Args:
+        features: Feature names in the order the model receives them
+
+    Returns:
+        String of the form '<FEATURE_SET_VERSION>-<12 character hex digest>'
+    """
+    digest = hashlib.sha256(','.join(map(str, features)).encode()).hexdigest()[:12]
+    return f'{FEATURE_SET_VERSION}-{digest}'
+
+
+def candle_range(features: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Describe the candles of a feature frame.
+
+    Args:
+        features: Feature rows indexed by candle
+
+    Returns:
+        Dictionary with the 'start' and 'end' candle and the number of 'rows'
+    """
+    if features.empty:
+        return {'start': None, 'end': None, 'rows': 0}
+    return {'start': str(features.index[0]), 'end': str(features.index[-1]), 'rows': int(len(features))}
+
+
+def data_digest(features: pd.DataFrame) -> str:
+    """
+    Hash the index and values of a feature frame.
+
+    Args:
+        features: Feature rows
+
+    Returns:
+        16 character hex digest
+    """
+    row_hashes = pd.util.hash_pandas_object(features, index=True).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+
+
+class PredictionCache:
+    """
+    Disk cache of model outputs over historical candles
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 200):
+        """
+        Initialize the prediction cache.
+
+        Args:
+            cache_dir: Directory holding the cached arrays
+            max_entries: Number of entries to keep (0 disables the cache)
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether outputs are cached at all"""
+        return self.max_entries > 0
+
+    def make_key(self, model_version: str, features: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Build the key of a model's outputs over a feature frame.
+
+        Args:
+            model_version: Version of the model (content hash)
+            features: Feature rows exactly as the model receives them
+
+        Returns:
+            Dictionary with the 'key' and the parts it was built from
+        """
+        parts = {
+            'model_version': model_version,
+            'feature_set_version': feature_set_version(list(features.columns)),
+            'candle_range': candle_range(features),
+            'data_digest': data_digest(features)
+        }
+        parts['key'] = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:24]
+        return parts
+
+    def _paths(self, key: str) -> Dict[str, str]:
+        """Get the array and sidecar paths of a key"""
+        base = os.path.join(self.cache_dir, key)
+        return {'array': f'{base}.npy', 'info': f'{base}.json'}
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Load cached outputs.
+
+        Args:
+            key: Entry key (see make_key)
+
+        Returns:
+            The cached array, or None if there is no entry
+        """
+        paths = self._paths(key)
+        try:
+            outputs = np.load(paths['array'])
+            # Mark the entry as recently used
+            os.utime(paths['info'])
+        except (OSError, ValueError):
+            return None
+        return outputs
+
+    def put(self, key_parts: Dict[str, Any], outputs: np.ndarray, label: str = '') -> None:
+        """
+        Store outputs and remove the least recently used entries beyond max_entries.
+
+        Args:
+            key_parts: Result of make_key
+            outputs: Model outputs to store
+            label: Free-form description of the model (e.g. its file stem)
+        """
+        paths = self._paths(key_parts['key'])
+        info = {
+            **key_parts,
+            'label': label,
+            'shape': list(outputs.shape),
+            'dtype': str(outputs.dtype),
+            'created_at': datetime.now().isoformat()
+        }
+
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{paths['array']}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, outputs)
+            os.replace(tmp_path, paths['array'])
+            tmp_path = f"{paths['info']}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(info, f, indent=2)
+            os.replace(tmp_path, paths['info'])
+            self._prune()
+
+    def _prune(self) -> None:
+        """Remove the least recently used entries beyond max_entries"""
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.json') and '.tmp' not in filename:
+                path = os.path.join(self.cache_dir, filename)
+                try:
+                    entries.append((os.path.getmtime(path), filename[:-len('.json')]))
+                except OSError:
+                    continue
+
+        entries.sort(reverse=True)
+        for _, key in entries[self.max_entries:]:
+            for path in self._paths(key).values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_or_compute(self, model_version: str, features: pd.DataFrame,
+                       predict: Callable[[], np.ndarray], label: str = '') -> np.ndarray:
+        """
+        Return the cached outputs of a model over a feature frame, predicting on a miss.
+
+        Args:
+            model_version: Version of the model (content hash)
+            features: Feature rows exactly as the model receives them
+            predict: Callable that runs the model over the features
+            label: Free-form description of the model for the sidecar file
+
+        Returns:
+            The model outputs
+        """
+        if not self.enabled:
+            return predict()
+
+        key_parts = self.make_key(model_version, features)
+        outputs = self.get(key_parts['key'])
+        if outputs is not None:
+            self.hits += 1
+            logger.info(f"Prediction cache hit for {label or model_version} "
+                        f"({key_parts['candle_range']['rows']} rows)")
+            return outputs
+
+        self.misses += 1
+        outputs = np.asarray(predict())
+        try:
+            self.put(key_parts, outputs, label)
+        except OSError as e:
+            logger.warning(f"Could not store predictions in the cache: {str(e)}")
+        return outputs
+
+    def clear(self) -> int:
+        """
+        Remove every entry.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            if not os.path.exists(self.cache_dir):
+                return 0
+            for filename in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, filename))
+                removed += filename.endswith('.json')
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, size on disk and hit/miss counts
+        """
+        entries = 0
+        size_bytes = 0
+        if os.path.exists(self.cache_dir):
+            for filename in os.listdir(self.cache_dir):
+                entries += filename.endswith('.json')
+                size_bytes += os.path.getsize(os.path.join(self.cache_dir, filename))
+        return {
+            'cache_dir': self.cache_dir,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'size_bytes': size_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+# Create a singleton instance
+_prediction_cache = None
+_prediction_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    """
+    Get the shared prediction cache
+
+    The number of entries comes from PREDICTION_CACHE_MAX_ENTRIES (0 disables it).
+
+    Returns:
+        The PredictionCache instance
+    """
+    global _prediction_cache
+
+    with _prediction_cache_lock:
+        if _prediction_cache is None:
+            try:
+                from config import active_config
+                max_entries = int(getattr(active_config, 'PREDICTION_CACHE_MAX_ENTRIES', 200))
+            except (ImportError, ValueError):
+                max_entries = 200
+            _prediction_cache = PredictionCache(max_entries=max_entries)
+        return _prediction_cache
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Prediction Worker Pool
+
+This module provides an optional pool of separate worker processes for CPU-heavy
+inference and feature work, so batch scoring is not serialised on the GIL of the
+Flask request threads. It handles:
+
+1. Starting worker processes that load each XGBoost model once and keep it cached
+2. Passing feature matrices and probability results through shared memory
+3. Running whole live-prediction / signal jobs inside the workers
+4. Health checks and recycling of workers (after a number of tasks or on failure)
+
+The pool is disabled by default. Set PREDICTION_POOL_WORKERS to the number of worker
+processes to enable it; get_prediction_pool() returns None while it is disabled so
+callers can fall back to in-thread inference.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, Future, CancelledError, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Tuple, Any, Optional, Callable
+
+import numpy as np
+
+logger = logging.getLogger('prediction_worker_pool')
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+DEFAULT_MODEL_DIR = os.path.join(current_dir, 'models')
+
+# Per-process state of a worker (set by _init_worker)
+_worker_predictor = None
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(model_dir: str, threads_per_worker: int) -> None:
+    """
+    Initialise a worker process.
+
+    The thread budget is applied before xgboost is imported so several workers do
+    not oversubscribe the CPU cores.
+
+    Args:
+        model_dir: Directory containing the trained models
+        threads_per_worker: Number of native threads each worker may use
+    """
+    global _worker_predictor
+
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_worker)
+
+    from predict_xgboost import XGBoostPredictor
+
+    _worker_predictor = XGBoostPredictor(model_dir)
+    _worker_state.update({
+        'pid': os.getpid(),
+        'started_at': datetime.now().isoformat(),
+        'threads': threads_per_worker,
+        'tasks': 0
+    })
+
+
+def _get_worker_model(symbol: str, model_type: str):
+    """Get a model from the worker cache, loading it on first use"""
+    model_key = _worker_predictor.get_model_key(symbol, model_type)
+    if model_key not in _worker_predictor.models:
+        if not _worker_predictor.load_model(symbol, model_type):
+            raise RuntimeError(f"{model_type} model for {symbol} is not available in worker {os.getpid()}")
+        _worker_predictor.models[model_key].set_params(n_jobs=_worker_state.get('threads', 1))
+    return _worker_predictor.models[model_key]
+
+
+def score_shared_matrix(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Score a feature matrix stored in shared memory (runs in a worker process).
+
+    Args:
+        task: Dictionary with symbol, model_type, columns, the names/shapes of the
+            input and output shared memory blocks
+
+    Returns:
+        Dictionary with the worker pid, row count and scoring time
+    """
+    import pandas as pd
+
+    start_time = time.time()
+    _worker_state['tasks'] = _worker_state.get('tasks', 0) + 1
+
+    model = _get_worker_model(task['symbol'], task['model_type'])
+
+    input_block = shared_memory.SharedMemory(name=task['input_name'])
+    output_block = shared_memory.SharedMemory(name=task['output_name'])
+    try:
+        features = np.ndarray(task['input_shape'], dtype=np.float64, buffer=input_block.buf)
+        output = np.ndarray(task['output_shape'], dtype=np.float64, buffer=output_block.buf)
+
+        probabilities = model.predict_proba(pd.DataFrame(features, columns=task['columns']))
+        if probabilities.shape != output.shape:
+            raise ValueError(f"Model returned probabilities of shape {probabilities.shape}, "
+                             f"expected {output.shape}")
+        output[:] = probabilities
+
+        # Release the views before closing the blocks
+        del features, output
+    finally:
+        input_block.close()
+        output_block.close()
+
+    return {
+        'pid': os.getpid(),
+        'rows': task['input_shape'][0],
+        'seconds': time.time() - start_time
+    }
+
+
+def run_live_prediction(symbol: str, model_type: str = 'balanced', compare: bool = False) -> Dict[str, Any]:
+    """
+    Run a complete live prediction (candle fetch, features, inference) in a worker.
+
+    Args:
+        symbol: Trading pair symbol (e.g., BTCUSDT)
+        model_type: Type of model to use ('standard' or 'balanced')
+        compare: If True, compare the standard and balanced models
+
+    Returns:
+        The live prediction result
+    """
+    _worker_state['tasks'] = _worker_state.get('tasks', 0) + 1
+
+    from live_prediction import make_live_prediction, compare_live_predictions
+
+    if compare:
+        return compare_live_predictions(symbol)
+    return make_live_prediction(symbol, model_type)
+
+
+def run_trading_signal(symbol: str, model_type: Optional[str] = None, timeframe: str = '1h') -> Dict[str, Any]:
+    """
+    Compute a fresh ML trading signal in a worker.
+
+    Args:
+        symbol: Trading pair symbol
+        model_type: ML model type to use
+        timeframe: Timeframe for analysis
+
+    Returns:
+        Signal data with prediction
+    """
+    _worker_state['tasks'] = _worker_state.get('tasks', 0) + 1
+
+    from ml_trading_bridge import get_ml_trading_bridge
+
+    return get_ml_trading_bridge().get_signal(symbol, model_type, timeframe, force_refresh=True)
+
+
+def ping_worker() -> Dict[str, Any]:
+    """Return the state of the worker that picks up this task"""
+    state = dict(_worker_state)
+    state['loaded_models'] = list(_worker_predictor.models.keys()) if _worker_predictor else []
+    return state
+
+
+class PredictionWorkerPool:
+    """
+    Pool of worker processes for model inference
+
+    Each worker loads models once and keeps them cached for its lifetime. Workers
+    are recycled after max_tasks_per_worker tasks, and the whole pool is restarted
+    when a worker dies or a health check fails.
+    """
+
+    def __init__(self,
+                 num_workers: Optional[int] = None,
+                 model_dir: Optional[str] = None,
+                 max_tasks_per_worker: int = 500,
+                 threads_per_worker: Optional[int] = None,
+                 task_timeout: float = 120.0):
+        """
+        Initialize the prediction worker pool
+
+        Args:
+            num_workers: Number of worker processes (default: number of CPU cores)
+            model_dir: Directory containing the trained models
+            max_tasks_per_worker: Tasks a worker runs before it is replaced
+            threads_per_worker: Native threads per worker (default: cores / workers)
+            task_timeout: Seconds to wait for a single task
+        """
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = max(1, num_workers or cpu_count)
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.num_workers)
+        self.task_timeout = task_timeout
+
+        self._lock = threading.RLock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Incremented on every start, so the futures of a broken pool restart it once
+        self._generation = 0
+
+        self.stats = {
+            'started_at': None,
+            'restarts': 0,
+            'tasks_submitted': 0,
+            'tasks_completed': 0,
+            'tasks_failed': 0,
+            'rows_scored': 0
+        }
+
+        logger.info(f"Prediction worker pool configured with {self.num_workers} workers, "
+                    f"{self.threads_per_worker} threads per worker")
+
+    def _get_context(self):
+        """Use forkserver where available so workers never inherit Flask threads"""
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('forkserver')
+        return multiprocessing.get_context('spawn')
+
+    def start(self) -> None:
+        """Start the worker processes (no-op if already running)"""
+        with self._lock:
+            if self._executor is not None:
+                return
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=self._get_context(),
+                initializer=_init_worker,
+                initargs=(self.model_dir, self.threads_per_worker),
+                max_tasks_per_child=self.max_tasks_per_worker
+            )
+            self._generation += 1
+            self.stats['started_at'] = datetime.now().isoformat()
+            logger.info(f"Prediction worker pool started with {self.num_workers} workers")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop all worker processes"""
+        with self._lock:
+            if self._executor is None:
+                return
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("Prediction worker pool stopped")
+
+    def restart(self) -> None:
+        """Replace all worker processes"""
+        with self._lock:
+            logger.warning("Restarting prediction worker pool")
+            self.shutdown(wait=False)
+            self.start()
+            self.stats['restarts'] += 1
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Submit a module-level function to the pool.
+
+        Args:
+            func: Picklable function to run in a worker
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            Future for the result
+        """
+        with self._lock:
+            if self._executor is None:
+                self.start()
+            try:
+                future = self._executor.submit(func, *args, **kwargs)
+            except BrokenProcessPool:
+                self.restart()
+                future = self._executor.submit(func, *args, **kwargs)
+            future.pool_generation = self._generation
+            self.stats['tasks_submitted'] += 1
+            return future
+
+    def _restart_broken(self, generation: Optional[int]) -> None:
+        """Restart the pool a failed future ran in, unless it has been replaced already"""
+        with self._lock:
+            if generation == self._generation:
+                self.restart()
+
+    def _collect(self, future: Future, description: str) -> Any:
+        """
+        Wait for a future and update the statistics, returning None on failure
+
+        When a worker dies every future of its pool fails; only the first of them
+        restarts the pool, the others (broken or cancelled by the restart) just fail.
+        """
+        try:
+            result = future.result(timeout=self.task_timeout)
+            self.stats['tasks_completed'] += 1
+            return result
+        except (BrokenProcessPool, CancelledError) as e:
+            self.stats['tasks_failed'] += 1
+            logger.error(f"Worker pool broke while running {description}: {e or type(e).__name__}")
+            self._restart_broken(getattr(future, 'pool_generation', None))
+        except FutureTimeoutError:
+            self.stats['tasks_failed'] += 1
+            logger.error(f"Timed out after {self.task_timeout}s while running {description}")
+        except Exception as e:
+            self.stats['tasks_failed'] += 1
+            logger.error(f"Error while running {description}: {e}")
+        return None
+
+    def map_calls(self, func: Callable, args_list: List[Tuple]) -> List[Any]:
+        """
+        Run a function for each argument tuple across the workers.
+
+        Args:
+            func: Picklable module-level function
+            args_list: List of argument tuples
+
+        Returns:
+            List of results in the same order (None for failed calls)
+        """
+        futures = [self.submit(func, *args) for args in args_list]
+        return [self._collect(future, f"{func.__name__}{args}")
+                for future, args in zip(futures, args_list)]
+
+    def score_matrices(self, jobs: List[Tuple[str, str, Any, int]]) -> List[Optional[np.ndarray]]:
+        """
+        Score feature matrices in the workers through shared memory.
+
+        This matches the scorer contract of XGBoostPredictor.predict_rows.
+
+        Args:
+            jobs: List of (symbol, model_type, features_df, n_classes) tuples
+
+        Returns:
+            One probability matrix per job (None if scoring failed)
+        """
+        blocks = []
+        futures = []
+        try:
+            for symbol, model_type, features_df, n_classes in jobs:
+                features = np.ascontiguousarray(features_df.to_numpy(dtype=np.float64))
+                output_shape = (features.shape[0], n_classes)
+
+                input_block = shared_memory.SharedMemory(create=True, size=max(features.nbytes, 1))
+                output_block = shared_memory.SharedMemory(
+                    create=True, size=max(int(np.prod(output_shape)) * 8, 1))
+                blocks.append((input_block, output_block, output_shape))
+
+                np.ndarray(features.shape, dtype=np.float64, buffer=input_block.buf)[:] = features
+
+                futures.append(self.submit(score_shared_matrix, {
+                    'symbol': symbol,
+                    'model_type': model_type,
+                    'columns': list(features_df.columns),
+                    'input_name': input_block.name,
+                    'input_shape': features.shape,
+                    'output_name': output_block.name,
+                    'output_shape': output_shape
+                }))
+
+            results = []
+            for (symbol, model_type, _, _), future, (_, output_block, output_shape) in zip(jobs, futures, blocks):
+                info = self._collect(future, f"scoring {symbol} ({model_type})")
+                if info is None:
+                    results.append(None)
+                    continue
+                self.stats['rows_scored'] += info['rows']
+                results.append(np.ndarray(output_shape, dtype=np.float64, buffer=output_block.buf).copy())
+            return results
+
+        finally:
+            for input_block, output_block, _ in blocks:
+                for block in (input_block, output_block):
+                    block.close()
+                    block.unlink()
+
+    def health_check(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """
+        Check that the workers respond, restarting the pool if they do not.
+
+        Args:
+            timeout: Seconds to wait for the ping
+
+        Returns:
+            Dictionary with health status, worker state and pool statistics
+        """
+        healthy = False
+        worker = None
+        try:
+            worker = self.submit(ping_worker).result(timeout=timeout)
+            self.stats['tasks_completed'] += 1
+            healthy = True
+        except Exception as e:
+            logger.error(f"Prediction worker pool health check failed: {e}")
+            self.restart()
+
+        return {
+            'healthy': healthy,
+            'running': self._executor is not None,
+            'num_workers': self.num_workers,
+            'threads_per_worker': self.threads_per_worker,
+            'max_tasks_per_worker': self.max_tasks_per_worker,
+            'worker': worker,
+            'stats': dict(self.stats),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+# Create a singleton instance
+_prediction_pool = None
+_prediction_pool_lock = threading.Lock()
+
+
+def get_prediction_pool() -> Optional[PredictionWorkerPool]:
+    """
+    Get the prediction worker pool singleton, or None if the pool is disabled
+
+    The pool is enabled by setting PREDICTION_POOL_WORKERS to a positive number.
+
+    Returns:
+        The PredictionWorkerPool instance or None
+    """
+    global _prediction_pool
+
+    try:
+        from config import active_config
+        num_workers = int(getattr(active_config, 'PREDICTION_POOL_WORKERS', 0))
+        max_tasks = int(getattr(active_config, 'PREDICTION_POOL_MAX_TASKS', 500))
+    except (ImportError, ValueError):
+        num_workers = 0
+        max_tasks = 500
+
+    if num_workers <= 0:
+        return None
+
+    with _prediction_pool_lock:
+        if _prediction_pool is None:
+            _prediction_pool = PredictionWorkerPool(
+                num_workers=num_workers,
+                max_tasks_per_worker=max_tasks
+            )
+            _prediction_pool.start()
+    return _prediction_pool
+
+
+# Simple test function
+if __name__ == "__main__":
+    import json
+
+    logging.basicConfig(level=logging.INFO)
+
+    from predict_xgboost import XGBoostPredictor, get_available_models
+
+    predictor = XGBoostPredictor(DEFAULT_MODEL_DIR)
+    symbols = get_available_models(DEFAULT_MODEL_DIR, categorize=True)['standard']
+    if not symbols:
+        print("No trained models found.")
+        sys.exit(0)
+
+    pool = PredictionWorkerPool(num_workers=2)
+    pool.start()
+
+    rows = [({'close': 100.0 + i}, symbols[0], 'standard') for i in range(1000)]
+    start = time.time()
+    results = predictor.predict_rows(rows, scorer=pool.score_matrices)
+    print(f"Scored {len(results)} rows in {time.time() - start:.3f}s")
+    print(json.dumps(pool.health_check(), indent=2))
+
+    pool.shutdown()
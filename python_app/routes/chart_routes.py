@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Chart Routes
+
+This module serves the charts of the background chart renderer (see
+chart_renderer.py). The endpoints that produce charts return their URL,
+/api/charts/<key>, instead of drawing them in the request:
+1. GET /api/charts/<key> returns the PNG image once it is rendered (202 while
+   it is being rendered)
+2. GET /api/charts/<key>/status returns the rendering status
+"""
+
+from flask import Blueprint, jsonify, send_file
+import os
+import sys
+import logging
+
+# Add the parent directory to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_renderer import get_chart_renderer, CHART_URL_PREFIX
+
+# Create the blueprint
+chart_bp = Blueprint('charts', __name__, url_prefix=CHART_URL_PREFIX)
+
+# Images never change for a key (the key is the hash of the chart's inputs)
+CHART_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+def _status_response(key: str):
+    """JSON response for a chart that is not (yet) rendered, or None if it is"""
+    renderer = get_chart_renderer()
+    status = renderer.status(key)
+
+    if status == 'ready':
+        return None
+    if status == 'pending':
+        return jsonify({
+            'success': True,
+            'data': {'key': key, 'status': status}
+        }), 202
+    if status == 'failed':
+        return jsonify({
+            'success': False,
+            'error': f"Chart {key} failed to render: {renderer.get_error(key)}"
+        }), 500
+    return jsonify({
+        'success': False,
+        'error': f'Chart {key} not found'
+    }), 404
+
+@chart_bp.route('/<key>', methods=['GET'])
+def get_chart(key):
+    """Get a rendered chart image"""
+    try:
+        response = _status_response(key)
+        if response is not None:
+            return response
+
+        return send_file(get_chart_renderer().get_path(key), mimetype='image/png',
+                         max_age=CHART_MAX_AGE_SECONDS)
+
+    except Exception as e:
+        logging.error(f"Error serving chart {key}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@chart_bp.route('/<key>/status', methods=['GET'])
+def get_chart_status(key):
+    """Get the rendering status of a chart"""
+    try:
+        response = _status_response(key)
+        if response is not None:
+            return response
+
+        return jsonify({
+            'success': True,
+            'data': {'key': key, 'status': 'ready'}
+        })
+
+    except Exception as e:
+        logging.error(f"Error getting chart status {key}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
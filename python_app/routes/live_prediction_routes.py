@@ -23,6 +23,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the live prediction module
 from live_prediction import make_live_prediction, compare_live_predictions
+from prediction_worker_pool import get_prediction_pool, run_live_prediction
 
 # Update the module to ensure it's reloaded
 import importlib
@@ -211,6 +212,28 @@ def batch_predict_live():
         # Log the request
         logging.info(f"Received batch live prediction request for {len(symbols)} symbols using {model_type} model (compare={compare})")
         
+        # Process the symbols in the prediction worker pool when it is enabled
+        pool = get_prediction_pool()
+        if pool is not None:
+            pooled_results = pool.map_calls(run_live_prediction,
+                                            [(symbol, model_type, compare) for symbol in symbols])
+            results = {}
+            for symbol, result in zip(symbols, pooled_results):
+                results[symbol] = result if result is not None else {
+                    'success': False,
+                    'error': 'Prediction worker failed',
+                    'symbol': symbol,
+                    'timestamp': datetime.now().isoformat()
+                }
+            
+            return jsonify({
+                'success': True,
+                'count': len(symbols),
+                'timestamp': datetime.now().isoformat(),
+                'model_type': 'comparison' if compare else model_type,
+                'results': results
+            })
+        
         # Process each symbol
         results = {}
         for symbol in symbols:
@@ -4,12 +4,16 @@ ML Optimization Routes
 
 This module defines Flask routes for ML model optimization.
 It provides endpoints for:
-1. Starting optimization processes (Grid Search, Random Search, Bayesian)
-2. Getting optimization status
+1. Starting optimization processes (Grid Search, Random Search, Bayesian, Hyperband)
+2. Getting optimization status, cancelling and resuming checkpointed runs
 3. Tracking optimization results
 4. Adaptive hyperparameter tuning
 5. Market-based retraining triggers
 6. Model deployment and feedback integration
+7. Listing and cancelling the jobs of the shared job scheduler
+
+Optimization and adaptive tuning run as jobs of the shared job scheduler
+(see job_scheduler.py), which caps the CPU cores used by concurrent runs.
 
 These endpoints are used by the frontend to manage and monitor ML model optimization.
 """
@@ -23,25 +27,54 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-import threading
 
 # Add the parent directory to the path so we can import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import optimization modules
-from xgboost_optimization import XGBoostOptimizer, run_xgboost_optimization
-from adaptive_tuning import AdaptiveParameterTuner, perform_adaptive_tuning
+from xgboost_optimization import XGBoostOptimizer, OPTIMIZATION_METHODS
+from optimization_checkpoint import list_checkpoints
+from adaptive_tuning import AdaptiveParameterTuner
+from job_scheduler import get_job_scheduler, optimization_job, adaptive_tuning_job
 from model_utils import evaluate_model, save_model, load_model_with_metadata
 from market_condition_monitor import MarketConditionMonitor
 
 # Create the blueprint
 ml_optimization_bp = Blueprint('ml_optimization', __name__)
 
-# Active optimization processes
+# Directory of the optimization checkpoints (matches run_xgboost_optimization's model_dir)
+CHECKPOINT_DIR = os.path.join('models', 'checkpoints')
+
+# Optimization processes by process key (each tracks its scheduler job)
 active_processes = {}
-# Active adaptive tuning processes
+# Adaptive tuning processes by process key (each tracks its scheduler job)
 adaptive_tuning_processes = {}
 
+
+def _process_status(process: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the status of a tracked process from its scheduler job
+    
+    Args:
+        process: Tracked process record
+        
+    Returns:
+        Process record updated with the job's status, progress and timestamps
+    """
+    job = get_job_scheduler().get_job(process.get('jobId', ''))
+    if job is None:
+        return dict(process)
+    
+    status = dict(process)
+    status['status'] = job.status
+    status['progress'] = dict(job.progress)
+    status['startedAt'] = job.started_at or process.get('startedAt')
+    if job.finished_at:
+        status['completedAt'] = job.finished_at
+    if job.error:
+        status['error'] = job.error
+    return status
+
 @ml_optimization_bp.route('/start', methods=['POST'])
 def start_optimization():
     """Start a new optimization process"""
@@ -65,41 +98,30 @@ def start_optimization():
                 'error': 'Symbol and timeframe are required'
             }), 400
         
-        # Normalize symbol format
-        symbol = symbol.replace('/', '').lower()
-        
-        # Check if an optimization is already running for this symbol/timeframe
-        process_key = f"{symbol}_{timeframe}_{optimization_type}"
-        if process_key in active_processes and active_processes[process_key]['status'] == 'running':
+        if optimization_type not in OPTIMIZATION_METHODS + ['all']:
             return jsonify({
                 'success': False,
-                'error': f'Optimization already running for {symbol} {timeframe}'
-            }), 409
-        
-        # Start optimization in a background thread
-        thread = threading.Thread(
-            target=run_optimization_process,
-            args=(symbol, timeframe, optimization_type),
-            daemon=True
-        )
+                'error': f"Invalid optimization type. Must be one of: {', '.join(OPTIMIZATION_METHODS + ['all'])}"
+            }), 400
         
-        # Track the process
-        active_processes[process_key] = {
-            'symbol': symbol,
-            'timeframe': timeframe,
-            'optimizationType': optimization_type,
-            'status': 'running',
-            'startedAt': datetime.now().isoformat(),
-            'thread': thread
-        }
+        # Normalize symbol format
+        symbol = symbol.replace('/', '').lower()
         
-        # Start the thread
-        thread.start()
+        # A queued or running job for this symbol/timeframe is reused (and a queued
+        # one gets the priority of this request if that is higher)
+        process_key = f"{symbol}_{timeframe}_{optimization_type}"
+        job, created = launch_optimization(symbol, timeframe, optimization_type,
+                                           resume=bool(data.get('resume', False)))
         
         return jsonify({
             'success': True,
-            'message': f'Optimization started for {symbol} {timeframe}',
-            'processKey': process_key
+            'message': (f'Optimization started for {symbol} {timeframe}' if created else
+                        f'Optimization already {job.status} for {symbol} {timeframe}'),
+            'processKey': process_key,
+            'jobId': job.job_id,
+            'created': created,
+            'status': job.status,
+            'priority': job.priority
         })
         
     except Exception as e:
@@ -113,10 +135,7 @@ def start_optimization():
 def optimization_status():
     """Get status of active optimization processes"""
     try:
-        # Filter out thread objects for JSON serialization
-        status_info = {}
-        for key, process in active_processes.items():
-            status_info[key] = {k: v for k, v in process.items() if k != 'thread'}
+        status_info = {key: _process_status(process) for key, process in active_processes.items()}
         
         return jsonify({
             'success': True,
@@ -140,9 +159,13 @@ def cancel_optimization(process_key):
                 'error': f'Process {process_key} not found'
             }), 404
         
-        # Mark as cancelled (threads can't be forcibly stopped in Python,
-        # but the process can check this flag and exit gracefully)
-        active_processes[process_key]['status'] = 'cancelled'
+        # The search checks for cancellation between trials and stops with its trials
+        # checkpointed; the scheduler terminates the job if it does not stop in time
+        if not get_job_scheduler().cancel(active_processes[process_key].get('jobId', '')):
+            return jsonify({
+                'success': False,
+                'error': f'Process {process_key} has already finished'
+            }), 409
         
         return jsonify({
             'success': True,
@@ -156,6 +179,63 @@ def cancel_optimization(process_key):
             'error': str(e)
         }), 500
 
+@ml_optimization_bp.route('/resume/<process_key>', methods=['POST'])
+def resume_optimization(process_key):
+    """Resume a cancelled or interrupted optimization process from its checkpoints"""
+    try:
+        if process_key in active_processes:
+            process = active_processes[process_key]
+            if get_job_scheduler().find_active_job(process['symbol'], process['timeframe'],
+                                                   process['optimizationType']):
+                return jsonify({
+                    'success': False,
+                    'error': f'Process {process_key} is still running'
+                }), 409
+            symbol, timeframe, optimization_type = process['symbol'], process['timeframe'], process['optimizationType']
+        else:
+            # After a restart the process is only known by its key
+            optimization_type = next((method for method in OPTIMIZATION_METHODS + ['all']
+                                      if process_key.endswith(f"_{method}")), None)
+            prefix = process_key[:-len(optimization_type) - 1] if optimization_type else ''
+            if not optimization_type or '_' not in prefix:
+                return jsonify({
+                    'success': False,
+                    'error': f'Process {process_key} not found'
+                }), 404
+            symbol, timeframe = prefix.rsplit('_', 1)
+        
+        job, _ = launch_optimization(symbol, timeframe, optimization_type, resume=True)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Optimization resumed for {symbol} {timeframe}',
+            'processKey': process_key,
+            'jobId': job.job_id
+        })
+        
+    except Exception as e:
+        logging.error(f"Error resuming optimization: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ml_optimization_bp.route('/checkpoints', methods=['GET'])
+def get_optimization_checkpoints():
+    """List the checkpoints of optimization runs"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': list_checkpoints(CHECKPOINT_DIR)
+        })
+        
+    except Exception as e:
+        logging.error(f"Error listing optimization checkpoints: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @ml_optimization_bp.route('/results/<symbol>/<timeframe>', methods=['GET'])
 def get_optimization_results(symbol, timeframe):
     """Get results of optimization for a specific symbol and timeframe"""
@@ -192,6 +272,8 @@ def get_optimization_results(symbol, timeframe):
                         opt_type = 'random_search'
                     elif 'bayesian' in filename:
                         opt_type = 'bayesian'
+                    elif 'hyperband' in filename:
+                        opt_type = 'hyperband'
                     elif 'baseline' in filename:
                         opt_type = 'baseline'
                         
@@ -203,7 +285,8 @@ def get_optimization_results(symbol, timeframe):
                         'accuracy': metadata.get('performance', {}).get('accuracy', 0),
                         'f1Score': metadata.get('performance', {}).get('f1_score', 0),
                         'trainingDate': metadata.get('training_date', ''),
-                        'params': metadata.get('params', {})
+                        'params': metadata.get('params', {}),
+                        'wallClockSeconds': metadata.get('search_cost', {}).get('wall_clock_seconds')
                     })
                 except Exception as e:
                     logging.error(f"Error reading metadata file {filename}: {str(e)}")
@@ -232,7 +315,7 @@ def compare_optimization_methods(symbol, timeframe):
         comparison = {}
         
         # Check for each optimization type
-        for opt_type in ['baseline', 'grid_search', 'random_search', 'bayesian']:
+        for opt_type in ['baseline'] + OPTIMIZATION_METHODS:
             metadata_path = os.path.join(model_dir, f'xgboost_{symbol}_{timeframe}_{opt_type}_metadata.json')
             
             if os.path.exists(metadata_path):
@@ -244,14 +327,16 @@ def compare_optimization_methods(symbol, timeframe):
                     'precision': metadata.get('performance', {}).get('precision', 0),
                     'recall': metadata.get('performance', {}).get('recall', 0),
                     'f1Score': metadata.get('performance', {}).get('f1_score', 0),
-                    'params': metadata.get('params', {})
+                    'params': metadata.get('params', {}),
+                    'wallClockSeconds': metadata.get('search_cost', {}).get('wall_clock_seconds'),
+                    'candidatesEvaluated': metadata.get('search_cost', {}).get('candidates_evaluated')
                 }
         
         # Calculate improvements over baseline
         if 'baseline' in comparison:
             baseline_accuracy = comparison['baseline']['accuracy']
             
-            for opt_type in ['grid_search', 'random_search', 'bayesian']:
+            for opt_type in OPTIMIZATION_METHODS:
                 if opt_type in comparison:
                     accuracy = comparison[opt_type]['accuracy']
                     improvement = (accuracy - baseline_accuracy) / baseline_accuracy if baseline_accuracy > 0 else 0
@@ -306,12 +391,24 @@ def get_optimization_parameters():
             'n_estimators': (50, 500)
         }
         
+        # Hyperband parameters (n_estimators is set by the round budget)
+        hyperband_params = {
+            'max_depth': ('int_uniform', 3, 10),
+            'learning_rate': ('uniform', 0.01, 0.3),
+            'min_child_weight': ('int_uniform', 1, 6),
+            'gamma': ('uniform', 0, 0.5),
+            'subsample': ('uniform', 0.6, 1.0),
+            'colsample_bytree': ('uniform', 0.6, 1.0),
+            'budget': {'min_rounds': 20, 'max_rounds': 500, 'eta': 3}
+        }
+        
         return jsonify({
             'success': True,
             'data': {
                 'grid_search': grid_search_params,
                 'random_search': random_search_params,
-                'bayesian': bayesian_params
+                'bayesian': bayesian_params,
+                'hyperband': hyperband_params
             }
         })
         
@@ -322,42 +419,44 @@ def get_optimization_parameters():
             'error': str(e)
         }), 500
 
-def run_optimization_process(symbol, timeframe, optimization_type):
+def launch_optimization(symbol, timeframe, optimization_type, resume=False):
     """
-    Run the optimization process in a background thread
+    Submit an optimization job to the job scheduler and track it
     
     Args:
         symbol: Trading pair symbol
         timeframe: Timeframe
         optimization_type: Type of optimization to run
+        resume: Whether to continue from the run's checkpoints
+        
+    Returns:
+        Tuple of (scheduler job, whether a new job was created)
     """
     process_key = f"{symbol}_{timeframe}_{optimization_type}"
+    scheduler = get_job_scheduler()
     
-    try:
-        logging.info(f"Starting optimization process for {symbol} {timeframe} ({optimization_type})")
-        
-        # Run the optimization
-        run_xgboost_optimization(
-            symbol=symbol,
-            timeframe=timeframe,
-            optimization_type=optimization_type
-        )
-        
-        # Update status
-        if process_key in active_processes:
-            active_processes[process_key]['status'] = 'completed'
-            active_processes[process_key]['completedAt'] = datetime.now().isoformat()
-            
-        logging.info(f"Optimization process completed for {symbol} {timeframe} ({optimization_type})")
-        
-    except Exception as e:
-        logging.error(f"Error in optimization process for {symbol} {timeframe}: {str(e)}")
-        
-        # Update status
-        if process_key in active_processes:
-            active_processes[process_key]['status'] = 'failed'
-            active_processes[process_key]['error'] = str(e)
-            active_processes[process_key]['completedAt'] = datetime.now().isoformat()
+    # An optimization may use up to half of the cores so a second run or a
+    # retraining job can still start next to it
+    job, created = scheduler.submit(
+        'optimization', symbol, timeframe, optimization_type, optimization_job,
+        args=(symbol, timeframe, optimization_type),
+        kwargs={'resume': resume},
+        cpu_slots=max(1, scheduler.max_cpu_slots // 2)
+    )
+    
+    # Track the process (an existing job may have been submitted by another caller)
+    if created or active_processes.get(process_key, {}).get('jobId') != job.job_id:
+        active_processes[process_key] = {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'optimizationType': optimization_type,
+            'status': job.status,
+            'resumed': resume,
+            'startedAt': datetime.now().isoformat(),
+            'jobId': job.job_id
+        }
+    
+    return job, created
 
 @ml_optimization_bp.route('/adaptive-tuning/start', methods=['POST'])
 def start_adaptive_tuning():
@@ -384,37 +483,33 @@ def start_adaptive_tuning():
         # Normalize symbol format
         symbol = symbol.replace('/', '').lower()
         
-        # Check if adaptive tuning is already running for this symbol/timeframe
+        # Submit adaptive tuning to the job scheduler; a queued or running job for this
+        # symbol/timeframe is reused (and a queued one gets this request's priority)
         process_key = f"{symbol}_{timeframe}_adaptive"
-        if process_key in adaptive_tuning_processes and adaptive_tuning_processes[process_key]['status'] == 'running':
-            return jsonify({
-                'success': False,
-                'error': f'Adaptive tuning already running for {symbol} {timeframe}'
-            }), 409
-        
-        # Start adaptive tuning in a background thread
-        thread = threading.Thread(
-            target=run_adaptive_tuning_process,
-            args=(symbol, timeframe),
-            daemon=True
+        job, created = get_job_scheduler().submit(
+            'adaptive_tuning', symbol, timeframe, 'adaptive', adaptive_tuning_job,
+            args=(symbol, timeframe)
         )
         
         # Track the process
-        adaptive_tuning_processes[process_key] = {
-            'symbol': symbol,
-            'timeframe': timeframe,
-            'status': 'running',
-            'startedAt': datetime.now().isoformat(),
-            'thread': thread
-        }
-        
-        # Start the thread
-        thread.start()
+        if created or adaptive_tuning_processes.get(process_key, {}).get('jobId') != job.job_id:
+            adaptive_tuning_processes[process_key] = {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'status': job.status,
+                'startedAt': datetime.now().isoformat(),
+                'jobId': job.job_id
+            }
         
         return jsonify({
             'success': True,
-            'message': f'Adaptive tuning started for {symbol} {timeframe}',
-            'processKey': process_key
+            'message': (f'Adaptive tuning started for {symbol} {timeframe}' if created else
+                        f'Adaptive tuning already {job.status} for {symbol} {timeframe}'),
+            'processKey': process_key,
+            'jobId': job.job_id,
+            'created': created,
+            'status': job.status,
+            'priority': job.priority
         })
         
     except Exception as e:
@@ -428,10 +523,17 @@ def start_adaptive_tuning():
 def adaptive_tuning_status():
     """Get status of active adaptive tuning processes"""
     try:
-        # Filter out thread objects for JSON serialization
+        scheduler = get_job_scheduler()
         status_info = {}
         for key, process in adaptive_tuning_processes.items():
-            status_info[key] = {k: v for k, v in process.items() if k != 'thread'}
+            status_info[key] = _process_status(process)
+            job = scheduler.get_job(process.get('jobId', ''))
+            if job is not None and job.result:
+                status_info[key]['adapted'] = job.result.get('adapted', False)
+                status_info[key]['modelId'] = job.result.get('model_id', '')
+                status_info[key]['trainingMode'] = job.result.get('training_mode')
+                if job.result.get('adapted'):
+                    status_info[key]['performance'] = job.result.get('performance', {})
         
         return jsonify({
             'success': True,
@@ -551,49 +653,46 @@ def check_adaptive_tuning_needed(symbol, timeframe):
             'error': str(e)
         }), 500
 
-def run_adaptive_tuning_process(symbol, timeframe):
-    """
-    Run the adaptive tuning process in a background thread
-    
-    Args:
-        symbol: Trading pair symbol
-        timeframe: Timeframe
-    """
-    process_key = f"{symbol}_{timeframe}_adaptive"
-    
+@ml_optimization_bp.route('/jobs', methods=['GET'])
+def list_scheduler_jobs():
+    """List the jobs of the job scheduler (optionally filtered by kind and status)"""
     try:
-        logging.info(f"Starting adaptive tuning process for {symbol} {timeframe}")
-        
-        # Run the adaptive tuning
-        result = perform_adaptive_tuning(
-            symbol=symbol,
-            timeframe=timeframe
-        )
+        scheduler = get_job_scheduler()
         
-        # Update status
-        if process_key in adaptive_tuning_processes:
-            if result.get('success'):
-                adaptive_tuning_processes[process_key]['status'] = 'completed'
-                adaptive_tuning_processes[process_key]['adapted'] = result.get('adapted', False)
-                adaptive_tuning_processes[process_key]['modelId'] = result.get('model_id', '')
-                if result.get('adapted'):
-                    adaptive_tuning_processes[process_key]['performance'] = result.get('performance', {})
-            else:
-                adaptive_tuning_processes[process_key]['status'] = 'failed'
-                adaptive_tuning_processes[process_key]['error'] = result.get('error', 'Unknown error')
-                
-            adaptive_tuning_processes[process_key]['completedAt'] = datetime.now().isoformat()
-            
-        logging.info(f"Adaptive tuning process completed for {symbol} {timeframe}")
+        return jsonify({
+            'success': True,
+            'scheduler': scheduler.get_status(),
+            'jobs': scheduler.list_jobs(kind=request.args.get('kind'), status=request.args.get('status'))
+        })
         
     except Exception as e:
-        logging.error(f"Error in adaptive tuning process for {symbol} {timeframe}: {str(e)}")
+        logging.error(f"Error listing scheduler jobs: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ml_optimization_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_scheduler_job(job_id):
+    """Cancel a queued or running job of the job scheduler"""
+    try:
+        if not get_job_scheduler().cancel(job_id):
+            return jsonify({
+                'success': False,
+                'error': f'Job {job_id} not found or already finished'
+            }), 404
         
-        # Update status
-        if process_key in adaptive_tuning_processes:
-            adaptive_tuning_processes[process_key]['status'] = 'failed'
-            adaptive_tuning_processes[process_key]['error'] = str(e)
-            adaptive_tuning_processes[process_key]['completedAt'] = datetime.now().isoformat()
+        return jsonify({
+            'success': True,
+            'message': f'Job {job_id} marked for cancellation'
+        })
+        
+    except Exception as e:
+        logging.error(f"Error cancelling job {job_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 # Market Condition Monitor instance
 market_monitor = None
@@ -699,7 +798,7 @@ def market_monitor_status():
             'running': market_monitor.running,
             'monitored_assets': market_monitor.monitored_assets,
             'condition_changes': market_monitor.condition_changes,
-            'queue_size': market_monitor.retrain_queue.qsize() if market_monitor.running else 0
+            'queue_size': market_monitor.get_queue_size() if market_monitor.running else 0
         })
         
     except Exception as e:
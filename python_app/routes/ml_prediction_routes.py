@@ -6,6 +6,7 @@ It provides endpoints for:
 1. Getting predictions from the XGBoost model for a specific symbol
 2. Getting available trained models
 3. Getting model metadata and performance metrics
+4. Getting precomputed feature importance and cached feature contributions
 
 These endpoints are used by the frontend to display ML predictions.
 """
@@ -22,6 +23,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the XGBoost predictor
 from predict_xgboost import XGBoostPredictor, get_available_models
+from prediction_worker_pool import get_prediction_pool
+from model_artifacts import IMPORTANCE_TYPES
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
 
 # Create the blueprint
 ml_prediction_bp = Blueprint('ml_prediction_xgboost', __name__)
@@ -39,11 +44,10 @@ def get_predictor() -> XGBoostPredictor:
     global predictor
     
     if predictor is None:
-        model_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
-        predictor = XGBoostPredictor(model_dir)
+        predictor = XGBoostPredictor(MODEL_DIR)
         
         # Pre-load available models (both standard and balanced)
-        models = get_available_models(model_dir, categorize=True)
+        models = get_available_models(MODEL_DIR, categorize=True)
         
         # Load standard models
         for symbol in models['standard']:
@@ -329,6 +333,10 @@ def batch_predict():
     market_data_batch = batch_data['data']
     symbols = [symbol.lower() for symbol in batch_data['symbols']]
     
+    # Score in the prediction worker pool when it is enabled
+    pool = get_prediction_pool()
+    scorer = pool.score_matrices if pool is not None else None
+    
     # If comparing models, we need to load both for each symbol
     if compare:
         # Create a container for results
@@ -337,8 +345,8 @@ def batch_predict():
             'balanced': []
         }
         
-        # For each symbol and its data
-        for market_data, symbol in zip(market_data_batch, symbols):
+        # Make sure both models are loaded for every symbol
+        for symbol in symbols:
             # Ensure both models are loaded
             standard_model_key = symbol
             balanced_model_key = f"{symbol}_balanced"
@@ -360,17 +368,14 @@ def batch_predict():
                         'success': False,
                         'message': f'Balanced model for {symbol} not found'
                     }), 404
-            
-            # Make predictions with both models
-            result = predictor.predict_with_both_models(market_data, symbol)
-            
-            # Add success flags
-            result['standard']['success'] = result['standard']['predicted_class'] is not None
-            result['balanced']['success'] = result['balanced']['predicted_class'] is not None
-            
-            # Add to results
-            comparison_results['standard'].append(result['standard'])
-            comparison_results['balanced'].append(result['balanced'])
+        
+        # Make predictions with both models, one stacked matrix per model
+        for model_type in ['standard', 'balanced']:
+            rows = [(market_data, symbol, model_type) for market_data, symbol in zip(market_data_batch, symbols)]
+            for result in predictor.predict_rows(rows, scorer=scorer):
+                # Add success flag
+                result['success'] = result['predicted_class'] is not None
+                comparison_results[model_type].append(result)
         
         return jsonify({
             'success': True,
@@ -394,9 +399,9 @@ def batch_predict():
                         'message': f'{model_type.capitalize()} model for {symbol} not found'
                     }), 404
         
-        # Make predictions for each data point
-        for market_data, symbol in zip(market_data_batch, symbols):
-            result = predictor.predict(market_data, symbol, model_type)
+        # Make predictions for all data points, one stacked matrix per model
+        rows = [(market_data, symbol, model_type) for market_data, symbol in zip(market_data_batch, symbols)]
+        for result in predictor.predict_rows(rows, scorer=scorer):
             result['success'] = result['predicted_class'] is not None
             model_results.append(result)
         
@@ -407,27 +412,80 @@ def batch_predict():
         })
 
 
+@ml_prediction_bp.route('/pool-health', methods=['GET'])
+def pool_health():
+    """
+    Get the health of the prediction worker pool.
+    
+    Returns:
+        JSON response with worker pool status, or enabled=false if the pool is disabled
+    """
+    pool = get_prediction_pool()
+    if pool is None:
+        return jsonify({
+            'success': True,
+            'enabled': False
+        })
+    
+    health = pool.health_check()
+    return jsonify({
+        'success': health['healthy'],
+        'enabled': True,
+        'health': health
+    })
+
+
+def _importance_payload(symbol: str, model_type: str, importance_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a model's precomputed feature importance in the response format.
+    
+    Args:
+        symbol: Symbol name (e.g., 'btcusdt')
+        model_type: 'standard' or 'balanced'
+        importance_type: Importance type (e.g., 'gain')
+        
+    Returns:
+        Dictionary with features, importance fractions and model version, or None if
+        the model does not exist
+    """
+    from ml_analysis.feature_importance_analyzer import get_importance_table
+    
+    table = get_importance_table(symbol, model_type, MODEL_DIR)
+    if table is None:
+        return None
+    
+    return {
+        'features': table['features'],
+        'importance': [pct / 100 for pct in table['importance'][importance_type]['pct']],
+        'importance_type': importance_type,
+        'model_version': table.get('model_version')
+    }
+
+
 @ml_prediction_bp.route('/feature-importance/<symbol>', methods=['GET'])
 def feature_importance(symbol: str):
     """
     Get feature importance for a specific model.
     
+    The importance is precomputed when the model is saved, so this only reads it.
+    
     Args:
         symbol: Symbol name (e.g., 'btcusdt')
         
     Query Parameters:
         model_type: The type of model to get feature importance for ('standard' or 'balanced')
         compare: If 'true', return feature importance for both models
+        importance_type: 'gain' (default), 'weight', 'cover', 'total_gain' or 'total_cover'
         
     Returns:
         JSON response with feature importance data
     """
     symbol = symbol.lower()
-    predictor = get_predictor()
     
     # Get query parameters
     model_type = request.args.get('model_type', 'standard')
     compare = request.args.get('compare', 'false').lower() == 'true'
+    importance_type = request.args.get('importance_type', 'gain')
     
     # Validate model_type
     if model_type not in ['standard', 'balanced']:
@@ -436,56 +494,27 @@ def feature_importance(symbol: str):
             'message': f'Invalid model_type: {model_type}. Must be "standard" or "balanced"'
         }), 400
     
+    if importance_type not in IMPORTANCE_TYPES:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid importance_type: {importance_type}. Must be one of {", ".join(IMPORTANCE_TYPES)}'
+        }), 400
+    
     # If comparing, return feature importance for both models
     if compare:
-        standard_model_key = symbol
-        balanced_model_key = f"{symbol}_balanced"
-        
-        # Load standard model if not already loaded
-        if standard_model_key not in predictor.metadata:
-            standard_loaded = predictor.load_model(symbol, "standard")
-            if not standard_loaded:
-                return jsonify({
-                    'success': False,
-                    'message': f'Standard model for {symbol} not found'
-                }), 404
-        
-        # Load balanced model if not already loaded
-        if balanced_model_key not in predictor.metadata:
-            balanced_loaded = predictor.load_model(symbol, "balanced")
-            if not balanced_loaded:
-                return jsonify({
-                    'success': False,
-                    'message': f'Balanced model for {symbol} not found'
-                }), 404
-        
-        # Get metadata for both models
-        standard_metadata = predictor.metadata[standard_model_key]
-        balanced_metadata = predictor.metadata[balanced_model_key]
-        
-        # Get or generate feature importance for both models
-        standard_feature_importance = {}
-        balanced_feature_importance = {}
-        
-        # For standard model
-        if 'feature_importance' in standard_metadata:
-            standard_feature_importance = standard_metadata['feature_importance']
-        else:
-            # Generate placeholder
-            standard_feature_importance = {
-                'features': predictor.features[standard_model_key],
-                'importance': [0.05] * len(predictor.features[standard_model_key])
-            }
-        
-        # For balanced model
-        if 'feature_importance' in balanced_metadata:
-            balanced_feature_importance = balanced_metadata['feature_importance']
-        else:
-            # Generate placeholder
-            balanced_feature_importance = {
-                'features': predictor.features[balanced_model_key],
-                'importance': [0.05] * len(predictor.features[balanced_model_key])
-            }
+        standard_feature_importance = _importance_payload(symbol, 'standard', importance_type)
+        if standard_feature_importance is None:
+            return jsonify({
+                'success': False,
+                'message': f'Standard model for {symbol} not found'
+            }), 404
+        
+        balanced_feature_importance = _importance_payload(symbol, 'balanced', importance_type)
+        if balanced_feature_importance is None:
+            return jsonify({
+                'success': False,
+                'message': f'Balanced model for {symbol} not found'
+            }), 404
         
         return jsonify({
             'success': True,
@@ -498,31 +527,12 @@ def feature_importance(symbol: str):
         })
     else:
         # Just return feature importance for one model
-        model_suffix = "_balanced" if model_type == "balanced" else ""
-        model_key = f"{symbol}{model_suffix}"
-        
-        # Load the model if not already loaded
-        if model_key not in predictor.metadata:
-            success = predictor.load_model(symbol, model_type)
-            if not success:
-                return jsonify({
-                    'success': False,
-                    'message': f'{model_type.capitalize()} model for {symbol} not found'
-                }), 404
-        
-        # Get the model metadata
-        metadata = predictor.metadata[model_key]
-        
-        # Check if the metadata has feature importance
-        if 'feature_importance' not in metadata:
-            # We need to generate it - in a real application, this would be pre-computed
-            # For this demo, we'll return a placeholder
-            feature_importance = {
-                'features': predictor.features[model_key],
-                'importance': [0.05] * len(predictor.features[model_key])  # Placeholder
-            }
-        else:
-            feature_importance = metadata['feature_importance']
+        feature_importance = _importance_payload(symbol, model_type, importance_type)
+        if feature_importance is None:
+            return jsonify({
+                'success': False,
+                'message': f'{model_type.capitalize()} model for {symbol} not found'
+            }), 404
         
         return jsonify({
             'success': True,
@@ -532,6 +542,64 @@ def feature_importance(symbol: str):
         })
 
 
+@ml_prediction_bp.route('/contributions/<symbol>', methods=['GET'])
+def feature_contributions(symbol: str):
+    """
+    Get per-prediction feature contributions over the symbol's stored test set.
+    
+    Contributions are computed once per model version and sample set and cached
+    on disk; later calls only read the cached summary.
+    
+    Args:
+        symbol: Symbol name (e.g., 'btcusdt')
+        
+    Query Parameters:
+        model_type: 'standard' or 'balanced' (default 'balanced')
+        max_rows: Number of most recent test rows to use (default: all)
+        top: Number of ranked features to return (default 20, 0 for all)
+        
+    Returns:
+        JSON response with the contribution summary
+    """
+    from ml_analysis.feature_importance_analyzer import load_contribution_samples, compute_contributions
+    
+    symbol = symbol.lower()
+    model_type = request.args.get('model_type', 'balanced')
+    max_rows = request.args.get('max_rows', type=int)
+    top = request.args.get('top', 20, type=int)
+    
+    if model_type not in ['standard', 'balanced']:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid model_type: {model_type}. Must be "standard" or "balanced"'
+        }), 400
+    
+    try:
+        samples = load_contribution_samples(symbol, max_rows=max_rows)
+        summary = compute_contributions(symbol, model_type, samples, MODEL_DIR)
+    except FileNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        logging.error(f"Error computing contributions for {symbol}: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error computing contributions: {e}'
+        }), 500
+    
+    if top > 0:
+        summary['ranking'] = summary['ranking'][:top]
+    
+    return jsonify({
+        'success': True,
+        'symbol': symbol,
+        'model_type': model_type,
+        'contributions': summary
+    })
+
+
 def register_routes(app):
     """
     Register the ML prediction routes with the Flask application.
@@ -16,6 +16,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import prediction functionality
 from predict import make_prediction, get_sample_data
+from model_artifacts import list_symbol_models
 from config import active_config
 
 # Create blueprint
@@ -65,12 +66,8 @@ def status():
         # Get the models directory path
         models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
         
-        # Check for available models
-        available_models = []
-        for file in os.listdir(models_dir):
-            if file.startswith('model_') and file.endswith('.pkl'):
-                symbol = file.replace('model_', '').replace('.pkl', '').upper()
-                available_models.append(symbol)
+        # Check for available models (native artifacts and legacy pickles)
+        available_models = list_symbol_models(models_dir)
         
         return jsonify({
             'success': True,
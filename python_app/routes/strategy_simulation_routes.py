@@ -17,7 +17,9 @@ from typing import Dict, Any, List, Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import simulation modules
-from python_app.strategy_simulation import run_strategy_simulation, compare_strategies, StrategySimulator
+from python_app.strategy_simulation import run_strategy_simulation, compare_strategies, run_strategy_sweep, run_strategy_robustness, run_portfolio_simulation, StrategySimulator
+from python_app.strategy_robustness import ROBUSTNESS_METHODS, MAX_ROBUSTNESS_SIMULATIONS
+from python_app.strategy_sweep import count_parameter_sets, MAX_SWEEP_COMBINATIONS, RANK_METRICS
 
 # Create the blueprint
 strategy_simulation_bp = Blueprint('strategy_simulation', __name__, url_prefix='/api/strategy-simulation')
@@ -134,6 +136,264 @@ def compare_strategy_types():
             'error': str(e)
         }), 500
 
+# Request keys of the swept parameters
+SWEEP_GRID_KEYS = {
+    'stopLossPercent': 'stop_loss_percent',
+    'takeProfitPercent': 'take_profit_percent',
+    'tradeSizePercent': 'trade_size_percent',
+    'leverage': 'leverage',
+    'confidenceThreshold': 'confidence_threshold'
+}
+
+@strategy_simulation_bp.route('/sweep', methods=['POST'])
+def sweep_strategy_parameters():
+    """Sweep grids of strategy parameters on the same market data and predictions"""
+    try:
+        data = request.json
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+        
+        # Required parameters
+        symbol = data.get('symbol')
+        timeframe = data.get('timeframe')
+        start_date = data.get('startDate')
+        end_date = data.get('endDate')
+        parameter_grid = data.get('parameterGrid')
+        
+        if not symbol or not timeframe or not start_date or not end_date or not parameter_grid:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required parameters (symbol, timeframe, startDate, endDate, parameterGrid)'
+            }), 400
+        
+        unknown = [key for key in parameter_grid if key not in SWEEP_GRID_KEYS]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown grid parameters {unknown}. Must be in: {', '.join(SWEEP_GRID_KEYS)}"
+            }), 400
+        
+        grid = {SWEEP_GRID_KEYS[key]: values for key, values in parameter_grid.items()}
+        try:
+            combinations = count_parameter_sets(grid)
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'parameterGrid values must be lists of numbers'
+            }), 400
+        if combinations > MAX_SWEEP_COMBINATIONS:
+            return jsonify({
+                'success': False,
+                'error': f'parameterGrid expands into {combinations} parameter sets, more than the {MAX_SWEEP_COMBINATIONS} allowed'
+            }), 400
+        
+        rank_by = data.get('rankBy', 'pnl_percent')
+        if rank_by not in RANK_METRICS:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown rankBy metric '{rank_by}'. Must be one of: {', '.join(RANK_METRICS)}"
+            }), 400
+        
+        # Normalize symbol format
+        symbol = symbol.replace('/', '').lower()
+        
+        # Run the sweep
+        result = run_strategy_sweep(
+            symbol,
+            timeframe,
+            start_date,
+            end_date,
+            grid,
+            initial_investment=float(data.get('initialInvestment', 10000.0)),
+            model_type=data.get('modelType', 'best'),
+            strategy_type=data.get('strategyType', 'balanced'),
+            rank_by=rank_by,
+            top_n=int(data.get('topN', 50))
+        )
+        
+        if result.get('success', False):
+            return jsonify({
+                'success': True,
+                'data': result
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': result.get('error', 'Unknown error')
+            }), 500
+        
+    except Exception as e:
+        logging.error(f"Error sweeping strategy parameters: {str(e)}")
+        import traceback
+        logging.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Strategy parameters of a robustness request: request key -> (parameter name, default)
+ROBUSTNESS_PARAMETER_KEYS = {
+    'tradeSizePercent': ('trade_size_percent', 10.0),
+    'stopLossPercent': ('stop_loss_percent', 2.0),
+    'takeProfitPercent': ('take_profit_percent', 3.0),
+    'leverage': ('leverage', 1.0),
+    'confidenceThreshold': ('confidence_threshold', 0.6)
+}
+
+@strategy_simulation_bp.route('/robustness', methods=['POST'])
+def analyze_strategy_robustness():
+    """Run Monte Carlo robustness analysis of a strategy"""
+    try:
+        data = request.json
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+        
+        # Required parameters
+        symbol = data.get('symbol')
+        timeframe = data.get('timeframe')
+        start_date = data.get('startDate')
+        end_date = data.get('endDate')
+        
+        if not symbol or not timeframe or not start_date or not end_date:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required parameters (symbol, timeframe, startDate, endDate)'
+            }), 400
+        
+        methods = data.get('methods')
+        if methods is not None:
+            unknown = [method for method in methods if method not in ROBUSTNESS_METHODS]
+            if unknown:
+                return jsonify({
+                    'success': False,
+                    'error': f"Unknown robustness methods {unknown}. Must be in: {', '.join(ROBUSTNESS_METHODS)}"
+                }), 400
+        
+        # The analysis runs in the request, so bound its size
+        try:
+            n_simulations = int(data.get('simulations', 10000))
+        except (TypeError, ValueError):
+            n_simulations = 0
+        if not 1 <= n_simulations <= MAX_ROBUSTNESS_SIMULATIONS:
+            return jsonify({
+                'success': False,
+                'error': f'simulations must be an integer between 1 and {MAX_ROBUSTNESS_SIMULATIONS}'
+            }), 400
+        
+        strategy_config = data.get('strategyConfig') or {}
+        parameters = {name: float(strategy_config.get(key, default))
+                      for key, (name, default) in ROBUSTNESS_PARAMETER_KEYS.items()}
+        fee_percent = data.get('feePercent', [0.02, 0.1])
+        seed = data.get('seed')
+        
+        # Normalize symbol format
+        symbol = symbol.replace('/', '').lower()
+        
+        # Run the analysis
+        result = run_strategy_robustness(
+            symbol,
+            timeframe,
+            start_date,
+            end_date,
+            parameters,
+            initial_investment=float(strategy_config.get('initialInvestment', 10000.0)),
+            model_type=strategy_config.get('modelType', 'best'),
+            strategy_type=strategy_config.get('strategyType', 'balanced'),
+            methods=methods,
+            n_simulations=n_simulations,
+            block_size=int(data.get('blockSize', 288)),
+            fee_percent=(float(fee_percent[0]), float(fee_percent[1])),
+            slippage_percent=float(data.get('slippagePercent', 0.05)),
+            seed=int(seed) if seed is not None else None
+        )
+        
+        if result.get('success', False):
+            return jsonify({
+                'success': True,
+                'data': result
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': result.get('error', 'Unknown error')
+            }), 500
+        
+    except Exception as e:
+        logging.error(f"Error analyzing strategy robustness: {str(e)}")
+        import traceback
+        logging.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@strategy_simulation_bp.route('/portfolio', methods=['POST'])
+def run_portfolio():
+    """Simulate a strategy over several symbols sharing one balance"""
+    try:
+        data = request.json
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+        
+        # Required parameters
+        symbols = data.get('symbols')
+        timeframe = data.get('timeframe')
+        strategy_config = data.get('strategyConfig')
+        start_date = data.get('startDate')
+        end_date = data.get('endDate')
+        
+        if not symbols or not timeframe or not strategy_config or not start_date or not end_date:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required parameters (symbols, timeframe, strategyConfig, startDate, endDate)'
+            }), 400
+        
+        # Normalize symbol format
+        symbols = list(dict.fromkeys(symbol.replace('/', '').lower() for symbol in symbols))
+        
+        # Run the simulation
+        result = run_portfolio_simulation(
+            symbols,
+            timeframe,
+            start_date,
+            end_date,
+            strategy_config,
+            max_asset_exposure_percent=float(data.get('maxAssetExposurePercent', 25.0)),
+            max_total_exposure_percent=float(data.get('maxTotalExposurePercent', 100.0))
+        )
+        
+        if result.get('success', False):
+            return jsonify({
+                'success': True,
+                'data': result
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': result.get('error', 'Unknown error')
+            }), 500
+        
+    except Exception as e:
+        logging.error(f"Error running portfolio simulation: {str(e)}")
+        import traceback
+        logging.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @strategy_simulation_bp.route('/historical-data/<symbol>/<timeframe>', methods=['GET'])
 def get_historical_data(symbol, timeframe):
     """Get historical market data for a specific symbol and timeframe"""
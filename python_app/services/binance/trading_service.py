@@ -16,10 +16,9 @@ not HTTP requests or API wrappers.
 import os
 import sys
 import json
-import time
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple, cast
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable, cast
 
 # Configure logging
 logging.basicConfig(
@@ -86,6 +85,12 @@ except ImportError:
         def log_error(symbol, operation, error_message, context=None):
             logger.error(f"ERROR: {symbol} {operation} - {error_message}")
 
+# Import the clock so replays can run paper trading on simulated time
+try:
+    from python_app.utils.clock import get_clock
+except ImportError:
+    from utils.clock import get_clock
+
 # Using the official Binance connector SDK
 try:
     from binance.spot import Spot
@@ -125,7 +130,8 @@ class BinanceTradingService:
                  max_retries: int = 3,
                  user_id: str = None,      # User ID for API key lookup
                  api_key: str = None,      # Optional direct API key
-                 secret_key: str = None):  # Optional direct secret key
+                 secret_key: str = None,   # Optional direct secret key
+                 price_source: Optional[Callable[[str], Optional[float]]] = None):
         """
         Initialize the Binance Trading Service
         
@@ -136,6 +142,8 @@ class BinanceTradingService:
             user_id: User ID for API key lookup (default: None)
             api_key: Optional direct API key, overrides user_id lookup (default: None)
             secret_key: Optional direct secret key, overrides user_id lookup (default: None)
+            price_source: Optional callable returning the price paper trades fill at for a
+                symbol, e.g. a replay feed (default: the Binance market service)
         """
         # If use_testnet is not specified, use the config value
         if use_testnet is None and active_config:
@@ -153,6 +161,8 @@ class BinanceTradingService:
         self.client = None  # Will be initialized on first use
         self.open_orders = []  # For tracking paper trade orders
         self.positions = []    # For tracking paper trade positions
+        self.price_source = price_source
+        self._last_paper_order_id = 0
         
         mode_str = "TESTNET" if use_testnet else "PRODUCTION"
         trade_type = "PAPER TRADING" if paper_mode else "REAL TRADING"
@@ -347,8 +357,8 @@ class BinanceTradingService:
         Returns:
             Order response data
         """
-        # Ensure client is initialized
-        if self.client is None:
+        # Ensure client is initialized (paper trading never talks to Binance)
+        if self.client is None and not self.paper_mode:
             self.client = self._create_client()
         # Standardize inputs
         symbol = symbol.upper().replace('-', '')
@@ -463,7 +473,7 @@ class BinanceTradingService:
                     }
                     
                 # Wait before retrying
-                time.sleep(2 ** attempt)  # Exponential backoff
+                get_clock().sleep(2 ** attempt)  # Exponential backoff
                 
             except ServerError as e:
                 error_msg = f"Binance server error: {e}"
@@ -492,7 +502,7 @@ class BinanceTradingService:
                     }
                     
                 # Wait before retrying
-                time.sleep(2 ** attempt)  # Exponential backoff
+                get_clock().sleep(2 ** attempt)  # Exponential backoff
                 
             except Exception as e:
                 error_msg = f"Unexpected error executing order: {e}"
@@ -521,7 +531,7 @@ class BinanceTradingService:
                     }
                     
                 # Wait before retrying
-                time.sleep(2 ** attempt)  # Exponential backoff
+                get_clock().sleep(2 ** attempt)  # Exponential backoff
     
     def place_market_order(self, symbol: str, side: str, quantity: float, user_id: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -572,6 +582,25 @@ class BinanceTradingService:
             position_id=None
         )
     
+    def _paper_market_price(self, symbol: str) -> Optional[float]:
+        """
+        Get the current price paper trades are filled at
+        
+        Args:
+            symbol: Trading pair symbol (e.g., BTCUSDT)
+            
+        Returns:
+            The price from the price source or the market service, or None if unavailable
+        """
+        if self.price_source is not None:
+            return self.price_source(symbol)
+        
+        from python_app.services.binance.market_service import binance_market_service
+        price_data = binance_market_service.get_symbol_price(symbol)
+        if price_data and 'price' in price_data:
+            return float(price_data['price'])
+        return None
+    
     def _execute_paper_trade(self, 
                             symbol: str, 
                             side: str, 
@@ -595,8 +624,9 @@ class BinanceTradingService:
         Returns:
             Simulated order response data
         """
-        # Generate a simulated order ID
-        order_id = int(time.time() * 1000)
+        # Generate a simulated order ID (unique even when orders share a millisecond)
+        order_id = max(int(get_clock().time() * 1000), self._last_paper_order_id + 1)
+        self._last_paper_order_id = order_id
         
         # Use the provided price or get the current price
         # For paper trading we'll assume the order gets filled immediately at the current price
@@ -604,10 +634,7 @@ class BinanceTradingService:
         if execution_price is None:
             # Try to get market price from our market service
             try:
-                from python_app.services.binance.market_service import binance_market_service
-                price_data = binance_market_service.get_symbol_price(symbol)
-                if price_data and 'price' in price_data:
-                    execution_price = float(price_data['price'])
+                execution_price = self._paper_market_price(symbol)
             except Exception as e:
                 logger.warning(f"Could not get market price: {e}. Using fallback price.")
                 # Fallback price (BTC ~ $69,000, ETH ~ $1,900)
@@ -620,7 +647,7 @@ class BinanceTradingService:
             "side": side,
             "quantity": quantity,
             "entry_price": execution_price,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": get_clock().now().isoformat(),
             "status": "OPEN",
             "ml_confidence": ml_signal.get('confidence') if ml_signal else None
         }
@@ -672,8 +699,8 @@ class BinanceTradingService:
         Returns:
             True if a position exists, False otherwise
         """
-        # Ensure client is initialized
-        if self.client is None:
+        # Ensure client is initialized (paper trading never talks to Binance)
+        if self.client is None and not self.paper_mode:
             self.client = self._create_client()
             
         # Standardize inputs
@@ -738,8 +765,8 @@ class BinanceTradingService:
         Returns:
             Position close result
         """
-        # Ensure client is initialized
-        if self.client is None:
+        # Ensure client is initialized (paper trading never talks to Binance)
+        if self.client is None and not self.paper_mode:
             self.client = self._create_client()
             
         # Standardize symbol
@@ -755,10 +782,7 @@ class BinanceTradingService:
                     # Get current price
                     current_price = None
                     try:
-                        from python_app.services.binance.market_service import binance_market_service
-                        price_data = binance_market_service.get_symbol_price(symbol)
-                        if price_data and 'price' in price_data:
-                            current_price = float(price_data['price'])
+                        current_price = self._paper_market_price(symbol)
                     except Exception as e:
                         logger.warning(f"Could not get market price: {e}. Using fallback price.")
                         current_price = entry_price  # Fallback to no P&L
@@ -783,7 +807,7 @@ class BinanceTradingService:
                     
                     # Calculate holding period in hours
                     start_time = datetime.fromisoformat(position["timestamp"])
-                    end_time = datetime.now()
+                    end_time = get_clock().now()
                     holding_period_hours = (end_time - start_time).total_seconds() / 3600
                     
                     # Update position
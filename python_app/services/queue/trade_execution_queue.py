@@ -21,7 +21,7 @@ import uuid
 import hashlib
 import json
 from typing import Dict, List, Any, Optional, Union, Tuple, Callable
-from datetime import datetime, timedelta
+from datetime import timedelta
 from queue import Queue, Empty
 from enum import Enum, auto
 
@@ -107,6 +107,12 @@ except ImportError:
                 logger.info(f"STATUS: {trade_id} -> {status}")
                 return True
 
+# Import the clock so replays can run the queue on simulated time
+try:
+    from python_app.utils.clock import get_clock
+except ImportError:
+    from utils.clock import get_clock
+
 
 # Trade status enum
 class TradeStatus(Enum):
@@ -148,7 +154,7 @@ class TradeRequest:
         self.status = TradeStatus.PENDING
         self.error_message: Optional[str] = None
         self.result = None
-        self.created_at = datetime.now()
+        self.created_at = get_clock().now()
         self.processed_at = None
         self.retries = 0
         self.max_retries = 3
@@ -205,6 +211,7 @@ class TradeExecutionQueue:
             self.stopping = False
             self.history = []  # Store history of processed trades
             self.max_history_size = 1000
+            self.manual_processing = False  # Replays drain the queue with process_pending()
             logger.info("Trade Execution Queue initialized")
 
     def set_callbacks(
@@ -225,6 +232,10 @@ class TradeExecutionQueue:
 
     def start(self) -> None:
         """Start the trade execution queue processor thread"""
+        if self.manual_processing:
+            logger.info("Trade queue is in manual processing mode, not starting the processor thread")
+            return
+
         if self.is_processing:
             logger.warning("Trade queue processor already running")
             return
@@ -247,6 +258,50 @@ class TradeExecutionQueue:
             self.processing_thread.join(timeout=5.0)
         logger.info("Trade execution queue processor stopped")
 
+    def set_manual_processing(self, enabled: bool) -> None:
+        """
+        Switch between the processor thread and processing in the caller's thread
+        
+        In manual mode no processor thread runs and queued trades are only executed
+        by process_pending(), so a replay decides exactly when trades go through.
+        
+        Args:
+            enabled: Whether to process trades manually
+        """
+        if enabled and self.is_processing:
+            self.stop()
+        self.manual_processing = enabled
+        logger.info(f"Trade queue manual processing {'enabled' if enabled else 'disabled'}")
+
+    def process_pending(self) -> int:
+        """
+        Process every queued trade in the calling thread
+        
+        Rate limited trades are retried after waiting on the clock, which costs no
+        real time on a simulation clock. Errors are logged and skipped like in the
+        processor thread.
+        
+        Returns:
+            Number of trades taken off the queue and handled
+        """
+        handled = 0
+        while True:
+            try:
+                trade_request = self.queue.get_nowait()
+            except Empty:
+                return handled
+            
+            try:
+                processed = self._process_request(trade_request)
+            except Exception as e:
+                logger.error(f"Error processing trade {trade_request.id}: {str(e)}")
+                processed = True
+            self.queue.task_done()
+            if processed:
+                handled += 1
+            else:
+                get_clock().sleep(0.5)
+
     def add_trade(self, trade_request: TradeRequest) -> str:
         """
         Add a trade request to the execution queue
@@ -257,7 +312,7 @@ class TradeExecutionQueue:
         Returns:
             The ID of the queued trade request
         """
-        if not self.is_processing:
+        if not self.is_processing and not self.manual_processing:
             self.start()
         
         # Add to queue
@@ -352,7 +407,7 @@ class TradeExecutionQueue:
                             "symbol": trade_request.symbol,
                             "side": trade_request.side,
                             "quantity": trade_request.quantity,
-                            "added_at": datetime.now().isoformat()
+                            "added_at": get_clock().now().isoformat()
                         })
                         
                         # Adjust quantity if needed
@@ -575,7 +630,7 @@ class TradeExecutionQueue:
         Returns:
             True if we can proceed, False if we should wait
         """
-        now = time.time()
+        now = get_clock().time()
         
         # Remove timestamps outside the current window
         self.request_timestamps = [ts for ts in self.request_timestamps 
@@ -609,7 +664,7 @@ class TradeExecutionQueue:
                 continue
                 
             # Only check trades from the last hour
-            if (datetime.now() - trade.created_at) > timedelta(hours=1):
+            if (get_clock().now() - trade.created_at) > timedelta(hours=1):
                 continue
                 
             # Check if properties match (same symbol, side, quantity, etc.)
@@ -628,7 +683,7 @@ class TradeExecutionQueue:
                 continue
                 
             # Only check trades from the last hour
-            if (datetime.now() - trade.created_at) > timedelta(hours=1):
+            if (get_clock().now() - trade.created_at) > timedelta(hours=1):
                 continue
                 
             # Check if properties match
@@ -740,36 +795,49 @@ class TradeExecutionQueue:
                     # No trades to process, check if we should exit
                     continue
                 
-                # Check if this trade was canceled while waiting in the queue
-                if trade_request.status == TradeStatus.CANCELED:
-                    logger.info(f"Skipping canceled trade {trade_request.id}")
-                    self.queue.task_done()
-                    continue
-                
-                # Check rate limit
-                if not self._check_rate_limit():
-                    # Put the request back and wait
-                    trade_request.status = TradeStatus.RATE_LIMITED
-                    self.queue.put(trade_request)
-                    self.queue.task_done()
-                    time.sleep(0.5)  # Wait a bit before retrying
-                    continue
-                
-                # Record request for rate limiting
-                self.request_timestamps.append(time.time())
-                
-                # Process the trade
-                self._execute_trade(trade_request)
+                processed = self._process_request(trade_request)
                 
                 # Mark task as done
                 self.queue.task_done()
                 
+                if not processed:
+                    get_clock().sleep(0.5)  # Wait a bit before retrying
+                
             except Exception as e:
                 logger.error(f"Error in trade queue processor: {str(e)}")
-                time.sleep(1.0)  # Wait a bit to avoid spinning on errors
+                get_clock().sleep(1.0)  # Wait a bit to avoid spinning on errors
                 
         logger.info("Trade queue processor thread stopped")
 
+    def _process_request(self, trade_request: TradeRequest) -> bool:
+        """
+        Handle one trade request taken off the queue
+        
+        Args:
+            trade_request: The trade request
+            
+        Returns:
+            False if the request was put back because of the rate limit, True otherwise
+        """
+        # Check if this trade was canceled while waiting in the queue
+        if trade_request.status == TradeStatus.CANCELED:
+            logger.info(f"Skipping canceled trade {trade_request.id}")
+            return True
+        
+        # Check rate limit
+        if not self._check_rate_limit():
+            # Put the request back
+            trade_request.status = TradeStatus.RATE_LIMITED
+            self.queue.put(trade_request)
+            return False
+        
+        # Record request for rate limiting
+        self.request_timestamps.append(get_clock().time())
+        
+        # Process the trade
+        self._execute_trade(trade_request)
+        return True
+
     def _execute_trade(self, trade_request: TradeRequest) -> None:
         """
         Execute a single trade request
@@ -844,7 +912,7 @@ class TradeExecutionQueue:
                 raise ValueError("Trading service callback not set")
             
             # Mark processing time
-            trade_request.processed_at = datetime.now()
+            trade_request.processed_at = get_clock().now()
             
             # Execute trade
             result = self.trading_service_callback(trade_request)
@@ -874,7 +942,7 @@ class TradeExecutionQueue:
                 
                 # Update order status to EXECUTED
                 update_trade_status(trade_request.id, "EXECUTED", {
-                    "execution_time": datetime.now().isoformat(),
+                    "execution_time": get_clock().now().isoformat(),
                     "is_paper_trade": is_paper_trade
                 })
             else:
@@ -910,7 +978,7 @@ class TradeExecutionQueue:
                     # Update order status to FAILED
                     update_trade_status(trade_request.id, "FAILED", {
                         "error_message": trade_request.error_message,
-                        "failure_time": datetime.now().isoformat()
+                        "failure_time": get_clock().now().isoformat()
                     })
             
         except Exception as e:
@@ -933,7 +1001,7 @@ class TradeExecutionQueue:
             # Update order status to FAILED
             update_trade_status(trade_request.id, "FAILED", {
                 "error_message": str(e),
-                "failure_time": datetime.now().isoformat()
+                "failure_time": get_clock().now().isoformat()
             })
         
         finally:
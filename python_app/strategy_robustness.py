@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Strategy Robustness Analysis
+
+A strategy simulation gives one deterministic equity path. This module resamples
+that path many times to show how much of its result is luck. It handles three
+kinds of Monte Carlo paths:
+
+1. trade_bootstrap: the strategy's trades drawn with replacement in random order,
+   so both the trade sequence and the trade mix vary
+2. block_bootstrap: the candle-to-candle returns of the strategy's equity curve
+   resampled in blocks of consecutive candles, keeping short-range dependence
+3. cost_perturbation: the same trades with a random fee per path and a random
+   slippage per trade taken off every entry and exit
+
+Paths are generated and scored as matrices with one row per path, in batches
+spread over a pool of worker processes. Every batch has its own seed derived from the analysis seed, so the
+results do not depend on the number of workers.
+
+Drawdowns and Sharpe ratios follow compute_metrics: the Sharpe ratio is the mean
+over the standard deviation of the path's step returns times sqrt(252). The steps
+are candles for the block bootstrap and trades for the trade based methods.
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from backtest_core import adjust_strategy_parameters, entry_signals, trade_path, first_closes, simulate
+
+logger = logging.getLogger('strategy_robustness')
+
+ROBUSTNESS_METHODS = ['trade_bootstrap', 'block_bootstrap', 'cost_perturbation']
+
+# Percentiles reported for every metric
+DEFAULT_PERCENTILES = [5, 25, 50, 75, 95]
+
+# Largest path x step matrix generated at once
+ROBUSTNESS_MATRIX_CELLS = 4_000_000
+
+# Most resampled paths per method of one analysis (kept to what a synchronous request
+# finishes in: 30,000 paths took about 58s, so 10,000 take about 20s)
+MAX_ROBUSTNESS_SIMULATIONS = 10_000
+
+# Per-process state of a worker (set by _init_robustness_worker)
+_worker_state: Dict[str, Any] = {}
+
+
+def strategy_returns(prices: np.ndarray, predictions: np.ndarray, initial_investment: float,
+                     parameters: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """
+    Simulate a strategy once and extract the returns the resampling works on
+
+    Args:
+        prices: Close price per candle
+        predictions: Bullish probability per candle
+        initial_investment: Initial investment amount
+        parameters: Effective strategy parameters (see adjust_strategy_parameters)
+
+    Returns:
+        Dictionary with the per-trade 'trade_moves' (price move in the trade's
+        direction), 'exposure' (trade_size_percent / 100 * leverage), the per-candle
+        'candle_returns' of the equity curve and the deterministic 'equity'
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    signals = entry_signals(predictions, parameters['confidence_threshold'])
+    result = simulate(prices, signals, initial_investment, parameters['trade_size_percent'],
+                      parameters['stop_loss_percent'], parameters['take_profit_percent'],
+                      parameters['leverage'])
+
+    # A trade closed twice on its exit candle counts its move twice, as in simulate
+    path = trade_path(prices, signals, parameters['stop_loss_percent'], parameters['take_profit_percent'])
+    first = first_closes(path)
+    entry_price = prices[path['entry_index']]
+    move = np.where(path['direction'] > 0, prices[path['exit_index']] - entry_price,
+                    entry_price - prices[path['exit_index']]) / entry_price
+    trade_moves = np.bincount(np.cumsum(first) - 1, weights=move, minlength=int(first.sum()))
+
+    equity = result['equity']
+    previous = equity[:-1]
+    candle_returns = np.where(previous > 0, equity[1:] / np.where(previous > 0, previous, 1) - 1, 0.0)
+
+    return {
+        'trade_moves': trade_moves,
+        'exposure': parameters['trade_size_percent'] / 100 * parameters['leverage'],
+        'candle_returns': candle_returns,
+        'equity': equity
+    }
+
+
+def _score_paths(initial_investment: float, step_returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compound step returns into equity paths and compute their metrics
+
+    Args:
+        initial_investment: Initial investment amount
+        step_returns: Return per path and step
+
+    Returns:
+        Dictionary with the 'final_balance', 'max_drawdown' and 'sharpe_ratio' of every path
+    """
+    n_paths = len(step_returns)
+    if step_returns.shape[1] == 0:
+        return {'final_balance': np.full(n_paths, float(initial_investment)),
+                'max_drawdown': np.zeros(n_paths), 'sharpe_ratio': np.zeros(n_paths)}
+
+    # A path that loses everything stays at zero
+    growth = np.maximum(1 + step_returns, 0)
+    equity = initial_investment * np.cumprod(growth, axis=1)
+
+    # Drawdown from the running peak, starting at the initial investment
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_investment)
+    max_drawdown = ((peak - equity) / peak).max(axis=1) * 100
+
+    # Step returns for the Sharpe ratio, skipping steps that start from zero equity
+    returns = growth - 1
+    if (equity[:, :-1] <= 0).any():
+        returns = np.where(np.concatenate((np.ones((n_paths, 1), dtype=bool), equity[:, :-1] > 0), axis=1),
+                           returns, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_return = np.nanmean(returns, axis=1)
+        std_dev = np.nanstd(returns, axis=1) if returns.shape[1] > 1 else np.zeros(n_paths)
+        sharpe_ratio = np.where(std_dev > 0, mean_return / std_dev * np.sqrt(252), 0)
+
+    return {
+        'final_balance': equity[:, -1].copy(),
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe_ratio
+    }
+
+
+def _generate_returns(method: str, n_paths: int, rng: np.random.Generator,
+                      state: Dict[str, Any]) -> np.ndarray:
+    """
+    Draw the step returns of a batch of resampled paths
+
+    Args:
+        method: One of ROBUSTNESS_METHODS
+        n_paths: Number of paths
+        rng: Random generator of the batch
+        state: Returns and settings of the analysis (see _set_worker_state)
+
+    Returns:
+        Return per path and step
+    """
+    if method == 'trade_bootstrap':
+        trade_returns = state['exposure'] * state['trade_moves']
+        if len(trade_returns) == 0:
+            return np.zeros((n_paths, 0))
+        return trade_returns[rng.integers(0, len(trade_returns), (n_paths, len(trade_returns)))]
+
+    if method == 'block_bootstrap':
+        candle_returns = state['candle_returns']
+        n = len(candle_returns)
+        if n == 0:
+            return np.zeros((n_paths, 0))
+        block_size = max(1, min(state['block_size'], n))
+        n_blocks = -(-n // block_size)
+        starts = rng.integers(0, n - block_size + 1, (n_paths, n_blocks))
+        index = (starts[:, :, np.newaxis] + np.arange(block_size)).reshape(n_paths, -1)[:, :n]
+        return candle_returns[index]
+
+    if method == 'cost_perturbation':
+        trade_moves = state['trade_moves']
+        low, high = state['fee_percent']
+        fee = rng.uniform(low, high, (n_paths, 1)) / 100
+        slippage = rng.uniform(0, state['slippage_percent'], (n_paths, 2, len(trade_moves))).sum(axis=1) / 100
+        # A fee and a slippage on both the entry and the exit of every trade
+        return state['exposure'] * (trade_moves - 2 * fee - slippage)
+
+    raise ValueError(f"Unknown robustness method '{method}'. Must be in: {', '.join(ROBUSTNESS_METHODS)}")
+
+
+def _set_worker_state(state: Dict[str, Any]) -> None:
+    """Point the worker state at the returns and settings of an analysis"""
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def _init_robustness_worker(state: Dict[str, Any]) -> None:
+    """Initialise a worker process with the returns and settings of an analysis"""
+    os.environ['OMP_NUM_THREADS'] = '1'
+    _set_worker_state(state)
+
+
+def _run_batch(method: str, n_paths: int, seed: np.random.SeedSequence) -> Tuple[str, Dict[str, np.ndarray]]:
+    """
+    Generate and score one batch of paths
+
+    Args:
+        method: One of ROBUSTNESS_METHODS
+        n_paths: Number of paths
+        seed: Seed of the batch
+
+    Returns:
+        Tuple of (method, metrics with one value per path)
+    """
+    rng = np.random.default_rng(seed)
+    step_returns = _generate_returns(method, n_paths, rng, _worker_state)
+    return method, _score_paths(_worker_state['initial_investment'], step_returns)
+
+
+def summarize_paths(values: np.ndarray, percentiles: List[float]) -> Dict[str, float]:
+    """
+    Summarize a metric over the resampled paths
+
+    Args:
+        values: Metric value per path
+        percentiles: Percentiles to report
+
+    Returns:
+        Dictionary with the mean, standard deviation and 'p<percentile>' bands
+    """
+    bands = np.percentile(values, percentiles)
+    summary = {'mean': float(values.mean()), 'std': float(values.std())}
+    summary.update({f'p{percentile:g}': float(band) for percentile, band in zip(percentiles, bands)})
+    return summary
+
+
+def run_robustness_analysis(prices: np.ndarray,
+                            predictions: np.ndarray,
+                            parameters: Dict[str, float],
+                            initial_investment: float = 10000.0,
+                            strategy_type: str = 'balanced',
+                            methods: Optional[List[str]] = None,
+                            n_simulations: int = 10000,
+                            block_size: int = 288,
+                            fee_percent: Tuple[float, float] = (0.02, 0.1),
+                            slippage_percent: float = 0.05,
+                            percentiles: Optional[List[float]] = None,
+                            seed: Optional[int] = None,
+                            n_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run Monte Carlo robustness analysis of a strategy
+
+    Args:
+        prices: Close price per candle
+        predictions: Bullish probability per candle
+        parameters: Strategy parameters ('trade_size_percent', 'stop_loss_percent',
+            'take_profit_percent', 'leverage', 'confidence_threshold')
+        initial_investment: Initial investment amount
+        strategy_type: Strategy type whose adjustments are applied to the parameters
+        methods: Resampling methods to run (default: all of ROBUSTNESS_METHODS)
+        n_simulations: Number of resampled paths per method (1 to MAX_ROBUSTNESS_SIMULATIONS)
+        block_size: Candles per block of the block bootstrap
+        fee_percent: Range of the fee per side drawn for each path (percent)
+        slippage_percent: Largest slippage per side drawn for each trade (percent)
+        percentiles: Percentiles to report (default: DEFAULT_PERCENTILES)
+        seed: Seed of the random generator (default: random)
+        n_workers: Number of worker processes (default: one per CPU core)
+
+    Returns:
+        Dictionary with the 'baseline' metrics of the deterministic path and, per
+        method, the percentile bands of final balance, max drawdown and Sharpe ratio
+        and the probability of ending below the initial investment
+    """
+    start_time = time.time()
+    methods = methods or list(ROBUSTNESS_METHODS)
+    unknown = [method for method in methods if method not in ROBUSTNESS_METHODS]
+    if unknown:
+        raise ValueError(f"Unknown robustness methods {unknown}. Must be in: {', '.join(ROBUSTNESS_METHODS)}")
+    if not 1 <= n_simulations <= MAX_ROBUSTNESS_SIMULATIONS:
+        raise ValueError(f"n_simulations must be between 1 and {MAX_ROBUSTNESS_SIMULATIONS}, got {n_simulations}")
+    percentiles = percentiles or list(DEFAULT_PERCENTILES)
+
+    effective = adjust_strategy_parameters(strategy_type, **parameters)
+    returns = strategy_returns(prices, predictions, initial_investment, effective)
+    state = {
+        'initial_investment': float(initial_investment),
+        'trade_moves': returns['trade_moves'],
+        'exposure': returns['exposure'],
+        'candle_returns': returns['candle_returns'],
+        'block_size': int(block_size),
+        'fee_percent': (float(fee_percent[0]), float(fee_percent[1])),
+        'slippage_percent': float(slippage_percent)
+    }
+
+    # Split every method into batches small enough to hold in memory
+    batches = []
+    for method in methods:
+        steps = len(state['candle_returns']) if method == 'block_bootstrap' else len(state['trade_moves'])
+        batch_size = max(1, ROBUSTNESS_MATRIX_CELLS // max(steps, 1))
+        for start in range(0, n_simulations, batch_size):
+            batches.append((method, min(batch_size, n_simulations - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    batches = [(method, n_paths, batch_seed) for (method, n_paths), batch_seed in zip(batches, seeds)]
+
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(batches)))
+    logger.info(f"Running {n_simulations} robustness paths for {', '.join(methods)} over "
+                f"{len(state['trade_moves'])} trades and {len(prices)} candles in {len(batches)} batches "
+                f"with {n_workers} workers")
+
+    path_metrics: Dict[str, Dict[str, List[np.ndarray]]] = {method: {} for method in methods}
+    if n_workers == 1:
+        _set_worker_state(state)
+        try:
+            batch_results = [_run_batch(*batch) for batch in batches]
+        finally:
+            _worker_state.clear()
+    else:
+        methods_available = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods_available else 'spawn')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                 initializer=_init_robustness_worker, initargs=(state,)) as executor:
+            batch_results = list(executor.map(_run_batch, *zip(*batches)))
+
+    for method, metrics in batch_results:
+        for name, values in metrics.items():
+            path_metrics[method].setdefault(name, []).append(values)
+
+    results = {}
+    for method in methods:
+        metrics = {name: np.concatenate(values) for name, values in path_metrics[method].items()}
+        results[method] = {
+            'simulations': int(len(metrics['final_balance'])),
+            'final_balance': summarize_paths(metrics['final_balance'], percentiles),
+            'max_drawdown': summarize_paths(metrics['max_drawdown'], percentiles),
+            'sharpe_ratio': summarize_paths(metrics['sharpe_ratio'], percentiles),
+            'loss_probability': float((metrics['final_balance'] < initial_investment).mean())
+        }
+
+    baseline_trades = _score_paths(initial_investment, (returns['exposure'] * returns['trade_moves'])[np.newaxis])
+    baseline_candles = _score_paths(initial_investment, returns['candle_returns'][np.newaxis])
+    elapsed = time.time() - start_time
+    logger.info(f"Robustness analysis of {n_simulations * len(methods)} paths finished in {elapsed:.2f}s")
+
+    return {
+        'strategy_type': strategy_type,
+        'parameters': effective,
+        'initial_investment': float(initial_investment),
+        'candles': len(prices),
+        'trades': len(state['trade_moves']),
+        'percentiles': percentiles,
+        'seed': seed,
+        'workers': n_workers,
+        'seconds': elapsed,
+        'baseline': {
+            'final_balance': float(baseline_trades['final_balance'][0]),
+            'max_drawdown': float(baseline_candles['max_drawdown'][0]),
+            'sharpe_ratio': float(baseline_candles['sharpe_ratio'][0]),
+            'trade_max_drawdown': float(baseline_trades['max_drawdown'][0]),
+            'trade_sharpe_ratio': float(baseline_trades['sharpe_ratio'][0])
+        },
+        'methods': results
+    }
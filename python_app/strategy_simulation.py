@@ -6,10 +6,12 @@ This module provides functionality for simulating different trading strategies
 based on ML model predictions. It enables:
 
 1. Backtesting of trading strategies with ML model predictions
-2. Comparison of different strategy configurations and parameters
-3. Performance analysis with key metrics (PnL, Sharpe ratio, drawdown, etc.)
-4. Trade-by-trade simulation with detailed reports
-5. Visualization data for the UI charts
+2. Comparison of different strategy configurations and parameter sweeps
+3. Monte Carlo robustness analysis of a strategy's results
+4. Portfolio simulation of several symbols sharing one balance
+5. Performance analysis with key metrics (PnL, Sharpe ratio, drawdown, etc.)
+6. Trade-by-trade simulation with detailed reports
+7. Visualization data for the UI charts
 
 It integrates with the XGBoost optimization system and model evaluation framework.
 """
@@ -23,12 +25,8 @@ import numpy as np
 from typing import Dict, List, Tuple, Any, Optional, Union
 from datetime import datetime, timedelta
 import requests
-import matplotlib.pyplot as plt
-import io
-import base64
 from pathlib import Path
 import xgboost as xgb
-import uuid
 
 # Configure logging
 log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
@@ -47,7 +45,15 @@ logger = logging.getLogger(__name__)
 
 # Import helpers from other modules
 from model_utils import evaluate_model, load_model_with_metadata
-from xgboost_optimization import XGBoostOptimizer, prepare_data_for_training
+from xgboost_optimization import XGBoostOptimizer
+from data_loader import prepare_data_for_training
+from backtest_core import run_backtest, EXIT_REASONS
+from strategy_sweep import run_parameter_sweep
+from strategy_robustness import run_robustness_analysis
+from portfolio_backtest import run_portfolio_backtest
+from model_artifacts import model_version, DEFAULT_MODEL_DIR
+from prediction_cache import get_prediction_cache
+from chart_renderer import strategy_performance_payload, submit_chart, chart_url
 
 class StrategySimulator:
     """
@@ -58,7 +64,8 @@ class StrategySimulator:
                 symbol: str, 
                 timeframe: str,
                 api_base_url: str = 'http://localhost:3000/api/ml/optimization',
-                data_dir: str = None):
+                data_dir: str = None,
+                model_dir: str = None):
         """
         Initialize the strategy simulator
         
@@ -66,11 +73,13 @@ class StrategySimulator:
             symbol: Trading pair symbol (e.g., 'btcusdt')
             timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
             api_base_url: Base URL for the API
-            data_dir: Directory for saving simulation results and charts
+            data_dir: Directory for saving simulation results
+            model_dir: Directory with the trained models (default: the app's models directory)
         """
         self.symbol = symbol.lower()
         self.timeframe = timeframe
         self.api_base_url = api_base_url
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
         
         # Set up data directory
         if data_dir is None:
@@ -135,7 +144,7 @@ class StrategySimulator:
             self.logger.error(f"Error loading market data: {str(e)}")
             return pd.DataFrame()
     
-    def load_model(self, model_type: str = 'best') -> Tuple[Optional[xgb.Booster], Optional[Dict[str, Any]]]:
+    def load_model(self, model_type: str = 'best') -> Tuple[Optional[xgb.XGBClassifier], Optional[Dict[str, Any]]]:
         """
         Load an XGBoost model for prediction
         
@@ -143,7 +152,8 @@ class StrategySimulator:
             model_type: Type of model to load ('bayesian', 'grid_search', 'random_search', or 'best')
             
         Returns:
-            Tuple of (model, metadata) or (None, None) if loading fails
+            Tuple of (model, metadata including the loaded 'model_path') or (None, None)
+            if loading fails
         """
         try:
             self.logger.info(f"Loading {model_type} model for {self.symbol} {self.timeframe}")
@@ -174,14 +184,14 @@ class StrategySimulator:
                 model_type = best_type
             
             # Load the model
-            model, metadata = load_model_with_metadata(self.symbol, self.timeframe, model_type)
+            info = load_model_with_metadata(self.model_dir, f"xgboost_{self.symbol}_{self.timeframe}_{model_type}")
             
-            if model is None:
+            if 'model' not in info:
                 self.logger.error(f"Could not load {model_type} model for {self.symbol} {self.timeframe}")
                 return None, None
                 
-            self.logger.info(f"Successfully loaded {model_type} model")
-            return model, metadata
+            self.logger.info(f"Successfully loaded {model_type} model from {info['model_path']}")
+            return info['model'], {**info['metadata'], 'model_path': info['model_path']}
             
         except Exception as e:
             self.logger.error(f"Error loading model: {str(e)}")
@@ -218,10 +228,63 @@ class StrategySimulator:
             self.logger.error(f"Error preparing features: {str(e)}")
             return pd.DataFrame()
     
+    def prepare_simulation_data(self,
+                                model_type: str,
+                                start_date: str,
+                                end_date: str) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+        """
+        Load market data and model and predict every candle once
+        
+        Predictions come from the prediction cache when the same model already
+        scored the same candles, so reruns with other strategy parameters skip
+        inference.
+        
+        Args:
+            model_type: Type of model to predict with
+            start_date: Start date for the simulation (YYYY-MM-DD)
+            end_date: End date for the simulation (YYYY-MM-DD)
+            
+        Returns:
+            Tuple of (market data with a 'prediction' column, model metadata), or
+            (None, {'error': message}) on failure
+        """
+        # Load market data
+        market_data = self.load_market_data(start_date, end_date)
+        if market_data.empty:
+            return None, {'error': 'Failed to load market data'}
+        
+        # Load model
+        model, metadata = self.load_model(model_type)
+        if model is None:
+            return None, {'error': f'Failed to load {model_type} model'}
+        
+        # Prepare features
+        features = self.prepare_features(market_data)
+        if features.empty:
+            return None, {'error': 'Failed to prepare features'}
+        
+        # Merge features with market data
+        # Ensure indexes match
+        aligned_index = features.index.intersection(market_data.index)
+        features = features.loc[aligned_index]
+        simulation_data = market_data.loc[aligned_index].copy()
+        
+        # Run prediction (keyed on the model file that was loaded)
+        model_path = metadata['model_path']
+        probabilities = get_prediction_cache().get_or_compute(
+            model_version(model_path), features, lambda: model.predict_proba(features.to_numpy()),
+            label=os.path.splitext(os.path.basename(model_path))[0])
+        
+        # Bullish probability (0.5 is neutral): BUY (class 0) raises it, SELL (class 2) lowers it
+        simulation_data['prediction'] = 0.5 + (probabilities[:, 0] - probabilities[:, 2]) / 2
+        
+        return simulation_data, metadata
+    
     def run_simulation(self, 
                        strategy_config: Dict[str, Any], 
                        start_date: str, 
-                       end_date: str) -> Dict[str, Any]:
+                       end_date: str,
+                       prepared: Optional[Tuple[pd.DataFrame, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Run a trading strategy simulation
         
@@ -229,6 +292,7 @@ class StrategySimulator:
             strategy_config: Strategy configuration parameters
             start_date: Start date for the simulation (YYYY-MM-DD)
             end_date: End date for the simulation (YYYY-MM-DD)
+            prepared: Result of prepare_simulation_data to reuse (default: prepare it)
             
         Returns:
             Dictionary with simulation results
@@ -247,49 +311,16 @@ class StrategySimulator:
             model_type = strategy_config.get('modelType', 'best')
             confidence_threshold = float(strategy_config.get('confidenceThreshold', 0.6))
             
-            # Load market data
-            market_data = self.load_market_data(start_date, end_date)
-            if market_data.empty:
-                return {
-                    'success': False,
-                    'error': 'Failed to load market data',
-                    'symbol': self.symbol,
-                    'timeframe': self.timeframe
-                }
-            
-            # Load model
-            model, metadata = self.load_model(model_type)
-            if model is None:
-                return {
-                    'success': False,
-                    'error': f'Failed to load {model_type} model',
-                    'symbol': self.symbol,
-                    'timeframe': self.timeframe
-                }
-            
-            # Prepare features
-            features = self.prepare_features(market_data)
-            if features.empty:
+            # Load data and model and predict (unless already done by the caller)
+            simulation_data, metadata = prepared or self.prepare_simulation_data(model_type, start_date, end_date)
+            if simulation_data is None:
                 return {
                     'success': False,
-                    'error': 'Failed to prepare features',
+                    'error': metadata['error'],
                     'symbol': self.symbol,
                     'timeframe': self.timeframe
                 }
             
-            # Merge features with market data
-            # Ensure indexes match
-            aligned_index = features.index.intersection(market_data.index)
-            features = features.loc[aligned_index]
-            simulation_data = market_data.loc[aligned_index].copy()
-            
-            # Run prediction
-            dmatrix = xgb.DMatrix(features)
-            predictions = model.predict(dmatrix)
-            
-            # Add predictions to simulation data
-            simulation_data['prediction'] = predictions
-            
             # Run the strategy simulation
             results = self._run_strategy(
                 simulation_data,
@@ -375,7 +406,7 @@ class StrategySimulator:
                      leverage: float,
                      confidence_threshold: float) -> Dict[str, Any]:
         """
-        Run the trading strategy simulation
+        Run the trading strategy simulation (see backtest_core for the semantics)
         
         Args:
             data: DataFrame with market data and predictions
@@ -388,337 +419,77 @@ class StrategySimulator:
             confidence_threshold: Minimum prediction confidence to enter a trade
             
         Returns:
-            Dictionary with simulation results
+            Dictionary with simulation results; 'balance_history' and 'equity_history'
+            are Series indexed by timestamp
         """
-        # Initialize simulation state
-        balance = initial_investment
-        position = None  # None = no position, 'long' or 'short'
-        position_size = 0.0
-        entry_price = 0.0
-        entry_time = None
-        
-        # Results tracking
-        trades = []  # List of completed trades
-        balance_history = []  # Balance at each time step
-        equity_history = []  # Equity (balance + unrealized PnL) at each time step
-        
-        # Adjust strategy parameters based on strategy type
-        if strategy_type == 'conservative':
-            # More conservative approach
-            trade_size_percent *= 0.7
-            stop_loss_percent *= 0.8
-            take_profit_percent *= 1.2
-            confidence_threshold = max(0.65, confidence_threshold)
-            
-        elif strategy_type == 'aggressive':
-            # More aggressive approach
-            trade_size_percent *= 1.3
-            stop_loss_percent *= 1.2
-            take_profit_percent *= 0.8
-            confidence_threshold = min(0.55, confidence_threshold)
-            leverage = min(3.0, leverage * 1.5)
-            
-        # For date-based iteration
-        for timestamp, row in data.iterrows():
-            current_price = row['close']
-            prediction = row['prediction']
-            
-            # Calculate current equity
-            if position is None:
-                equity = balance
-            elif position == 'long':
-                unrealized_pnl = position_size * (current_price - entry_price) * leverage
-                equity = balance + unrealized_pnl
-            elif position == 'short':
-                unrealized_pnl = position_size * (entry_price - current_price) * leverage
-                equity = balance + unrealized_pnl
-            
-            # Record history
-            balance_history.append((timestamp, balance))
-            equity_history.append((timestamp, equity))
-            
-            # Check if we need to close a position (stop loss or take profit)
-            if position is not None:
-                if position == 'long':
-                    # Check stop loss
-                    stop_price = entry_price * (1 - stop_loss_percent / 100)
-                    if current_price <= stop_price:
-                        # Stop loss triggered
-                        pnl = position_size * (current_price - entry_price) * leverage
-                        balance += pnl
-                        
-                        trades.append({
-                            'type': 'long',
-                            'entry_time': entry_time.isoformat(),
-                            'exit_time': timestamp.isoformat(),
-                            'entry_price': entry_price,
-                            'exit_price': current_price,
-                            'position_size': position_size,
-                            'pnl': pnl,
-                            'pnl_percent': (pnl / (position_size * entry_price) * 100),
-                            'exit_reason': 'stop_loss'
-                        })
-                        
-                        position = None
-                        
-                    # Check take profit
-                    take_profit_price = entry_price * (1 + take_profit_percent / 100)
-                    if current_price >= take_profit_price:
-                        # Take profit triggered
-                        pnl = position_size * (current_price - entry_price) * leverage
-                        balance += pnl
-                        
-                        trades.append({
-                            'type': 'long',
-                            'entry_time': entry_time.isoformat(),
-                            'exit_time': timestamp.isoformat(),
-                            'entry_price': entry_price,
-                            'exit_price': current_price,
-                            'position_size': position_size,
-                            'pnl': pnl,
-                            'pnl_percent': (pnl / (position_size * entry_price) * 100),
-                            'exit_reason': 'take_profit'
-                        })
-                        
-                        position = None
-                        
-                elif position == 'short':
-                    # Check stop loss
-                    stop_price = entry_price * (1 + stop_loss_percent / 100)
-                    if current_price >= stop_price:
-                        # Stop loss triggered
-                        pnl = position_size * (entry_price - current_price) * leverage
-                        balance += pnl
-                        
-                        trades.append({
-                            'type': 'short',
-                            'entry_time': entry_time.isoformat(),
-                            'exit_time': timestamp.isoformat(),
-                            'entry_price': entry_price,
-                            'exit_price': current_price,
-                            'position_size': position_size,
-                            'pnl': pnl,
-                            'pnl_percent': (pnl / (position_size * entry_price) * 100),
-                            'exit_reason': 'stop_loss'
-                        })
-                        
-                        position = None
-                        
-                    # Check take profit
-                    take_profit_price = entry_price * (1 - take_profit_percent / 100)
-                    if current_price <= take_profit_price:
-                        # Take profit triggered
-                        pnl = position_size * (entry_price - current_price) * leverage
-                        balance += pnl
-                        
-                        trades.append({
-                            'type': 'short',
-                            'entry_time': entry_time.isoformat(),
-                            'exit_time': timestamp.isoformat(),
-                            'entry_price': entry_price,
-                            'exit_price': current_price,
-                            'position_size': position_size,
-                            'pnl': pnl,
-                            'pnl_percent': (pnl / (position_size * entry_price) * 100),
-                            'exit_reason': 'take_profit'
-                        })
-                        
-                        position = None
-            
-            # Check if we need to open a new position based on prediction
-            if position is None:
-                # Normalizing prediction from 0-1 to -1 to 1 range, where:
-                # 0.5 = neutral (hold)
-                # >0.5 = bullish (more bullish as it approaches 1)
-                # <0.5 = bearish (more bearish as it approaches 0)
-                signal = (prediction - 0.5) * 2  # Range from -1 to 1
-                
-                # Only take positions with sufficient confidence
-                if abs(signal) >= confidence_threshold:
-                    if signal > 0:  # Bullish signal
-                        # Open long position
-                        trade_amount = balance * (trade_size_percent / 100)
-                        position_size = trade_amount / current_price
-                        position = 'long'
-                        entry_price = current_price
-                        entry_time = timestamp
-                        
-                    elif signal < 0:  # Bearish signal
-                        # Open short position
-                        trade_amount = balance * (trade_size_percent / 100)
-                        position_size = trade_amount / current_price
-                        position = 'short'
-                        entry_price = current_price
-                        entry_time = timestamp
-        
-        # Close any open position at the end of simulation
-        if position is not None:
-            last_price = data.iloc[-1]['close']
-            last_time = data.index[-1]
-            
-            if position == 'long':
-                pnl = position_size * (last_price - entry_price) * leverage
-            else:  # position == 'short'
-                pnl = position_size * (entry_price - last_price) * leverage
-                
-            balance += pnl
-            
-            trades.append({
-                'type': position,
+        results = run_backtest(
+            data['close'].to_numpy(dtype=np.float64),
+            data['prediction'].to_numpy(dtype=np.float64),
+            strategy_type,
+            initial_investment,
+            trade_size_percent,
+            stop_loss_percent,
+            take_profit_percent,
+            leverage,
+            confidence_threshold
+        )
+        
+        # Only the trades become Python objects; the curves stay arrays
+        trade_arrays = results.pop('trades')
+        entry_times = data.index[trade_arrays['entry_index']]
+        exit_times = data.index[trade_arrays['exit_index']]
+        trades = [
+            {
+                'type': 'long' if direction > 0 else 'short',
                 'entry_time': entry_time.isoformat(),
-                'exit_time': last_time.isoformat(),
+                'exit_time': exit_time.isoformat(),
                 'entry_price': entry_price,
-                'exit_price': last_price,
+                'exit_price': exit_price,
                 'position_size': position_size,
                 'pnl': pnl,
-                'pnl_percent': (pnl / (position_size * entry_price) * 100),
-                'exit_reason': 'simulation_end'
-            })
-        
-        # Calculate performance metrics
-        final_balance = balance
-        pnl = final_balance - initial_investment
-        pnl_percent = (pnl / initial_investment) * 100
-        
-        # Calculate win rate
-        win_count = sum(1 for trade in trades if trade['pnl'] > 0)
-        loss_count = sum(1 for trade in trades if trade['pnl'] <= 0)
-        trade_count = len(trades)
-        win_rate = win_count / trade_count if trade_count > 0 else 0
-        
-        # Calculate average win/loss
-        win_trades = [trade['pnl'] for trade in trades if trade['pnl'] > 0]
-        loss_trades = [trade['pnl'] for trade in trades if trade['pnl'] <= 0]
-        
-        average_win = sum(win_trades) / len(win_trades) if win_trades else 0
-        average_loss = sum(loss_trades) / len(loss_trades) if loss_trades else 0
-        largest_win = max(win_trades) if win_trades else 0
-        largest_loss = min(loss_trades) if loss_trades else 0
-        
-        # Calculate drawdown
-        drawdowns = []
-        peak = initial_investment
-        for _, equity in equity_history:
-            if equity > peak:
-                peak = equity
-            if peak > 0:
-                drawdown = (peak - equity) / peak * 100
-                drawdowns.append(drawdown)
-        
-        average_drawdown = sum(drawdowns) / len(drawdowns) if drawdowns else 0
-        max_drawdown = max(drawdowns) if drawdowns else 0
-        
-        # Calculate daily returns for Sharpe ratio
-        daily_returns = []
-        for i in range(1, len(equity_history)):
-            prev_equity = equity_history[i-1][1]
-            curr_equity = equity_history[i][1]
-            if prev_equity > 0:
-                daily_return = (curr_equity - prev_equity) / prev_equity
-                daily_returns.append(daily_return)
-        
-        # Calculate Sharpe ratio (using daily values)
-        if daily_returns:
-            avg_return = sum(daily_returns) / len(daily_returns)
-            std_dev = np.std(daily_returns) if len(daily_returns) > 1 else 0
-            sharpe_ratio = (avg_return / std_dev) * np.sqrt(252) if std_dev > 0 else 0
-            volatility = std_dev * np.sqrt(252) * 100  # Annualized and in percentage
-        else:
-            sharpe_ratio = 0
-            volatility = 0
+                'pnl_percent': pnl_percent,
+                'exit_reason': EXIT_REASONS[reason]
+            }
+            for direction, entry_time, exit_time, entry_price, exit_price, position_size, pnl, pnl_percent, reason
+            in zip(trade_arrays['direction'].tolist(), entry_times, exit_times,
+                   trade_arrays['entry_price'].tolist(), trade_arrays['exit_price'].tolist(),
+                   trade_arrays['position_size'].tolist(), trade_arrays['pnl'].tolist(),
+                   trade_arrays['pnl_percent'].tolist(), trade_arrays['exit_reason'].tolist())
+        ]
+        
+        balance_history = pd.Series(results.pop('balance'), index=data.index)
+        equity_history = pd.Series(results.pop('equity'), index=data.index)
         
         return {
-            'final_balance': final_balance,
-            'pnl': pnl,
-            'pnl_percent': pnl_percent,
-            'win_rate': win_rate,
-            'average_drawdown': average_drawdown,
-            'max_drawdown': max_drawdown,
-            'sharpe_ratio': sharpe_ratio,
-            'volatility': volatility,
-            'trade_count': trade_count,
-            'win_count': win_count,
-            'loss_count': loss_count,
-            'average_win': average_win,
-            'average_loss': average_loss,
-            'largest_win': largest_win,
-            'largest_loss': largest_loss,
+            **results,
             'trades': trades,
             'balance_history': balance_history,
             'equity_history': equity_history
         }
     
     def _generate_performance_chart(self, 
-                                   balance_history: List[Tuple[datetime, float]],
-                                   equity_history: List[Tuple[datetime, float]],
+                                   balance_history: pd.Series,
+                                   equity_history: pd.Series,
                                    trades: List[Dict[str, Any]]) -> str:
         """
-        Generate a performance chart and save it to a file
+        Queue the performance chart for background rendering
         
         Args:
-            balance_history: List of (timestamp, balance) tuples
-            equity_history: List of (timestamp, equity) tuples
+            balance_history: Balance indexed by timestamp
+            equity_history: Equity indexed by timestamp
             trades: List of trade dictionaries
             
         Returns:
-            URL path to the saved chart
+            URL path the chart is served at (rendered once per distinct input)
         """
         try:
-            # Create figure
-            plt.figure(figsize=(12, 8))
-            
-            # Extract data for plotting
-            timestamps = [ts for ts, _ in equity_history]
-            equity_values = [eq for _, eq in equity_history]
-            balance_values = [bal for _, bal in balance_history]
-            
-            # Plot equity curve
-            plt.plot(timestamps, equity_values, label='Equity', color='blue')
-            plt.plot(timestamps, balance_values, label='Balance', color='green', linestyle='--')
-            
-            # Mark trades on the equity curve
-            for trade in trades:
-                entry_time = datetime.fromisoformat(trade['entry_time'])
-                exit_time = datetime.fromisoformat(trade['exit_time'])
-                
-                # Find the closest equity history points
-                entry_idx = min(range(len(timestamps)), key=lambda i: abs(timestamps[i] - entry_time))
-                exit_idx = min(range(len(timestamps)), key=lambda i: abs(timestamps[i] - exit_time))
-                
-                if trade['pnl'] > 0:
-                    color = 'green'
-                else:
-                    color = 'red'
-                
-                plt.plot([timestamps[entry_idx], timestamps[exit_idx]], 
-                         [equity_values[entry_idx], equity_values[exit_idx]], 
-                         color=color, alpha=0.5, linewidth=1)
-            
-            # Add labels and title
-            plt.title(f"{self.symbol.upper()} {self.timeframe} Strategy Performance")
-            plt.xlabel("Date")
-            plt.ylabel("Value")
-            plt.legend()
-            plt.grid(True, alpha=0.3)
-            
-            # Rotate x-axis labels for better readability
-            plt.xticks(rotation=45)
-            
-            # Ensure directory exists
-            charts_dir = os.path.join(self.data_dir, 'charts')
-            os.makedirs(charts_dir, exist_ok=True)
-            
-            # Generate a unique filename
-            filename = f"{self.symbol}_{self.timeframe}_{uuid.uuid4().hex[:8]}.png"
-            filepath = os.path.join(charts_dir, filename)
-            
-            # Save figure
-            plt.tight_layout()
-            plt.savefig(filepath)
-            plt.close()
-            
-            # Return the URL path (relative to the API)
-            return f"/data/simulations/charts/{filename}"
+            payload = strategy_performance_payload(
+                f"{self.symbol.upper()} {self.timeframe} Strategy Performance",
+                balance_history,
+                equity_history,
+                trades
+            )
+            return chart_url(submit_chart('strategy_performance', payload))
             
         except Exception as e:
             self.logger.error(f"Error generating performance chart: {str(e)}")
@@ -802,6 +573,16 @@ def compare_strategies(
             'confidenceThreshold': 0.6
         }
         
+        # Load the data and predict once for all strategy types
+        prepared = simulator.prepare_simulation_data(base_config['modelType'], start_date, end_date)
+        if prepared[0] is None:
+            return {
+                'success': False,
+                'error': prepared[1]['error'],
+                'symbol': symbol,
+                'timeframe': timeframe
+            }
+        
         # Run simulations for each strategy type
         results = {}
         
@@ -813,7 +594,7 @@ def compare_strategies(
                 'strategyType': strategy_type
             }
             
-            strategy_result = simulator.run_simulation(strategy_config, start_date, end_date)
+            strategy_result = simulator.run_simulation(strategy_config, start_date, end_date, prepared)
             
             if strategy_result.get('success', False):
                 results[strategy_type] = {
@@ -848,6 +629,266 @@ def compare_strategies(
             'timeframe': timeframe
         }
 
+def run_strategy_sweep(
+    symbol: str,
+    timeframe: str,
+    start_date: str,
+    end_date: str,
+    grid: Dict[str, List[float]],
+    initial_investment: float = 10000.0,
+    model_type: str = 'best',
+    strategy_type: str = 'balanced',
+    rank_by: str = 'pnl_percent',
+    top_n: int = 50,
+    n_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Sweep strategy parameter grids on the same market data and predictions
+    
+    Args:
+        symbol: Trading pair symbol
+        timeframe: Timeframe for the data
+        start_date: Start date for the simulation (YYYY-MM-DD)
+        end_date: End date for the simulation (YYYY-MM-DD)
+        grid: Values to try per parameter (see strategy_sweep.SWEEP_PARAMETERS)
+        initial_investment: Initial investment amount
+        model_type: Type of model to predict with
+        strategy_type: Strategy type whose adjustments are applied to every set
+        rank_by: Metric to rank the results by
+        top_n: Number of ranked results to return (0 for all)
+        n_workers: Number of worker processes (default: one per CPU core)
+        
+    Returns:
+        Dictionary with the ranked results and the Pareto front of return vs drawdown
+    """
+    try:
+        logger.info(f"Starting strategy sweep for {symbol} on {timeframe}")
+        
+        simulator = StrategySimulator(symbol, timeframe)
+        simulation_data, metadata = simulator.prepare_simulation_data(model_type, start_date, end_date)
+        if simulation_data is None:
+            return {
+                'success': False,
+                'error': metadata['error'],
+                'symbol': symbol,
+                'timeframe': timeframe
+            }
+        
+        sweep = run_parameter_sweep(
+            simulation_data['close'].to_numpy(dtype=np.float64),
+            simulation_data['prediction'].to_numpy(dtype=np.float64),
+            grid,
+            initial_investment=initial_investment,
+            strategy_type=strategy_type,
+            n_workers=n_workers,
+            rank_by=rank_by
+        )
+        if top_n:
+            sweep['results'] = sweep['results'][:top_n]
+        
+        return {
+            'success': True,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'startDate': start_date,
+            'endDate': end_date,
+            'modelParameters': metadata.get('params', {}),
+            **sweep
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in run_strategy_sweep: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {
+            'success': False,
+            'error': str(e),
+            'symbol': symbol,
+            'timeframe': timeframe
+        }
+
+def run_strategy_robustness(
+    symbol: str,
+    timeframe: str,
+    start_date: str,
+    end_date: str,
+    parameters: Dict[str, float],
+    initial_investment: float = 10000.0,
+    model_type: str = 'best',
+    strategy_type: str = 'balanced',
+    methods: Optional[List[str]] = None,
+    n_simulations: int = 10000,
+    block_size: int = 288,
+    fee_percent: Tuple[float, float] = (0.02, 0.1),
+    slippage_percent: float = 0.05,
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run Monte Carlo robustness analysis of a strategy on market data and predictions
+    
+    Args:
+        symbol: Trading pair symbol
+        timeframe: Timeframe for the data
+        start_date: Start date for the simulation (YYYY-MM-DD)
+        end_date: End date for the simulation (YYYY-MM-DD)
+        parameters: Strategy parameters (see strategy_robustness.run_robustness_analysis)
+        initial_investment: Initial investment amount
+        model_type: Type of model to predict with
+        strategy_type: Strategy type whose adjustments are applied to the parameters
+        methods: Resampling methods to run (see strategy_robustness.ROBUSTNESS_METHODS)
+        n_simulations: Number of resampled paths per method
+        block_size: Candles per block of the block bootstrap
+        fee_percent: Range of the fee per side drawn for each path (percent)
+        slippage_percent: Largest slippage per side drawn for each trade (percent)
+        seed: Seed of the random generator (default: random)
+        n_workers: Number of worker processes (default: one per CPU core)
+        
+    Returns:
+        Dictionary with the baseline metrics and the percentile bands per method
+    """
+    try:
+        logger.info(f"Starting strategy robustness analysis for {symbol} on {timeframe}")
+        
+        simulator = StrategySimulator(symbol, timeframe)
+        simulation_data, metadata = simulator.prepare_simulation_data(model_type, start_date, end_date)
+        if simulation_data is None:
+            return {
+                'success': False,
+                'error': metadata['error'],
+                'symbol': symbol,
+                'timeframe': timeframe
+            }
+        
+        analysis = run_robustness_analysis(
+            simulation_data['close'].to_numpy(dtype=np.float64),
+            simulation_data['prediction'].to_numpy(dtype=np.float64),
+            parameters,
+            initial_investment=initial_investment,
+            strategy_type=strategy_type,
+            methods=methods,
+            n_simulations=n_simulations,
+            block_size=block_size,
+            fee_percent=fee_percent,
+            slippage_percent=slippage_percent,
+            seed=seed,
+            n_workers=n_workers
+        )
+        
+        return {
+            'success': True,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'startDate': start_date,
+            'endDate': end_date,
+            'modelParameters': metadata.get('params', {}),
+            **analysis
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in run_strategy_robustness: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {
+            'success': False,
+            'error': str(e),
+            'symbol': symbol,
+            'timeframe': timeframe
+        }
+
+def run_portfolio_simulation(
+    symbols: List[str],
+    timeframe: str,
+    start_date: str,
+    end_date: str,
+    strategy_config: Dict[str, Any],
+    max_asset_exposure_percent: float = 25.0,
+    max_total_exposure_percent: float = 100.0,
+    curve_points: int = 500
+) -> Dict[str, Any]:
+    """
+    Simulate a strategy over several symbols sharing one balance
+    
+    Args:
+        symbols: Trading pair symbols
+        timeframe: Timeframe for the data
+        start_date: Start date for the simulation (YYYY-MM-DD)
+        end_date: End date for the simulation (YYYY-MM-DD)
+        strategy_config: Dictionary with strategy configuration (as for run_strategy_simulation)
+        max_asset_exposure_percent: Largest exposure of one position (percent of balance)
+        max_total_exposure_percent: Largest exposure of all open positions (percent of balance)
+        curve_points: Largest number of points of the returned equity curve
+        
+    Returns:
+        Dictionary with the portfolio metrics, a breakdown per symbol and the equity curve
+    """
+    try:
+        logger.info(f"Starting portfolio simulation of {len(symbols)} symbols on {timeframe}")
+        
+        model_type = strategy_config.get('modelType', 'best')
+        frames = {}
+        model_parameters = {}
+        for symbol in symbols:
+            simulator = StrategySimulator(symbol, timeframe)
+            simulation_data, metadata = simulator.prepare_simulation_data(model_type, start_date, end_date)
+            if simulation_data is None:
+                return {
+                    'success': False,
+                    'error': f"{symbol}: {metadata['error']}",
+                    'symbols': symbols,
+                    'timeframe': timeframe
+                }
+            frames[symbol] = simulation_data
+            model_parameters[symbol] = metadata.get('params', {})
+        
+        initial_investment = float(strategy_config.get('initialInvestment', 10000.0))
+        result = run_portfolio_backtest(
+            frames,
+            strategy_config.get('strategyType', 'balanced'),
+            initial_investment,
+            float(strategy_config.get('tradeSizePercent', 10.0)),
+            float(strategy_config.get('stopLossPercent', 2.0)),
+            float(strategy_config.get('takeProfitPercent', 3.0)),
+            float(strategy_config.get('leverage', 1.0)),
+            float(strategy_config.get('confidenceThreshold', 0.6)),
+            max_asset_exposure_percent=max_asset_exposure_percent,
+            max_total_exposure_percent=max_total_exposure_percent
+        )
+        
+        # Sample the curves for the UI
+        step = max(1, -(-len(result['index']) // max(curve_points, 1)))
+        equity_curve = [
+            {'timestamp': str(timestamp), 'equity': float(equity), 'exposure': float(exposure)}
+            for timestamp, equity, exposure in zip(result['index'][::step], result['equity'][::step],
+                                                   result['exposure'][::step])
+        ]
+        
+        metrics = {key: value for key, value in result.items()
+                   if key not in ('index', 'balance', 'equity', 'exposure', 'trades')}
+        return {
+            'success': True,
+            'timeframe': timeframe,
+            'startDate': start_date,
+            'endDate': end_date,
+            'initialInvestment': initial_investment,
+            'maxAssetExposurePercent': max_asset_exposure_percent,
+            'maxTotalExposurePercent': max_total_exposure_percent,
+            'modelParameters': model_parameters,
+            **metrics,
+            'equityCurve': equity_curve
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in run_portfolio_simulation: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {
+            'success': False,
+            'error': str(e),
+            'symbols': symbols,
+            'timeframe': timeframe
+        }
+
 # If run directly, perform a test simulation
 if __name__ == "__main__":
     import sys
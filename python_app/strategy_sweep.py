@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Strategy Parameter Sweep
+
+This module runs thousands of strategy simulations over one set of prices and
+predictions. It handles:
+
+1. Expanding grids over stop loss, take profit, trade size, leverage and
+   confidence threshold into parameter sets
+2. Grouping the parameter sets by trade path: entries and exits only depend on
+   the stop loss, take profit and confidence threshold, so each path is found
+   once and every trade size / leverage combination on it is evaluated together
+   as a matrix (see backtest_core.simulate_sizings)
+3. Spreading the paths over a pool of worker processes
+4. Ranking the results and finding the Pareto front of return against drawdown
+
+With a single worker the paths run in the calling process, so small sweeps and
+machines with one core do not pay for starting a pool.
+"""
+
+import os
+import time
+import logging
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple, Any, Optional
+
+import numpy as np
+
+from backtest_core import (adjust_strategy_parameters, entry_signals, trade_path,
+                           simulate_sizings, compute_metrics_batch)
+
+logger = logging.getLogger('strategy_sweep')
+
+# Swept parameters, in the order of the parameter set keys
+SWEEP_PARAMETERS = ['stop_loss_percent', 'take_profit_percent', 'trade_size_percent',
+                    'leverage', 'confidence_threshold']
+
+# Values used for parameters the grid does not cover
+DEFAULT_PARAMETERS = {
+    'stop_loss_percent': 2.0,
+    'take_profit_percent': 3.0,
+    'trade_size_percent': 10.0,
+    'leverage': 1.0,
+    'confidence_threshold': 0.6
+}
+
+# Largest sizing x candle matrix evaluated at once
+SWEEP_MATRIX_CELLS = 4_000_000
+
+# Largest number of parameter sets per sweep (about 20s over a year of hourly candles on one core)
+MAX_SWEEP_COMBINATIONS = 20_000
+
+# Metrics the results can be ranked by
+RANK_METRICS = ['final_balance', 'pnl', 'pnl_percent', 'win_rate', 'average_drawdown', 'max_drawdown',
+                'sharpe_ratio', 'volatility', 'trade_count', 'win_count', 'loss_count', 'average_win',
+                'average_loss', 'largest_win', 'largest_loss']
+
+# Metrics where lower is better when ranking
+ASCENDING_METRICS = {'max_drawdown', 'average_drawdown', 'volatility'}
+
+# Per-process state of a worker (set by _init_sweep_worker)
+_worker_state: Dict[str, Any] = {}
+
+
+def count_parameter_sets(grid: Dict[str, List[float]]) -> int:
+    """
+    Count the parameter sets a grid expands into
+
+    Args:
+        grid: Values to try per parameter (see build_parameter_sets)
+
+    Returns:
+        Number of parameter sets
+    """
+    count = 1
+    for name in SWEEP_PARAMETERS:
+        count *= len({float(value) for value in grid.get(name) or [DEFAULT_PARAMETERS[name]]})
+    return count
+
+
+def build_parameter_sets(grid: Dict[str, List[float]], strategy_type: str = 'balanced') -> List[Dict[str, float]]:
+    """
+    Expand a parameter grid into parameter sets
+
+    Args:
+        grid: Values to try per parameter (see SWEEP_PARAMETERS); missing parameters
+            use DEFAULT_PARAMETERS
+        strategy_type: Strategy type whose adjustments are applied to every set
+            ('balanced' uses the values as given)
+
+    Returns:
+        List of parameter sets with the given values and the 'effective' values the
+        simulation runs with
+    """
+    unknown = [name for name in grid if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {unknown}. Must be in: {', '.join(SWEEP_PARAMETERS)}")
+
+    values = [sorted({float(value) for value in grid.get(name) or [DEFAULT_PARAMETERS[name]]})
+              for name in SWEEP_PARAMETERS]
+    parameter_sets = []
+    for combination in itertools.product(*values):
+        parameters = dict(zip(SWEEP_PARAMETERS, combination))
+        parameters['effective'] = adjust_strategy_parameters(strategy_type, **parameters)
+        parameter_sets.append(parameters)
+    return parameter_sets
+
+
+def _set_worker_state(prices: np.ndarray, predictions: np.ndarray, initial_investment: float) -> None:
+    """Point the worker state at a price and prediction series"""
+    _worker_state.clear()
+    _worker_state.update({
+        'prices': prices,
+        'predictions': predictions,
+        'initial_investment': initial_investment,
+        'signals': {}
+    })
+
+
+def _init_sweep_worker(prices: np.ndarray, predictions: np.ndarray, initial_investment: float) -> None:
+    """Initialise a worker process with the prices and predictions"""
+    os.environ['OMP_NUM_THREADS'] = '1'
+    _set_worker_state(prices, predictions, initial_investment)
+
+
+def _run_path(path_key: Tuple[float, float, float], exposures: List[float]) -> Tuple[Tuple[float, float, float], Dict[str, List[float]]]:
+    """
+    Evaluate every sizing of one trade path
+
+    Args:
+        path_key: (stop_loss_percent, take_profit_percent, confidence_threshold)
+        exposures: Distinct exposures (trade_size_percent / 100 * leverage) to evaluate
+
+    Returns:
+        Tuple of (path_key, metrics with one value per exposure)
+    """
+    stop_loss_percent, take_profit_percent, confidence_threshold = path_key
+    prices = _worker_state['prices']
+    initial_investment = _worker_state['initial_investment']
+
+    # Entry signals are shared by every path with the same threshold
+    signals = _worker_state['signals'].get(confidence_threshold)
+    if signals is None:
+        signals = entry_signals(_worker_state['predictions'], confidence_threshold)
+        _worker_state['signals'][confidence_threshold] = signals
+    path = trade_path(prices, signals, stop_loss_percent, take_profit_percent)
+
+    block = max(1, SWEEP_MATRIX_CELLS // max(len(prices), 1))
+    metrics: Dict[str, List[float]] = {}
+    for start in range(0, len(exposures), block):
+        sizing = simulate_sizings(prices, path, initial_investment, np.asarray(exposures[start:start + block]))
+        batch = compute_metrics_batch(initial_investment, sizing['final_balance'], sizing['equity'], sizing['pnl'])
+        for name, values in batch.items():
+            metrics.setdefault(name, []).extend(np.asarray(values).tolist())
+    return path_key, metrics
+
+
+def pareto_front(results: List[Dict[str, Any]], return_key: str = 'pnl_percent',
+                 risk_key: str = 'max_drawdown') -> List[Dict[str, Any]]:
+    """
+    Find the results no other result beats on both return and drawdown
+
+    Args:
+        results: Sweep results
+        return_key: Metric to maximise
+        risk_key: Metric to minimise
+
+    Returns:
+        The non-dominated results, ordered by increasing risk
+    """
+    front = []
+    best_return = -np.inf
+    for result in sorted(results, key=lambda r: (r[risk_key], -r[return_key])):
+        if result[return_key] > best_return:
+            front.append(result)
+            best_return = result[return_key]
+    return front
+
+
+def run_parameter_sweep(prices: np.ndarray,
+                        predictions: np.ndarray,
+                        grid: Dict[str, List[float]],
+                        initial_investment: float = 10000.0,
+                        strategy_type: str = 'balanced',
+                        n_workers: Optional[int] = None,
+                        rank_by: str = 'pnl_percent') -> Dict[str, Any]:
+    """
+    Simulate every parameter set of a grid on the same prices and predictions
+
+    Args:
+        prices: Close price per candle
+        predictions: Bullish probability per candle
+        grid: Values to try per parameter (see build_parameter_sets)
+        initial_investment: Initial investment amount
+        strategy_type: Strategy type whose adjustments are applied to every set
+        n_workers: Number of worker processes (default: one per CPU core)
+        rank_by: Metric to rank the results by (drawdowns and volatility ascending)
+
+    Returns:
+        Dictionary with the ranked 'results' (parameters plus metrics), the
+        'pareto_front' of return against max drawdown and run statistics
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Unknown rank metric {rank_by}. Must be one of: {', '.join(RANK_METRICS)}")
+    combinations = count_parameter_sets(grid)
+    if combinations > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f"Grid expands into {combinations} parameter sets, more than the "
+                         f"{MAX_SWEEP_COMBINATIONS} allowed per sweep")
+
+    start_time = time.time()
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    predictions = np.ascontiguousarray(predictions, dtype=np.float64)
+    parameter_sets = build_parameter_sets(grid, strategy_type)
+
+    # Group the sets by trade path; sizings with the same exposure give the same result
+    paths: Dict[Tuple[float, float, float], List[float]] = {}
+    for parameters in parameter_sets:
+        effective = parameters['effective']
+        key = (effective['stop_loss_percent'], effective['take_profit_percent'], effective['confidence_threshold'])
+        exposure = effective['trade_size_percent'] / 100 * effective['leverage']
+        parameters['_path'], parameters['_exposure'] = key, exposure
+        if exposure not in paths.setdefault(key, []):
+            paths[key].append(exposure)
+
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(paths)))
+    logger.info(f"Sweeping {len(parameter_sets)} parameter sets over {len(paths)} trade paths "
+                f"and {len(prices)} candles with {n_workers} workers")
+
+    path_metrics: Dict[Tuple[float, float, float], Dict[str, List[float]]] = {}
+    if n_workers == 1:
+        _set_worker_state(prices, predictions, initial_investment)
+        try:
+            for key, exposures in paths.items():
+                path_metrics[key] = _run_path(key, exposures)[1]
+        finally:
+            _worker_state.clear()
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, initializer=_init_sweep_worker,
+                                 initargs=(prices, predictions, initial_investment)) as executor:
+            futures = [executor.submit(_run_path, key, exposures) for key, exposures in paths.items()]
+            for future in as_completed(futures):
+                key, metrics = future.result()
+                path_metrics[key] = metrics
+
+    results = []
+    for parameters in parameter_sets:
+        key, exposure = parameters.pop('_path'), parameters.pop('_exposure')
+        index = paths[key].index(exposure)
+        metrics = {name: values[index] for name, values in path_metrics[key].items()}
+        for name in ('trade_count', 'win_count', 'loss_count'):
+            metrics[name] = int(metrics[name])
+        results.append({**parameters, **metrics})
+
+    results.sort(key=lambda r: r[rank_by], reverse=rank_by not in ASCENDING_METRICS)
+    for rank, result in enumerate(results, 1):
+        result['rank'] = rank
+
+    elapsed = time.time() - start_time
+    logger.info(f"Sweep of {len(results)} simulations finished in {elapsed:.2f}s")
+
+    return {
+        'simulations': len(results),
+        'trade_paths': len(paths),
+        'candles': len(prices),
+        'workers': n_workers,
+        'strategy_type': strategy_type,
+        'rank_by': rank_by,
+        'seconds': elapsed,
+        'results': results,
+        'pareto_front': pareto_front(results)
+    }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental adaptive tuning plan
+
+This script checks that plan_training_update updates a model incrementally on new
+candles from the training distribution, retrains it fully when the new candles'
+features have drifted, and never hands out the newest candles whose labels are
+still placeholders.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Reduce logging level to minimize output
+logging.basicConfig(level=logging.ERROR)
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from data_loader import get_training_state, DEFAULT_FORWARD_RETURNS_PERIODS
+from xgboost_optimization import XGBoostOptimizer
+from adaptive_tuning import AdaptiveParameterTuner
+
+def make_candles(rows: int, seed: int) -> pd.DataFrame:
+    """Hourly candles of a mean-reverting price with a few indicators"""
+    rng = np.random.default_rng(seed)
+    log_price = np.zeros(rows)
+    for i in range(1, rows):
+        log_price[i] = 0.95 * log_price[i - 1] + rng.normal(0, 0.01)
+    close = 100 * np.exp(log_price)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2023-01-01', periods=rows, freq='h'),
+        'open': np.roll(close, 1),
+        'high': close * 1.002,
+        'low': close * 0.998,
+        'close': close,
+        'volume': rng.uniform(100, 200, rows)
+    })
+    df['return_1'] = df['close'].pct_change()
+    df['sma_ratio'] = df['close'] / df['close'].rolling(20).mean()
+    return df.iloc[20:].reset_index(drop=True)
+
+def plan_for(data_dir: str, candles: pd.DataFrame, training_state: dict) -> dict:
+    """Write the candles and plan the update of a model trained on training_state"""
+    candles.to_csv(os.path.join(data_dir, 'testusdt_1h.csv'), index=False)
+    optimizer = XGBoostOptimizer('testusdt', '1h', data_dir=data_dir, model_dir=data_dir)
+    return AdaptiveParameterTuner(optimizer).plan_training_update(training_state)
+
+def run_test() -> bool:
+    """Run the training plan checks"""
+    data_dir = tempfile.mkdtemp()
+    try:
+        candles = make_candles(2600, 3)
+        trained, new = candles.iloc[:2000], candles.iloc[2000:]
+
+        trained.to_csv(os.path.join(data_dir, 'testusdt_1h.csv'), index=False)
+        training_state = get_training_state(data_dir, 'testusdt', '1h')
+        assert 'forward_return' not in training_state['feature_cols']
+        assert training_state['rows'] == len(trained) - DEFAULT_FORWARD_RETURNS_PERIODS
+
+        # New candles from the same distribution are learned incrementally
+        plan = plan_for(data_dir, candles, training_state)
+        assert plan['mode'] == 'incremental', plan['reason']
+        assert np.isfinite(plan['drift'])
+        assert len(plan['y_new']) == len(new), "Only the rows with known labels are new"
+        assert plan['cutoffs'][-1] == pd.Timestamp(candles['timestamp'].iloc[-DEFAULT_FORWARD_RETURNS_PERIODS - 1]).isoformat()
+        print(f"Undrifted candles: {plan['mode']} update on {len(plan['y_new'])} rows, drift {plan['drift']:.2f}")
+
+        # The same candles with shifted volume and prices force a full retrain
+        shifted = candles.copy()
+        shifted.loc[2000:, 'volume'] *= 5
+        shifted.loc[2000:, ['open', 'high', 'low', 'close']] *= 1.5
+        plan = plan_for(data_dir, shifted, training_state)
+        assert plan['mode'] == 'full' and 'drift' in plan['reason'], plan['reason']
+        print(f"Drifted candles: {plan['mode']} retrain ({plan['reason']})")
+
+        print("All adaptive tuning checks passed")
+        return True
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    success = run_test()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the job scheduler
+
+This script checks that a queued job which needs more CPU slots than are free is not
+starved by smaller, lower-priority jobs behind it, and that a job which finishes
+after a cancel request keeps its result.
+"""
+
+import os
+import sys
+import time
+import logging
+
+# Reduce logging level to minimize output
+logging.basicConfig(level=logging.ERROR)
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from job_scheduler import (JobScheduler, PRIORITY_LOW, PRIORITY_NORMAL,
+                           JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, ACTIVE_STATES)
+
+def sleep_job(context, seconds: float) -> float:
+    """Job target that sleeps and ignores cancellation"""
+    time.sleep(seconds)
+    return seconds
+
+def wait_for(predicate, timeout: float = 30.0) -> bool:
+    """Poll until the predicate holds or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def run_test() -> bool:
+    """Run the scheduler checks"""
+    scheduler = JobScheduler(max_cpu_slots=2)
+    try:
+        # One slot busy, then a 2-slot job that must wait, then a stream of 1-slot jobs
+        running, _ = scheduler.submit('retraining', 'aaausdt', '1h', 'adaptive', sleep_job,
+                                      args=(1.0,), priority=PRIORITY_LOW)
+        assert wait_for(lambda: running.status == JOB_RUNNING)
+        blocked, _ = scheduler.submit('optimization', 'bbbusdt', '1h', 'bayesian', sleep_job,
+                                      args=(0.2,), priority=PRIORITY_NORMAL, cpu_slots=2)
+        small = [scheduler.submit('retraining', f'c{i}usdt', '1h', 'adaptive', sleep_job,
+                                  args=(0.5,), priority=PRIORITY_LOW)[0] for i in range(3)]
+
+        time.sleep(0.5)
+        assert blocked.status == JOB_QUEUED
+        assert all(job.status == JOB_QUEUED for job in small), "A lower-priority job took the blocked job's slot"
+
+        assert wait_for(lambda: all(job.status not in ACTIVE_STATES for job in [blocked] + small))
+        assert all(blocked.started_at < job.started_at for job in small)
+        print("Blocked 2-slot job started before the 1-slot jobs behind it")
+
+        # A job that finishes despite a cancel request keeps its result
+        finishing, _ = scheduler.submit('optimization', 'dddusdt', '1h', 'grid', sleep_job, args=(0.5,))
+        assert wait_for(lambda: finishing.status == JOB_RUNNING)
+        assert scheduler.cancel(finishing.job_id)
+        assert wait_for(lambda: finishing.status not in ACTIVE_STATES)
+        assert finishing.status == JOB_COMPLETED and finishing.result == 0.5, finishing.status
+        assert not scheduler.cancel(finishing.job_id)
+        print("Job that finished after a cancel request kept its result")
+
+        print("All job scheduler checks passed")
+        return True
+    finally:
+        scheduler.stop()
+
+if __name__ == "__main__":
+    success = run_test()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the portfolio backtest
+
+This script checks that a one-asset portfolio without caps matches the
+single-asset backtest, that the total exposure cap keeps positions from
+overlapping when it only fits one of them, and that a 20-asset portfolio over a
+year of 5m candles simulates in seconds.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from backtest_core import run_backtest, first_closes
+from portfolio_backtest import run_portfolio_backtest
+
+def make_asset(rows: int, seed: int) -> pd.DataFrame:
+    """Random-walk closes with predictions that are sometimes confident"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=rows, freq='5min')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    prediction = np.clip(0.5 + rng.normal(0, 0.25, rows), 0, 1)
+    return pd.DataFrame({'close': close, 'prediction': prediction}, index=index)
+
+def run_test() -> bool:
+    """Run the parity, cap and speed checks"""
+    config = dict(strategy_type='balanced', initial_investment=10000.0, trade_size_percent=10.0,
+                  stop_loss_percent=2.0, take_profit_percent=3.0, leverage=2.0, confidence_threshold=0.6)
+
+    # One asset without caps is the single-asset backtest
+    data = make_asset(20000, 1)
+    expected = run_backtest(data['close'].to_numpy(), data['prediction'].to_numpy(), **config)
+    assert first_closes(expected['trades']).all(), "Test data closes a trade twice"
+    actual = run_portfolio_backtest({'btcusdt': data}, **config, max_asset_exposure_percent=1000,
+                                    max_total_exposure_percent=1000)
+    for name in ('final_balance', 'max_drawdown', 'sharpe_ratio', 'trade_count'):
+        if not np.isclose(expected[name], actual[name], rtol=1e-9, atol=1e-9):
+            raise AssertionError(f"{name}: expected {expected[name]}, got {actual[name]}")
+    assert np.allclose(expected['equity'], actual['equity'])
+    print(f"Parity with the single-asset backtest over {actual['trade_count']} trades")
+
+    # A total cap that fits one position at a time
+    frames = {f'asset{i}': make_asset(20000, 10 + i) for i in range(3)}
+    capped = run_portfolio_backtest(frames, **config, max_total_exposure_percent=20)
+    trades = capped['trades']
+    order = np.argsort(trades['entry_index'], kind='stable')
+    assert (trades['entry_index'][order][1:] >= trades['exit_index'][order][:-1]).all(), "Positions overlap"
+    assert capped['skipped_entries'] > 0
+    print(f"Total cap: {capped['trade_count']} trades, {capped['skipped_entries']} skipped entries")
+
+    # A late listing does not trade before its first candle
+    frames['asset2'] = frames['asset2'].iloc[5000:]
+    late = run_portfolio_backtest(frames, **config)
+    assert (late['trades']['entry_index'][late['trades']['asset'] == 2] >= 5000).all()
+
+    # Speed: 20 assets over a year of 5m candles
+    frames = {f'asset{i}': make_asset(105120, 100 + i) for i in range(20)}
+    start = time.time()
+    result = run_portfolio_backtest(frames, **config)
+    elapsed = time.time() - start
+    print(f"20 assets x {len(result['equity'])} candles: {result['trade_count']} trades in {elapsed:.2f}s")
+    assert elapsed < 10, "Portfolio backtest is too slow"
+
+    print("All portfolio backtest checks passed")
+    return True
+
+if __name__ == "__main__":
+    success = run_test()
+    sys.exit(0 if success else 1)
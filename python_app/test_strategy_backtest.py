@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized backtest core
+
+This script checks that StrategySimulator._run_strategy (now backed by
+backtest_core) gives the same trades, curves and metrics as the original
+row-by-row loop, and that a year of 5m candles simulates in under a second.
+"""
+
+import os
+import sys
+import time
+import tempfile
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from strategy_simulation import StrategySimulator
+
+def legacy_run_strategy(data: pd.DataFrame,
+                 strategy_type: str,
+                 initial_investment: float,
+                 trade_size_percent: float,
+                 stop_loss_percent: float,
+                 take_profit_percent: float,
+                 leverage: float,
+                 confidence_threshold: float) -> Dict[str, Any]:
+    """
+    Reference implementation: the original row-by-row loop of StrategySimulator._run_strategy
+
+    Args:
+        data: DataFrame with market data and predictions
+        strategy_type: Type of strategy (conservative, balanced, aggressive)
+        initial_investment: Initial investment amount
+        trade_size_percent: Percentage of balance to use per trade
+        stop_loss_percent: Stop loss percentage
+        take_profit_percent: Take profit percentage
+        leverage: Leverage multiplier
+        confidence_threshold: Minimum prediction confidence to enter a trade
+
+    Returns:
+        Dictionary with simulation results
+    """
+    # Initialize simulation state
+    balance = initial_investment
+    position = None  # None = no position, 'long' or 'short'
+    position_size = 0.0
+    entry_price = 0.0
+    entry_time = None
+
+    # Results tracking
+    trades = []  # List of completed trades
+    balance_history = []  # Balance at each time step
+    equity_history = []  # Equity (balance + unrealized PnL) at each time step
+
+    # Adjust strategy parameters based on strategy type
+    if strategy_type == 'conservative':
+        # More conservative approach
+        trade_size_percent *= 0.7
+        stop_loss_percent *= 0.8
+        take_profit_percent *= 1.2
+        confidence_threshold = max(0.65, confidence_threshold)
+
+    elif strategy_type == 'aggressive':
+        # More aggressive approach
+        trade_size_percent *= 1.3
+        stop_loss_percent *= 1.2
+        take_profit_percent *= 0.8
+        confidence_threshold = min(0.55, confidence_threshold)
+        leverage = min(3.0, leverage * 1.5)
+
+    # For date-based iteration
+    for timestamp, row in data.iterrows():
+        current_price = row['close']
+        prediction = row['prediction']
+
+        # Calculate current equity
+        if position is None:
+            equity = balance
+        elif position == 'long':
+            unrealized_pnl = position_size * (current_price - entry_price) * leverage
+            equity = balance + unrealized_pnl
+        elif position == 'short':
+            unrealized_pnl = position_size * (entry_price - current_price) * leverage
+            equity = balance + unrealized_pnl
+
+        # Record history
+        balance_history.append((timestamp, balance))
+        equity_history.append((timestamp, equity))
+
+        # Check if we need to close a position (stop loss or take profit)
+        if position is not None:
+            if position == 'long':
+                # Check stop loss
+                stop_price = entry_price * (1 - stop_loss_percent / 100)
+                if current_price <= stop_price:
+                    # Stop loss triggered
+                    pnl = position_size * (current_price - entry_price) * leverage
+                    balance += pnl
+
+                    trades.append({
+                        'type': 'long',
+                        'entry_time': entry_time.isoformat(),
+                        'exit_time': timestamp.isoformat(),
+                        'entry_price': entry_price,
+                        'exit_price': current_price,
+                        'position_size': position_size,
+                        'pnl': pnl,
+                        'pnl_percent': (pnl / (position_size * entry_price) * 100),
+                        'exit_reason': 'stop_loss'
+                    })
+
+                    position = None
+
+                # Check take profit
+                take_profit_price = entry_price * (1 + take_profit_percent / 100)
+                if current_price >= take_profit_price:
+                    # Take profit triggered
+                    pnl = position_size * (current_price - entry_price) * leverage
+                    balance += pnl
+
+                    trades.append({
+                        'type': 'long',
+                        'entry_time': entry_time.isoformat(),
+                        'exit_time': timestamp.isoformat(),
+                        'entry_price': entry_price,
+                        'exit_price': current_price,
+                        'position_size': position_size,
+                        'pnl': pnl,
+                        'pnl_percent': (pnl / (position_size * entry_price) * 100),
+                        'exit_reason': 'take_profit'
+                    })
+
+                    position = None
+
+            elif position == 'short':
+                # Check stop loss
+                stop_price = entry_price * (1 + stop_loss_percent / 100)
+                if current_price >= stop_price:
+                    # Stop loss triggered
+                    pnl = position_size * (entry_price - current_price) * leverage
+                    balance += pnl
+
+                    trades.append({
+                        'type': 'short',
+                        'entry_time': entry_time.isoformat(),
+                        'exit_time': timestamp.isoformat(),
+                        'entry_price': entry_price,
+                        'exit_price': current_price,
+                        'position_size': position_size,
+                        'pnl': pnl,
+                        'pnl_percent': (pnl / (position_size * entry_price) * 100),
+                        'exit_reason': 'stop_loss'
+                    })
+
+                    position = None
+
+                # Check take profit
+                take_profit_price = entry_price * (1 - take_profit_percent / 100)
+                if current_price <= take_profit_price:
+                    # Take profit triggered
+                    pnl = position_size * (entry_price - current_price) * leverage
+                    balance += pnl
+
+                    trades.append({
+                        'type': 'short',
+                        'entry_time': entry_time.isoformat(),
+                        'exit_time': timestamp.isoformat(),
+                        'entry_price': entry_price,
+                        'exit_price': current_price,
+                        'position_size': position_size,
+                        'pnl': pnl,
+                        'pnl_percent': (pnl / (position_size * entry_price) * 100),
+                        'exit_reason': 'take_profit'
+                    })
+
+                    position = None
+
+        # Check if we need to open a new position based on prediction
+        if position is None:
+            # Normalizing prediction from 0-1 to -1 to 1 range, where:
+            # 0.5 = neutral (hold)
+            # >0.5 = bullish (more bullish as it approaches 1)
+            # <0.5 = bearish (more bearish as it approaches 0)
+            signal = (prediction - 0.5) * 2  # Range from -1 to 1
+
+            # Only take positions with sufficient confidence
+            if abs(signal) >= confidence_threshold:
+                if signal > 0:  # Bullish signal
+                    # Open long position
+                    trade_amount = balance * (trade_size_percent / 100)
+                    position_size = trade_amount / current_price
+                    position = 'long'
+                    entry_price = current_price
+                    entry_time = timestamp
+
+                elif signal < 0:  # Bearish signal
+                    # Open short position
+                    trade_amount = balance * (trade_size_percent / 100)
+                    position_size = trade_amount / current_price
+                    position = 'short'
+                    entry_price = current_price
+                    entry_time = timestamp
+
+    # Close any open position at the end of simulation
+    if position is not None:
+        last_price = data.iloc[-1]['close']
+        last_time = data.index[-1]
+
+        if position == 'long':
+            pnl = position_size * (last_price - entry_price) * leverage
+        else:  # position == 'short'
+            pnl = position_size * (entry_price - last_price) * leverage
+
+        balance += pnl
+
+        trades.append({
+            'type': position,
+            'entry_time': entry_time.isoformat(),
+            'exit_time': last_time.isoformat(),
+            'entry_price': entry_price,
+            'exit_price': last_price,
+            'position_size': position_size,
+            'pnl': pnl,
+            'pnl_percent': (pnl / (position_size * entry_price) * 100),
+            'exit_reason': 'simulation_end'
+        })
+
+    # Calculate performance metrics
+    final_balance = balance
+    pnl = final_balance - initial_investment
+    pnl_percent = (pnl / initial_investment) * 100
+
+    # Calculate win rate
+    win_count = sum(1 for trade in trades if trade['pnl'] > 0)
+    loss_count = sum(1 for trade in trades if trade['pnl'] <= 0)
+    trade_count = len(trades)
+    win_rate = win_count / trade_count if trade_count > 0 else 0
+
+    # Calculate average win/loss
+    win_trades = [trade['pnl'] for trade in trades if trade['pnl'] > 0]
+    loss_trades = [trade['pnl'] for trade in trades if trade['pnl'] <= 0]
+
+    average_win = sum(win_trades) / len(win_trades) if win_trades else 0
+    average_loss = sum(loss_trades) / len(loss_trades) if loss_trades else 0
+    largest_win = max(win_trades) if win_trades else 0
+    largest_loss = min(loss_trades) if loss_trades else 0
+
+    # Calculate drawdown
+    drawdowns = []
+    peak = initial_investment
+    for _, equity in equity_history:
+        if equity > peak:
+            peak = equity
+        if peak > 0:
+            drawdown = (peak - equity) / peak * 100
+            drawdowns.append(drawdown)
+
+    average_drawdown = sum(drawdowns) / len(drawdowns) if drawdowns else 0
+    max_drawdown = max(drawdowns) if drawdowns else 0
+
+    # Calculate daily returns for Sharpe ratio
+    daily_returns = []
+    for i in range(1, len(equity_history)):
+        prev_equity = equity_history[i-1][1]
+        curr_equity = equity_history[i][1]
+        if prev_equity > 0:
+            daily_return = (curr_equity - prev_equity) / prev_equity
+            daily_returns.append(daily_return)
+
+    # Calculate Sharpe ratio (using daily values)
+    if daily_returns:
+        avg_return = sum(daily_returns) / len(daily_returns)
+        std_dev = np.std(daily_returns) if len(daily_returns) > 1 else 0
+        sharpe_ratio = (avg_return / std_dev) * np.sqrt(252) if std_dev > 0 else 0
+        volatility = std_dev * np.sqrt(252) * 100  # Annualized and in percentage
+    else:
+        sharpe_ratio = 0
+        volatility = 0
+
+    return {
+        'final_balance': final_balance,
+        'pnl': pnl,
+        'pnl_percent': pnl_percent,
+        'win_rate': win_rate,
+        'average_drawdown': average_drawdown,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe_ratio,
+        'volatility': volatility,
+        'trade_count': trade_count,
+        'win_count': win_count,
+        'loss_count': loss_count,
+        'average_win': average_win,
+        'average_loss': average_loss,
+        'largest_win': largest_win,
+        'largest_loss': largest_loss,
+        'trades': trades,
+        'balance_history': balance_history,
+        'equity_history': equity_history
+    }
+
+
+def make_market_data(rows: int, seed: int) -> pd.DataFrame:
+    """Random-walk closes with predictions that are sometimes confident"""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    prediction = rng.beta(0.6, 0.6, rows)
+    index = pd.date_range('2024-01-01', periods=rows, freq='5min')
+    return pd.DataFrame({'close': close, 'prediction': prediction}, index=index)
+
+def assert_close(name: str, expected: float, actual: float) -> None:
+    """Compare two numbers with a relative tolerance for summation order"""
+    if not np.isclose(expected, actual, rtol=1e-9, atol=1e-9):
+        raise AssertionError(f"{name}: expected {expected}, got {actual}")
+
+def check_parity(simulator: StrategySimulator, data: pd.DataFrame, config: Dict[str, Any]) -> int:
+    """Run both implementations on the same data and compare every output"""
+    expected = legacy_run_strategy(data, **config)
+    actual = simulator._run_strategy(data, **config)
+    
+    assert len(expected['trades']) == len(actual['trades']), \
+        f"trade count {len(expected['trades'])} != {len(actual['trades'])}"
+    for expected_trade, actual_trade in zip(expected['trades'], actual['trades']):
+        for key, value in expected_trade.items():
+            if isinstance(value, str):
+                assert value == actual_trade[key], f"trade {key}: {value} != {actual_trade[key]}"
+            else:
+                assert_close(f"trade {key}", value, actual_trade[key])
+    
+    expected_balance = np.array([value for _, value in expected['balance_history']])
+    expected_equity = np.array([value for _, value in expected['equity_history']])
+    assert np.allclose(expected_balance, actual['balance_history'].to_numpy(), rtol=1e-9), "balance curve"
+    assert np.allclose(expected_equity, actual['equity_history'].to_numpy(), rtol=1e-9), "equity curve"
+    
+    for key, value in expected.items():
+        if key not in ('trades', 'balance_history', 'equity_history'):
+            assert_close(key, value, actual[key])
+    return len(actual['trades'])
+
+def run_test() -> bool:
+    """Run the parity and speed checks"""
+    simulator = StrategySimulator('btcusdt', '5m', data_dir=tempfile.mkdtemp())
+    base = {
+        'initial_investment': 10000.0,
+        'trade_size_percent': 10.0,
+        'stop_loss_percent': 2.0,
+        'take_profit_percent': 3.0,
+        'leverage': 1.0,
+        'confidence_threshold': 0.6
+    }
+    configs = [
+        {**base, 'strategy_type': 'balanced'},
+        {**base, 'strategy_type': 'conservative'},
+        {**base, 'strategy_type': 'aggressive', 'leverage': 2.0},
+        {**base, 'strategy_type': 'balanced', 'stop_loss_percent': 0.5, 'take_profit_percent': 0.8,
+         'confidence_threshold': 0.2},
+        # Crossed levels: both exits fire on the same candle
+        {**base, 'strategy_type': 'balanced', 'stop_loss_percent': -0.1, 'take_profit_percent': -0.1},
+        # Never reached: the position is closed at the end of the simulation
+        {**base, 'strategy_type': 'balanced', 'stop_loss_percent': 90.0, 'take_profit_percent': 500.0}
+    ]
+    
+    print("=== Parity with the row-by-row loop ===")
+    for seed, config in enumerate(configs):
+        data = make_market_data(5000, seed)
+        trade_count = check_parity(simulator, data, config)
+        print(f"✓ {config['strategy_type']:<12} SL {config['stop_loss_percent']:>5} TP "
+              f"{config['take_profit_percent']:>5}: {trade_count} trades match")
+    
+    print("\n=== One year of 5m candles ===")
+    data = make_market_data(365 * 288, 42)
+    config = {**base, 'strategy_type': 'balanced', 'stop_loss_percent': 0.5, 'take_profit_percent': 0.8}
+    
+    start_time = time.time()
+    result = simulator._run_strategy(data, **config)
+    vectorized_seconds = time.time() - start_time
+    
+    start_time = time.time()
+    legacy_run_strategy(data, **config)
+    loop_seconds = time.time() - start_time
+    
+    print(f"{len(data)} candles, {result['trade_count']} trades: {vectorized_seconds:.3f}s "
+          f"(row-by-row loop {loop_seconds:.2f}s)")
+    if vectorized_seconds >= 1.0:
+        print("✗ Simulation took longer than a second")
+        return False
+    
+    print("\n✓ All backtest checks passed!")
+    return True
+
+if __name__ == "__main__":
+    success = run_test()
+    sys.exit(0 if success else 1)
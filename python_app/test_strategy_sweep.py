@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script for the strategy parameter sweep
+
+This script checks that sweep results are ranked by the requested metric, that the
+Pareto front holds exactly the results no other result beats on both return and
+drawdown, that one worker and several workers give identical results, and that the
+/sweep route rejects oversized grids and unknown rank metrics and otherwise loads
+a trained model and sweeps its predictions. The simulator's predictions must be
+bullish probabilities from the model's class probabilities, cached per model file.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from flask import Flask
+
+# Reduce logging level to minimize output
+logging.basicConfig(level=logging.ERROR)
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+for path in (current_dir, parent_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from strategy_sweep import run_parameter_sweep, MAX_SWEEP_COMBINATIONS
+from data_loader import prepare_data_for_training
+from model_utils import save_model
+from python_app.strategy_simulation import StrategySimulator
+from prediction_cache import get_prediction_cache
+from python_app.routes.strategy_simulation_routes import strategy_simulation_bp
+
+GRID = {
+    'stop_loss_percent': [1.0, 2.0, 4.0],
+    'take_profit_percent': [1.5, 3.0, 6.0],
+    'trade_size_percent': [5.0, 10.0, 25.0],
+    'leverage': [1.0, 3.0],
+    'confidence_threshold': [0.55, 0.7]
+}
+
+def make_candles(rows: int, seed: int) -> pd.DataFrame:
+    """Hourly random-walk candles indexed by timestamp"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.005, rows)))
+    return pd.DataFrame({
+        'open': np.roll(close, 1),
+        'high': close * 1.003,
+        'low': close * 0.997,
+        'close': close,
+        'volume': rng.uniform(100, 200, rows)
+    }, index=pd.date_range('2024-01-01', periods=rows, freq='h', name='timestamp'))
+
+def check_sweep() -> None:
+    """Check ranking, the Pareto front and worker parity"""
+    rng = np.random.default_rng(5)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, 5000)))
+    predictions = np.clip(0.5 + rng.normal(0, 0.25, 5000), 0, 1)
+
+    single = run_parameter_sweep(prices, predictions, GRID, n_workers=1)
+    results = single['results']
+    assert single['simulations'] == len(results) == 108
+    assert [r['rank'] for r in results] == list(range(1, 109))
+    returns = [r['pnl_percent'] for r in results]
+    assert returns == sorted(returns, reverse=True), "Not ranked by descending return"
+    drawdowns = [r['max_drawdown'] for r in
+                 run_parameter_sweep(prices, predictions, GRID, n_workers=1, rank_by='max_drawdown')['results']]
+    assert drawdowns == sorted(drawdowns), "Not ranked by ascending drawdown"
+    print(f"Ranked {len(results)} results by return and by drawdown")
+
+    front = single['pareto_front']
+    for member in front:
+        assert not any((r['max_drawdown'] <= member['max_drawdown'] and r['pnl_percent'] > member['pnl_percent']) or
+                       (r['max_drawdown'] < member['max_drawdown'] and r['pnl_percent'] >= member['pnl_percent'])
+                       for r in results), "A Pareto front member is dominated"
+    for result in results:
+        assert any(f['max_drawdown'] <= result['max_drawdown'] and f['pnl_percent'] >= result['pnl_percent']
+                   for f in front), "A result is neither on nor behind the Pareto front"
+    print(f"Pareto front of {len(front)} results")
+
+    pooled = run_parameter_sweep(prices, predictions, GRID, n_workers=3)
+    assert pooled['workers'] == 3
+    assert pooled['results'] == results, "Pooled sweep differs from the in-process sweep"
+    assert pooled['pareto_front'] == front
+    print("Three workers give the same results as one")
+
+    for kwargs in ({'rank_by': 'profit'},
+                   {'grid': {**GRID, 'leverage': list(range(1, MAX_SWEEP_COMBINATIONS))}}):
+        try:
+            run_parameter_sweep(prices, predictions, **{'grid': GRID, **kwargs}, n_workers=1)
+        except ValueError:
+            continue
+        raise AssertionError(f"Sweep accepted {list(kwargs)}")
+
+def check_route(model_dir: str) -> None:
+    """Check the /sweep route's validation and a sweep with a trained model"""
+    candles = make_candles(1500, 7)
+    X, y, _ = prepare_data_for_training(candles, 'testusdt', '1h')
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=3)
+    model.fit(X.to_numpy(), y.to_numpy())
+    save_model(model, os.path.join(model_dir, 'xgboost_testusdt_1h_bayesian.model'),
+               {'symbol': 'testusdt', 'timeframe': '1h', 'params': {'max_depth': 3}})
+
+    app = Flask(__name__)
+    app.register_blueprint(strategy_simulation_bp)
+    client = app.test_client()
+    request = {'symbol': 'TEST/USDT', 'timeframe': '1h', 'startDate': '2024-01-01', 'endDate': '2024-03-05',
+               'modelType': 'bayesian', 'topN': 10,
+               'parameterGrid': {'stopLossPercent': [1, 2], 'takeProfitPercent': [2, 4],
+                                 'tradeSizePercent': [10, 20], 'confidenceThreshold': [0.5, 0.6]}}
+
+    oversized = {**request['parameterGrid'], 'leverage': list(range(1, MAX_SWEEP_COMBINATIONS))}
+    response = client.post('/api/strategy-simulation/sweep', json={**request, 'parameterGrid': oversized})
+    assert response.status_code == 400, response.status_code
+    response = client.post('/api/strategy-simulation/sweep', json={**request, 'rankBy': 'profit'})
+    assert response.status_code == 400, response.status_code
+    print("Route rejected an oversized grid and an unknown rank metric")
+
+    with mock.patch('python_app.strategy_simulation.DEFAULT_MODEL_DIR', model_dir), \
+            mock.patch.object(StrategySimulator, 'load_market_data', lambda self, start, end: candles):
+        response = client.post('/api/strategy-simulation/sweep', json=request)
+    body = response.get_json()
+    assert response.status_code == 200 and body['success'], body
+    data = body['data']
+    assert data['simulations'] == 16 and len(data['results']) == 10
+    assert data['modelParameters'] == {'max_depth': 3}
+    print(f"Route swept {data['simulations']} parameter sets over {data['candles']} candles")
+
+    # Predictions are bullish probabilities, cached per model file
+    simulator = StrategySimulator('testusdt', '1h', model_dir=model_dir)
+    with mock.patch.object(StrategySimulator, 'load_market_data', lambda self, start, end: candles):
+        first, metadata = simulator.prepare_simulation_data('bayesian', '2024-01-01', '2024-03-05')
+        assert metadata['model_path'] == os.path.join(model_dir, 'xgboost_testusdt_1h_bayesian.model')
+        prediction = first['prediction'].to_numpy()
+        assert ((prediction > 0) & (prediction < 1)).all() and len(np.unique(prediction)) > 3
+        expected = model.predict_proba(X.to_numpy())
+        assert np.allclose(prediction, 0.5 + (expected[:, 0] - expected[:, 2]) / 2)
+
+        hits = get_prediction_cache().hits
+        simulator.prepare_simulation_data('bayesian', '2024-01-01', '2024-03-05')
+        assert get_prediction_cache().hits == hits + 1, "Rerun missed the prediction cache"
+
+        retrained = xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(X.to_numpy(), y.to_numpy())
+        save_model(retrained, metadata['model_path'], {'symbol': 'testusdt', 'timeframe': '1h'})
+        second, _ = simulator.prepare_simulation_data('bayesian', '2024-01-01', '2024-03-05')
+        assert get_prediction_cache().hits == hits + 1, "Retrained model reused the old predictions"
+        assert not np.allclose(second['prediction'].to_numpy(), prediction)
+    print("Predictions are bullish probabilities cached per model file")
+
+def run_test() -> bool:
+    """Run the sweep and route checks"""
+    model_dir = tempfile.mkdtemp()
+    try:
+        check_sweep()
+        check_route(model_dir)
+        print("All strategy sweep checks passed")
+        return True
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    success = run_test()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the walk-forward evaluation
+
+This script checks that a walk-forward evaluation of a random walk, whose future is
+unpredictable, stays near chance accuracy: the label's forward return is not used as
+a feature, the rows whose labels reach into a test window are not trained on
+before it, and the newest rows, whose labels are placeholders, are not scored.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Reduce logging level to minimize output
+logging.basicConfig(level=logging.ERROR)
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from walk_forward import WalkForwardEvaluator
+
+def make_random_walk(rows: int, seed: int) -> pd.DataFrame:
+    """Hourly random-walk candles with a few indicators of past prices"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2023-01-01', periods=rows, freq='h'),
+        'open': np.roll(close, 1),
+        'high': close * 1.002,
+        'low': close * 0.998,
+        'close': close,
+        'volume': rng.uniform(100, 200, rows)
+    })
+    df['return_1'] = df['close'].pct_change()
+    df['return_24'] = df['close'].pct_change(24)
+    df['sma_ratio'] = df['close'] / df['close'].rolling(20).mean()
+    return df.iloc[24:]
+
+def run_test() -> bool:
+    """Run the leakage check"""
+    data_dir = tempfile.mkdtemp()
+    try:
+        make_random_walk(6000, 7).to_csv(os.path.join(data_dir, 'testusdt_1h.csv'), index=False)
+
+        params = {'objective': 'multi:softmax', 'max_depth': 4, 'learning_rate': 0.1,
+                  'n_estimators': 50, 'seed': 42}
+        for full_retrain_every in (0, 3):
+            evaluator = WalkForwardEvaluator('testusdt', '1h', data_dir=data_dir, model_dir=data_dir,
+                                             params=params, n_windows=6, full_retrain_every=full_retrain_every)
+            report = evaluator.run()
+
+            assert 'forward_return' not in evaluator.feature_cols, "The label's forward return is a feature"
+            assert report['windows'][0]['rows'] > 0
+            scored = evaluator.y[evaluator.n_initial + evaluator.purge_rows:len(evaluator.y) - evaluator.purge_rows]
+            assert sum(window['rows'] for window in report['windows']) == len(scored), \
+                "The newest rows' placeholder labels were scored"
+            accuracy = report['overall']['accuracy']
+            majority = np.bincount(scored).max() / len(scored)
+            print(f"Full retrain every {full_retrain_every}: out-of-sample accuracy {accuracy:.3f} "
+                  f"(majority class {majority:.3f})")
+            assert accuracy < majority + 0.1, "Walk-forward accuracy on a random walk is far above chance"
+
+        print("All walk-forward checks passed")
+        return True
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    success = run_test()
+    sys.exit(0 if success else 1)
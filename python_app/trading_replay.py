@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Trading Replay
+
+This module feeds stored candles through the live trading components on a
+simulation clock, as fast as they can process them. It provides:
+
+1. ReplayMarketFeed: serves the stored candles and model predictions as of the
+   clock, through the interfaces the components already use (the market service
+   price methods, the ML bridge get_prediction and the candle scheduler batches).
+   Predictions are scored once up front with XGBoostPredictor.predict_frame, so
+   they come from the prediction cache on reruns.
+2. ReplayDriver: installs a SimulationClock (see utils/clock.py) and steps it
+   through the candle close times, optionally under cProfile.
+3. replay_demo_bot: runs DemoTradingBot.run_simulation, whose sleeps advance the
+   simulation clock to the next candle.
+4. replay_paper_trading: runs MLPaperTradingIntegration on every candle batch,
+   trading through the TradeExecutionQueue and a paper mode BinanceTradingService.
+   The queue is drained in the replay thread after every candle.
+
+Usage:
+    python trading_replay.py --csv BTCUSDT=data/btcusdt_5m.csv --interval 5m --mode paper --profile
+"""
+
+import os
+import sys
+import io
+import time
+import json
+import logging
+import pstats
+import cProfile
+import argparse
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+import numpy as np
+import pandas as pd
+
+# Add the app directory and its parent to the path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+for path in (current_dir, os.path.dirname(current_dir)):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from candle_scheduler import interval_to_seconds
+
+try:
+    from python_app.utils.clock import SimulationClock, use_clock
+except ImportError:
+    from utils.clock import SimulationClock, use_clock
+
+logger = logging.getLogger('trading_replay')
+
+# Columns every candle frame needs
+REQUIRED_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _prepare_candles(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Index a candle frame by its naive UTC open time and add missing indicators
+
+    Args:
+        frame: Candles with a 'timestamp' column or a DatetimeIndex
+
+    Returns:
+        Sorted candle frame with indicator columns
+    """
+    frame = frame.copy()
+    if 'timestamp' in frame.columns:
+        frame = frame.set_index('timestamp')
+    frame.index = pd.to_datetime(frame.index)
+    if frame.index.tz is not None:
+        frame.index = frame.index.tz_convert('UTC').tz_localize(None)
+    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Candles are missing columns {missing}")
+
+    if 'rsi_14' not in frame.columns:
+        from data.dataset_loader import get_dataset_loader
+        frame = get_dataset_loader().apply_indicators(frame)
+    return frame
+
+
+class ReplayMarketFeed:
+    """
+    Stored candles and predictions served as of the simulation clock
+
+    A candle becomes visible once the clock reaches its close time (open time plus
+    one interval), like a live candle.
+    """
+
+    def __init__(self, candles: Dict[str, pd.DataFrame], interval: str = '5m',
+                 model_type: str = 'balanced', predictor=None):
+        """
+        Initialize the feed and score every candle.
+
+        Args:
+            candles: Candle frame per symbol (e.g. {'BTCUSDT': frame})
+            interval: Candle interval (e.g. '5m')
+            model_type: Model type to predict with ('standard' or 'balanced')
+            predictor: XGBoostPredictor to score with (default: a new one)
+        """
+        if predictor is None:
+            from predict_xgboost import XGBoostPredictor
+            predictor = XGBoostPredictor()
+
+        self.interval = interval
+        self.interval_seconds = interval_to_seconds(interval)
+        self.model_type = model_type
+        self.symbols: List[str] = []
+        self._close_times: Dict[str, np.ndarray] = {}
+        self._prices: Dict[str, np.ndarray] = {}
+        self._labels: Dict[str, np.ndarray] = {}
+        self._confidences: Dict[str, np.ndarray] = {}
+        self._clock = None
+
+        for symbol, frame in candles.items():
+            symbol = self._symbol_key(symbol)
+            frame = _prepare_candles(frame)
+            scored = predictor.predict_frame(frame, symbol, model_type)
+            if scored is None:
+                raise ValueError(f"Could not score the candles of {symbol} with the {model_type} model")
+
+            self.symbols.append(symbol)
+            close_times = frame.index + pd.Timedelta(seconds=self.interval_seconds)
+            self._close_times[symbol] = close_times.to_numpy(dtype='datetime64[ns]')
+            self._prices[symbol] = frame['close'].to_numpy(dtype=np.float64)
+            self._labels[symbol] = scored['predicted_label']
+            self._confidences[symbol] = scored['confidence'].astype(np.float64)
+            logger.info(f"Replay feed loaded {len(frame)} {interval} candles for {symbol}")
+
+        self.close_times = [pd.Timestamp(t).to_pydatetime() for t in
+                            np.unique(np.concatenate(list(self._close_times.values())))]
+
+    @classmethod
+    def from_csv(cls, paths: Dict[str, str], interval: str = '5m', model_type: str = 'balanced',
+                 predictor=None) -> 'ReplayMarketFeed':
+        """
+        Build a feed from candle CSV files.
+
+        Args:
+            paths: CSV path per symbol
+            interval: Candle interval
+            model_type: Model type to predict with
+            predictor: XGBoostPredictor to score with
+
+        Returns:
+            The ReplayMarketFeed
+        """
+        candles = {symbol: pd.read_csv(path) for symbol, path in paths.items()}
+        return cls(candles, interval, model_type, predictor)
+
+    def attach_clock(self, clock: Optional[SimulationClock]) -> None:
+        """
+        Read the time from a clock.
+
+        Args:
+            clock: Simulation clock of the replay (None detaches it)
+        """
+        self._clock = clock
+
+    @staticmethod
+    def _symbol_key(symbol: str) -> str:
+        """Normalize a symbol (e.g. 'btc-usdt' to 'BTCUSDT')"""
+        return symbol.upper().replace('-', '').replace('/', '')
+
+    def _index(self, symbol: str) -> int:
+        """Get the position of the last closed candle of a symbol (-1 if none)"""
+        close_times = self._close_times.get(symbol)
+        if close_times is None or self._clock is None:
+            return -1
+        now = np.datetime64(self._clock.now(), 'ns')
+        return int(np.searchsorted(close_times, now, side='right')) - 1
+
+    def get_latest_price(self, symbol: str) -> Optional[float]:
+        """
+        Get the close of the last closed candle (market service interface).
+
+        Args:
+            symbol: Trading pair symbol
+
+        Returns:
+            Price, or None before the first candle closes
+        """
+        symbol = self._symbol_key(symbol)
+        i = self._index(symbol)
+        return float(self._prices[symbol][i]) if i >= 0 else None
+
+    def get_symbol_price(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the price of a symbol in the market service response format.
+
+        Args:
+            symbol: Trading pair symbol
+
+        Returns:
+            Dictionary with 'symbol' and 'price', or None before the first candle closes
+        """
+        price = self.get_latest_price(symbol)
+        return {'symbol': symbol.upper(), 'price': str(price)} if price is not None else None
+
+    def get_prediction(self, symbol: str, interval: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the prediction of the last closed candle (ML bridge interface).
+
+        Args:
+            symbol: Trading pair symbol
+            interval: Ignored, the feed has a single interval
+
+        Returns:
+            Dictionary with 'prediction', 'confidence', 'current_price' and
+            'timestamp', or None before the first candle closes
+        """
+        symbol = self._symbol_key(symbol)
+        i = self._index(symbol)
+        if i < 0:
+            return None
+        return {
+            'symbol': symbol,
+            'prediction': self._labels[symbol][i],
+            'confidence': float(self._confidences[symbol][i]),
+            'current_price': float(self._prices[symbol][i]),
+            'timestamp': pd.Timestamp(self._close_times[symbol][i]).isoformat()
+        }
+
+    def batch(self) -> Dict[str, Any]:
+        """
+        Get the candle scheduler batch of the current candle close.
+
+        Returns:
+            Dictionary with the 'candle_close' time and the 'predictions' per symbol
+            and model type, as published by the candle-close scheduler
+        """
+        predictions = {}
+        for symbol in self.symbols:
+            prediction = self.get_prediction(symbol)
+            if prediction is None:
+                continue
+            predictions[symbol] = {self.model_type: {
+                'success': True,
+                'symbol': symbol,
+                'predicted_label': prediction['prediction'],
+                'confidence': prediction['confidence'],
+                'current_price': prediction['current_price'],
+                'timestamp': prediction['timestamp']
+            }}
+        return {
+            'candle_close': self._clock.now().isoformat() if self._clock else None,
+            'interval': self.interval,
+            'predictions': predictions
+        }
+
+
+class ReplayDriver:
+    """
+    Runs trading logic over a feed on a simulation clock
+    """
+
+    def __init__(self, feed: ReplayMarketFeed, quiet: bool = True, profile: bool = False):
+        """
+        Initialize the replay driver.
+
+        Args:
+            feed: Market feed to replay
+            quiet: Suppress INFO logging while replaying
+            profile: Run the replay under cProfile
+        """
+        self.feed = feed
+        self.quiet = quiet
+        self.profile = profile
+
+    def run(self, target: Callable[[SimulationClock], Any]) -> Dict[str, Any]:
+        """
+        Run a callable with a simulation clock starting at the first candle close.
+
+        Args:
+            target: Callable receiving the installed clock
+
+        Returns:
+            Dictionary with the target's 'result' and the replay 'stats'
+        """
+        if not self.feed.close_times:
+            raise ValueError("The replay feed has no candles")
+
+        clock = SimulationClock(self.feed.close_times[0])
+        profiler = cProfile.Profile() if self.profile else None
+        self.feed.attach_clock(clock)
+        if self.quiet:
+            logging.disable(logging.INFO)
+
+        start_time = time.time()
+        try:
+            with use_clock(clock):
+                if profiler:
+                    profiler.enable()
+                try:
+                    result = target(clock)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            if self.quiet:
+                logging.disable(logging.NOTSET)
+            self.feed.attach_clock(None)
+        wall_seconds = time.time() - start_time
+
+        simulated_seconds = (clock.now() - self.feed.close_times[0]).total_seconds()
+        stats = {
+            'candles': len(self.feed.close_times),
+            'start': self.feed.close_times[0].isoformat(),
+            'end': clock.now().isoformat(),
+            'simulated_seconds': simulated_seconds,
+            'wall_seconds': wall_seconds,
+            'speedup': simulated_seconds / wall_seconds if wall_seconds > 0 else None
+        }
+        if profiler:
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(25)
+            stats['profile'] = output.getvalue()
+
+        logger.info(f"Replayed {stats['candles']} candles ({simulated_seconds / 86400:.1f} days) "
+                    f"in {wall_seconds:.2f}s")
+        return {'result': result, 'stats': stats}
+
+    def run_candles(self, on_candle: Callable[[datetime], None],
+                    on_finish: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+        """
+        Move the clock to every candle close in turn and call on_candle.
+
+        Args:
+            on_candle: Callable receiving the candle close time
+            on_finish: Optional callable run at the last candle close, whose return
+                value becomes the 'result'
+
+        Returns:
+            Dictionary with the 'result' and the replay 'stats'
+        """
+        def step_candles(clock: SimulationClock) -> Any:
+            for close_time in self.feed.close_times:
+                clock.set(close_time)
+                on_candle(close_time)
+            return on_finish() if on_finish else None
+
+        return self.run(step_candles)
+
+
+def replay_demo_bot(feed: ReplayMarketFeed, symbol: Optional[str] = None,
+                    confidence_threshold: float = 0.75, initial_balance: float = 10000.0,
+                    quiet: bool = True, profile: bool = False) -> Dict[str, Any]:
+    """
+    Replay DemoTradingBot over the feed.
+
+    Args:
+        feed: Market feed to replay
+        symbol: Symbol to trade (default: the first symbol of the feed)
+        confidence_threshold: Minimum confidence level for trades
+        initial_balance: Initial USDT balance
+        quiet: Suppress INFO logging while replaying
+        profile: Run the replay under cProfile
+
+    Returns:
+        Dictionary with the final portfolio value, trades and replay stats
+    """
+    from demo_trading_bot import DemoTradingBot
+
+    symbol = symbol or feed.symbols[0]
+    bot = DemoTradingBot(symbol=symbol, interval=feed.interval, model_type=feed.model_type,
+                         confidence_threshold=confidence_threshold, initial_balance=initial_balance,
+                         ml_bridge=feed)
+
+    replay = ReplayDriver(feed, quiet, profile).run(
+        lambda clock: bot.run_simulation(periods=len(feed.close_times),
+                                         period_seconds=feed.interval_seconds,
+                                         save_report=False))
+    return {
+        'success': True,
+        'mode': 'demo',
+        'symbol': symbol,
+        'final_value': replay['result'],
+        'total_trades': bot.total_trades,
+        'trades': bot.trades,
+        'stats': replay['stats']
+    }
+
+
+def replay_paper_trading(feed: ReplayMarketFeed, initial_balance: float = 10000.0,
+                         min_confidence: Optional[float] = None,
+                         quiet: bool = True, profile: bool = False) -> Dict[str, Any]:
+    """
+    Replay MLPaperTradingIntegration over the feed, trading through the trade
+    execution queue and a paper mode BinanceTradingService.
+
+    Args:
+        feed: Market feed to replay
+        initial_balance: Starting balance of the paper account
+        min_confidence: Minimum confidence to trade (default: the integration's)
+        quiet: Suppress INFO logging while replaying
+        profile: Run the replay under cProfile
+
+    Returns:
+        Dictionary with the performance report, positions and replay stats
+    """
+    from python_app.services.queue.trade_execution_queue import get_trade_execution_queue
+    from python_app.services.binance.trading_service import BinanceTradingService
+    from python_app.services.binance.trade_queue_service import BinanceTradeQueueService
+    from ml_paper_trading_integration import MLPaperTradingIntegration
+
+    # Take over the shared queue for the replay and hand it back afterwards
+    trade_queue = get_trade_execution_queue()
+    previous_callbacks = (trade_queue.trading_service_callback, trade_queue.risk_check_callback)
+    previous_manual = trade_queue.manual_processing
+    trade_queue.set_manual_processing(True)
+
+    try:
+        trading_service = BinanceTradingService(paper_mode=True, price_source=feed.get_latest_price)
+        integration = MLPaperTradingIntegration(trade_queue_service=BinanceTradeQueueService(trading_service),
+                                                initial_balance=initial_balance)
+        integration.market_service = feed
+        integration.symbols_to_monitor = list(feed.symbols)
+        integration.model_type = feed.model_type
+        integration.monitoring_interval = feed.interval_seconds
+        if min_confidence is not None:
+            integration.min_confidence_threshold = min_confidence
+
+        def on_candle(close_time: datetime) -> None:
+            integration.process_batch(feed.batch())
+            trade_queue.process_pending()
+
+        replay = ReplayDriver(feed, quiet, profile).run_candles(on_candle, integration.generate_performance_report)
+    finally:
+        trade_queue.set_callbacks(*previous_callbacks)
+        trade_queue.set_manual_processing(previous_manual)
+
+    return {
+        'success': True,
+        'mode': 'paper',
+        'symbols': feed.symbols,
+        'report': replay['result'].get('report'),
+        'positions': trading_service.positions,
+        'stats': replay['stats']
+    }
+
+
+def main():
+    """Replay stored candles from the command line"""
+    parser = argparse.ArgumentParser(description='Replay stored candles through the trading components')
+    parser.add_argument('--csv', nargs='+', required=True, help='Candle files as SYMBOL=path')
+    parser.add_argument('--interval', type=str, default='5m', help='Candle interval (e.g., 5m, 1h)')
+    parser.add_argument('--model', type=str, default='balanced', help='Model type (standard or balanced)')
+    parser.add_argument('--mode', choices=['demo', 'paper'], default='paper', help='Components to replay')
+    parser.add_argument('--confidence', type=float, default=None, help='Minimum confidence to trade')
+    parser.add_argument('--balance', type=float, default=10000.0, help='Initial balance')
+    parser.add_argument('--profile', action='store_true', help='Profile the replay with cProfile')
+    args = parser.parse_args()
+
+    paths = dict(item.split('=', 1) for item in args.csv)
+    feed = ReplayMarketFeed.from_csv(paths, args.interval, args.model)
+
+    if args.mode == 'demo':
+        result = replay_demo_bot(feed, confidence_threshold=args.confidence or 0.75,
+                                 initial_balance=args.balance, profile=args.profile)
+    else:
+        result = replay_paper_trading(feed, initial_balance=args.balance, min_confidence=args.confidence,
+                                      profile=args.profile)
+
+    stats = result['stats']
+    print(stats.pop('profile', ''))
+    print(json.dumps(stats, indent=2))
+    if result.get('report'):
+        print(json.dumps(result['report'], indent=2, default=str))
+    elif 'final_value' in result:
+        print(f"Final value: {result['final_value']:.2f} after {result['total_trades']} trades")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -17,7 +17,6 @@ Parameters:
 import os
 import sys
 import logging
-import pickle
 import argparse
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Union, Any
@@ -26,7 +25,7 @@ import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, f1_score
 import xgboost as xgb
 
 # Setup logging
@@ -45,6 +44,7 @@ try:
     from binance.spot import Spot
     from binance.error import ClientError, ServerError
     from config import active_config
+    from model_artifacts import save_artifact, LEGACY_CLASS_MAPPING
     import requests
 except ImportError:
     logging.error("Binance connector SDK not found. Please install it using 'pip install binance-connector'")
@@ -250,6 +250,20 @@ def train_model(df: pd.DataFrame, symbol: str) -> Tuple[xgb.XGBClassifier, Stand
     Returns:
         Tuple of (trained model, feature scaler, feature names)
     """
+    model, scaler, features, _ = train_model_with_metrics(df, symbol)
+    return model, scaler, features
+
+def train_model_with_metrics(df: pd.DataFrame, symbol: str) -> Tuple[xgb.XGBClassifier, StandardScaler, List[str], Dict[str, Any]]:
+    """
+    Train an XGBoost classifier on the prepared data and report its test metrics.
+    
+    Args:
+        df: DataFrame with features and target labels
+        symbol: Symbol name for logging purposes
+        
+    Returns:
+        Tuple of (trained model, feature scaler, feature names, metrics dictionary)
+    """
     # Separate features and target
     features = [
         'open', 'high', 'low', 'close', 'volume',
@@ -283,7 +297,9 @@ def train_model(df: pd.DataFrame, symbol: str) -> Tuple[xgb.XGBClassifier, Stand
         colsample_bytree=0.8,
         random_state=42,
         n_jobs=-1,
-        tree_method='hist'  # Faster training method
+        tree_method='hist',  # Faster training method
+        eval_metric='mlogloss',
+        early_stopping_rounds=10
     )
     
     # Map target values (-1, 0, 1) to (0, 1, 2) for multi-class classification
@@ -294,8 +310,6 @@ def train_model(df: pd.DataFrame, symbol: str) -> Tuple[xgb.XGBClassifier, Stand
         X_train_scaled,
         y_train_mapped,
         eval_set=[(X_test_scaled, y_test_mapped)],
-        eval_metric='mlogloss',
-        early_stopping_rounds=10,
         verbose=True
     )
     
@@ -323,10 +337,18 @@ def train_model(df: pd.DataFrame, symbol: str) -> Tuple[xgb.XGBClassifier, Stand
     for i, feature in enumerate(features):
         logging.info(f"  {feature}: {importance[i]:.4f}")
     
-    return model, scaler, features
+    metrics = {
+        'accuracy': float(accuracy_score(y_test_original, y_pred_original)),
+        'f1_score': float(f1_score(y_test_original, y_pred_original, average='weighted')),
+        'training_samples': len(X_train),
+        'test_samples': len(X_test)
+    }
+    
+    return model, scaler, features, metrics
 
 # Save the trained model, scaler, and features
-def save_model(model: xgb.XGBClassifier, scaler: StandardScaler, features: List[str], symbol: str):
+def save_model(model: xgb.XGBClassifier, scaler: StandardScaler, features: List[str], symbol: str,
+               model_dir: Optional[str] = None, extra_metadata: Optional[Dict[str, Any]] = None) -> str:
     """
     Save the trained model and associated metadata to disk.
     
@@ -335,26 +357,60 @@ def save_model(model: xgb.XGBClassifier, scaler: StandardScaler, features: List[
         scaler: Feature scaler used during training
         features: List of feature names
         symbol: Symbol name for file naming
+        model_dir: Directory to save the model in (default: the models directory)
+        extra_metadata: Additional metadata (e.g. interval and test metrics)
+        
+    Returns:
+        Path of the saved model
     """
     # Create directory if it doesn't exist
-    model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+    model_dir = model_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
     os.makedirs(model_dir, exist_ok=True)
     
-    # Determine file path
+    # Save model (native booster), scaler arrays and feature list as one artifact
     symbol_lower = symbol.lower()
-    model_path = os.path.join(model_dir, f'model_{symbol_lower}.pkl')
-    
-    # Save model, scaler, and feature list
-    with open(model_path, 'wb') as f:
-        pickle.dump({
-            'model': model,
-            'scaler': scaler,
-            'features': features,
-            'trained_at': datetime.now().isoformat(),
-            'symbol': symbol
-        }, f)
-    
-    logging.info(f"Model saved to {model_path}")
+    artifact = save_artifact(model, f'model_{symbol_lower}', {
+        'symbol': symbol,
+        'features': features,
+        'trained_at': datetime.now().isoformat(),
+        'class_mapping': {str(k): v for k, v in LEGACY_CLASS_MAPPING.items()},
+        **(extra_metadata or {})
+    }, scaler, model_dir)
+    
+    logging.info(f"Model saved to {artifact.model_path}")
+    return artifact.model_path
+
+def train_and_save(symbol: str, interval: str = '4h', threshold: float = 2.0, window: int = 5,
+                   dummy: bool = False, model_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the full pipeline for one symbol and interval: fetch, label, train and save.
+    
+    Unlike main(), a failed training run is reported as an error instead of being
+    replaced by a dummy model.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., BTCUSDT)
+        interval: Timeframe for historical data
+        threshold: Price movement threshold percentage
+        window: Number of future candles to look ahead
+        dummy: Create a dummy model instead of training a real one
+        model_dir: Directory to save the model in (default: the models directory)
+        
+    Returns:
+        Dictionary with the model path and the test metrics (empty for dummy models)
+    """
+    if dummy:
+        model, scaler, features = create_dummy_model(symbol)
+        metrics = {}
+    else:
+        df = fetch_historical_data(symbol, interval)
+        df = add_technical_indicators(df)
+        df = add_target_labels(df, window, threshold)
+        model, scaler, features, metrics = train_model_with_metrics(df, symbol)
+    
+    model_path = save_model(model, scaler, features, symbol, model_dir,
+                            {'interval': interval, 'dummy': dummy, 'performance': metrics})
+    return {'model_path': model_path, **metrics}
 
 # Main function
 def create_dummy_model(symbol: str) -> Tuple[xgb.XGBClassifier, StandardScaler, List[str]]:
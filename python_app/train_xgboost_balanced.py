@@ -8,6 +8,11 @@ by using two complementary techniques:
 
 The combination of these techniques should improve prediction for BUY and SELL signals
 while maintaining good performance on the HOLD class.
+
+When the data would not fit in memory (SMOTE copies the training set several times),
+the model is trained out of core instead: the CSVs are streamed in chunks through an
+external-memory matrix and the classes are balanced with weights alone
+(see out_of_core_training.py).
 """
 
 import os
@@ -20,11 +25,16 @@ import matplotlib.pyplot as plt
 import xgboost as xgb
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, precision_recall_fscore_support
 from sklearn.preprocessing import LabelEncoder
-from typing import Dict, List, Tuple, Any
+from sklearn.model_selection import train_test_split
+from typing import Dict, List, Tuple, Any, Optional
 
 # Import imblearn for oversampling techniques
 from imblearn.over_sampling import SMOTE, RandomOverSampler
 
+from model_utils import save_compact_variants
+from model_artifacts import write_importance_table
+from out_of_core_training import train_out_of_core, memory_is_tight, get_peak_rss_mb
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -363,10 +373,77 @@ def save_model(model: xgb.XGBClassifier, model_path: str, metadata: Dict[str, An
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         logger.info(f"Metadata saved to {metadata_path}")
+    
+    # Precompute feature importance so dashboards never recompute it
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    write_importance_table(model, stem, (metadata or {}).get('features', []), os.path.dirname(model_path))
+
+def train_balanced_out_of_core(data_dir: str, model_dir: str, symbol: str, chunk_rows: int = 100000):
+    """
+    Train the balanced model without loading the data into memory.
+    
+    The training CSVs are streamed in chunks and the classes are balanced with
+    sample weights only, since oversampling would materialize the data.
+    
+    Args:
+        data_dir: Directory containing the training and test data files
+        model_dir: Directory to save the model
+        symbol: Symbol name used in file names
+        chunk_rows: Rows per streamed chunk
+    """
+    train_partitions = [(os.path.join(data_dir, f'X_train_{symbol}.csv'), os.path.join(data_dir, f'y_train_{symbol}.csv'))]
+    test_partitions = [(os.path.join(data_dir, f'X_test_{symbol}.csv'), os.path.join(data_dir, f'y_test_{symbol}.csv'))]
+    
+    model, report = train_out_of_core(train_partitions, test_partitions, chunk_rows=chunk_rows)
+    evaluation = report['evaluation']
+    
+    # Define class mapping
+    class_mapping = {0: 'BUY', 1: 'HOLD', 2: 'SELL'}
+    
+    # Create confusion matrix plot
+    cm_file = os.path.join(model_dir, f'confusion_matrix_{symbol}_balanced.png')
+    plot_confusion_matrix(np.array(evaluation['confusion_matrix']), 
+                         [class_mapping[i] for i in range(len(class_mapping))],
+                         cm_file)
+    
+    # Create feature importance plot
+    fi_file = os.path.join(model_dir, f'feature_importance_{symbol}_balanced.png')
+    plot_feature_importance(model, report['feature_names'], fi_file)
+    
+    # Prepare metadata
+    metadata = {
+        'symbol': symbol,
+        'feature_count': len(report['feature_names']),
+        'training_samples': {
+            'original': report['rows'],
+            'oversampled': report['rows']
+        },
+        'test_samples': evaluation['test_samples'],
+        'class_mapping': class_mapping,
+        'class_weights': report['class_weights'],
+        'params': report['params'],
+        'evaluation': evaluation,
+        'features': report['feature_names'],
+        'resampling': 'class_weights',
+        'training_mode': 'out_of_core',
+        'peak_rss_mb': report['peak_rss_mb']
+    }
+    
+    # Save the model (compact variants need the data in memory and are skipped)
+    model_path = os.path.join(model_dir, f'xgboost_{symbol}_balanced.model')
+    save_model(model, model_path, metadata)
+    
+    logger.info(f"Out-of-core training completed with peak RSS {report['peak_rss_mb']:.0f} MB.")
 
-def main():
+def main(out_of_core: Optional[bool] = None, compact_variants: bool = False):
     """
     Main function to train and evaluate the XGBoost model.
+    
+    Args:
+        out_of_core: Stream the data instead of loading it (default: only when
+            SMOTE on the loaded data would not fit in memory)
+        compact_variants: Also build compact variants of the in-memory model and
+            their latency/accuracy table
     """
     # Define paths (use the same paths as in the original training script)
     data_dir = 'data/training'
@@ -378,6 +455,18 @@ def main():
     # Symbol to train model for
     symbol = 'btcusdt'
     
+    if out_of_core is None:
+        files = [os.path.join(data_dir, f'{name}_{symbol}.csv') for name in ('X_train', 'y_train', 'X_test', 'y_test')]
+        # SMOTE brings every class up to the majority count, which for three classes
+        # can triple the training set on top of the loaded copy
+        out_of_core = (all(os.path.exists(path) for path in files)
+                       and memory_is_tight([(files[0], files[1]), (files[2], files[3])], copies=4))
+    
+    if out_of_core:
+        logger.info("Training out of core with class weights instead of SMOTE")
+        train_balanced_out_of_core(data_dir, model_dir, symbol)
+        return
+    
     # Load data
     X_train, X_test, y_train, y_test = load_train_test_data(data_dir, symbol)
     if X_train is None:
@@ -429,14 +518,40 @@ def main():
         'params': model.get_params(),
         'evaluation': evaluation,
         'features': X_train.columns.tolist(),
-        'resampling': 'SMOTE'
+        'resampling': 'SMOTE',
+        'training_mode': 'in_memory',
+        'peak_rss_mb': get_peak_rss_mb()
     }
     
     # Save the model
     model_path = os.path.join(model_dir, f'xgboost_{symbol}_balanced.model')
     save_model(model, model_path, metadata)
     
-    logger.info("Model training and evaluation completed successfully.")
+    # Build compact variants and their latency/accuracy table, so the predictor can
+    # serve a faster model when the accuracy cost is acceptable. The validation rows
+    # are split off before SMOTE, so no synthetic neighbour of them is trained on
+    if compact_variants:
+        X_fit, X_val, y_fit, y_val = train_test_split(X_train, original_y_train, test_size=0.2,
+                                                      random_state=42, stratify=original_y_train)
+        X_fit, y_fit = apply_smote_oversampling(X_fit, y_fit)
+        save_compact_variants(model, f'xgboost_{symbol}_balanced', metadata,
+                              X_fit, y_fit, create_sample_weights(y_fit, class_weights),
+                              X_val=X_val, y_val=y_val, X_test=X_test, y_test=y_test,
+                              model_dir=model_dir)
+    
+    logger.info(f"Model training and evaluation completed successfully (peak RSS {get_peak_rss_mb():.0f} MB).")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the balanced XGBoost model")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--out-of-core', dest='out_of_core', action='store_true', default=None,
+                      help="Stream the data and balance with class weights only")
+    mode.add_argument('--in-memory', dest='out_of_core', action='store_false',
+                      help="Load the data and apply SMOTE")
+    parser.add_argument('--compact-variants', action='store_true',
+                        help="Also build compact variants of the in-memory model")
+    
+    args = parser.parse_args()
+    main(out_of_core=args.out_of_core, compact_variants=args.compact_variants)
\ No newline at end of file
@@ -24,6 +24,9 @@ from sklearn.metrics import accuracy_score, precision_recall_fscore_support, cla
 from sklearn.preprocessing import LabelEncoder
 from typing import Dict, Tuple, List, Any
 
+from model_utils import save_compact_variants
+from model_artifacts import write_importance_table
+
 # Configure logging
 log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
 os.makedirs(log_dir, exist_ok=True)
@@ -325,10 +328,18 @@ def save_model(model: xgb.XGBClassifier, model_path: str, metadata: Dict[str, An
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         logging.info(f"Saved model metadata to {metadata_path}")
+    
+    # Precompute feature importance so dashboards never recompute it
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    write_importance_table(model, stem, (metadata or {}).get('features', []), os.path.dirname(model_path))
 
-def main():
+def main(compact_variants: bool = False):
     """
     Main function to train and evaluate the XGBoost model.
+    
+    Args:
+        compact_variants: Also build compact variants of the model and their
+            latency/accuracy table
     """
     # Paths
     data_dir = 'data/training'
@@ -399,6 +410,13 @@ def main():
     model_path = f'{model_dir}/xgboost_{symbol}.model'
     save_model(model, model_path, metadata)
     
+    # Build compact variants and their latency/accuracy table
+    variant_table = None
+    if compact_variants:
+        variant_table = save_compact_variants(model, f'xgboost_{symbol}', metadata,
+                                              X_train, y_train, sample_weights,
+                                              X_test=X_test, y_test=y_test, model_dir=model_dir)
+    
     # Print summary
     print("\n=== XGBoost MODEL TRAINING SUMMARY ===")
     print(f"Symbol: {symbol.upper()}")
@@ -428,9 +446,23 @@ def main():
         
         print(f"  {cls_name} - Precision: {precision:.4f}, Recall: {recall:.4f}, F1: {f1:.4f}")
     
+    if variant_table:
+        print("\nCompact variants:")
+        for name, entry in variant_table['variants'].items():
+            print(f"  {name}: validation accuracy {entry['accuracy']:.4f}, "
+                  f"test accuracy {entry['test_accuracy']:.4f}, "
+                  f"{entry['single_row_ms']:.3f} ms/row single, {entry['batch_row_us']:.2f} us/row batch")
+    
     print(f"\nModel saved to: {model_path}")
     print(f"Confusion matrix saved to: {model_dir}/confusion_matrix_{symbol}.png")
     print(f"Feature importance saved to: {model_dir}/feature_importance_{symbol}.png")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the XGBoost model")
+    parser.add_argument('--compact-variants', action='store_true',
+                        help="Also build compact variants of the model")
+    
+    args = parser.parse_args()
+    main(compact_variants=args.compact_variants)
\ No newline at end of file
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Training Farm
+
+This module trains a whole universe of models in one command: every combination of
+symbols x intervals x model types. It handles:
+
+1. Building the job matrix and ordering it longest-first, so the slow searches do
+   not end up running alone at the end
+2. Running the jobs across worker processes, with the CPU cores split between the
+   workers (each fit is limited to its share of threads)
+3. Writing every model and its metadata atomically (temporary file + rename)
+4. Collecting per-job durations and metrics into a summary table, saved next to
+   the models
+
+Model types:
+- standard: the train_model.py pipeline (Binance candles, indicators, labels), saved
+  as the served model_<symbol> artifact
+- baseline: the optimizer's baseline model on the stored training data
+- grid_search, random_search, bayesian, hyperband: one optimization method on the
+  stored training data (run_xgboost_optimization)
+
+Usage:
+    python training_farm.py --symbols BTCUSDT ETHUSDT --intervals 1h 4h --model-types standard baseline
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+logger = logging.getLogger('training_farm')
+
+OPTIMIZATION_TYPES = ['grid_search', 'random_search', 'bayesian', 'hyperband']
+MODEL_TYPES = ['standard', 'baseline'] + OPTIMIZATION_TYPES
+
+# Relative cost of each model type, used to start the longest jobs first
+MODEL_TYPE_COST = {
+    'standard': 1,
+    'baseline': 1,
+    'hyperband': 20,
+    'random_search': 30,
+    'bayesian': 30,
+    'grid_search': 100
+}
+
+# Interval whose standard models are written to the served model_<symbol> artifacts;
+# standard models of other intervals go to <model_dir>/intervals/<interval>/
+DEFAULT_SERVING_INTERVAL = '4h'
+
+
+def build_job_matrix(symbols: List[str], intervals: List[str], model_types: List[str]) -> List[Dict[str, Any]]:
+    """
+    Build the jobs of a symbol x interval x model type matrix, longest first
+
+    Args:
+        symbols: Trading pair symbols (e.g., BTCUSDT)
+        intervals: Timeframes (e.g., 1h, 4h)
+        model_types: Model types (see MODEL_TYPES)
+
+    Returns:
+        List of job dictionaries with 'symbol', 'interval' and 'model_type'
+    """
+    unknown = [model_type for model_type in model_types if model_type not in MODEL_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown model types {unknown}. Must be in: {', '.join(MODEL_TYPES)}")
+
+    jobs = [{'symbol': symbol, 'interval': interval, 'model_type': model_type}
+            for symbol in symbols for interval in intervals for model_type in model_types]
+    jobs.sort(key=lambda job: MODEL_TYPE_COST[job['model_type']], reverse=True)
+    return jobs
+
+
+def _init_farm_worker(threads_per_job: int) -> None:
+    """Limit a worker's fits to its share of the cores (before xgboost is imported)"""
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_job)
+    os.environ['JOB_CPU_SLOTS'] = str(threads_per_job)
+
+
+def _read_performance(metadata_path: str) -> Dict[str, Any]:
+    """Read the performance section of a saved model's metadata"""
+    with open(metadata_path, 'r') as f:
+        return json.load(f).get('performance', {})
+
+
+def run_farm_job(job: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Train and save the model of one job (runs in a worker process)
+
+    Args:
+        job: Job from build_job_matrix
+        options: Farm options ('data_dir', 'model_dir', 'threshold', 'window', 'dummy',
+            'serving_interval')
+
+    Returns:
+        The job with 'status', 'duration_seconds', metrics, 'model_path' and 'error'
+    """
+    symbol, interval, model_type = job['symbol'], job['interval'], job['model_type']
+    model_dir = options['model_dir']
+    result = {**job, 'status': 'failed', 'error': None, 'model_path': None,
+              'accuracy': None, 'f1_score': None, 'pid': os.getpid()}
+    start_time = time.time()
+
+    try:
+        if model_type == 'standard':
+            from train_model import train_and_save
+
+            if interval != options['serving_interval']:
+                model_dir = os.path.join(model_dir, 'intervals', interval)
+            outcome = train_and_save(symbol, interval, options['threshold'], options['window'],
+                                     dummy=options['dummy'], model_dir=model_dir)
+            result.update({'model_path': outcome['model_path'],
+                           'accuracy': outcome.get('accuracy'),
+                           'f1_score': outcome.get('f1_score')})
+
+        elif model_type == 'baseline':
+            from xgboost_optimization import XGBoostOptimizer
+
+            optimizer = XGBoostOptimizer(symbol.lower(), interval, options['data_dir'], model_dir, n_workers=1)
+            optimizer.load_data()
+            baseline = optimizer.train_baseline_model()
+            result.update({'model_path': optimizer.save_baseline_model(),
+                           'accuracy': float(baseline['accuracy']),
+                           'f1_score': float(baseline['f1_score'])})
+
+        else:
+            from xgboost_optimization import run_xgboost_optimization
+
+            # The job's threads go to a single in-process CV executor
+            run_xgboost_optimization(symbol.lower(), interval, model_type,
+                                     data_dir=options['data_dir'], model_dir=model_dir, n_workers=1)
+            stem = f'xgboost_{symbol.lower()}_{interval}_{model_type}'
+            performance = _read_performance(os.path.join(model_dir, f'{stem}_metadata.json'))
+            result.update({'model_path': os.path.join(model_dir, f'{stem}.model'),
+                           'accuracy': performance.get('accuracy'),
+                           'f1_score': performance.get('f1_score')})
+
+        result['status'] = 'completed'
+
+    except Exception as e:
+        logging.getLogger('training_farm').error(f"Training {model_type} for {symbol} {interval} failed: {e}")
+        result['error'] = str(e)
+
+    result['duration_seconds'] = time.time() - start_time
+    return result
+
+
+def run_training_farm(symbols: List[str],
+                      intervals: List[str],
+                      model_types: List[str],
+                      n_workers: Optional[int] = None,
+                      threads_per_job: Optional[int] = None,
+                      data_dir: str = 'data/training',
+                      model_dir: str = 'models',
+                      threshold: float = 2.0,
+                      window: int = 5,
+                      dummy: bool = False,
+                      serving_interval: str = DEFAULT_SERVING_INTERVAL) -> Dict[str, Any]:
+    """
+    Train every symbol x interval x model type combination across worker processes
+
+    Args:
+        symbols: Trading pair symbols
+        intervals: Timeframes
+        model_types: Model types (see MODEL_TYPES)
+        n_workers: Number of worker processes (default: one per CPU core, at most one per job)
+        threads_per_job: Threads per job (default: the cores divided between the workers)
+        data_dir: Directory containing the stored training data
+        model_dir: Directory to save the models in
+        threshold: Price movement threshold percentage (standard models)
+        window: Number of future candles to look ahead (standard models)
+        dummy: Create dummy standard models instead of fetching data
+        serving_interval: Interval whose standard models replace the served artifacts
+
+    Returns:
+        Summary with the per-job results, counts and total wall-clock time
+    """
+    jobs = build_job_matrix(symbols, intervals, model_types)
+    cpu_count = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or cpu_count, len(jobs)))
+    threads_per_job = max(1, threads_per_job or cpu_count // n_workers)
+    options = {
+        'data_dir': data_dir,
+        'model_dir': model_dir,
+        'threshold': threshold,
+        'window': window,
+        'dummy': dummy,
+        'serving_interval': serving_interval
+    }
+
+    logger.info(f"Training {len(jobs)} models with {n_workers} workers and {threads_per_job} threads per job")
+    start_time = time.time()
+    results = []
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                             initializer=_init_farm_worker, initargs=(threads_per_job,)) as executor:
+        futures = {executor.submit(run_farm_job, job, options): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                result = {**job, 'status': 'failed', 'error': f"Worker failed: {e}", 'model_path': None,
+                          'accuracy': None, 'f1_score': None, 'duration_seconds': None}
+            results.append(result)
+            logger.info(f"[{len(results)}/{len(jobs)}] {result['symbol']} {result['interval']} "
+                        f"{result['model_type']}: {result['status']}")
+
+    results.sort(key=lambda result: (result['symbol'], result['interval'], result['model_type']))
+
+    summary = {
+        'symbols': symbols,
+        'intervals': intervals,
+        'model_types': model_types,
+        'workers': n_workers,
+        'threads_per_job': threads_per_job,
+        'jobs': results,
+        'completed': sum(1 for result in results if result['status'] == 'completed'),
+        'failed': sum(1 for result in results if result['status'] != 'completed'),
+        'job_seconds': sum(result['duration_seconds'] or 0.0 for result in results),
+        'wall_clock_seconds': time.time() - start_time,
+        'timestamp': datetime.now().isoformat()
+    }
+    summary['summary_path'] = save_summary(summary, model_dir)
+    return summary
+
+
+def format_summary_table(summary: Dict[str, Any]) -> str:
+    """
+    Format the results of a farm run as a text table
+
+    Args:
+        summary: Summary from run_training_farm
+
+    Returns:
+        Table with one row per job and a totals line
+    """
+    def fmt(value: Optional[float], spec: str) -> str:
+        return format(value, spec) if value is not None else '-'
+
+    lines = [f"{'Symbol':<10} {'Interval':<8} {'Model type':<14} {'Status':<10} {'Seconds':>8} "
+             f"{'Accuracy':>9} {'F1':>7}  Error"]
+    for result in summary['jobs']:
+        lines.append(f"{result['symbol']:<10} {result['interval']:<8} {result['model_type']:<14} "
+                     f"{result['status']:<10} {fmt(result['duration_seconds'], '8.1f'):>8} "
+                     f"{fmt(result['accuracy'], '9.4f'):>9} {fmt(result['f1_score'], '7.4f'):>7}  "
+                     f"{(result['error'] or '')[:60]}")
+    lines.append(f"{summary['completed']} completed, {summary['failed']} failed; "
+                 f"{summary['job_seconds']:.1f}s of training in {summary['wall_clock_seconds']:.1f}s wall clock "
+                 f"({summary['workers']} workers x {summary['threads_per_job']} threads)")
+    return '\n'.join(lines)
+
+
+def save_summary(summary: Dict[str, Any], model_dir: str) -> str:
+    """
+    Save a farm summary atomically
+
+    Args:
+        summary: Summary from run_training_farm
+        model_dir: Directory of the models
+
+    Returns:
+        Path of the summary file
+    """
+    summary_dir = os.path.join(model_dir, 'training_farm')
+    os.makedirs(summary_dir, exist_ok=True)
+    path = os.path.join(summary_dir, f"summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+    logger.info(f"Training farm summary saved to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Train a symbol x interval x model type matrix in parallel')
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'], help='Trading pair symbols')
+    parser.add_argument('--intervals', nargs='+', default=[DEFAULT_SERVING_INTERVAL], help='Timeframes')
+    parser.add_argument('--model-types', nargs='+', default=['standard'], choices=MODEL_TYPES,
+                        help='Model types to train')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: one per CPU core)')
+    parser.add_argument('--threads-per-job', type=int, default=None,
+                        help='Threads per job (default: the cores divided between the workers)')
+    parser.add_argument('--data-dir', type=str, default='data/training', help='Directory of the stored training data')
+    parser.add_argument('--model-dir', type=str, default='models', help='Directory to save the models in')
+    parser.add_argument('--threshold', type=float, default=2.0, help='Price movement threshold percentage')
+    parser.add_argument('--window', type=int, default=5, help='Number of future candles to look ahead')
+    parser.add_argument('--serving-interval', type=str, default=DEFAULT_SERVING_INTERVAL,
+                        help='Interval whose standard models replace the served model_<symbol> artifacts')
+    parser.add_argument('--dummy', action='store_true', help='Create dummy standard models instead of fetching data')
+
+    args = parser.parse_args()
+
+    summary = run_training_farm(
+        symbols=args.symbols,
+        intervals=args.intervals,
+        model_types=args.model_types,
+        n_workers=args.workers,
+        threads_per_job=args.threads_per_job,
+        data_dir=args.data_dir,
+        model_dir=args.model_dir,
+        threshold=args.threshold,
+        window=args.window,
+        dummy=args.dummy,
+        serving_interval=args.serving_interval
+    )
+
+    print(format_summary_table(summary))
+    print(f"Summary: {summary['summary_path']}")
+    sys.exit(1 if summary['failed'] else 0)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Clock
+
+The trading components read the time and wait through the clock returned by
+get_clock() instead of calling time.time(), time.sleep() or datetime.now()
+directly. By default that is the system clock. A replay installs a
+SimulationClock, whose sleep() moves virtual time forward instead of waiting,
+so stored candles can be fed through the live trading logic at full speed.
+
+Usage:
+    from python_app.utils.clock import SimulationClock, use_clock
+
+    with use_clock(SimulationClock(start=datetime(2024, 1, 1))) as clock:
+        bot.run_simulation(periods=8640, period_seconds=300)
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Union
+
+
+class Clock:
+    """
+    Wall clock (the default clock)
+    """
+
+    def now(self) -> datetime:
+        """Get the current local time"""
+        return datetime.now()
+
+    def time(self) -> float:
+        """Get the current time in seconds since the epoch"""
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Wait for a number of seconds.
+
+        Args:
+            seconds: Seconds to wait
+        """
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class SimulationClock(Clock):
+    """
+    Virtual clock that only moves when it is told to
+
+    sleep() advances the clock instead of waiting, so code that paces itself
+    with the clock runs as fast as it can compute.
+    """
+
+    def __init__(self, start: Optional[Union[datetime, float]] = None):
+        """
+        Initialize the simulation clock.
+
+        Args:
+            start: Initial time as a naive local datetime or an epoch timestamp
+                (default: the current time)
+        """
+        self._lock = threading.Lock()
+        self._now = self._to_datetime(start) if start is not None else datetime.now()
+        self.slept_seconds = 0.0
+
+    @staticmethod
+    def _to_datetime(when: Union[datetime, float]) -> datetime:
+        """Convert an epoch timestamp or aware datetime to a naive local datetime"""
+        if isinstance(when, datetime):
+            return when if when.tzinfo is None else datetime.fromtimestamp(when.timestamp())
+        return datetime.fromtimestamp(float(when))
+
+    def now(self) -> datetime:
+        """Get the virtual time"""
+        with self._lock:
+            return self._now
+
+    def time(self) -> float:
+        """Get the virtual time in seconds since the epoch"""
+        return self.now().timestamp()
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Advance the clock instead of waiting.
+
+        Args:
+            seconds: Seconds to advance
+        """
+        if seconds > 0:
+            self.advance(seconds)
+            with self._lock:
+                self.slept_seconds += seconds
+
+    def advance(self, seconds: float) -> datetime:
+        """
+        Move the clock forward.
+
+        Args:
+            seconds: Seconds to advance
+
+        Returns:
+            The new virtual time
+        """
+        with self._lock:
+            self._now += timedelta(seconds=max(0.0, seconds))
+            return self._now
+
+    def set(self, when: Union[datetime, float]) -> datetime:
+        """
+        Move the clock to a point in time. The clock never goes backwards.
+
+        Args:
+            when: Target time as a naive local datetime or an epoch timestamp
+
+        Returns:
+            The new virtual time
+        """
+        target = self._to_datetime(when)
+        with self._lock:
+            if target > self._now:
+                self._now = target
+            return self._now
+
+
+# Clock used by the trading components
+_clock: Clock = Clock()
+_clock_lock = threading.Lock()
+
+
+def get_clock() -> Clock:
+    """
+    Get the active clock
+
+    Returns:
+        The installed clock, or the system clock
+    """
+    return _clock
+
+
+def set_clock(clock: Optional[Clock]) -> Clock:
+    """
+    Install a clock for every component.
+
+    Args:
+        clock: Clock to install, or None to restore the system clock
+
+    Returns:
+        The previously installed clock
+    """
+    global _clock
+
+    with _clock_lock:
+        previous = _clock
+        _clock = clock if clock is not None else Clock()
+        return previous
+
+
+@contextmanager
+def use_clock(clock: Clock) -> Iterator[Clock]:
+    """
+    Install a clock for the duration of a with block.
+
+    Args:
+        clock: Clock to install
+
+    Yields:
+        The installed clock
+    """
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Validation Analytics Store
+
+Validation reports are analyzed from rollups instead of the full CSV. A rollup
+holds additive counters of a report:
+
+- per prediction class: predictions, correct predictions, actual outcomes,
+  confidence and the price change of the correct predictions
+- per confidence bucket: predictions and correct predictions
+- per day: predictions and correct predictions
+
+The historical prediction validator writes the rollup of every report it saves to
+<report>.rollup.json. The analyzers load the rollup when it matches the report
+file (size and modification time) and otherwise build it once by streaming the
+CSV in chunks. Rollups of several reports can be merged.
+
+Charts are rendered by the shared chart renderer (see chart_renderer.py) from
+small payloads built from the rollup (the indicators chart reads only its columns
+of the report), so an unchanged chart is copied from its cache instead of redrawn.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from chart_renderer import get_chart_renderer, chart_key, chart_url
+
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+PREDICTION_CLASSES = ['BUY', 'HOLD', 'SELL']
+
+# Confidence buckets: (lower, upper] per label, with 0 in the first bucket
+CONFIDENCE_BINS = [0, 0.6, 0.7, 0.8, 0.9, 0.95, 0.98, 1.0]
+CONFIDENCE_LABELS = ['0-0.6', '0.6-0.7', '0.7-0.8', '0.8-0.9', '0.9-0.95', '0.95-0.98', '0.98-1.0']
+
+# Predictions above this confidence count as high confidence (a bucket edge)
+HIGH_CONFIDENCE = 0.8
+
+# Bump when the rollup layout changes
+ROLLUP_VERSION = 1
+
+# Report columns a rollup is built from, and those the indicators chart reads
+ROLLUP_COLUMNS = ['timestamp', 'symbol', 'interval', 'model_type', 'prediction', 'confidence',
+                  'actual_direction', 'price_change_pct', 'was_correct']
+INDICATOR_COLUMNS = ['timestamp', 'current_price', 'prediction', 'was_correct',
+                     'bb_upper', 'bb_lower', 'ema_20', 'rsi_14', 'macd']
+
+
+def _accuracy(correct: float, count: float) -> float:
+    """Accuracy in percent (0 without predictions)"""
+    return (correct / count) * 100 if count > 0 else 0
+
+
+class ValidationRollup:
+    """
+    Additive counters of a validation report
+    """
+
+    def __init__(self, symbol: str = '', interval: str = '', model_type: str = ''):
+        """
+        Initialize an empty rollup.
+
+        Args:
+            symbol: Trading pair symbol
+            interval: Candle interval
+            model_type: Type of model that made the predictions
+        """
+        self.metadata = {'symbol': symbol, 'interval': interval, 'model_type': model_type}
+        self.total = 0
+        self.correct = 0
+        self.confidence_sum = 0.0
+        self.start: Optional[str] = None
+        self.end: Optional[str] = None
+        self.classes = {pred_type: {'count': 0, 'correct': 0, 'actual': 0, 'confidence_sum': 0.0,
+                                    'correct_change_sum': 0.0}
+                        for pred_type in PREDICTION_CLASSES}
+        self.confidence = {label: {'count': 0, 'correct': 0} for label in CONFIDENCE_LABELS}
+        self.days: Dict[str, Dict[str, int]] = {}
+        self.source: Dict[str, Any] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **metadata) -> 'ValidationRollup':
+        """
+        Build the rollup of report rows.
+
+        Args:
+            df: Report rows
+            **metadata: symbol, interval and model_type (default: taken from the rows)
+
+        Returns:
+            The rollup
+        """
+        rollup = cls(**metadata)
+        rollup.add(df)
+        return rollup
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Add report rows to the counters.
+
+        Args:
+            df: Report rows (a whole report or one chunk of it)
+        """
+        if df is None or df.empty:
+            return
+
+        for key in self.metadata:
+            if not self.metadata[key] and key in df.columns:
+                self.metadata[key] = str(df[key].iloc[0])
+
+        correct = df['was_correct'].astype(bool).to_numpy()
+        confidence = df['confidence'].to_numpy(dtype=np.float64)
+        prediction = df['prediction'].to_numpy()
+        actual = df['actual_direction'].to_numpy()
+        change = df['price_change_pct'].to_numpy(dtype=np.float64)
+
+        self.total += len(df)
+        self.correct += int(correct.sum())
+        self.confidence_sum += float(confidence.sum())
+
+        for pred_type, counters in self.classes.items():
+            mask = prediction == pred_type
+            counters['count'] += int(mask.sum())
+            counters['correct'] += int((mask & correct).sum())
+            counters['actual'] += int((actual == pred_type).sum())
+            counters['confidence_sum'] += float(confidence[mask].sum())
+            counters['correct_change_sum'] += float(change[mask & correct].sum())
+
+        bucket = np.searchsorted(CONFIDENCE_BINS[1:-1], confidence, side='left')
+        counts = np.bincount(bucket, minlength=len(CONFIDENCE_LABELS))
+        correct_counts = np.bincount(bucket, weights=correct, minlength=len(CONFIDENCE_LABELS))
+        for label, count, correct_count in zip(CONFIDENCE_LABELS, counts, correct_counts):
+            self.confidence[label]['count'] += int(count)
+            self.confidence[label]['correct'] += int(correct_count)
+
+        timestamps = pd.to_datetime(df['timestamp'])
+        days = timestamps.dt.strftime('%Y-%m-%d').to_numpy()
+        by_day = pd.Series(correct, index=days).groupby(level=0).agg(['count', 'sum'])
+        for day, (count, correct_count) in zip(by_day.index, by_day.to_numpy()):
+            counters = self.days.setdefault(day, {'count': 0, 'correct': 0})
+            counters['count'] += int(count)
+            counters['correct'] += int(correct_count)
+
+        self._extend_range(str(timestamps.min()), str(timestamps.max()))
+
+    def _extend_range(self, start: Optional[str], end: Optional[str]) -> None:
+        """Widen the time range to include [start, end]"""
+        if start is not None and (self.start is None or pd.Timestamp(start) < pd.Timestamp(self.start)):
+            self.start = start
+        if end is not None and (self.end is None or pd.Timestamp(end) > pd.Timestamp(self.end)):
+            self.end = end
+
+    def merge(self, other: 'ValidationRollup') -> 'ValidationRollup':
+        """
+        Add the counters of another rollup.
+
+        Args:
+            other: Rollup to add
+
+        Returns:
+            This rollup
+        """
+        self.total += other.total
+        self.correct += other.correct
+        self.confidence_sum += other.confidence_sum
+        for groups, other_groups in ((self.classes, other.classes), (self.confidence, other.confidence)):
+            for name, counters in other_groups.items():
+                for key, value in counters.items():
+                    groups[name][key] += value
+        for day, counters in other.days.items():
+            own = self.days.setdefault(day, {'count': 0, 'correct': 0})
+            own['count'] += counters['count']
+            own['correct'] += counters['correct']
+        self._extend_range(other.start, other.end)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the rollup to a JSON-serializable dictionary"""
+        return {
+            'version': ROLLUP_VERSION,
+            'metadata': self.metadata,
+            'total': self.total,
+            'correct': self.correct,
+            'confidence_sum': self.confidence_sum,
+            'start': self.start,
+            'end': self.end,
+            'classes': self.classes,
+            'confidence': self.confidence,
+            'days': dict(sorted(self.days.items())),
+            'source': self.source
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ValidationRollup':
+        """
+        Rebuild a rollup from to_dict output.
+
+        Args:
+            data: Dictionary from to_dict
+
+        Returns:
+            The rollup
+        """
+        rollup = cls(**data['metadata'])
+        for key in ('total', 'correct', 'confidence_sum', 'start', 'end', 'classes', 'confidence',
+                    'days', 'source'):
+            setattr(rollup, key, data[key])
+        return rollup
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the statistics shown by the report analyzers.
+
+        Returns:
+            Dictionary with overall, per-class and high confidence statistics
+        """
+        if self.total == 0:
+            return {}
+
+        stats = {
+            'total_predictions': self.total,
+            'correct_predictions': self.correct,
+            'accuracy': _accuracy(self.correct, self.total)
+        }
+        for pred_type, counters in self.classes.items():
+            stats[f'{pred_type.lower()}_predictions'] = counters['count']
+            stats[f'{pred_type.lower()}_correct'] = counters['correct']
+            stats[f'{pred_type.lower()}_accuracy'] = _accuracy(counters['correct'], counters['count'])
+
+        stats['avg_confidence'] = self.confidence_sum / self.total
+
+        high = [self.confidence[label] for label, lower in zip(CONFIDENCE_LABELS, CONFIDENCE_BINS)
+                if lower >= HIGH_CONFIDENCE]
+        stats['high_conf_predictions'] = sum(counters['count'] for counters in high)
+        stats['high_conf_correct'] = sum(counters['correct'] for counters in high)
+        stats['high_conf_accuracy'] = _accuracy(stats['high_conf_correct'], stats['high_conf_predictions'])
+
+        stats['start_time'] = self.start
+        stats['end_time'] = self.end
+        return stats
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the structured summary of HistoricalPredictionValidator.generate_summary_data.
+
+        Returns:
+            Dictionary containing summary metrics
+        """
+        if self.total == 0:
+            return {}
+
+        classification = {}
+        profits = {}
+        for pred_type in ('BUY', 'SELL'):
+            counters = self.classes[pred_type]
+            precision = counters['correct'] / counters['count'] if counters['count'] > 0 else 0
+            recall = counters['correct'] / counters['actual'] if counters['actual'] > 0 else 0
+            classification[pred_type] = {
+                'precision': float(precision),
+                'recall': float(recall),
+                'f1_score': float(2 * (precision * recall) / (precision + recall)) if (precision + recall) > 0 else 0,
+                'win_ratio': float(_accuracy(counters['correct'], counters['count']))
+            }
+            # A short profits from a price drop
+            sign = 1 if pred_type == 'BUY' else -1
+            profits[pred_type] = sign * counters['correct_change_sum']
+
+        buy_wins, sell_wins = self.classes['BUY']['correct'], self.classes['SELL']['correct']
+        profitable_trades = buy_wins + sell_wins
+
+        return {
+            'total_predictions': int(self.total),
+            'correct_predictions': int(self.correct),
+            'overall_accuracy': float(_accuracy(self.correct, self.total)),
+            'average_confidence': float(self.confidence_sum / self.total),
+            'time_range': {
+                'start': str(self.start),
+                'end': str(self.end)
+            },
+            'class_breakdown': {
+                pred_type: {
+                    'count': int(counters['count']),
+                    'correct': int(counters['correct']),
+                    'accuracy': float(_accuracy(counters['correct'], counters['count']))
+                }
+                for pred_type, counters in self.classes.items()
+            },
+            'classification_metrics': classification,
+            'profitability': {
+                'profitable_trades': int(profitable_trades),
+                'profitable_trades_percentage': float(_accuracy(profitable_trades, self.total)),
+                'avg_buy_profit_pct': float(profits['BUY'] / buy_wins) if buy_wins else 0,
+                'avg_sell_profit_pct': float(profits['SELL'] / sell_wins) if sell_wins else 0,
+                'avg_profit_per_trade': float((profits['BUY'] + profits['SELL']) / profitable_trades)
+                if profitable_trades else 0,
+                'cumulative_return_pct': float(profits['BUY'] + profits['SELL'])
+            }
+        }
+
+
+def rollup_path(report_path: str) -> str:
+    """Get the path of a report's rollup file"""
+    return f"{os.path.splitext(report_path)[0]}.rollup.json"
+
+
+def _file_state(path: str) -> Dict[str, int]:
+    """Size and modification time of a file"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _file_digest(path: str) -> str:
+    """16 character hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def save_rollup(rollup: ValidationRollup, report_path: str) -> str:
+    """
+    Write the rollup of a report next to it.
+
+    Args:
+        rollup: Rollup of the report
+        report_path: Path of the CSV report (already written)
+
+    Returns:
+        Path of the rollup file
+    """
+    rollup.source = {**_file_state(report_path), 'digest': _file_digest(report_path)}
+    path = rollup_path(report_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(rollup.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_rollup(report_path: str, chunk_rows: int = 100000) -> ValidationRollup:
+    """
+    Build the rollup of a CSV report, reading it in chunks.
+
+    Args:
+        report_path: Path of the CSV report
+        chunk_rows: Rows read at a time
+
+    Returns:
+        The rollup
+    """
+    header = pd.read_csv(report_path, nrows=0).columns
+    columns = [column for column in ROLLUP_COLUMNS if column in header]
+    rollup = ValidationRollup()
+    for chunk in pd.read_csv(report_path, usecols=columns, chunksize=chunk_rows):
+        rollup.add(chunk)
+    return rollup
+
+
+def load_rollup(report_path: str) -> Optional[ValidationRollup]:
+    """
+    Load the rollup of a report, building and saving it if it is missing or stale.
+
+    Args:
+        report_path: Path of the CSV report
+
+    Returns:
+        The rollup, or None if the report cannot be read
+    """
+    if not os.path.exists(report_path):
+        logger.error(f"Report file '{report_path}' not found")
+        return None
+
+    path = rollup_path(report_path)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') == ROLLUP_VERSION and \
+                {key: data['source'].get(key) for key in ('size', 'mtime_ns')} == _file_state(report_path):
+            return ValidationRollup.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    try:
+        rollup = build_rollup(report_path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Error loading report: {e}")
+        return None
+    try:
+        save_rollup(rollup, report_path)
+    except OSError as e:
+        logger.warning(f"Could not save the rollup of {report_path}: {e}")
+    return rollup
+
+
+def chart_jobs(rollup: ValidationRollup, report_path: str) -> List[Dict[str, Any]]:
+    """
+    Build the chart jobs of a report.
+
+    Args:
+        rollup: Rollup of the report
+        report_path: Path of the CSV report
+
+    Returns:
+        List of jobs with the 'chart' name (see chart_renderer.CHART_RENDERERS)
+        and its 'payload'
+    """
+    if rollup.total == 0:
+        return []
+
+    days = sorted(rollup.days)
+    buckets = [label for label in CONFIDENCE_LABELS if rollup.confidence[label]['count'] > 0]
+    jobs = [
+        {'chart': 'prediction_accuracy', 'payload': {
+            'classes': PREDICTION_CLASSES,
+            'count': [rollup.classes[pred_type]['count'] for pred_type in PREDICTION_CLASSES],
+            'correct': [rollup.classes[pred_type]['correct'] for pred_type in PREDICTION_CLASSES]}},
+        {'chart': 'confidence_vs_accuracy', 'payload': {
+            'labels': buckets,
+            'count': [rollup.confidence[label]['count'] for label in buckets],
+            'correct': [rollup.confidence[label]['correct'] for label in buckets]}},
+        {'chart': 'cumulative_accuracy', 'payload': {
+            'days': days,
+            'count': [rollup.days[day]['count'] for day in days],
+            'correct': [rollup.days[day]['correct'] for day in days]}}
+    ]
+
+    # Drawn from the report rows; the file digest stands in for them in the chart key
+    digest = rollup.source.get('digest') or _file_digest(report_path)
+    jobs.append({'chart': 'indicators_and_predictions',
+                 'payload': {'report': os.path.abspath(report_path),
+                             'columns': INDICATOR_COLUMNS,
+                             'report_digest': digest}})
+    return jobs
+
+
+def render_charts(jobs: List[Dict[str, Any]], output_dir: str,
+                  timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Render charts into a directory through the shared chart renderer, which
+    reuses its cached image of a chart with the same payload.
+
+    Args:
+        jobs: Chart jobs (see chart_jobs)
+        output_dir: Directory the charts are written to as <chart>.png
+        timeout: Seconds to wait at most for each chart
+
+    Returns:
+        Per chart, the output 'path', whether it was 'cached' and its 'url'
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    renderer = get_chart_renderer()
+
+    # Queue every chart before waiting, so they render in parallel
+    keys = {}
+    results = {}
+    for job in jobs:
+        cached = renderer.get_path(chart_key(job['chart'], job['payload'])) is not None
+        keys[job['chart']] = renderer.submit(job['chart'], job['payload'])
+        results[job['chart']] = {'path': os.path.join(output_dir, f"{job['chart']}.png"),
+                                 'cached': cached, 'url': chart_url(keys[job['chart']])}
+
+    for chart, result in results.items():
+        shutil.copyfile(renderer.wait(keys[chart], timeout), result['path'])
+
+    rendered = sum(not result['cached'] for result in results.values())
+    logger.info(f"Rendered {rendered} of {len(jobs)} charts ({len(jobs) - rendered} cached)")
+    return results
+
+
+def render_validation_charts(rollup: ValidationRollup, report_path: str, output_dir: str,
+                             timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Render every chart of a validation report.
+
+    Args:
+        rollup: Rollup of the report
+        report_path: Path of the CSV report
+        output_dir: Directory the charts are written to
+        timeout: Seconds to wait at most for each chart
+
+    Returns:
+        Per chart, the output 'path', whether it was 'cached' and its 'url'
+    """
+    return render_charts(chart_jobs(rollup, report_path), output_dir, timeout)
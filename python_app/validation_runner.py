@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Validation Runner
+
+This module validates a whole universe of predictions in one command: every
+combination of symbols x intervals. It handles:
+
+1. Downloading the history of every combination through a bounded thread pool,
+   so the downloads overlap instead of running one after another
+2. Scoring each downloaded history in worker processes as soon as it arrives;
+   each worker keeps one predictor, so a symbol's model is loaded once per worker
+   instead of once per combination
+3. Saving the report (CSV + rollup) of every combination, as the historical
+   prediction validator does for a single one
+4. Merging the rollups of all combinations into one summary, with per-symbol and
+   per-interval accuracy, saved in validation_reports
+
+Usage:
+    python validation_runner.py --symbols BTCUSDT ETHUSDT --intervals 1h 4h --days 7
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional
+
+import pandas as pd
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from validation_analytics import ValidationRollup
+
+logger = logging.getLogger('validation_runner')
+
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_REPORT_DIR = os.path.join(current_dir, 'validation_reports')
+
+# Predictor and market service shared by the validations of one worker process
+_worker_state: Dict[str, Any] = {}
+
+
+def get_validation_worker_counts() -> Dict[str, int]:
+    """Read the fetch and scoring worker counts from the config ('fetch', 'score')"""
+    try:
+        from config import active_config
+        return {'fetch': int(getattr(active_config, 'VALIDATION_FETCH_WORKERS', DEFAULT_FETCH_WORKERS)),
+                'score': int(getattr(active_config, 'VALIDATION_WORKERS', 0))}
+    except (ImportError, ValueError):
+        return {'fetch': DEFAULT_FETCH_WORKERS, 'score': 0}
+
+
+def _init_validation_worker() -> None:
+    """Keep each worker's inference on one thread (before xgboost is imported)"""
+    os.environ['OMP_NUM_THREADS'] = '1'
+
+
+def build_validation_jobs(symbols: List[str], intervals: List[str]) -> List[Dict[str, str]]:
+    """
+    Build the jobs of a symbol x interval matrix
+
+    Args:
+        symbols: Trading pair symbols (e.g., BTCUSDT)
+        intervals: Timeframes (e.g., 1h, 4h)
+
+    Returns:
+        List of job dictionaries with 'symbol' and 'interval'
+    """
+    return [{'symbol': symbol.upper(), 'interval': interval} for symbol in symbols for interval in intervals]
+
+
+def fetch_job_history(job: Dict[str, str], days: int) -> pd.DataFrame:
+    """
+    Download the history of one job (runs in a fetch thread)
+
+    Args:
+        job: Job from build_validation_jobs
+        days: Number of days of historical data to analyze
+
+    Returns:
+        DataFrame of candles with indicators (empty if the download failed)
+    """
+    from historical_prediction_validator import fetch_validation_history
+    return fetch_validation_history(job['symbol'], job['interval'], days)
+
+
+def score_job(job: Dict[str, str], history: pd.DataFrame, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the downloaded history of one job and save its report (runs in a worker process)
+
+    Args:
+        job: Job from build_validation_jobs
+        history: Output of fetch_job_history
+        options: Runner options ('model_type', 'days', 'confidence_threshold', 'save_reports')
+
+    Returns:
+        The job with 'status', 'predictions', 'accuracy', 'report_paths', 'rollup'
+        (rollup dictionary), 'score_seconds' and 'error'
+    """
+    from historical_prediction_validator import HistoricalPredictionValidator
+    from predict_xgboost import XGBoostPredictor
+    from services.binance.market_service import BinanceMarketService
+
+    result = {**job, 'status': 'failed', 'error': None, 'predictions': 0, 'accuracy': None,
+              'report_paths': {}, 'rollup': None, 'pid': os.getpid()}
+    start_time = time.time()
+
+    try:
+        if 'predictor' not in _worker_state:
+            _worker_state['predictor'] = XGBoostPredictor()
+            _worker_state['market_service'] = BinanceMarketService()
+
+        validator = HistoricalPredictionValidator(
+            symbol=job['symbol'],
+            interval=job['interval'],
+            model_type=options['model_type'],
+            days=options['days'],
+            confidence_threshold=options['confidence_threshold'],
+            predictor=_worker_state['predictor'],
+            market_service=_worker_state['market_service']
+        )
+        if not validator.load_model():
+            raise ValueError(f"No {options['model_type']} model for {job['symbol']}")
+
+        validator.validate_history(history)
+        report = validator.create_report()
+        if report.empty:
+            raise ValueError("No predictions to report")
+
+        if options['save_reports']:
+            result['report_paths'] = validator.save_report(format_type='csv')
+
+        rollup = validator._get_rollup()
+        result.update({'status': 'completed',
+                       'predictions': rollup.total,
+                       'accuracy': rollup.correct / rollup.total * 100,
+                       'rollup': rollup.to_dict()})
+
+    except Exception as e:
+        logger.error(f"Validating {job['symbol']} {job['interval']} failed: {e}")
+        result['error'] = str(e)
+
+    result['score_seconds'] = time.time() - start_time
+    return result
+
+
+def _failed(job: Dict[str, str], error: str) -> Dict[str, Any]:
+    """Result of a job that could not be scored"""
+    return {**job, 'status': 'failed', 'error': error, 'predictions': 0, 'accuracy': None,
+            'report_paths': {}, 'rollup': None, 'score_seconds': None}
+
+
+def _group_accuracy(rollups: List[ValidationRollup], key: str) -> Dict[str, Optional[float]]:
+    """Accuracy of the merged rollups of each symbol or interval"""
+    groups: Dict[str, ValidationRollup] = {}
+    for rollup in rollups:
+        groups.setdefault(rollup.metadata[key], ValidationRollup()).merge(rollup)
+    return {name: (group.correct / group.total * 100 if group.total else None)
+            for name, group in sorted(groups.items())}
+
+
+def run_validation_matrix(symbols: List[str],
+                          intervals: List[str],
+                          model_type: str = 'balanced',
+                          days: int = 7,
+                          confidence_threshold: float = 0.5,
+                          fetch_workers: Optional[int] = None,
+                          n_workers: Optional[int] = None,
+                          save_reports: bool = True,
+                          report_dir: str = DEFAULT_REPORT_DIR) -> Dict[str, Any]:
+    """
+    Validate every symbol x interval combination concurrently and merge the results
+
+    Args:
+        symbols: Trading pair symbols
+        intervals: Timeframes
+        model_type: Model type to use ('standard' or 'balanced')
+        days: Number of days of historical data to analyze
+        confidence_threshold: Minimum confidence threshold for predictions
+        fetch_workers: Number of concurrent downloads (default: VALIDATION_FETCH_WORKERS)
+        n_workers: Number of scoring processes (default: VALIDATION_WORKERS, or one per
+            CPU core; 1 scores in this process)
+        save_reports: Save the CSV report and rollup of every combination
+        report_dir: Directory to save the merged summary in
+
+    Returns:
+        Summary with the per-job results, the merged summary (in the format of
+        HistoricalPredictionValidator.generate_summary_data), per-symbol and
+        per-interval accuracy, counts and total wall-clock time
+    """
+    jobs = build_validation_jobs(symbols, intervals)
+    configured = get_validation_worker_counts()
+    fetch_workers = max(1, min(fetch_workers or configured['fetch'] or DEFAULT_FETCH_WORKERS, len(jobs)))
+    n_workers = max(1, min(n_workers or configured['score'] or os.cpu_count() or 1, len(jobs)))
+    options = {
+        'model_type': model_type,
+        'days': days,
+        'confidence_threshold': confidence_threshold,
+        'save_reports': save_reports
+    }
+
+    logger.info(f"Validating {len(jobs)} combinations with {fetch_workers} downloads and {n_workers} scoring workers")
+    start_time = time.time()
+    results = []
+
+    def record(result: Dict[str, Any]) -> None:
+        results.append(result)
+        logger.info(f"[{len(results)}/{len(jobs)}] {result['symbol']} {result['interval']}: {result['status']}")
+
+    # Create the shared dataset loader before the fetch threads race to do it
+    from data.dataset_loader import get_dataset_loader
+    get_dataset_loader()
+
+    executor = None
+    if n_workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                       initializer=_init_validation_worker)
+
+    try:
+        score_futures = {}
+        with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='validation-fetch') as fetcher:
+            fetch_futures = {fetcher.submit(fetch_job_history, job, days): (job, time.time()) for job in jobs}
+            for future in as_completed(fetch_futures):
+                job, submitted = fetch_futures[future]
+                fetch_seconds = time.time() - submitted
+                try:
+                    history = future.result()
+                except Exception as e:
+                    history, error = None, f"Fetch failed: {e}"
+                else:
+                    error = "No historical data"
+                if history is None or history.empty:
+                    record({**_failed(job, error), 'fetch_seconds': fetch_seconds})
+                    continue
+
+                # Score while the remaining downloads continue
+                if executor is None:
+                    record({**score_job(job, history, options), 'fetch_seconds': fetch_seconds})
+                else:
+                    score_futures[executor.submit(score_job, job, history, options)] = (job, fetch_seconds)
+
+        for future in as_completed(score_futures):
+            job, fetch_seconds = score_futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                result = _failed(job, f"Worker failed: {e}")
+            record({**result, 'fetch_seconds': fetch_seconds})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    results.sort(key=lambda result: (result['symbol'], result['interval']))
+
+    # Merge the rollups of all combinations into one summary
+    rollups = [ValidationRollup.from_dict(result.pop('rollup')) for result in results if result['rollup']]
+    for result in results:
+        result.pop('rollup', None)
+    merged = ValidationRollup(symbol=','.join(sorted({job['symbol'] for job in jobs})),
+                              interval=','.join(intervals), model_type=model_type)
+    for rollup in rollups:
+        merged.merge(rollup)
+
+    summary = {
+        'symbols': [symbol.upper() for symbol in symbols],
+        'intervals': intervals,
+        'model_type': model_type,
+        'days': days,
+        'confidence_threshold': confidence_threshold,
+        'fetch_workers': fetch_workers,
+        'workers': n_workers,
+        'jobs': results,
+        'completed': sum(1 for result in results if result['status'] == 'completed'),
+        'failed': sum(1 for result in results if result['status'] != 'completed'),
+        'summary': merged.summary() if merged.total else {},
+        'accuracy_by_symbol': _group_accuracy(rollups, 'symbol'),
+        'accuracy_by_interval': _group_accuracy(rollups, 'interval'),
+        'fetch_seconds': sum(result.get('fetch_seconds') or 0.0 for result in results),
+        'score_seconds': sum(result['score_seconds'] or 0.0 for result in results),
+        'wall_clock_seconds': time.time() - start_time,
+        'timestamp': datetime.now().isoformat()
+    }
+    summary['summary_path'] = save_summary(summary, report_dir)
+    return summary
+
+
+def format_summary_table(summary: Dict[str, Any]) -> str:
+    """
+    Format the results of a validation run as a text table
+
+    Args:
+        summary: Summary from run_validation_matrix
+
+    Returns:
+        Table with one row per job and a totals line
+    """
+    def fmt(value: Optional[float], spec: str) -> str:
+        return format(value, spec) if value is not None else '-'
+
+    lines = [f"{'Symbol':<10} {'Interval':<8} {'Status':<10} {'Fetch s':>8} {'Score s':>8} "
+             f"{'Predictions':>11} {'Accuracy':>9}  Error"]
+    for result in summary['jobs']:
+        lines.append(f"{result['symbol']:<10} {result['interval']:<8} {result['status']:<10} "
+                     f"{fmt(result.get('fetch_seconds'), '8.1f'):>8} {fmt(result['score_seconds'], '8.1f'):>8} "
+                     f"{result['predictions']:>11} {fmt(result['accuracy'], '9.2f'):>9}  "
+                     f"{(result['error'] or '')[:60]}")
+    merged = summary['summary']
+    if merged:
+        lines.append(f"Overall: {merged['total_predictions']} predictions, "
+                     f"{merged['overall_accuracy']:.2f}% accuracy")
+    lines.append(f"{summary['completed']} completed, {summary['failed']} failed; "
+                 f"{summary['fetch_seconds']:.1f}s of downloads and {summary['score_seconds']:.1f}s of scoring "
+                 f"in {summary['wall_clock_seconds']:.1f}s wall clock "
+                 f"({summary['fetch_workers']} downloads x {summary['workers']} workers)")
+    return '\n'.join(lines)
+
+
+def save_summary(summary: Dict[str, Any], report_dir: str = DEFAULT_REPORT_DIR) -> str:
+    """
+    Save a validation run summary atomically
+
+    Args:
+        summary: Summary from run_validation_matrix
+        report_dir: Directory of the validation reports
+
+    Returns:
+        Path of the summary file
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"validation_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+    logger.info(f"Validation run summary saved to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Validate a symbol x interval matrix of predictions concurrently')
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'], help='Trading pair symbols')
+    parser.add_argument('--intervals', nargs='+', default=['1h'], help='Timeframes')
+    parser.add_argument('--days', type=int, default=7, help='Number of days of historical data to analyze')
+    parser.add_argument('--model', type=str, choices=['standard', 'balanced'], default='balanced',
+                        help='Model type to use (standard or balanced)')
+    parser.add_argument('--threshold', type=float, default=0.6,
+                        help='Minimum confidence threshold for predictions (0.0-1.0)')
+    parser.add_argument('--fetch-workers', type=int, default=None,
+                        help='Number of concurrent downloads (default: VALIDATION_FETCH_WORKERS)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of scoring processes (default: VALIDATION_WORKERS or one per CPU core)')
+    parser.add_argument('--no-reports', action='store_true', help='Only save the merged summary')
+
+    args = parser.parse_args()
+
+    summary = run_validation_matrix(
+        symbols=args.symbols,
+        intervals=args.intervals,
+        model_type=args.model,
+        days=args.days,
+        confidence_threshold=args.threshold,
+        fetch_workers=args.fetch_workers,
+        n_workers=args.workers,
+        save_reports=not args.no_reports
+    )
+
+    print(format_summary_table(summary))
+    print(f"Summary: {summary['summary_path']}")
+    sys.exit(1 if summary['failed'] else 0)
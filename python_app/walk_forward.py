@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Walk-Forward Evaluation
+
+This module evaluates an XGBoost configuration the way it would have traded: in time
+order, always predicting candles the model has not seen. It handles:
+
+1. Training an initial model on the oldest part of the stored feature matrix
+2. Advancing a test window through the rest of the data
+3. After each window, updating the booster incrementally (adding boosting rounds on
+   the window that was just evaluated) instead of retraining from scratch
+4. Optionally retraining from scratch every N windows to bound drift of the
+   incremental model
+5. Reporting per-window metrics and wall-clock time
+
+The features are scaled with statistics of the initial training rows only, and
+columns derived from future prices are not used as features. A label looks
+`purge_rows` candles ahead, so the rows whose labels reach into a test window are
+left out of every training range (the initial fit and each update); no
+information from the evaluated windows leaks into the model.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+# Add current directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from data_loader import load_feature_frame, _row_cutoff, DEFAULT_FORWARD_RETURNS_PERIODS
+from model_utils import calculate_class_weights, create_sample_weights
+
+logger = logging.getLogger('walk_forward')
+
+# Parameters used when neither explicit parameters nor an optimized model are given
+# (the optimizer's baseline configuration)
+DEFAULT_PARAMS = {
+    'objective': 'multi:softmax',
+    'eval_metric': 'mlogloss',
+    'learning_rate': 0.05,
+    'max_depth': 6,
+    'min_child_weight': 2,
+    'gamma': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'n_estimators': 200,
+    'seed': 42
+}
+
+
+class WalkForwardEvaluator:
+    """
+    Walk-forward evaluation of an XGBoost configuration with incremental model updates
+    """
+
+    def __init__(self,
+                 symbol: str,
+                 timeframe: str,
+                 data_dir: str = 'data/training',
+                 model_dir: str = 'models',
+                 params: Optional[Dict[str, Any]] = None,
+                 model_type: Optional[str] = None,
+                 initial_train_fraction: float = 0.5,
+                 n_windows: int = 12,
+                 window_size: Optional[int] = None,
+                 rounds_per_window: Optional[int] = None,
+                 full_retrain_every: int = 0,
+                 purge_rows: int = DEFAULT_FORWARD_RETURNS_PERIODS):
+        """
+        Initialize the evaluator
+
+        Args:
+            symbol: Trading pair symbol (e.g., 'btcusdt')
+            timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
+            data_dir: Directory containing training data
+            model_dir: Directory of the optimized models (and the walk-forward reports)
+            params: XGBoost parameters (default: those of model_type, else the baseline)
+            model_type: Optimized model whose parameters to evaluate (e.g. 'bayesian')
+            initial_train_fraction: Fraction of the rows used to train the initial model
+            n_windows: Number of test windows the remaining rows are split into
+            window_size: Rows per test window (overrides n_windows)
+            rounds_per_window: Boosting rounds added per update (default: in proportion
+                to the window size, as adaptive tuning does)
+            full_retrain_every: Retrain from scratch every N windows (0 = never)
+            purge_rows: Candles a label looks ahead; the rows this close to a test
+                window are not trained on before it
+        """
+        self.symbol = symbol.lower()
+        self.timeframe = timeframe
+        self.data_dir = data_dir
+        self.model_dir = model_dir
+        self.model_type = model_type
+        self.initial_train_fraction = initial_train_fraction
+        self.n_windows = n_windows
+        self.window_size = window_size
+        self.rounds_per_window = rounds_per_window
+        self.full_retrain_every = full_retrain_every
+        self.purge_rows = max(0, purge_rows)
+        self.params = params or self._load_params()
+
+        self.X: Optional[np.ndarray] = None
+        self.y: Optional[np.ndarray] = None
+        self.df = None
+
+    def _load_params(self) -> Dict[str, Any]:
+        """Get the parameters of the optimized model, or the baseline parameters"""
+        if self.model_type:
+            metadata_path = os.path.join(
+                self.model_dir, f'xgboost_{self.symbol}_{self.timeframe}_{self.model_type}_metadata.json')
+            if os.path.exists(metadata_path):
+                with open(metadata_path, 'r') as f:
+                    params = json.load(f).get('params')
+                if params:
+                    return params
+            logger.warning(f"No parameters found in {metadata_path}, using the baseline parameters")
+        return dict(DEFAULT_PARAMS)
+
+    def load_data(self) -> None:
+        """Load the stored feature matrix in time order and scale it with the initial training rows"""
+        df, feature_cols = load_feature_frame(self.data_dir, self.symbol, self.timeframe)
+        X = df[feature_cols].values.astype(float)
+        n_initial = int(len(X) * self.initial_train_fraction)
+        if n_initial < 1 or n_initial + 2 * self.purge_rows >= len(X):
+            raise ValueError(f"Initial training fraction {self.initial_train_fraction} leaves no rows to train or test")
+
+        mean = X[:n_initial].mean(axis=0)
+        scale = X[:n_initial].std(axis=0)
+        scale[scale == 0] = 1.0
+
+        self.df = df
+        self.X = (X - mean) / scale
+        self.y = df['target'].values.astype(int)
+        self.feature_cols = feature_cols
+        self.n_initial = n_initial
+
+    def _booster_params(self) -> Tuple[Dict[str, Any], int]:
+        """Convert the XGBClassifier parameters to xgb.train parameters and rounds"""
+        booster_params = {k: v for k, v in self.params.items()
+                          if k not in ('n_estimators', 'use_label_encoder', 'n_jobs', 'early_stopping_rounds')}
+        booster_params['num_class'] = int(self.y.max()) + 1
+        booster_params.setdefault('objective', 'multi:softmax')
+        booster_params.setdefault('tree_method', 'hist')
+        booster_params['verbosity'] = 0
+        return booster_params, int(self.params.get('n_estimators') or 100)
+
+    def _train_matrix(self, start: int, end: int) -> xgb.DMatrix:
+        """Build the class-weighted training matrix of rows [start, end)"""
+        y = self.y[start:end]
+        return xgb.DMatrix(self.X[start:end], label=y,
+                           weight=create_sample_weights(y, calculate_class_weights(y)))
+
+    def _windows(self) -> List[Tuple[int, int]]:
+        """
+        Split the rows after the initial training rows and the purge gap into consecutive test windows
+
+        The last purge_rows rows are left out: their labels look past the end of the data
+        and are only HOLD placeholders.
+        """
+        n_rows = len(self.X) - self.purge_rows
+        first = self.n_initial + self.purge_rows
+        size = self.window_size or max(1, int(np.ceil((n_rows - first) / max(1, self.n_windows))))
+        return [(start, min(start + size, n_rows)) for start in range(first, n_rows, size)]
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the walk-forward evaluation
+
+        Window i is predicted by the model trained on every row whose label is known
+        before it (all rows up to purge_rows before the window): the initial model plus
+        incremental updates on the rows that became known since the previous update
+        (or a full retrain on all of them when one is due).
+
+        Returns:
+            Dictionary with per-window metrics and timings, the overall out-of-sample
+            metrics and the total wall-clock time
+        """
+        start_time = time.time()
+        if self.X is None:
+            self.load_data()
+
+        booster_params, n_estimators = self._booster_params()
+        windows = self._windows()
+        rounds_per_window = self.rounds_per_window or min(
+            n_estimators, max(10, int(n_estimators * (windows[0][1] - windows[0][0]) / self.n_initial)))
+
+        logger.info(f"Walk-forward evaluation of {self.symbol} {self.timeframe}: {self.n_initial} initial rows, "
+                    f"{len(windows)} windows, {rounds_per_window} rounds per update")
+
+        train_start = time.time()
+        booster = xgb.train(booster_params, self._train_matrix(0, self.n_initial), num_boost_round=n_estimators)
+        update = {'mode': 'initial', 'rows': self.n_initial, 'seconds': time.time() - train_start}
+        trained_end = self.n_initial
+
+        results = []
+        all_true, all_pred = [], []
+        for index, (start, end) in enumerate(windows):
+            predict_start = time.time()
+            predictions = booster.predict(xgb.DMatrix(self.X[start:end]))
+            if predictions.ndim > 1:
+                predictions = predictions.argmax(axis=1)
+            predictions = predictions.astype(int)
+            predict_seconds = time.time() - predict_start
+
+            y_true = self.y[start:end]
+            all_true.append(y_true)
+            all_pred.append(predictions)
+            results.append({
+                'window': index,
+                'start': _row_cutoff(self.df, start + 1),
+                'end': _row_cutoff(self.df, end),
+                'rows': end - start,
+                **self._metrics(y_true, predictions),
+                'model_update': update['mode'],
+                'train_rows': update['rows'],
+                'train_seconds': update['seconds'],
+                'predict_seconds': predict_seconds,
+                'boosting_rounds': booster.num_boosted_rounds()
+            })
+            logger.info(f"Window {index}: accuracy {results[-1]['accuracy']:.4f} on {end - start} rows "
+                        f"({update['mode']} model, trained in {update['seconds']:.2f}s)")
+
+            if index == len(windows) - 1:
+                break
+
+            # Prepare the model for the next window (only rows whose labels end before it)
+            train_start = time.time()
+            known_end = end - self.purge_rows
+            if self.full_retrain_every and (index + 1) % self.full_retrain_every == 0:
+                booster = xgb.train(booster_params, self._train_matrix(0, known_end), num_boost_round=n_estimators)
+                update = {'mode': 'full', 'rows': known_end}
+            elif known_end > trained_end:
+                booster = xgb.train(booster_params, self._train_matrix(trained_end, known_end),
+                                    num_boost_round=rounds_per_window, xgb_model=booster)
+                update = {'mode': 'incremental', 'rows': known_end - trained_end}
+            else:
+                update = {'mode': 'unchanged', 'rows': 0}
+            trained_end = max(trained_end, known_end)
+            update['seconds'] = time.time() - train_start
+
+        y_true, y_pred = np.concatenate(all_true), np.concatenate(all_pred)
+        report = {
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'model_type': self.model_type or 'baseline',
+            'params': self.params,
+            'initial_train_rows': self.n_initial,
+            'rounds_per_window': rounds_per_window,
+            'full_retrain_every': self.full_retrain_every,
+            'purge_rows': self.purge_rows,
+            'windows': results,
+            'overall': self._metrics(y_true, y_pred),
+            'mean_window_accuracy': float(np.mean([window['accuracy'] for window in results])),
+            'train_seconds': float(sum(window['train_seconds'] for window in results)),
+            'predict_seconds': float(sum(window['predict_seconds'] for window in results)),
+            'wall_clock_seconds': time.time() - start_time,
+            'timestamp': datetime.now().isoformat()
+        }
+
+        logger.info(f"Walk-forward evaluation finished in {report['wall_clock_seconds']:.2f}s: "
+                    f"out-of-sample accuracy {report['overall']['accuracy']:.4f} over {len(y_true)} rows")
+        return report
+
+    @staticmethod
+    def _metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+        """Compute the classification metrics of a window"""
+        return {
+            'accuracy': float(accuracy_score(y_true, y_pred)),
+            'precision': float(precision_score(y_true, y_pred, average='weighted', zero_division=0)),
+            'recall': float(recall_score(y_true, y_pred, average='weighted', zero_division=0)),
+            'f1_score': float(f1_score(y_true, y_pred, average='weighted', zero_division=0))
+        }
+
+    def save_report(self, report: Dict[str, Any]) -> str:
+        """
+        Save a walk-forward report next to the models
+
+        Args:
+            report: Report from run()
+
+        Returns:
+            Path of the report file
+        """
+        report_dir = os.path.join(self.model_dir, 'walk_forward')
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir,
+                            f"xgboost_{self.symbol}_{self.timeframe}_{report['model_type']}_walk_forward.json")
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        logger.info(f"Walk-forward report saved to {path}")
+        return path
+
+
+def run_walk_forward(symbol: str,
+                     timeframe: str,
+                     data_dir: str = 'data/training',
+                     model_dir: str = 'models',
+                     model_type: Optional[str] = None,
+                     **kwargs: Any) -> Dict[str, Any]:
+    """
+    Run a walk-forward evaluation and save its report
+
+    Args:
+        symbol: Trading pair symbol
+        timeframe: Timeframe
+        data_dir: Directory containing training data
+        model_dir: Directory of the optimized models
+        model_type: Optimized model whose parameters to evaluate (default: baseline parameters)
+        **kwargs: Further WalkForwardEvaluator options
+
+    Returns:
+        Walk-forward report with the path of the saved file in 'report_path'
+    """
+    evaluator = WalkForwardEvaluator(symbol, timeframe, data_dir, model_dir, model_type=model_type, **kwargs)
+    report = evaluator.run()
+    report['report_path'] = evaluator.save_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation with incremental model updates")
+    parser.add_argument('--symbol', type=str, required=True, help="Trading pair symbol (e.g., 'btcusdt')")
+    parser.add_argument('--timeframe', type=str, required=True, help="Timeframe (e.g., '1h', '4h', '1d')")
+    parser.add_argument('--model-type', type=str, default=None,
+                        help="Optimized model whose parameters to evaluate (e.g., 'bayesian')")
+    parser.add_argument('--data-dir', type=str, default='data/training',
+                        help="Directory containing training data")
+    parser.add_argument('--model-dir', type=str, default='models',
+                        help="Directory of the optimized models")
+    parser.add_argument('--initial-train-fraction', type=float, default=0.5,
+                        help="Fraction of the rows used to train the initial model")
+    parser.add_argument('--windows', type=int, default=12, help="Number of test windows")
+    parser.add_argument('--window-size', type=int, default=None, help="Rows per test window (overrides --windows)")
+    parser.add_argument('--rounds-per-window', type=int, default=None,
+                        help="Boosting rounds added per incremental update")
+    parser.add_argument('--full-retrain-every', type=int, default=0,
+                        help="Retrain from scratch every N windows (0 = never)")
+    parser.add_argument('--purge-rows', type=int, default=DEFAULT_FORWARD_RETURNS_PERIODS,
+                        help="Candles a label looks ahead (rows left out before each test window)")
+
+    args = parser.parse_args()
+
+    report = run_walk_forward(
+        symbol=args.symbol,
+        timeframe=args.timeframe,
+        data_dir=args.data_dir,
+        model_dir=args.model_dir,
+        model_type=args.model_type,
+        initial_train_fraction=args.initial_train_fraction,
+        n_windows=args.windows,
+        window_size=args.window_size,
+        rounds_per_window=args.rounds_per_window,
+        full_retrain_every=args.full_retrain_every,
+        purge_rows=args.purge_rows
+    )
+
+    print(f"{'Window':>6} {'End':>26} {'Rows':>6} {'Accuracy':>9} {'F1':>7} {'Update':>12} {'Train s':>8}")
+    for window in report['windows']:
+        print(f"{window['window']:>6} {str(window['end']):>26} {window['rows']:>6} {window['accuracy']:>9.4f} "
+              f"{window['f1_score']:>7.4f} {window['model_update']:>12} {window['train_seconds']:>8.2f}")
+    print(f"Out-of-sample accuracy {report['overall']['accuracy']:.4f}, "
+          f"wall-clock {report['wall_clock_seconds']:.2f}s, report: {report['report_path']}")
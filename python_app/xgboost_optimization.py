@@ -6,6 +6,7 @@ This module implements multiple optimization methods for XGBoost models:
 1. Grid Search
 2. Random Search 
 3. Bayesian Optimization
+4. Hyperband (successive halving over round/data budgets)
 
 It also provides functions to track model performance and visualization utilities.
 """
@@ -13,18 +14,17 @@ It also provides functions to track model performance and visualization utilitie
 import os
 import sys
 import time
-import json
 import logging
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-import matplotlib.pyplot as plt
 from typing import Dict, List, Tuple, Any, Optional, Union, Callable
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 from sklearn.model_selection import train_test_split, KFold, cross_val_score
 from sklearn.preprocessing import StandardScaler
 import joblib
 import requests
+import threading
 from datetime import datetime
 from hyperopt import fmin, tpe, hp, STATUS_OK, Trials
 from tqdm import tqdm
@@ -52,6 +52,12 @@ if current_dir not in sys.path:
 # Import data loading and preprocessing utilities
 from data_loader import load_train_test_data, preprocess_data
 from model_utils import evaluate_model, save_model, calculate_class_weights, create_sample_weights
+from optimization_executor import ParallelCVExecutor
+from optimization_checkpoint import OptimizationCheckpoint, OptimizationCancelled, config_fingerprint
+from chart_renderer import render_chart
+
+# Hyperparameter search methods supported by the optimizer
+OPTIMIZATION_METHODS = ['grid_search', 'random_search', 'bayesian', 'hyperband']
 
 class XGBoostOptimizer:
     """
@@ -63,7 +69,12 @@ class XGBoostOptimizer:
                  timeframe: str, 
                  data_dir: str = 'data/training',
                  model_dir: str = 'models',
-                 api_base_url: str = 'http://localhost:3000/api/ml/optimization'):
+                 api_base_url: str = 'http://localhost:3000/api/ml/optimization',
+                 n_workers: Optional[int] = None,
+                 resume: bool = False,
+                 cancel_event: Optional[threading.Event] = None,
+                 checkpoint_dir: Optional[str] = None,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
         """
         Initialize the optimizer
         
@@ -73,12 +84,22 @@ class XGBoostOptimizer:
             data_dir: Directory containing training data
             model_dir: Directory to save trained models
             api_base_url: Base URL for the ML optimization API
+            n_workers: Number of processes for cross-validation fits (default: one per CPU core)
+            resume: Whether searches continue from their checkpoints instead of starting over
+            cancel_event: Event that stops a running search when set (its finished trials stay checkpointed)
+            checkpoint_dir: Directory for search checkpoints (default: <model_dir>/checkpoints)
+            progress_callback: Called with the method and number of finished trials after every trial
         """
         self.symbol = symbol.lower()
         self.timeframe = timeframe
         self.data_dir = data_dir
         self.model_dir = model_dir
         self.api_base_url = api_base_url
+        self.n_workers = n_workers
+        self.resume = resume
+        self.cancel_event = cancel_event
+        self.checkpoint_dir = checkpoint_dir or os.path.join(model_dir, 'checkpoints')
+        self.progress_callback = progress_callback
         
         # Ensure directories exist
         os.makedirs(self.model_dir, exist_ok=True)
@@ -96,6 +117,8 @@ class XGBoostOptimizer:
         # Load and preprocess data
         self.logger = logging.getLogger(f"{__name__}.{self.symbol}_{self.timeframe}")
         self.tuning_run_id = None
+        self.checkpoint = None
+        self.matrix_cache_summary = {}
         
     def load_data(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[int, str]]:
         """
@@ -199,10 +222,6 @@ class XGBoostOptimizer:
         model = self.baseline_results['model']
         params = self.baseline_results['params']
         model_path = os.path.join(self.model_dir, f'xgboost_{self.symbol}_{self.timeframe}_baseline.model')
-        metadata_path = os.path.join(self.model_dir, f'xgboost_{self.symbol}_{self.timeframe}_baseline_metadata.json')
-        
-        # Save the model
-        model.save_model(model_path)
         
         # Save metadata
         features = [f"feature_{i}" for i in range(self.X_train.shape[1])]
@@ -221,8 +240,8 @@ class XGBoostOptimizer:
             'training_date': datetime.now().isoformat()
         }
         
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        # Model and metadata are written atomically
+        save_model(model, model_path, metadata)
             
         self.logger.info(f"Saved baseline model to {model_path}")
         return model_path
@@ -232,7 +251,7 @@ class XGBoostOptimizer:
         Create a new tuning run record in the database
         
         Args:
-            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian')
+            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian', 'hyperband')
             
         Returns:
             Tuning run ID
@@ -307,6 +326,189 @@ class XGBoostOptimizer:
             
         self.update_tuning_run(updates)
     
+    def _begin_run(self, optimization_type: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Open the tuning run and checkpoint of a search
+        
+        When resuming a checkpoint of the same search configuration, the tuning run it
+        was reporting to is reused instead of creating a new one.
+        
+        Args:
+            optimization_type: Type of optimization
+            config: JSON-serializable description of the search
+            
+        Returns:
+            Trials already finished by the checkpointed run (empty for a fresh start)
+        """
+        if getattr(self, 'X_train', None) is not None:
+            config = {**config, 'data_shape': list(self.X_train.shape)}
+        
+        self.checkpoint = OptimizationCheckpoint(self.checkpoint_dir, self.symbol, self.timeframe, optimization_type)
+        previous = self.checkpoint.load_state() if self.resume else None
+        
+        if previous and previous.get('tuning_run_id') and previous.get('fingerprint') == config_fingerprint(config):
+            self.tuning_run_id = previous['tuning_run_id']
+            self.update_tuning_run({'status': 'running'})
+        else:
+            self.create_tuning_run(optimization_type)
+        
+        return self.checkpoint.start(config, resume=self.resume, tuning_run_id=self.tuning_run_id)
+    
+    def _record_trial(self, result: Dict[str, Any]) -> None:
+        """
+        Checkpoint a finished trial and report progress
+        
+        Args:
+            result: Trial result
+        """
+        self.checkpoint.record_trial(result)
+        if self.progress_callback is not None:
+            self.progress_callback({
+                'method': self.checkpoint.method,
+                'trials_completed': self.checkpoint.state.get('trials_completed', 0)
+            })
+    
+    def _check_cancelled(self) -> None:
+        """Raise OptimizationCancelled if the run has been cancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise OptimizationCancelled(f"Optimization for {self.symbol} {self.timeframe} was cancelled")
+    
+    def _abort_run(self, error: Exception) -> None:
+        """
+        Record a cancelled or failed search in its tuning run and checkpoint
+        
+        Args:
+            error: The exception that stopped the search
+        """
+        status = 'cancelled' if isinstance(error, OptimizationCancelled) else 'failed'
+        if self.checkpoint is not None:
+            self.checkpoint.finish(status, error=None if status == 'cancelled' else str(error))
+        self.update_tuning_run({
+            'status': status,
+            'errorMessage': str(error),
+            'completedAt': datetime.now().isoformat()
+        })
+    
+    def _get_cv_folds(self, cv: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get the cross-validation folds of the training set
+        
+        Args:
+            cv: Number of cross-validation folds
+            
+        Returns:
+            List of (train_idx, val_idx) pairs
+        """
+        kf = KFold(n_splits=cv, shuffle=True, random_state=42)
+        return list(kf.split(self.X_train))
+    
+    def _create_cv_executor(self, cv: int) -> ParallelCVExecutor:
+        """
+        Create the executor that runs the (candidate, fold) fits in parallel
+        
+        Args:
+            cv: Number of cross-validation folds
+            
+        Returns:
+            ParallelCVExecutor for the training set
+        """
+        return ParallelCVExecutor(
+            self.X_train,
+            self.y_train,
+            self.sample_weights,
+            self._get_cv_folds(cv),
+            n_workers=self.n_workers
+        )
+    
+    def _cross_validate_candidates(self, param_list: List[Dict[str, Any]], cv: int,
+                                   update_every: int, desc: str,
+                                   finished: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], float]:
+        """
+        Cross-validate parameter candidates in parallel
+        
+        Results are streamed into the tuning run and the checkpoint as candidates
+        finish. Candidates that already finished in a checkpointed run are not refit.
+        
+        Args:
+            param_list: Parameter sets to evaluate (without the base parameters)
+            cv: Number of cross-validation folds
+            update_every: Number of finished candidates between tuning run updates
+            desc: Progress bar description
+            finished: Results of candidates finished before a resume (keyed by 'trial')
+            
+        Returns:
+            Tuple of (all results in candidate order, best parameters, best CV accuracy)
+        """
+        all_results = [result for result in finished or [] if result.get('trial', -1) < len(param_list)]
+        best = {'score': -1, 'params': None}
+        for result in all_results:
+            if result['accuracy'] > best['score']:
+                best['score'] = result['accuracy']
+                best['params'] = param_list[result['trial']]
+        done = {result['trial'] for result in all_results}
+        progress = tqdm(total=len(param_list), initial=len(done), desc=desc)
+        
+        def on_result(trial: int, cv_result: Dict[str, Any]) -> None:
+            result = {
+                'trial': trial,
+                'params': param_list[trial],
+                'accuracy': cv_result['accuracy'],
+                'fold_scores': cv_result['fold_scores'],
+                'fit_seconds': cv_result['fit_seconds']
+            }
+            all_results.append(result)
+            self._record_trial(result)
+            progress.update(1)
+            
+            # Update best if improved
+            if result['accuracy'] > best['score']:
+                best['score'] = result['accuracy']
+                best['params'] = result['params']
+            
+            # Update tuning run periodically
+            if len(all_results) % update_every == 0 or len(all_results) == len(param_list):
+                self.update_tuning_run({
+                    'allParams': all_results,
+                    'bestAccuracy': best['score'],
+                    'bestParams': best['params']
+                })
+            
+            # Stop between candidates once the run is cancelled
+            self._check_cancelled()
+        
+        self._check_cancelled()
+        candidates = [(trial, {**self.base_params, **params})
+                      for trial, params in enumerate(param_list) if trial not in done]
+        try:
+            with self._create_cv_executor(cv) as executor:
+                executor.evaluate(candidates, callback=on_result)
+                self.matrix_cache_summary = executor.get_matrix_cache_summary()
+        finally:
+            progress.close()
+            self.checkpoint.update()
+        
+        all_results.sort(key=lambda result: result['trial'])
+        return all_results, best['params'], best['score']
+    
+    def _fit_final_model(self, params: Dict[str, Any]) -> xgb.XGBClassifier:
+        """
+        Train a model on the full training set
+        
+        Args:
+            params: Parameters to use (without the base parameters)
+            
+        Returns:
+            Trained model
+        """
+        model = xgb.XGBClassifier(**{**self.base_params, **params})
+        model.fit(
+            self.X_train, 
+            self.y_train, 
+            sample_weight=self.sample_weights,
+            verbose=False
+        )
+        return model
+    
     def grid_search(self, param_grid: Dict[str, List[Any]], cv: int = 3) -> Dict[str, Any]:
         """
         Perform grid search for hyperparameter optimization
@@ -319,7 +521,7 @@ class XGBoostOptimizer:
             Dictionary with best model and performance metrics
         """
         self.logger.info("Starting grid search optimization")
-        tuning_run_id = self.create_tuning_run('grid_search')
+        start_time = time.time()
         
         try:
             # Train baseline model if not already done
@@ -334,10 +536,8 @@ class XGBoostOptimizer:
             
             self.logger.info(f"Grid search with {len(param_combinations)} parameter combinations")
             
-            best_score = -1
-            best_params = None
-            best_model = None
-            all_results = []
+            # The grid order is fixed, so finished trials identify the grid positions to skip
+            finished = self._begin_run('grid_search', {'param_grid': param_grid, 'cv': cv})
             
             # Update tuning run with total combinations
             self.update_tuning_run({
@@ -346,66 +546,12 @@ class XGBoostOptimizer:
                 }]
             })
             
-            # Perform grid search
-            for i, params_dict in enumerate(tqdm(param_combinations, desc="Grid Search")):
-                # Combine with base parameters
-                full_params = {**self.base_params, **params_dict}
-                
-                # Train and evaluate model
-                model = xgb.XGBClassifier(**full_params)
-                
-                # Use cross-validation
-                kf = KFold(n_splits=cv, shuffle=True, random_state=42)
-                cv_scores = []
-                
-                for train_idx, val_idx in kf.split(self.X_train):
-                    X_cv_train, X_cv_val = self.X_train[train_idx], self.X_train[val_idx]
-                    y_cv_train, y_cv_val = self.y_train[train_idx], self.y_train[val_idx]
-                    
-                    # Get sample weights for this fold
-                    weights_cv = self.sample_weights[train_idx] if self.sample_weights is not None else None
-                    
-                    # Train on this fold
-                    model.fit(X_cv_train, y_cv_train, sample_weight=weights_cv, verbose=False)
-                    
-                    # Predict and evaluate
-                    y_cv_pred = model.predict(X_cv_val)
-                    fold_accuracy = accuracy_score(y_cv_val, y_cv_pred)
-                    cv_scores.append(fold_accuracy)
-                
-                # Calculate average score
-                avg_score = np.mean(cv_scores)
-                
-                # Store result
-                result = {
-                    'params': params_dict,
-                    'accuracy': avg_score,
-                    'fold_scores': cv_scores
-                }
-                all_results.append(result)
-                
-                # Update best if improved
-                if avg_score > best_score:
-                    best_score = avg_score
-                    best_params = params_dict
-                    
-                    # Retrain on full training set with best params
-                    best_model = xgb.XGBClassifier(**{**self.base_params, **best_params})
-                    best_model.fit(
-                        self.X_train, 
-                        self.y_train, 
-                        sample_weight=self.sample_weights,
-                        verbose=False
-                    )
-                
-                # Update tuning run periodically
-                if (i + 1) % 10 == 0 or (i + 1) == len(param_combinations):
-                    progress_update = {
-                        'allParams': all_results,
-                        'bestAccuracy': best_score,
-                        'bestParams': best_params
-                    }
-                    self.update_tuning_run(progress_update)
+            # Perform grid search, running the fits of all combinations in parallel
+            all_results, best_params, best_score = self._cross_validate_candidates(
+                param_combinations, cv, update_every=10, desc="Grid Search", finished=finished)
+            
+            # Retrain on full training set with best params
+            best_model = self._fit_final_model(best_params)
             
             # Final evaluation on test set
             y_pred = best_model.predict(self.X_test)
@@ -426,6 +572,7 @@ class XGBoostOptimizer:
                 baseline_accuracy=baseline_accuracy,
                 best_accuracy=final_accuracy
             )
+            self.checkpoint.finish('completed')
             
             # Return results
             grid_search_results = {
@@ -436,7 +583,10 @@ class XGBoostOptimizer:
                 'recall': recall,
                 'f1_score': f1,
                 'confusion_matrix': cm.tolist(),
-                'all_results': all_results
+                'all_results': all_results,
+                'wall_clock_seconds': time.time() - start_time,
+                'fit_seconds': sum(result['fit_seconds'] for result in all_results),
+                'matrix_cache': self.matrix_cache_summary
             }
             
             self.grid_search_results = grid_search_results
@@ -444,11 +594,7 @@ class XGBoostOptimizer:
             
         except Exception as e:
             self.logger.error(f"Grid search failed: {str(e)}")
-            self.update_tuning_run({
-                'status': 'failed',
-                'errorMessage': str(e),
-                'completedAt': datetime.now().isoformat()
-            })
+            self._abort_run(e)
             raise
     
     def random_search(self, param_distributions: Dict[str, Any], n_iter: int = 50, cv: int = 3) -> Dict[str, Any]:
@@ -464,7 +610,7 @@ class XGBoostOptimizer:
             Dictionary with best model and performance metrics
         """
         self.logger.info(f"Starting random search optimization with {n_iter} iterations")
-        tuning_run_id = self.create_tuning_run('random_search')
+        start_time = time.time()
         
         try:
             # Train baseline model if not already done
@@ -473,10 +619,8 @@ class XGBoostOptimizer:
                 
             baseline_accuracy = self.baseline_results['accuracy']
             
-            best_score = -1
-            best_params = None
-            best_model = None
-            all_results = []
+            finished = self._begin_run('random_search', {
+                'param_distributions': param_distributions, 'n_iter': n_iter, 'cv': cv})
             
             # Update tuning run with total iterations
             self.update_tuning_run({
@@ -485,69 +629,27 @@ class XGBoostOptimizer:
                 }]
             })
             
+            # Generate random parameters up front so all candidates can run in parallel. The
+            # samples and the random state after sampling are checkpointed, so a resumed run
+            # evaluates the same candidates and continues the same random sequence.
+            search_state = self.checkpoint.load_search_state() if finished else None
+            if search_state:
+                param_samples = search_state['candidates']
+                np.random.set_state(search_state['random_state'])
+            else:
+                finished = []
+                param_samples = [self._sample_parameters(param_distributions) for _ in range(n_iter)]
+                self.checkpoint.save_search_state({
+                    'candidates': param_samples,
+                    'random_state': np.random.get_state()
+                })
+            
             # Perform random search
-            for i in tqdm(range(n_iter), desc="Random Search"):
-                # Generate random parameters
-                params_dict = self._sample_parameters(param_distributions)
-                
-                # Combine with base parameters
-                full_params = {**self.base_params, **params_dict}
-                
-                # Train and evaluate model
-                model = xgb.XGBClassifier(**full_params)
-                
-                # Use cross-validation
-                kf = KFold(n_splits=cv, shuffle=True, random_state=42)
-                cv_scores = []
-                
-                for train_idx, val_idx in kf.split(self.X_train):
-                    X_cv_train, X_cv_val = self.X_train[train_idx], self.X_train[val_idx]
-                    y_cv_train, y_cv_val = self.y_train[train_idx], self.y_train[val_idx]
-                    
-                    # Get sample weights for this fold
-                    weights_cv = self.sample_weights[train_idx] if self.sample_weights is not None else None
-                    
-                    # Train on this fold
-                    model.fit(X_cv_train, y_cv_train, sample_weight=weights_cv, verbose=False)
-                    
-                    # Predict and evaluate
-                    y_cv_pred = model.predict(X_cv_val)
-                    fold_accuracy = accuracy_score(y_cv_val, y_cv_pred)
-                    cv_scores.append(fold_accuracy)
-                
-                # Calculate average score
-                avg_score = np.mean(cv_scores)
-                
-                # Store result
-                result = {
-                    'params': params_dict,
-                    'accuracy': avg_score,
-                    'fold_scores': cv_scores
-                }
-                all_results.append(result)
-                
-                # Update best if improved
-                if avg_score > best_score:
-                    best_score = avg_score
-                    best_params = params_dict
-                    
-                    # Retrain on full training set with best params
-                    best_model = xgb.XGBClassifier(**{**self.base_params, **best_params})
-                    best_model.fit(
-                        self.X_train, 
-                        self.y_train, 
-                        sample_weight=self.sample_weights,
-                        verbose=False
-                    )
-                
-                # Update tuning run periodically
-                if (i + 1) % 5 == 0 or (i + 1) == n_iter:
-                    progress_update = {
-                        'allParams': all_results,
-                        'bestAccuracy': best_score,
-                        'bestParams': best_params
-                    }
-                    self.update_tuning_run(progress_update)
+            all_results, best_params, best_score = self._cross_validate_candidates(
+                param_samples, cv, update_every=5, desc="Random Search", finished=finished)
+            
+            # Retrain on full training set with best params
+            best_model = self._fit_final_model(best_params)
             
             # Final evaluation on test set
             y_pred = best_model.predict(self.X_test)
@@ -568,6 +670,7 @@ class XGBoostOptimizer:
                 baseline_accuracy=baseline_accuracy,
                 best_accuracy=final_accuracy
             )
+            self.checkpoint.finish('completed')
             
             # Return results
             random_search_results = {
@@ -578,7 +681,10 @@ class XGBoostOptimizer:
                 'recall': recall,
                 'f1_score': f1,
                 'confusion_matrix': cm.tolist(),
-                'all_results': all_results
+                'all_results': all_results,
+                'wall_clock_seconds': time.time() - start_time,
+                'fit_seconds': sum(result['fit_seconds'] for result in all_results),
+                'matrix_cache': self.matrix_cache_summary
             }
             
             self.random_search_results = random_search_results
@@ -586,11 +692,7 @@ class XGBoostOptimizer:
             
         except Exception as e:
             self.logger.error(f"Random search failed: {str(e)}")
-            self.update_tuning_run({
-                'status': 'failed',
-                'errorMessage': str(e),
-                'completedAt': datetime.now().isoformat()
-            })
+            self._abort_run(e)
             raise
     
     def bayesian_optimization(self, param_space: Dict[str, Any], max_evals: int = 50) -> Dict[str, Any]:
@@ -607,7 +709,7 @@ class XGBoostOptimizer:
         from hyperopt import fmin, tpe, hp, STATUS_OK, Trials
         
         self.logger.info(f"Starting Bayesian optimization with {max_evals} evaluations")
-        tuning_run_id = self.create_tuning_run('bayesian')
+        start_time = time.time()
         
         try:
             # Train baseline model if not already done
@@ -616,8 +718,22 @@ class XGBoostOptimizer:
                 
             baseline_accuracy = self.baseline_results['accuracy']
             
-            # Results storage
-            all_results = []
+            finished = self._begin_run('bayesian', {'param_space': sorted(param_space.keys()), 'max_evals': max_evals})
+            
+            # Restore the hyperopt Trials and random generator of a checkpointed run, so
+            # TPE continues from the same history instead of starting over
+            search_state = self.checkpoint.load_search_state() if finished else None
+            if search_state:
+                trials = search_state['trials']
+                rstate = search_state['rstate']
+            else:
+                trials = Trials()
+                rstate = np.random.default_rng(self.base_params['seed'])
+            
+            # Results storage (trials logged after the last saved Trials are evaluated again)
+            finished_by_trial = {result['trial']: result for result in finished} if search_state else {}
+            all_results = [finished_by_trial[trial] for trial in sorted(finished_by_trial)
+                           if trial < len(trials.trials)]
             
             # Update tuning run with total evaluations
             self.update_tuning_run({
@@ -640,38 +756,21 @@ class XGBoostOptimizer:
                     'n_estimators': int(params['n_estimators'])
                 }
                 
-                # Train model
-                model = xgb.XGBClassifier(**xgb_params)
-                
-                # Use 3-fold cross-validation
-                kf = KFold(n_splits=3, shuffle=True, random_state=42)
-                cv_scores = []
-                
-                for train_idx, val_idx in kf.split(self.X_train):
-                    X_cv_train, X_cv_val = self.X_train[train_idx], self.X_train[val_idx]
-                    y_cv_train, y_cv_val = self.y_train[train_idx], self.y_train[val_idx]
-                    
-                    # Get sample weights for this fold
-                    weights_cv = self.sample_weights[train_idx] if self.sample_weights is not None else None
-                    
-                    # Train on this fold
-                    model.fit(X_cv_train, y_cv_train, sample_weight=weights_cv, verbose=False)
-                    
-                    # Predict and evaluate
-                    y_cv_pred = model.predict(X_cv_val)
-                    fold_accuracy = accuracy_score(y_cv_val, y_cv_pred)
-                    cv_scores.append(fold_accuracy)
-                
-                # Calculate average score
-                avg_score = np.mean(cv_scores)
+                # Use 3-fold cross-validation, with the folds trained in parallel
+                trial = len(all_results)
+                cv_result = executor.evaluate([(trial, xgb_params)])[trial]
+                avg_score = cv_result['accuracy']
                 
                 # Store result in a format that can be JSON serialized
                 result = {
+                    'trial': trial,
                     'params': {k: float(v) if isinstance(v, np.float64) else v for k, v in params.items()},
                     'accuracy': float(avg_score),
-                    'fold_scores': [float(s) for s in cv_scores]
+                    'fold_scores': [float(s) for s in cv_result['fold_scores']],
+                    'fit_seconds': cv_result['fit_seconds']
                 }
                 all_results.append(result)
+                self._record_trial(result)
                 
                 # Update tuning run periodically
                 if len(all_results) % 5 == 0:
@@ -689,16 +788,26 @@ class XGBoostOptimizer:
                 # Return negative score for minimization
                 return {'loss': -avg_score, 'status': STATUS_OK}
             
-            # Run Bayesian optimization
-            trials = Trials()
-            best = fmin(
-                fn=objective,
-                space=param_space,
-                algo=tpe.suggest,
-                max_evals=max_evals,
-                trials=trials,
-                verbose=1
-            )
+            # Run Bayesian optimization (TPE proposes one candidate at a time, so the
+            # parallelism here is across the folds of each candidate). fmin is advanced one
+            # evaluation at a time so the Trials can be checkpointed after every trial.
+            with self._create_cv_executor(3) as executor:
+                for n_evals in tqdm(range(len(trials.trials) + 1, max_evals + 1), desc="Bayesian Optimization"):
+                    self._check_cancelled()
+                    fmin(
+                        fn=objective,
+                        space=param_space,
+                        algo=tpe.suggest,
+                        max_evals=n_evals,
+                        trials=trials,
+                        rstate=rstate,
+                        verbose=False,
+                        show_progressbar=False
+                    )
+                    self.checkpoint.save_search_state({'trials': trials, 'rstate': rstate})
+                self.matrix_cache_summary = executor.get_matrix_cache_summary()
+            
+            best = trials.argmin
             
             # Get best parameters
             best_params = {
@@ -740,6 +849,7 @@ class XGBoostOptimizer:
                 baseline_accuracy=baseline_accuracy,
                 best_accuracy=final_accuracy
             )
+            self.checkpoint.finish('completed')
             
             # Return results
             bayesian_results = {
@@ -750,7 +860,10 @@ class XGBoostOptimizer:
                 'recall': recall,
                 'f1_score': f1,
                 'confusion_matrix': cm.tolist(),
-                'all_results': all_results
+                'all_results': all_results,
+                'wall_clock_seconds': time.time() - start_time,
+                'fit_seconds': sum(result['fit_seconds'] for result in all_results),
+                'matrix_cache': self.matrix_cache_summary
             }
             
             self.bayesian_results = bayesian_results
@@ -758,11 +871,187 @@ class XGBoostOptimizer:
             
         except Exception as e:
             self.logger.error(f"Bayesian optimization failed: {str(e)}")
+            self._abort_run(e)
+            raise
+    
+    def hyperband_search(self, param_distributions: Dict[str, Any], max_rounds: int = 500,
+                         min_rounds: int = 20, eta: int = 3, cv: int = 3,
+                         min_data_fraction: float = 0.25) -> Dict[str, Any]:
+        """
+        Perform Hyperband (successive halving) search for hyperparameter optimization
+        
+        Candidates are first trained with few boosting rounds on part of the training
+        data; only the best 1/eta of each rung is promoted to the next, larger budget.
+        Hyperband runs several such brackets that trade the number of candidates
+        against their starting budget.
+        
+        Args:
+            param_distributions: Dictionary of parameters and their distributions
+                (same format as random_search; n_estimators is set by the budget)
+            max_rounds: Boosting rounds at the full budget
+            min_rounds: Boosting rounds at the smallest budget
+            eta: Fraction of candidates kept at each rung is 1/eta
+            cv: Number of cross-validation folds
+            min_data_fraction: Smallest fraction of the training data a budget uses
+            
+        Returns:
+            Dictionary with best model and performance metrics
+        """
+        self.logger.info(f"Starting Hyperband optimization with budgets from {min_rounds} to {max_rounds} rounds")
+        start_time = time.time()
+        
+        try:
+            # Train baseline model if not already done
+            if not hasattr(self, 'baseline_results'):
+                self.train_baseline_model()
+                
+            baseline_accuracy = self.baseline_results['accuracy']
+            
+            # The number of boosting rounds is controlled by the budget
+            param_distributions = {k: v for k, v in param_distributions.items() if k != 'n_estimators'}
+            s_max = int(np.floor(np.log(max_rounds / min_rounds) / np.log(eta) + 1e-9))
+            
+            finished = self._begin_run('hyperband', {
+                'param_distributions': param_distributions, 'max_rounds': max_rounds,
+                'min_rounds': min_rounds, 'eta': eta, 'cv': cv, 'min_data_fraction': min_data_fraction})
+            
+            # Each bracket's sampled candidates are checkpointed; promotion only depends on
+            # the scores, so a resumed run replays the finished rungs without refitting
+            search_state = self.checkpoint.load_search_state() if finished else None
+            if not search_state:
+                search_state, finished = {'brackets': {}}, []
+            finished_by_trial = {result['trial']: result for result in finished}
+            
+            all_results = []
+            best = {'score': -1, 'params': None}
+            
+            # Update tuning run with the bracket layout
             self.update_tuning_run({
-                'status': 'failed',
-                'errorMessage': str(e),
-                'completedAt': datetime.now().isoformat()
+                'allParams': [{
+                    'info': f"Starting Hyperband with {s_max + 1} brackets, eta={eta}"
+                }]
             })
+            
+            with self._create_cv_executor(cv) as executor:
+                for bracket in range(s_max, -1, -1):
+                    # Number of candidates and starting budget of this bracket
+                    n_candidates = int(np.ceil((s_max + 1) / (bracket + 1) * eta ** bracket))
+                    if bracket in search_state['brackets']:
+                        candidates = search_state['brackets'][bracket]
+                        np.random.set_state(search_state['random_state'])
+                    else:
+                        candidates = [self._sample_parameters(param_distributions) for _ in range(n_candidates)]
+                        search_state['brackets'][bracket] = candidates
+                        search_state['random_state'] = np.random.get_state()
+                        self.checkpoint.save_search_state(search_state)
+                    
+                    for rung in range(bracket + 1):
+                        budget = eta ** (rung - bracket)
+                        n_estimators = max(1, int(round(max_rounds * budget)))
+                        data_fraction = max(min_data_fraction, budget)
+                        trial_ids = [f"b{bracket}r{rung}c{i}" for i in range(len(candidates))]
+                        
+                        def on_result(trial_id: str, cv_result: Dict[str, Any]) -> None:
+                            result = {
+                                'trial': trial_id,
+                                'params': {**candidates[trial_ids.index(trial_id)], 'n_estimators': n_estimators},
+                                'accuracy': cv_result['accuracy'],
+                                'fold_scores': cv_result['fold_scores'],
+                                'fit_seconds': cv_result['fit_seconds'],
+                                'bracket': bracket,
+                                'rung': rung,
+                                'data_fraction': data_fraction
+                            }
+                            finished_by_trial[trial_id] = result
+                            self._record_trial(result)
+                            self._check_cancelled()
+                        
+                        self._check_cancelled()
+                        executor.evaluate(
+                            [(trial_id, {**self.base_params, **params, 'n_estimators': n_estimators})
+                             for trial_id, params in zip(trial_ids, candidates) if trial_id not in finished_by_trial],
+                            callback=on_result,
+                            data_fraction=data_fraction
+                        )
+                        self.checkpoint.update()
+                        
+                        scored = []
+                        for i, trial_id in enumerate(trial_ids):
+                            result = finished_by_trial[trial_id]
+                            all_results.append(result)
+                            scored.append((result['accuracy'], i))
+                            
+                            # Only full-budget scores are comparable across brackets
+                            if budget >= 1.0 and result['accuracy'] > best['score']:
+                                best['score'] = result['accuracy']
+                                best['params'] = result['params']
+                        
+                        self.logger.info(f"Bracket {bracket} rung {rung}: {len(candidates)} candidates at "
+                                         f"{n_estimators} rounds on {data_fraction:.0%} of the data, "
+                                         f"best CV accuracy {max(scored)[0]:.4f}")
+                        
+                        self.update_tuning_run({
+                            'allParams': all_results,
+                            'bestAccuracy': best['score'],
+                            'bestParams': best['params']
+                        })
+                        
+                        # Promote the top 1/eta of the candidates to the next rung
+                        n_keep = max(1, len(candidates) // eta)
+                        scored.sort(key=lambda item: item[0], reverse=True)
+                        candidates = [candidates[i] for _, i in scored[:n_keep]]
+                
+                self.matrix_cache_summary = executor.get_matrix_cache_summary()
+            
+            best_params = best['params']
+            
+            # Train final model with best parameters
+            best_model = self._fit_final_model(best_params)
+            
+            # Final evaluation on test set
+            y_pred = best_model.predict(self.X_test)
+            final_accuracy = accuracy_score(self.y_test, y_pred)
+            precision = precision_score(self.y_test, y_pred, average='weighted')
+            recall = recall_score(self.y_test, y_pred, average='weighted')
+            f1 = f1_score(self.y_test, y_pred, average='weighted')
+            cm = confusion_matrix(self.y_test, y_pred)
+            
+            wall_clock_seconds = time.time() - start_time
+            self.logger.info(f"Hyperband optimization completed in {wall_clock_seconds:.1f}s - "
+                             f"Best accuracy: {final_accuracy:.4f}, F1: {f1:.4f}")
+            self.logger.info(f"Best parameters: {best_params}")
+            
+            # Mark tuning run as completed
+            self.complete_tuning_run(
+                success=True,
+                best_params=best_params,
+                all_params=all_results,
+                baseline_accuracy=baseline_accuracy,
+                best_accuracy=final_accuracy
+            )
+            self.checkpoint.finish('completed')
+            
+            # Return results
+            hyperband_results = {
+                'model': best_model,
+                'params': {**self.base_params, **best_params},
+                'accuracy': final_accuracy,
+                'precision': precision,
+                'recall': recall,
+                'f1_score': f1,
+                'confusion_matrix': cm.tolist(),
+                'all_results': all_results,
+                'wall_clock_seconds': wall_clock_seconds,
+                'fit_seconds': sum(result['fit_seconds'] for result in all_results),
+                'matrix_cache': self.matrix_cache_summary
+            }
+            
+            self.hyperband_results = hyperband_results
+            return hyperband_results
+            
+        except Exception as e:
+            self.logger.error(f"Hyperband optimization failed: {str(e)}")
+            self._abort_run(e)
             raise
     
     def save_optimized_model(self, optimization_type: str) -> str:
@@ -770,7 +1059,7 @@ class XGBoostOptimizer:
         Save the optimized model to disk
         
         Args:
-            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian')
+            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian', 'hyperband')
             
         Returns:
             Path to the saved model
@@ -784,10 +1073,6 @@ class XGBoostOptimizer:
         params = results['params']
         
         model_path = os.path.join(self.model_dir, f'xgboost_{self.symbol}_{self.timeframe}_{optimization_type}.model')
-        metadata_path = os.path.join(self.model_dir, f'xgboost_{self.symbol}_{self.timeframe}_{optimization_type}_metadata.json')
-        
-        # Save the model
-        model.save_model(model_path)
         
         # Save metadata
         features = [f"feature_{i}" for i in range(self.X_train.shape[1])]
@@ -804,11 +1089,17 @@ class XGBoostOptimizer:
                 'recall': results['recall'],
                 'f1_score': results['f1_score']
             },
+            'search_cost': {
+                'wall_clock_seconds': results.get('wall_clock_seconds'),
+                'fit_seconds': results.get('fit_seconds'),
+                'candidates_evaluated': len(results.get('all_results', [])),
+                'setup_seconds_saved': results.get('matrix_cache', {}).get('estimated_setup_seconds_saved')
+            },
             'training_date': datetime.now().isoformat()
         }
         
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        # Model and metadata are written atomically
+        save_model(model, model_path, metadata)
             
         self.logger.info(f"Saved optimized model ({optimization_type}) to {model_path}")
         return model_path
@@ -830,7 +1121,7 @@ class XGBoostOptimizer:
                 'f1_score': self.baseline_results['f1_score']
             }
         
-        for method in ['grid_search', 'random_search', 'bayesian']:
+        for method in OPTIMIZATION_METHODS:
             results_attr = f"{method}_results"
             if hasattr(self, results_attr):
                 results = getattr(self, results_attr)
@@ -838,7 +1129,8 @@ class XGBoostOptimizer:
                     'accuracy': results['accuracy'],
                     'precision': results['precision'],
                     'recall': results['recall'],
-                    'f1_score': results['f1_score']
+                    'f1_score': results['f1_score'],
+                    'wall_clock_seconds': results.get('wall_clock_seconds')
                 }
         
         return comparison
@@ -847,6 +1139,9 @@ class XGBoostOptimizer:
         """
         Visualize the performance comparison
         
+        The chart is drawn by the background chart renderer (an unchanged
+        comparison reuses its cached image).
+        
         Args:
             save_path: Path to save the visualization
             
@@ -857,39 +1152,25 @@ class XGBoostOptimizer:
         
         # Prepare data for plotting
         methods = list(comparison.keys())
-        accuracies = [comparison[m]['accuracy'] for m in methods]
-        f1_scores = [comparison[m]['f1_score'] for m in methods]
-        
-        # Create plot
-        plt.figure(figsize=(10, 6))
-        x = np.arange(len(methods))
-        width = 0.35
-        
-        plt.bar(x - width/2, accuracies, width, label='Accuracy')
-        plt.bar(x + width/2, f1_scores, width, label='F1 Score')
-        
-        plt.ylabel('Score')
-        plt.title(f'Performance Comparison for {self.symbol.upper()} ({self.timeframe})')
-        plt.xticks(x, [m.replace('_', ' ').title() for m in methods])
-        plt.legend()
-        
-        plt.ylim(0, 1.0)
+        payload = {
+            'title': f'Performance Comparison for {self.symbol.upper()} ({self.timeframe})',
+            'methods': methods,
+            'accuracy': [float(comparison[m]['accuracy']) for m in methods],
+            'f1_score': [float(comparison[m]['f1_score']) for m in methods]
+        }
         
         # Save the plot
         if save_path is None:
             save_path = os.path.join(self.model_dir, f'{self.symbol}_{self.timeframe}_performance_comparison.png')
-            
-        plt.savefig(save_path)
-        plt.close()
         
-        return save_path
+        return render_chart('performance_comparison', payload, save_path)
     
     def send_model_performance_to_api(self, optimization_type: str, strategy_impact: Dict[str, Any]) -> None:
         """
         Send model performance metrics to the API
         
         Args:
-            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian')
+            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian', 'hyperband')
             strategy_impact: Dictionary with strategy impact metrics
         """
         results_attr = f"{optimization_type}_results"
@@ -938,7 +1219,7 @@ class XGBoostOptimizer:
         Log the impact of the optimized model on trading strategy
         
         Args:
-            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian')
+            optimization_type: Type of optimization ('grid_search', 'random_search', 'bayesian', 'hyperband')
             simulation_data: Dictionary with simulation data
         """
         results_attr = f"{optimization_type}_results"
@@ -1049,7 +1330,11 @@ def run_xgboost_optimization(
     timeframe: str,
     optimization_type: str = 'all',
     data_dir: str = 'data/training',
-    model_dir: str = 'models'
+    model_dir: str = 'models',
+    n_workers: Optional[int] = None,
+    resume: bool = False,
+    cancel_event: Optional[threading.Event] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> None:
     """
     Run XGBoost optimization for a specific symbol and timeframe
@@ -1057,14 +1342,20 @@ def run_xgboost_optimization(
     Args:
         symbol: Trading pair symbol (e.g., 'btcusdt')
         timeframe: Timeframe for the data (e.g., '1h', '4h', '1d')
-        optimization_type: Type of optimization to run ('grid_search', 'random_search', 'bayesian', 'all')
+        optimization_type: Type of optimization to run ('grid_search', 'random_search', 'bayesian', 'hyperband', 'all')
         data_dir: Directory containing training data
         model_dir: Directory to save trained models
+        n_workers: Number of processes for cross-validation fits (default: one per CPU core)
+        resume: Whether to continue each search from its checkpoint
+        cancel_event: Event that stops the run when set (raises OptimizationCancelled)
+        progress_callback: Called with the method and number of finished trials after every trial
     """
     logger.info(f"Starting XGBoost optimization for {symbol} on {timeframe} timeframe")
     
     # Create optimizer
-    optimizer = XGBoostOptimizer(symbol, timeframe, data_dir, model_dir)
+    optimizer = XGBoostOptimizer(symbol, timeframe, data_dir, model_dir, n_workers=n_workers,
+                                 resume=resume, cancel_event=cancel_event,
+                                 progress_callback=progress_callback)
     
     try:
         # Load data
@@ -1164,6 +1455,28 @@ def run_xgboost_optimization(
             # Send model performance to API
             optimizer.send_model_performance_to_api('bayesian', mock_strategy_impact)
         
+        # Run Hyperband
+        if optimization_type in ['hyperband', 'all']:
+            param_distributions = {
+                'max_depth': ('int_uniform', 3, 10),
+                'learning_rate': ('uniform', 0.01, 0.3),
+                'min_child_weight': ('int_uniform', 1, 6),
+                'gamma': ('uniform', 0, 0.5),
+                'subsample': ('uniform', 0.6, 1.0),
+                'colsample_bytree': ('uniform', 0.6, 1.0)
+            }
+            
+            hyperband_results = optimizer.hyperband_search(param_distributions, max_rounds=500, min_rounds=20)
+            hyperband_model_path = optimizer.save_optimized_model('hyperband')
+            logger.info(f"Hyperband optimized model saved to {hyperband_model_path} "
+                        f"({hyperband_results['wall_clock_seconds']:.1f}s wall clock)")
+            
+            # Log strategy impact
+            optimizer.log_strategy_impact('hyperband', mock_strategy_impact)
+            
+            # Send model performance to API
+            optimizer.send_model_performance_to_api('hyperband', mock_strategy_impact)
+        
         # Create performance comparison visualization
         if optimization_type == 'all':
             vis_path = optimizer.visualize_performance_comparison()
@@ -1183,12 +1496,16 @@ if __name__ == "__main__":
     parser.add_argument('--symbol', type=str, required=True, help="Trading pair symbol (e.g., 'btcusdt')")
     parser.add_argument('--timeframe', type=str, required=True, help="Timeframe (e.g., '1h', '4h', '1d')")
     parser.add_argument('--optimization', type=str, default='all', 
-                        choices=['grid_search', 'random_search', 'bayesian', 'all'],
+                        choices=OPTIMIZATION_METHODS + ['all'],
                         help="Optimization method to use")
     parser.add_argument('--data-dir', type=str, default='data/training', 
                         help="Directory containing training data")
     parser.add_argument('--model-dir', type=str, default='models', 
                         help="Directory to save trained models")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of processes for cross-validation fits (default: one per CPU core)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue each search from its checkpoint instead of starting over")
     
     args = parser.parse_args()
     
@@ -1197,5 +1514,7 @@ if __name__ == "__main__":
         timeframe=args.timeframe,
         optimization_type=args.optimization,
         data_dir=args.data_dir,
-        model_dir=args.model_dir
+        model_dir=args.model_dir,
+        n_workers=args.workers,
+        resume=args.resume
     )
\ No newline at end of file